@@ -1,62 +1,106 @@
-import copy
 import hashlib
 import json
 import logging
 
 import celpy
 
-from keep.api.core.db import get_all_filters, get_last_alert_hash_by_fingerprint
+from keep.api.alert_deduplicator.deduplication_index import DeduplicationIndex
 from keep.api.models.alert import AlertDto
+from keep.rulesengine.celactivation import alert_to_cel_payload, build_activation
+from keep.rulesengine.celcache import get_cel_program
 
 
-# decide whether this should be a singleton so that we can keep the filters in memory
 class AlertDeduplicator:
     # this fields will be removed from the alert before hashing
     # TODO: make this configurable
     DEFAULT_FIELDS = ["lastReceived"]
 
     def __init__(self, tenant_id):
-        self.filters = get_all_filters(tenant_id)
+        # the filters and the last alert hashes are kept in memory, across requests
+        self.index = DeduplicationIndex.get_instance()
+        self.filters = self.index.get_filters(tenant_id)
         self.logger = logging.getLogger(__name__)
         self.tenant_id = tenant_id
 
     def is_deduplicated(self, alert: AlertDto) -> bool:
+        alert_hash = self.get_alert_hash(alert)
+
+        # Check if the hash is the hash of the last alert of the fingerprint
+        last_alert_hash_by_fingerprint = self.index.get_last_hashes(
+            self.tenant_id, [alert.fingerprint], {(alert.fingerprint, alert_hash)}
+        ).get(alert.fingerprint)
+        alert_deduplicate = self._is_duplicate(
+            alert, alert_hash, last_alert_hash_by_fingerprint
+        )
+        return alert_hash, alert_deduplicate
+
+    def is_deduplicated_batch(self, alerts: list[AlertDto]) -> list[tuple[str, bool]]:
+        """Check a batch of alerts, fetching the last alert hashes missing from the index in one query
+
+        Returns:
+            list[tuple[str, bool]]: the hash and whether it's deduplicated, for each alert
+        """
+        alert_hashes = [self.get_alert_hash(alert) for alert in alerts]
+        last_alert_hashes = self.index.get_last_hashes(
+            self.tenant_id,
+            [alert.fingerprint for alert in alerts],
+            {
+                (alert.fingerprint, alert_hash)
+                for alert, alert_hash in zip(alerts, alert_hashes)
+            },
+        )
+        return [
+            (
+                alert_hash,
+                self._is_duplicate(
+                    alert, alert_hash, last_alert_hashes.get(alert.fingerprint)
+                ),
+            )
+            for alert, alert_hash in zip(alerts, alert_hashes)
+        ]
+
+    def get_alert_hash(self, alert: AlertDto) -> str:
+        # the fields are removed from a dump of the alert, so the alert itself is never copied
+        payload = alert.dict()
         # Apply all deduplication filters
+        #   the activation is rebuilt only when a filter actually changed the alert
+        activation = None
         for filt in self.filters:
-            alert = self._apply_deduplication_filter(filt, alert)
+            if activation is None:
+                activation = build_activation(alert_to_cel_payload(payload))
+            if self._apply_deduplication_filter(filt, payload, activation):
+                activation = None
 
         # Remove default fields
         for field in AlertDeduplicator.DEFAULT_FIELDS:
-            alert = self._remove_field(field, alert)
+            self._remove_field(field, payload)
 
         # Calculate the hash
-        alert_hash = hashlib.sha256(
-            json.dumps(alert.dict(), default=str).encode()
-        ).hexdigest()
+        return hashlib.sha256(json.dumps(payload, default=str).encode()).hexdigest()
 
-        # Check if the hash is already in the database
-        last_alert_hash_by_fingerprint = get_last_alert_hash_by_fingerprint(
-            self.tenant_id, alert.fingerprint
+    def update_index(self, alerts: list[AlertDto]):
+        """Index the hashes of alerts that were stored, must be called after they are committed"""
+        # the alerts are ordered, so the last alert of each fingerprint wins
+        self.index.set_last_hashes(
+            self.tenant_id,
+            {alert.fingerprint: getattr(alert, "alert_hash", None) for alert in alerts},
         )
+
+    def _is_duplicate(
+        self, alert: AlertDto, alert_hash: str, last_alert_hash: str | None
+    ) -> bool:
         alert_deduplicate = (
-            True
-            if last_alert_hash_by_fingerprint
-            and last_alert_hash_by_fingerprint == alert_hash
-            else False
+            True if last_alert_hash and last_alert_hash == alert_hash else False
         )
         if alert_deduplicate:
             self.logger.info(f"Alert {alert.id} is deduplicated {alert.source}")
+        return alert_deduplicate
 
-        return alert_hash, alert_deduplicate
-
-    def _run_matcher(self, matcher, alert: AlertDto) -> bool:
+    def _run_matcher(self, matcher, alert: AlertDto | dict, activation=None) -> bool:
         # run the CEL matcher
-        env = celpy.Environment()
-        ast = env.compile(matcher)
-        prgm = env.program(ast)
-        activation = celpy.json_to_cel(
-            json.loads(json.dumps(alert.dict(), default=str))
-        )
+        prgm = get_cel_program(matcher)
+        if activation is None:
+            activation = build_activation(alert_to_cel_payload(alert))
         try:
             r = prgm.evaluate(activation)
         except celpy.evaluation.CELEvalError as e:
@@ -67,37 +111,32 @@ class AlertDeduplicator:
             raise
         return True if r else False
 
-    def _apply_deduplication_filter(self, filt, alert: AlertDto) -> AlertDto:
+    def _apply_deduplication_filter(self, filt, payload: dict, activation=None) -> bool:
+        """Remove the fields of the filter from the alert payload, if the filter matches
+
+        Returns:
+            bool: whether the filter matched (and the payload changed)
+        """
         # check if the matcher applies
-        filter_apply = self._run_matcher(filt.matcher_cel, alert)
+        filter_apply = self._run_matcher(filt.matcher_cel, payload, activation)
         if not filter_apply:
             self.logger.debug(f"Filter {filt.id} did not match")
-            return alert
+            return False
 
         # remove the fields
         for field in filt.fields:
-            alert = self._remove_field(field, alert)
+            self._remove_field(field, payload)
 
-        return alert
+        return True
 
-    def _remove_field(self, field, alert: AlertDto) -> AlertDto:
-        # remove the field from the alert
-        alert = copy.deepcopy(alert)
+    def _remove_field(self, field, payload: dict):
+        # remove the field from the alert payload (a dump of the alert, so it's safe to modify)
         field_parts = field.split(".")
-        # if its not a nested field
-        if len(field_parts) == 1:
-            try:
-                delattr(alert, field)
-            except AttributeError:
-                self.logger.warning("Failed to delete attribute {field} from alert")
-                pass
-        # if its a nested field, copy the dictionaty and remove the field
-        # this is for cases such as labels/tags
-        else:
-            alert_attr = field_parts[0]
-            d = copy.deepcopy(getattr(alert, alert_attr))
-            for part in field_parts[1:-1]:
-                d = d[part]
-            del d[field_parts[-1]]
-            setattr(alert, field_parts[0], d)
-        return alert
+        # if its a nested field (e.g. labels/tags), walk to the dictionary that holds it
+        d = payload
+        for part in field_parts[:-1]:
+            d = d.get(part) if isinstance(d, dict) else None
+        if not isinstance(d, dict) or field_parts[-1] not in d:
+            self.logger.warning(f"Failed to delete attribute {field} from alert")
+            return
+        del d[field_parts[-1]]
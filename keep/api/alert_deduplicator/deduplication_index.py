@@ -0,0 +1,194 @@
+"""
+Process-wide index of the last alert hashes and the deduplication filters of every tenant.
+
+The index only sees the alerts stored by this process, so with several workers or
+replicas (or the database ingest queue) an indexed hash may be stale and a new alert
+dropped as a duplicate. KEEP_DEDUP_CONFIRM_DUPLICATES=true reads such a hash again
+from the database before dropping the alert, at the cost of a read per batch with
+duplicates; KEEP_DEDUP_INDEX_TTL bounds how long the entries are trusted.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from keep.api.core.db import get_all_filters, get_last_alert_hashes_by_fingerprints
+from keep.api.models.db.alert import AlertDeduplicationFilter
+from keep.rulesengine.celcache import get_cel_program
+
+KEEP_DEDUP_INDEX_SIZE = int(os.environ.get("KEEP_DEDUP_INDEX_SIZE", 100000))
+# seconds, 0 - the last alert hashes never expire
+KEEP_DEDUP_INDEX_TTL = int(os.environ.get("KEEP_DEDUP_INDEX_TTL", 0))
+# read the last alert hash from the database before dropping an alert as a duplicate,
+#   for when other workers or replicas ingest alerts of the same fingerprints
+KEEP_DEDUP_CONFIRM_DUPLICATES = (
+    os.environ.get("KEEP_DEDUP_CONFIRM_DUPLICATES", "false") == "true"
+)
+# seconds, picks up filters that were changed directly in the database
+KEEP_DEDUP_FILTERS_TTL = int(os.environ.get("KEEP_DEDUP_FILTERS_TTL", 60))
+
+
+class DeduplicationIndex:
+    def __init__(
+        self,
+        max_size: int = KEEP_DEDUP_INDEX_SIZE,
+        ttl: int = KEEP_DEDUP_INDEX_TTL,
+        filters_ttl: int = KEEP_DEDUP_FILTERS_TTL,
+        confirm_duplicates: bool = KEEP_DEDUP_CONFIRM_DUPLICATES,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.filters_ttl = filters_ttl
+        self.confirm_duplicates = confirm_duplicates
+        # (tenant_id, fingerprint) -> (alert hash, when it was indexed)
+        self._hashes: OrderedDict[tuple[str, str], tuple[str | None, float]] = (
+            OrderedDict()
+        )
+        # tenant_id -> (filters, when they were loaded)
+        self._filters: dict[str, tuple[list[AlertDeduplicationFilter], float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # the indexed hashes that were read again before dropping an alert
+        self.confirmations = 0
+
+    @classmethod
+    def get_instance(cls) -> "DeduplicationIndex":
+        if not hasattr(cls, "_instance"):
+            cls._instance = cls()
+        return cls._instance
+
+    def get_last_hashes(
+        self,
+        tenant_id: str,
+        fingerprints: list[str],
+        incoming_hashes: set[tuple[str, str]] | None = None,
+    ) -> dict[str, str | None]:
+        """Get the hash of the last alert of each fingerprint, reading only the misses from the database
+
+        Args:
+            incoming_hashes (set[tuple[str, str]], optional): the (fingerprint, hash) of the
+                alerts being deduplicated. With confirm_duplicates, an indexed hash equal to
+                an incoming one (the alert would be dropped) is read from the database too.
+
+        Returns:
+            dict[str, str | None]: the last alert hash by fingerprint, fingerprints without alerts are missing
+        """
+        now = time.monotonic()
+        last_hashes = {}
+        missing = []
+        with self._lock:
+            for fingerprint in dict.fromkeys(fingerprints):
+                key = (tenant_id, fingerprint)
+                entry = self._hashes.get(key)
+                if entry is not None and (not self.ttl or now - entry[1] < self.ttl):
+                    self._hashes.move_to_end(key)
+                    if (
+                        self.confirm_duplicates
+                        and incoming_hashes
+                        and (fingerprint, entry[0]) in incoming_hashes
+                    ):
+                        self.confirmations += 1
+                        missing.append(fingerprint)
+                        continue
+                    self.hits += 1
+                    last_hashes[fingerprint] = entry[0]
+                else:
+                    self.misses += 1
+                    missing.append(fingerprint)
+        if missing:
+            found = get_last_alert_hashes_by_fingerprints(tenant_id, missing)
+            # fingerprints without alerts are not indexed, their first alert indexes them
+            self.set_last_hashes(tenant_id, found, indexed_at=now)
+            last_hashes.update(found)
+        return last_hashes
+
+    def set_last_hashes(
+        self,
+        tenant_id: str,
+        last_hashes: dict[str, str | None],
+        indexed_at: float | None = None,
+    ):
+        """Index the hashes of the last alerts of the fingerprints, called after the alerts are committed
+
+        Args:
+            indexed_at (float, optional): when the hashes were read, entries indexed after it are kept.
+        """
+        indexed_at = indexed_at or time.monotonic()
+        with self._lock:
+            for fingerprint, alert_hash in last_hashes.items():
+                key = (tenant_id, fingerprint)
+                entry = self._hashes.get(key)
+                # e.g. an alert was stored while the hashes were read from the database
+                if entry is not None and entry[1] > indexed_at:
+                    continue
+                self._hashes[key] = (alert_hash, indexed_at)
+                self._hashes.move_to_end(key)
+            while len(self._hashes) > self.max_size:
+                self._hashes.popitem(last=False)
+                self.evictions += 1
+
+    def get_filters(self, tenant_id: str) -> list[AlertDeduplicationFilter]:
+        """Get the deduplication filters of the tenant, loading (and compiling) them on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._filters.get(tenant_id)
+        if entry is not None and now - entry[1] < self.filters_ttl:
+            return entry[0]
+        filters = list(get_all_filters(tenant_id))
+        for filt in filters:
+            try:
+                # warm the compiled programs cache, so the first alert doesn't compile them
+                get_cel_program(filt.matcher_cel)
+            except Exception:
+                self.logger.warning(
+                    "Failed to compile deduplication filter",
+                    extra={"tenant_id": tenant_id, "filter_id": filt.id},
+                )
+        with self._lock:
+            self._filters[tenant_id] = (filters, now)
+        return filters
+
+    def invalidate_filters(self, tenant_id: str | None = None):
+        """Reload the deduplication filters of the tenant (or all tenants) on the next use,
+        should be called whenever they are created, updated or deleted"""
+        with self._lock:
+            if tenant_id is None:
+                self._filters.clear()
+            else:
+                self._filters.pop(tenant_id, None)
+
+    def invalidate(self, tenant_id: str, fingerprints: list[str] | None = None):
+        """Drop the indexed hashes of the fingerprints (or all the fingerprints) of the tenant"""
+        with self._lock:
+            if fingerprints is None:
+                keys = [key for key in self._hashes if key[0] == tenant_id]
+            else:
+                keys = [(tenant_id, fingerprint) for fingerprint in fingerprints]
+            for key in keys:
+                self._hashes.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._hashes.clear()
+            self._filters.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.confirmations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._hashes),
+                "max_size": self.max_size,
+                "tenants_filters": len(self._filters),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "confirmations": self.confirmations,
+            }
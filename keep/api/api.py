@@ -16,10 +16,14 @@ from starlette_context.middleware import RawContextMiddleware
 
 import keep.api.logging
 import keep.api.observability
+from keep.api.core.auth_cache import AuthCache
 from keep.api.core.config import AuthenticationType
 from keep.api.core.db import get_user
 from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.api.core.preset_counters import PresetCounters
+from keep.api.core.realtime_publisher import RealtimePublisher
 from keep.api.logging import CONFIG as logging_config
+from keep.api.logging import WorkflowLogShipper
 from keep.api.routes import (
     alerts,
     extraction,
@@ -29,6 +33,7 @@ from keep.api.routes import (
     preset,
     providers,
     pusher,
+    realtime,
     rules,
     settings,
     status,
@@ -37,7 +42,11 @@ from keep.api.routes import (
     workflows,
 )
 from keep.event_subscriber.event_subscriber import EventSubscriber
+from keep.ingestqueue.ingest_queue import get_ingest_queue
+from keep.ingestqueue.ingest_worker import KEEP_INGEST_WORKERS, IngestWorkerPool
 from keep.posthog.posthog import get_posthog_client
+from keep.providers.providers_puller import ProvidersPuller
+from keep.providers.providers_sync import ProvidersSync, is_providers_sync_enabled
 from keep.workflowmanager.workflowmanager import WorkflowManager
 
 load_dotenv(find_dotenv())
@@ -159,6 +168,7 @@ def get_app(
     )
     app.include_router(whoami.router, prefix="/whoami", tags=["whoami"])
     app.include_router(pusher.router, prefix="/pusher", tags=["pusher"])
+    app.include_router(realtime.router, prefix="/realtime", tags=["realtime"])
     app.include_router(status.router, prefix="/status", tags=["status"])
     app.include_router(rules.router, prefix="/rules", tags=["rules"])
     app.include_router(preset.router, prefix="/preset", tags=["preset"])
@@ -233,8 +243,49 @@ def get_app(
             #       we should add a "wait" here to make sure the server is ready
             await event_subscriber.start()
             logger.info("Consumer started successfully")
+        # Start the ingest workers
+        ingest_queue = get_ingest_queue()
+        if ingest_queue and KEEP_INGEST_WORKERS > 0:
+            logger.info("Starting the ingest workers")
+            app.state.ingest_worker_pool = IngestWorkerPool(
+                ingest_queue, alerts.process_ingest_task
+            )
+            app.state.ingest_worker_pool.start()
+            logger.info("Ingest workers started successfully")
+        # Start pulling the providers into the db
+        if is_providers_sync_enabled():
+            logger.info("Starting the providers sync")
+            app.state.providers_sync = ProvidersSync(alerts.process_ingest_task)
+            app.state.providers_sync.start()
+            logger.info("Providers sync started successfully")
         logger.info("Services started successfully")
 
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        providers_sync = getattr(app.state, "providers_sync", None)
+        if providers_sync:
+            logger.info("Stopping the providers sync")
+            providers_sync.stop()
+            logger.info("Providers sync stopped")
+        ingest_worker_pool = getattr(app.state, "ingest_worker_pool", None)
+        if ingest_worker_pool:
+            logger.info("Stopping the ingest workers")
+            ingest_worker_pool.stop()
+            logger.info("Ingest workers stopped")
+        if SCHEDULER:
+            logger.info("Stopping the scheduler")
+            # drains the queued workflow runs
+            WorkflowManager.get_instance().stop()
+            logger.info("Scheduler stopped")
+        # ships the buffered workflow logs
+        WorkflowLogShipper.get_instance().stop()
+        # writes when the API keys were last used
+        AuthCache.get_instance().stop()
+        PresetCounters.get_instance().stop()
+        # sends the buffered real-time updates
+        RealtimePublisher.get_instance().stop()
+        ProvidersPuller.get_instance().stop()
+
     @app.exception_handler(Exception)
     async def catch_exception(request: Request, exc: Exception):
         logging.error(
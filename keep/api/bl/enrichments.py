@@ -10,6 +10,7 @@ from keep.api.core.db import enrich_alert, get_mapping_rule_by_id
 from keep.api.models.alert import AlertDto
 from keep.api.models.db.extraction import ExtractionRule
 from keep.api.models.db.mapping import MappingRule
+from keep.rulesengine.celcache import get_cel_program
 
 
 def get_nested_attribute(obj: AlertDto, attr_path: str):
@@ -37,6 +38,36 @@ class EnrichmentsBl:
         self.logger = logging.getLogger(__name__)
         self.tenant_id = tenant_id
         self.db_session = db
+        # the rules are loaded once per instance, so an instance can be reused
+        #   for a batch of events (see handle_formatted_events)
+        self._extraction_rules: dict[bool, list[ExtractionRule]] = {}
+        self._mapping_rules: list[MappingRule] | None = None
+
+    def get_extraction_rules(self, is_alert_dto: bool) -> list[ExtractionRule]:
+        """
+        Get the extraction rules for formatted (AlertDto) or raw (dict) events
+        """
+        if is_alert_dto not in self._extraction_rules:
+            self._extraction_rules[is_alert_dto] = (
+                self.db_session.query(ExtractionRule)
+                .filter(ExtractionRule.tenant_id == self.tenant_id)
+                .filter(ExtractionRule.disabled == False)
+                .filter(ExtractionRule.pre == False if is_alert_dto else True)
+                .order_by(ExtractionRule.priority.desc())
+                .all()
+            )
+        return self._extraction_rules[is_alert_dto]
+
+    def get_mapping_rules(self) -> list[MappingRule]:
+        if self._mapping_rules is None:
+            self._mapping_rules = (
+                self.db_session.query(MappingRule)
+                .filter(MappingRule.tenant_id == self.tenant_id)
+                .filter(MappingRule.disabled == False)
+                .order_by(MappingRule.priority.desc())
+                .all()
+            )
+        return self._mapping_rules
 
     def run_extraction_rules(self, event: AlertDto | dict) -> AlertDto | dict:
         """
@@ -51,16 +82,7 @@ class EnrichmentsBl:
             "Running extraction rules for incoming event",
             extra={"tenant_id": self.tenant_id, "fingerprint": fingerprint},
         )
-        rules: list[ExtractionRule] = (
-            self.db_session.query(ExtractionRule)
-            .filter(ExtractionRule.tenant_id == self.tenant_id)
-            .filter(ExtractionRule.disabled == False)
-            .filter(
-                ExtractionRule.pre == False if isinstance(event, AlertDto) else True
-            )
-            .order_by(ExtractionRule.priority.desc())
-            .all()
-        )
+        rules = self.get_extraction_rules(isinstance(event, AlertDto))
 
         if not rules:
             self.logger.debug("No extraction rules found for tenant")
@@ -98,9 +120,7 @@ class EnrichmentsBl:
                     },
                 )
             else:
-                env = celpy.Environment()
-                ast = env.compile(rule.condition)
-                prgm = env.program(ast)
+                prgm = get_cel_program(rule.condition)
                 activation = celpy.json_to_cel(event)
                 relevant = prgm.evaluate(activation)
                 if not relevant:
@@ -179,13 +199,7 @@ class EnrichmentsBl:
             "Running mapping rules for incoming alert",
             extra={"fingerprint": alert.fingerprint, "tenant_id": self.tenant_id},
         )
-        rules: list[MappingRule] = (
-            self.db_session.query(MappingRule)
-            .filter(MappingRule.tenant_id == self.tenant_id)
-            .filter(MappingRule.disabled == False)
-            .order_by(MappingRule.priority.desc())
-            .all()
-        )
+        rules = self.get_mapping_rules()
 
         if not rules:
             self.logger.debug("No mapping rules found for tenant")
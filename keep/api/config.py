@@ -4,8 +4,13 @@ import os
 import keep.api.logging
 from keep.api.api import AUTH_TYPE
 from keep.api.core.config import AuthenticationType
-from keep.api.core.db import create_db_and_tables, try_create_single_tenant
+from keep.api.core.db import (
+    create_db_and_tables,
+    run_pending_backfills,
+    try_create_single_tenant,
+)
 from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.api.core.realtime_publisher import KEEP_REALTIME_TRANSPORT
 
 PORT = int(os.environ.get("PORT", 8080))
 
@@ -16,6 +21,17 @@ logger = logging.getLogger(__name__)
 def on_starting(server=None):
     """This function is called by the gunicorn server when it starts"""
     logger.info("Keep server starting")
+    # the local transport only reaches the clients connected to the same worker
+    workers = server.cfg.workers if server is not None else 1
+    if KEEP_REALTIME_TRANSPORT == "local" and workers > 1:
+        logger.error(
+            "KEEP_REALTIME_TRANSPORT=local requires a single worker",
+            extra={"workers": workers},
+        )
+        raise RuntimeError(
+            f"KEEP_REALTIME_TRANSPORT=local requires a single worker, got {workers}"
+            ", use Pusher (or Soketi) to run more workers"
+        )
     if not os.environ.get("SKIP_DB_CREATION", "false") == "true":
         create_db_and_tables()
 
@@ -26,6 +42,11 @@ def on_starting(server=None):
     ]:
         try_create_single_tenant(SINGLE_TENANT_UUID)
 
+    # populate the tables added to an existing database (e.g. the last alerts),
+    #   once, before the workers serve them
+    if not os.environ.get("SKIP_DB_BACKFILLS", "false") == "true":
+        run_pending_backfills()
+
     if os.environ.get("USE_NGROK", "false") == "true":
         from pyngrok import ngrok
         from pyngrok.conf import PyngrokConfig
@@ -0,0 +1,215 @@
+"""
+In-process cache of the authentication path.
+
+Every request authenticated with an API key looked the key up in the database and
+updated its last_used column, so a flood of webhooks (Grafana, Prometheus) cost a
+read and a write per event, and every bearer token was decoded (and its signature
+verified) on every request.
+
+The API keys are cached by their hash for KEEP_AUTH_CACHE_TTL seconds (the unknown
+keys for KEEP_AUTH_CACHE_NEGATIVE_TTL seconds) and the decoded tokens, with their
+role, until they expire (at most KEEP_AUTH_CACHE_TTL seconds). Rotating or deleting
+a key through /settings/apikey invalidates it, with several replicas the other
+replicas pick it up after the TTL.
+
+The last time every key was used is kept in memory and written in a single batch
+every KEEP_API_KEYS_LAST_USED_FLUSH_INTERVAL seconds by a background thread.
+"""
+
+import datetime
+import hashlib
+import logging
+import os
+import threading
+import time
+import typing
+from collections import OrderedDict
+
+from keep.api.core.db import get_api_key, update_keys_last_used
+from keep.api.core.rbac import Admin as AdminRole
+from keep.api.core.rbac import Role, get_role_by_role_name
+from keep.api.models.db.tenant import TenantApiKey
+
+# seconds, 0 - don't cache
+KEEP_AUTH_CACHE_TTL = int(os.environ.get("KEEP_AUTH_CACHE_TTL", 60))
+# seconds
+KEEP_AUTH_CACHE_NEGATIVE_TTL = int(os.environ.get("KEEP_AUTH_CACHE_NEGATIVE_TTL", 10))
+KEEP_AUTH_CACHE_SIZE = int(os.environ.get("KEEP_AUTH_CACHE_SIZE", 10000))
+# seconds
+KEEP_API_KEYS_LAST_USED_FLUSH_INTERVAL = int(
+    os.environ.get("KEEP_API_KEYS_LAST_USED_FLUSH_INTERVAL", 30)
+)
+
+
+class AuthCache:
+    def __init__(
+        self,
+        ttl: int = KEEP_AUTH_CACHE_TTL,
+        negative_ttl: int = KEEP_AUTH_CACHE_NEGATIVE_TTL,
+        max_size: int = KEEP_AUTH_CACHE_SIZE,
+        flush_interval: int = KEEP_API_KEYS_LAST_USED_FLUSH_INTERVAL,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        # key hash -> (the api key or None if there's no such key, when it expires)
+        self._api_keys: OrderedDict[str, tuple[TenantApiKey | None, float]] = (
+            OrderedDict()
+        )
+        # (verifier, token hash) -> (the decoded token, its role, when it expires)
+        self._tokens: OrderedDict[tuple[str, str], tuple[dict, type[Role], float]] = (
+            OrderedDict()
+        )
+        # (tenant id, reference id) -> when the key was last used, not written yet
+        self._last_used: dict[tuple[str, str], datetime.datetime] = {}
+        # bumped on every invalidation, so a lookup that raced with it isn't cached
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def get_instance(cls) -> "AuthCache":
+        if not hasattr(cls, "_instance"):
+            cls._instance = cls()
+        return cls._instance
+
+    def get_api_key(self, api_key: str) -> TenantApiKey | None:
+        """The (detached) api key, None if there's no such key"""
+        key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._api_keys.get(key_hash)
+            if entry is not None and entry[1] > now:
+                self._api_keys.move_to_end(key_hash)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            generation = self._generation
+        tenant_api_key = get_api_key(api_key)
+        ttl = self.ttl if tenant_api_key else min(self.ttl, self.negative_ttl)
+        if ttl > 0:
+            self._set(self._api_keys, key_hash, (tenant_api_key, now + ttl), generation)
+        return tenant_api_key
+
+    def get_token(
+        self,
+        verifier: str,
+        token: str,
+        decode: typing.Callable[[str], dict],
+        role_claim: str,
+    ) -> tuple[dict, type[Role]]:
+        """The decoded token and its role
+
+        Args:
+            verifier (str): who decodes the token, tokens are cached per verifier.
+            token (str): the bearer token.
+            decode (Callable): decodes (and verifies) the token, raises if it's invalid.
+            role_claim (str): the claim of the role name (admin if it's missing).
+        """
+        key = (verifier, hashlib.sha256(token.encode()).hexdigest())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is not None and entry[2] > now:
+                self._tokens.move_to_end(key)
+                self.hits += 1
+                return entry[0], entry[1]
+            self.misses += 1
+            generation = self._generation
+        payload = decode(token)
+        # default to admin for backwards compatibility
+        role = get_role_by_role_name(payload.get(role_claim, AdminRole.get_name()))
+        ttl = self.ttl
+        if payload.get("exp"):
+            # don't keep the token after it expires
+            ttl = min(ttl, payload["exp"] - time.time())
+        if ttl > 0:
+            self._set(self._tokens, key, (payload, role, now + ttl), generation)
+        return payload, role
+
+    def invalidate_api_key(self, tenant_id: str, reference_id: str):
+        """Look the api key up in the database on its next use (rotated or deleted)"""
+        with self._lock:
+            self._generation += 1
+            for key_hash, (tenant_api_key, _) in list(self._api_keys.items()):
+                if (
+                    tenant_api_key is not None
+                    and tenant_api_key.tenant_id == tenant_id
+                    and tenant_api_key.reference_id == reference_id
+                ):
+                    del self._api_keys[key_hash]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._api_keys.clear()
+            self._tokens.clear()
+
+    def touch_api_key(self, tenant_id: str, reference_id: str):
+        """Record that the api key was used now, written by the background thread"""
+        with self._lock:
+            self._last_used[(tenant_id, reference_id)] = datetime.datetime.utcnow()
+        self._ensure_started()
+
+    def flush(self):
+        """Write the last used time of the keys that were used since the last flush"""
+        with self._lock:
+            last_used, self._last_used = self._last_used, {}
+        if not last_used:
+            return
+        try:
+            update_keys_last_used(last_used)
+        except Exception:
+            self.logger.exception(
+                "Failed to update API keys last used", extra={"keys": len(last_used)}
+            )
+
+    def stop(self):
+        """Stop the background thread, writing the pending last used times"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "api_keys": len(self._api_keys),
+                "tokens": len(self._tokens),
+                "hits": self.hits,
+                "misses": self.misses,
+                "pending_last_used": len(self._last_used),
+            }
+
+    def _set(self, cache: OrderedDict, key, value, generation: int):
+        with self._lock:
+            if generation != self._generation:
+                # a key may have been rotated or deleted while it was looked up
+                return
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.max_size:
+                cache.popitem(last=False)
+
+    def _ensure_started(self):
+        if self._thread is not None or self._stop.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="api-keys-last-used", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self.flush()
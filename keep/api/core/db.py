@@ -6,14 +6,29 @@ import random
 import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Tuple
-from uuid import uuid4
+from uuid import UUID, uuid4
 
+import chevron
 import pymysql
 import validators
 from dotenv import find_dotenv, load_dotenv
 from google.cloud.sql.connector import Connector
 from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
-from sqlalchemy import and_, desc, func, null, select, update
+from sqlalchemy import (
+    and_,
+    case,
+    delete,
+    desc,
+    exists,
+    func,
+    insert,
+    null,
+    select,
+    update,
+)
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload, selectinload, subqueryload
 from sqlalchemy.orm.attributes import flag_modified
@@ -27,13 +42,16 @@ from keep.api.core.config import config
 from keep.api.core.rbac import Admin as AdminRole
 from keep.api.models.alert import AlertStatus
 from keep.api.models.db.alert import *
+from keep.api.models.db.backfill import *
 from keep.api.models.db.extraction import *
+from keep.api.models.db.ingest import *
 from keep.api.models.db.mapping import *
 from keep.api.models.db.preset import *
 from keep.api.models.db.provider import *
 from keep.api.models.db.rule import *
 from keep.api.models.db.tenant import *
 from keep.api.models.db.workflow import *
+from keep.api.models.group import GroupDto
 
 logger = logging.getLogger(__name__)
 
@@ -178,6 +196,16 @@ def get_session() -> Session:
             yield session
 
 
+def get_session_sync() -> Session:
+    """
+    Creates a database session, for code that runs outside of a request (e.g. background workers).
+
+    Returns:
+        Session: A database session, the caller is responsible for closing it
+    """
+    return Session(engine)
+
+
 def try_create_single_tenant(tenant_id: str) -> None:
     try:
         # if Keep is not multitenant, let's import the User table too:
@@ -299,120 +327,252 @@ def get_last_completed_execution(
     ).first()
 
 
-def get_workflows_that_should_run():
+# a running interval workflow is claimed again only after it finished or timed out
+WORKFLOW_EXECUTION_TIMEOUT = timedelta(minutes=60)
+
+
+def get_workflows_that_should_run(limit: int = 100) -> List[dict]:
+    """
+    Claim the interval workflows that are due, and create their executions.
+
+    The due workflows are found with a single query on the indexed next_run_at
+    of their schedules (WorkflowSchedule). A workflow is claimed by a conditional
+    update of its schedule, so every due run is claimed by exactly one scheduler,
+    and the rows are locked with SKIP LOCKED where the dialect supports it, so
+    concurrent schedulers skip each other's rows instead of waiting for them.
+
+    Args:
+        limit (int): The maximum number of workflows to claim.
+
+    Returns:
+        List[dict]: tenant_id, workflow_id and workflow_execution_id of each claimed workflow.
+    """
+    now = datetime.utcnow()
+    claimable = and_(
+        WorkflowSchedule.next_run_at <= now,
+        or_(
+            WorkflowSchedule.is_running == False,
+            WorkflowSchedule.last_started_at <= now - WORKFLOW_EXECUTION_TIMEOUT,
+        ),
+    )
     with Session(engine) as session:
-        workflows_with_interval = session.exec(
-            select(Workflow)
-            .where(Workflow.is_deleted == False)
-            .where(Workflow.interval != None)
-            .where(Workflow.interval > 0)
-        ).all()
+        query = (
+            select(WorkflowSchedule)
+            .where(claimable)
+            .order_by(WorkflowSchedule.next_run_at)
+            .limit(limit)
+        )
+        if engine.dialect.name in ["postgresql", "mysql"]:
+            query = query.with_for_update(skip_locked=True)
+        schedules = session.exec(query).all()
 
         workflows_to_run = []
-        # for each workflow:
-        for workflow in workflows_with_interval:
-            current_time = datetime.utcnow()
-            last_execution = get_last_completed_execution(session, workflow.id)
-            # if there no last execution, that's the first time we run the workflow
-            if not last_execution:
-                try:
-                    # try to get the lock
-                    workflow_execution_id = create_workflow_execution(
-                        workflow.id, workflow.tenant_id, "scheduler"
-                    )
-                    # we succeed to get the lock on this execution number :)
-                    # let's run it
-                    workflows_to_run.append(
-                        {
-                            "tenant_id": workflow.tenant_id,
-                            "workflow_id": workflow.id,
-                            "workflow_execution_id": workflow_execution_id,
-                        }
-                    )
-                # some other thread/instance has already started to work on it
-                except IntegrityError:
-                    continue
-            # else, if the last execution was more than interval seconds ago, we need to run it
-            elif (
-                last_execution.started + timedelta(seconds=workflow.interval)
-                <= current_time
-            ):
-                try:
-                    # try to get the lock with execution_number + 1
-                    workflow_execution_id = create_workflow_execution(
-                        workflow.id,
-                        workflow.tenant_id,
-                        "scheduler",
-                        last_execution.execution_number + 1,
-                    )
-                    # we succeed to get the lock on this execution number :)
-                    # let's run it
-                    workflows_to_run.append(
-                        {
-                            "tenant_id": workflow.tenant_id,
-                            "workflow_id": workflow.id,
-                            "workflow_execution_id": workflow_execution_id,
-                        }
+        timed_out_execution_ids = []
+        for schedule in schedules:
+            workflow_execution_id = str(uuid4())
+            # read before the update, which synchronizes the schedule object
+            workflow_id, tenant_id = schedule.workflow_id, schedule.tenant_id
+            execution_number = schedule.execution_number
+            timed_out_execution_id = (
+                schedule.last_execution_id if schedule.is_running else None
+            )
+            # the execution number is the claim's token, only one scheduler can increment it
+            result = session.execute(
+                update(WorkflowSchedule)
+                .where(WorkflowSchedule.workflow_id == workflow_id)
+                .where(WorkflowSchedule.execution_number == execution_number)
+                .where(claimable)
+                .values(
+                    execution_number=execution_number + 1,
+                    next_run_at=now + timedelta(seconds=schedule.interval),
+                    is_running=True,
+                    last_started_at=now,
+                    last_execution_id=workflow_execution_id,
+                )
+            )
+            if result.rowcount != 1:
+                # claimed by another scheduler
+                continue
+            if timed_out_execution_id:
+                timed_out_execution_ids.append(timed_out_execution_id)
+            session.add(
+                WorkflowExecution(
+                    id=workflow_execution_id,
+                    workflow_id=workflow_id,
+                    tenant_id=tenant_id,
+                    started=datetime.now(tz=timezone.utc),
+                    triggered_by="scheduler",
+                    execution_number=execution_number + 1,
+                    status="in_progress",
+                )
+            )
+            workflows_to_run.append(
+                {
+                    "tenant_id": tenant_id,
+                    "workflow_id": workflow_id,
+                    "workflow_execution_id": workflow_execution_id,
+                }
+            )
+        if timed_out_execution_ids:
+            # if the previous execution runs more than WORKFLOW_EXECUTION_TIMEOUT, than its timeout
+            session.execute(
+                update(WorkflowExecution)
+                .where(WorkflowExecution.id.in_(timed_out_execution_ids))
+                .where(WorkflowExecution.status == "in_progress")
+                .values(status="timeout")
+            )
+        try:
+            session.commit()
+        except IntegrityError:
+            # e.g. an execution number that was taken by an event execution
+            logger.exception("Failed to create the scheduled workflows executions")
+            return []
+    return workflows_to_run
+
+
+def get_next_workflow_run_at() -> datetime | None:
+    """
+    Get when the next interval workflow is due, for the scheduler to sleep until then.
+
+    Returns:
+        datetime | None: The earliest due time (UTC), None if there are no interval workflows.
+    """
+    with Session(engine) as session:
+        next_run_at, next_timeout_at = session.exec(
+            select(
+                func.min(
+                    case(
+                        (
+                            WorkflowSchedule.is_running == False,
+                            WorkflowSchedule.next_run_at,
+                        ),
+                        else_=None,
                     )
-                    # continue to the next one
-                    continue
-                # some other thread/instance has already started to work on it
-                except IntegrityError:
-                    # we need to verify the locking is still valid and not timeouted
-                    session.rollback()
-                    pass
-                # get the ongoing execution
-                ongoing_execution = session.exec(
-                    select(WorkflowExecution)
-                    .where(WorkflowExecution.workflow_id == workflow.id)
-                    .where(
-                        WorkflowExecution.execution_number
-                        == last_execution.execution_number + 1
+                ),
+                # running workflows are due only after they finished or timed out
+                func.min(
+                    case(
+                        (
+                            WorkflowSchedule.is_running == True,
+                            WorkflowSchedule.last_started_at,
+                        ),
+                        else_=None,
                     )
-                    .limit(1)
-                ).first()
-                # this is a WTF exception since if this (workflow_id, execution_number) does not exist,
-                # we would be able to acquire the lock
-                if not ongoing_execution:
-                    logger.error(
-                        f"WTF: ongoing execution not found {workflow.id} {last_execution.execution_number + 1}"
+                ),
+            )
+        ).one()
+    if next_timeout_at:
+        next_timeout_at = next_timeout_at + WORKFLOW_EXECUTION_TIMEOUT
+    due_times = [due_time for due_time in [next_run_at, next_timeout_at] if due_time]
+    return min(due_times) if due_times else None
+
+
+def set_workflow_schedule(session: Session, workflow: Workflow):
+    """
+    Create, update or remove the schedule of a workflow after it was changed.
+
+    The caller commits the session.
+
+    Args:
+        session (Session): The session the workflow is changed in.
+        workflow (Workflow): The workflow.
+    """
+    schedule = session.get(WorkflowSchedule, workflow.id)
+    if workflow.is_deleted or not workflow.interval or workflow.interval <= 0:
+        if schedule:
+            session.delete(schedule)
+        return
+    if not schedule:
+        # a new interval workflow runs right away
+        session.add(
+            WorkflowSchedule(
+                workflow_id=workflow.id,
+                tenant_id=workflow.tenant_id,
+                interval=workflow.interval,
+                next_run_at=datetime.utcnow(),
+            )
+        )
+    elif schedule.interval != workflow.interval:
+        schedule.interval = workflow.interval
+        # the new interval counts from the last run
+        schedule.next_run_at = (schedule.last_started_at or datetime.utcnow()) + (
+            timedelta(seconds=workflow.interval)
+        )
+        session.add(schedule)
+
+
+def sync_workflow_schedules() -> int:
+    """
+    Reconcile the schedules with the interval workflows, e.g. workflows that were
+    created before the schedules existed or changed directly in the database.
+
+    Returns:
+        int: The number of schedules that were created, updated or removed.
+    """
+    with Session(engine) as session:
+        workflows = {
+            workflow_id: (tenant_id, interval)
+            for workflow_id, tenant_id, interval in session.exec(
+                select(Workflow.id, Workflow.tenant_id, Workflow.interval)
+                .where(Workflow.is_deleted == False)
+                .where(Workflow.interval != None)
+                .where(Workflow.interval > 0)
+            ).all()
+        }
+        schedules = {
+            schedule.workflow_id: schedule
+            for schedule in session.exec(select(WorkflowSchedule)).all()
+        }
+        changes = 0
+        for workflow_id, schedule in schedules.items():
+            if workflow_id not in workflows:
+                session.delete(schedule)
+                changes += 1
+            elif schedule.interval != workflows[workflow_id][1]:
+                schedule.interval = workflows[workflow_id][1]
+                schedule.next_run_at = (
+                    schedule.last_started_at or datetime.utcnow()
+                ) + timedelta(seconds=schedule.interval)
+                session.add(schedule)
+                changes += 1
+
+        missing = [
+            workflow_id for workflow_id in workflows if workflow_id not in schedules
+        ]
+        if missing:
+            # continue from the last execution of each workflow, with a single query
+            last_executions = {
+                workflow_id: (execution_number, started)
+                for workflow_id, execution_number, started in session.exec(
+                    select(
+                        WorkflowExecution.workflow_id,
+                        func.max(WorkflowExecution.execution_number),
+                        func.max(WorkflowExecution.started),
                     )
-                    continue
-                # if this completed, error, than that's ok - the service who locked the execution is done
-                elif ongoing_execution.status != "in_progress":
-                    continue
-                # if the ongoing execution runs more than 60 minutes, than its timeout
-                elif ongoing_execution.started + timedelta(minutes=60) <= current_time:
-                    ongoing_execution.status = "timeout"
-                    session.commit()
-                    # re-create the execution and try to get the lock
-                    try:
-                        workflow_execution_id = create_workflow_execution(
-                            workflow.id,
-                            workflow.tenant_id,
-                            "scheduler",
-                            ongoing_execution.execution_number + 1,
-                        )
-                    # some other thread/instance has already started to work on it and that's ok
-                    except IntegrityError:
-                        logger.debug(
-                            f"Failed to create a new execution for workflow {workflow.id} [timeout]. Constraint is met."
-                        )
-                        continue
-                    # managed to acquire the (workflow_id, execution_number) lock
-                    workflows_to_run.append(
-                        {
-                            "tenant_id": workflow.tenant_id,
-                            "workflow_id": workflow.id,
-                            "workflow_execution_id": workflow_execution_id,
-                        }
+                    .where(WorkflowExecution.workflow_id.in_(missing))
+                    .group_by(WorkflowExecution.workflow_id)
+                ).all()
+            }
+            now = datetime.utcnow()
+            for workflow_id in missing:
+                tenant_id, interval = workflows[workflow_id]
+                execution_number, started = last_executions.get(workflow_id, (0, None))
+                session.add(
+                    WorkflowSchedule(
+                        workflow_id=workflow_id,
+                        tenant_id=tenant_id,
+                        interval=interval,
+                        next_run_at=(
+                            started.replace(tzinfo=None) + timedelta(seconds=interval)
+                            if started
+                            else now
+                        ),
+                        execution_number=execution_number or 0,
                     )
-            else:
-                logger.debug(
-                    f"Workflow {workflow.id} is already running by someone else"
                 )
-
-        return workflows_to_run
+                changes += 1
+        session.commit()
+    return changes
 
 
 def add_or_update_workflow(
@@ -446,6 +606,7 @@ def add_or_update_workflow(
             existing_workflow.revision += 1  # Increment the revision
             existing_workflow.last_updated = datetime.now()  # Update last_updated
             existing_workflow.is_deleted = False
+            set_workflow_schedule(session, existing_workflow)
 
         else:
             # Create a new workflow
@@ -460,6 +621,7 @@ def add_or_update_workflow(
                 workflow_raw=workflow_raw,
             )
             session.add(workflow)
+            set_workflow_schedule(session, workflow)
 
         session.commit()
         return existing_workflow if existing_workflow else workflow
@@ -615,6 +777,71 @@ def get_all_workflows_yamls(tenant_id: str) -> List[str]:
     return workflows
 
 
+def get_workflows_versions(tenant_id: str) -> dict[str, tuple[int, datetime]]:
+    """
+    Get the version of each of the tenant's workflows, without their raw yaml.
+
+    Args:
+        tenant_id (str): The tenant id.
+
+    Returns:
+        dict[str, tuple[int, datetime]]: (revision, last_updated) by workflow id.
+    """
+    with Session(engine) as session:
+        rows = session.exec(
+            select(Workflow.id, Workflow.revision, Workflow.last_updated)
+            .where(Workflow.tenant_id == tenant_id)
+            .where(Workflow.is_deleted == False)
+        ).all()
+    return {
+        workflow_id: (revision, last_updated)
+        for workflow_id, revision, last_updated in rows
+    }
+
+
+def get_workflows_by_ids(tenant_id: str, workflow_ids: List[str]) -> List[Workflow]:
+    if not workflow_ids:
+        return []
+    with Session(engine) as session:
+        workflows = session.exec(
+            select(Workflow)
+            .where(Workflow.tenant_id == tenant_id)
+            .where(Workflow.id.in_(workflow_ids))
+            .where(Workflow.is_deleted == False)
+        ).all()
+    return workflows
+
+
+def get_workflow_version(
+    tenant_id: str, workflow_id: str
+) -> tuple[int, datetime] | None:
+    """
+    Get the (revision, last_updated) of a workflow, without its raw yaml.
+
+    Args:
+        tenant_id (str): The tenant id.
+        workflow_id (str): The workflow id (or name, as in get_workflow).
+
+    Returns:
+        tuple[int, datetime] | None: None if the workflow doesn't exist.
+    """
+    # the same lookup as get_workflow
+    if validators.uuid(workflow_id):
+        workflow_filter = Workflow.id == workflow_id
+    else:
+        workflow_filter = Workflow.name == workflow_id
+    with Session(engine) as session:
+        row = session.exec(
+            select(Workflow.revision, Workflow.last_updated)
+            .where(Workflow.tenant_id == tenant_id)
+            .where(workflow_filter)
+            .where(Workflow.is_deleted == False)
+        ).first()
+    if not row:
+        return None
+    return (row[0], row[1])
+
+
 def get_workflow(tenant_id: str, workflow_id: str) -> Workflow:
     with Session(engine) as session:
         # if the workflow id is uuid:
@@ -679,6 +906,13 @@ def finish_workflow_execution(tenant_id, workflow_id, execution_id, status, erro
         workflow_execution.execution_time = (
             datetime.utcnow() - workflow_execution.started
         ).total_seconds()
+        # the interval workflow can be claimed again
+        session.execute(
+            update(WorkflowSchedule)
+            .where(WorkflowSchedule.workflow_id == workflow_id)
+            .where(WorkflowSchedule.last_execution_id == execution_id)
+            .values(is_running=False)
+        )
         # TODO: logs
         session.commit()
 
@@ -717,6 +951,7 @@ def delete_workflow(tenant_id, workflow_id):
 
         if workflow:
             workflow.is_deleted = True
+            set_workflow_schedule(session, workflow)
             session.commit()
 
 
@@ -733,22 +968,27 @@ def get_workflow_id(tenant_id, workflow_name):
             return workflow.id
 
 
-def push_logs_to_db(log_entries):
+def push_logs_to_db(log_entries: List[dict]):
+    """
+    Insert workflow execution logs in one statement.
+
+    Args:
+        log_entries (List[dict]): workflow_execution_id, timestamp (datetime), message
+            and context (JSON serializable or None) of each log.
+    """
+    if not log_entries:
+        return
     db_log_entries = [
-        WorkflowExecutionLog(
-            workflow_execution_id=log_entry["workflow_execution_id"],
-            timestamp=datetime.strptime(log_entry["asctime"], "%Y-%m-%d %H:%M:%S,%f"),
-            message=log_entry["message"][0:255],  # limit the message to 255 chars
-            context=json.loads(
-                json.dumps(log_entry.get("context", {}), default=str)
-            ),  # workaround to serialize any object
-        )
+        {
+            "workflow_execution_id": log_entry["workflow_execution_id"],
+            "timestamp": log_entry["timestamp"],
+            "message": log_entry["message"][0:255],  # limit the message to 255 chars
+            "context": log_entry.get("context"),
+        }
         for log_entry in log_entries
     ]
-
-    # Add the LogEntry instances to the database session
     with Session(engine) as session:
-        session.add_all(db_log_entries)
+        session.execute(insert(WorkflowExecutionLog.__table__), db_log_entries)
         session.commit()
 
 
@@ -788,10 +1028,11 @@ def _enrich_alert(session, tenant_id, fingerprint, enrichments):
         # SQLAlchemy doesn't support updating JSON fields, so we need to do it manually
         # https://github.com/sqlalchemy/sqlalchemy/discussions/8396#discussion-4308891
         new_enrichment_data = {**enrichment.enrichments, **enrichments}
+        # the timestamp is when the alert was last enriched, see get_last_alerts_changes
         stmt = (
             update(AlertEnrichment)
             .where(AlertEnrichment.id == enrichment.id)
-            .values(enrichments=new_enrichment_data)
+            .values(enrichments=new_enrichment_data, timestamp=datetime.utcnow())
         )
         session.execute(stmt)
         session.commit()
@@ -828,22 +1069,31 @@ def get_enrichment(tenant_id, fingerprint):
 
 
 def get_enrichments(
-    tenant_id: int, fingerprints: List[str]
+    tenant_id: int, fingerprints: List[str], session: Session = None
 ) -> List[Optional[AlertEnrichment]]:
     """
     Get a list of alert enrichments for a list of fingerprints using a single DB query.
 
     :param tenant_id: The tenant ID to filter the alert enrichments by.
     :param fingerprints: A list of fingerprints to get the alert enrichments for.
+    :param session: The session to use, a new one is created if not given.
     :return: A list of AlertEnrichment objects or None for each fingerprint.
     """
-    with Session(engine) as session:
-        result = session.exec(
-            select(AlertEnrichment)
-            .where(AlertEnrichment.tenant_id == tenant_id)
-            .where(AlertEnrichment.alert_fingerprint.in_(fingerprints))
-        ).all()
-    return result
+    if session is None:
+        with Session(engine) as session:
+            return _get_enrichments(session, tenant_id, fingerprints)
+    return _get_enrichments(session, tenant_id, fingerprints)
+
+
+def _get_enrichments(
+    session: Session, tenant_id: int, fingerprints: List[str]
+) -> List[AlertEnrichment]:
+    return (
+        session.query(AlertEnrichment)
+        .filter(AlertEnrichment.tenant_id == tenant_id)
+        .filter(AlertEnrichment.alert_fingerprint.in_(fingerprints))
+        .all()
+    )
 
 
 def get_enrichment_with_session(session, tenant_id, fingerprint):
@@ -855,9 +1105,59 @@ def get_enrichment_with_session(session, tenant_id, fingerprint):
     return alert_enrichment
 
 
+def _apply_alerts_cursor(
+    query, cursor: Tuple[datetime, uuid.UUID] | None = None, keyset: bool = False
+):
+    """
+    Keyset pagination over alerts: order the alerts by (timestamp, id), newest first,
+    and skip everything up to (and including) the cursor.
+
+    Args:
+        query: The alerts query.
+        cursor (Tuple[datetime, UUID], optional): The (timestamp, id) of the last alert of the previous page.
+        keyset (bool, optional): Whether the query is paginated (implied by cursor).
+            Otherwise, the alerts are only ordered by timestamp.
+    """
+    if not cursor and not keyset:
+        return query.order_by(Alert.timestamp.desc())
+    if cursor:
+        cursor_timestamp, cursor_id = cursor
+        query = query.filter(
+            or_(
+                Alert.timestamp < cursor_timestamp,
+                and_(Alert.timestamp == cursor_timestamp, Alert.id < cursor_id),
+            )
+        )
+    return query.order_by(Alert.timestamp.desc(), Alert.id.desc())
+
+
 def get_alerts_with_filters(
-    tenant_id, provider_id=None, filters=None, time_delta=1
+    tenant_id,
+    provider_id=None,
+    filters=None,
+    time_delta=1,
+    cel_filter=None,
+    cursor=None,
+    limit=10000,
+    keyset=False,
 ) -> list[Alert]:
+    """
+    Get the alerts of the last time_delta days.
+
+    Args:
+        tenant_id (str): The tenant_id to filter the alerts by.
+        provider_id (str, optional): The provider id to filter by.
+        filters (list[dict], optional): Enrichments filters ({"key": ..., "value": ...}).
+        time_delta (int, optional): The number of days to look back. Defaults to 1.
+        cel_filter (optional): SQL predicate over Alert and AlertEnrichment, e.g.
+            translated from a CEL query by keep.rulesengine.celsql.
+        cursor (Tuple[datetime, UUID], optional): Keyset pagination cursor, see _apply_alerts_cursor.
+        keyset (bool, optional): Whether the query is keyset paginated, see _apply_alerts_cursor.
+        limit (int, optional): The maximum number of alerts. Defaults to 10000.
+
+    Returns:
+        list[Alert]: The alerts, newest first.
+    """
     with Session(engine) as session:
         # Create the query
         query = session.query(Alert)
@@ -926,9 +1226,12 @@ def get_alerts_with_filters(
         if provider_id:
             query = query.filter(Alert.provider_id == provider_id)
 
-        query = query.order_by(Alert.timestamp.desc())
+        if cel_filter is not None:
+            query = query.filter(cel_filter)
+
+        query = _apply_alerts_cursor(query, cursor, keyset)
 
-        query = query.limit(10000)
+        query = query.limit(limit)
 
         # Execute the query
         alerts = query.all()
@@ -936,58 +1239,59 @@ def get_alerts_with_filters(
     return alerts
 
 
-def get_last_alerts(tenant_id, provider_id=None, limit=1000) -> list[Alert]:
+def get_last_alerts(
+    tenant_id,
+    provider_id=None,
+    limit=1000,
+    cursor=None,
+    keyset=False,
+    fingerprints=None,
+) -> list[Alert]:
     """
     Get the last alert for each fingerprint along with the first time the alert was triggered.
 
     Args:
         tenant_id (_type_): The tenant_id to filter the alerts by.
         provider_id (_type_, optional): The provider id to filter by. Defaults to None.
+        limit (int, optional): The maximum number of alerts. Defaults to 1000.
+        cursor (Tuple[datetime, UUID], optional): Keyset pagination cursor, see _apply_alerts_cursor.
+        keyset (bool, optional): Whether the query is keyset paginated, see _apply_alerts_cursor.
+        fingerprints (list[str], optional): The fingerprints to filter by. Defaults to None.
 
     Returns:
         List[Alert]: A list of Alert objects including the first time the alert was triggered.
     """
     with Session(engine) as session:
-        # Subquery that selects the max and min timestamp for each fingerprint.
-        subquery = (
-            session.query(
-                Alert.fingerprint,
-                func.max(Alert.timestamp).label("max_timestamp"),
-                func.min(Alert.timestamp).label(
-                    "min_timestamp"
-                ),  # Include minimum timestamp
-            )
-            .filter(Alert.tenant_id == tenant_id)
-            .group_by(Alert.fingerprint)
-            .subquery()
-        )
-
-        # Main query joins the subquery to select alerts with their first and last occurrence.
+        # LastAlert holds the last alert of each fingerprint, see set_last_alert
+        #   (databases created before it existed are backfilled on startup)
         query = (
             session.query(
                 Alert,
-                subquery.c.min_timestamp.label(
-                    "startedAt"
-                ),  # Include "startedAt" in the selected columns
+                LastAlert.first_timestamp.label("startedAt"),
             )
-            .filter(Alert.tenant_id == tenant_id)
             .join(
-                subquery,
+                LastAlert,
                 and_(
-                    Alert.fingerprint == subquery.c.fingerprint,
-                    Alert.timestamp == subquery.c.max_timestamp,
+                    LastAlert.tenant_id == Alert.tenant_id,
+                    LastAlert.alert_id == Alert.id,
                 ),
             )
+            .filter(LastAlert.tenant_id == tenant_id)
             .options(subqueryload(Alert.alert_enrichment))
         )
 
         if provider_id:
             query = query.filter(Alert.provider_id == provider_id)
 
+        if fingerprints is not None:
+            query = query.filter(LastAlert.fingerprint.in_(fingerprints))
+
         # Order by timestamp in descending order and limit the results
+        query = _apply_alerts_cursor(query, cursor, keyset)
         query = query.limit(limit)
         # Execute the query
         alerts_with_start = query.all()
+
         # Convert result to list of Alert objects and include "startedAt" information if needed
         alerts = []
         for alert, startedAt in alerts_with_start:
@@ -998,13 +1302,325 @@ def get_last_alerts(tenant_id, provider_id=None, limit=1000) -> list[Alert]:
     return alerts
 
 
-def get_alerts_by_fingerprint(tenant_id: str, fingerprint: str, limit=1) -> List[Alert]:
+def get_last_alerts_changes(
+    tenant_id: str, since: datetime, limit: int = 1000
+) -> Tuple[Dict[str, datetime], Dict[str, datetime]]:
+    """
+    Get the fingerprints whose last alert or enrichment changed since a given time.
+
+    Args:
+        tenant_id (str): The tenant_id to filter the alerts by.
+        since (datetime): The changes after this time (UTC) are returned.
+        limit (int, optional): The maximum number of fingerprints of each kind. Defaults to 1000.
+
+    Returns:
+        Tuple[Dict[str, datetime], Dict[str, datetime]]: The fingerprints that were
+            received and the fingerprints that were enriched, with when they were.
+    """
+    with Session(engine) as session:
+        received = session.exec(
+            select(LastAlert.fingerprint, LastAlert.timestamp)
+            .where(LastAlert.tenant_id == tenant_id)
+            .where(LastAlert.timestamp > since)
+            .limit(limit)
+        ).all()
+        enriched = session.exec(
+            select(AlertEnrichment.alert_fingerprint, AlertEnrichment.timestamp)
+            .where(AlertEnrichment.tenant_id == tenant_id)
+            .where(AlertEnrichment.timestamp > since)
+            .limit(limit)
+        ).all()
+    return dict(received), dict(enriched)
+
+
+def _get_last_alerts_from_history(
+    session: Session,
+    tenant_id,
+    provider_id=None,
+    limit=1000,
+    cursor=None,
+    keyset=False,
+) -> list[Tuple[Alert, datetime]]:
+    """
+    Calculate the last alert of each fingerprint (and its first occurrence) from the entire alerts history.
+    """
+    # Subquery that selects the max and min timestamp for each fingerprint.
+    subquery = (
+        session.query(
+            Alert.fingerprint,
+            func.max(Alert.timestamp).label("max_timestamp"),
+            func.min(Alert.timestamp).label(
+                "min_timestamp"
+            ),  # Include minimum timestamp
+        )
+        .filter(Alert.tenant_id == tenant_id)
+        .group_by(Alert.fingerprint)
+        .subquery()
+    )
+
+    # Main query joins the subquery to select alerts with their first and last occurrence.
+    query = (
+        session.query(
+            Alert,
+            subquery.c.min_timestamp.label(
+                "startedAt"
+            ),  # Include "startedAt" in the selected columns
+        )
+        .filter(Alert.tenant_id == tenant_id)
+        .join(
+            subquery,
+            and_(
+                Alert.fingerprint == subquery.c.fingerprint,
+                Alert.timestamp == subquery.c.max_timestamp,
+            ),
+        )
+        .options(subqueryload(Alert.alert_enrichment))
+    )
+
+    if provider_id:
+        query = query.filter(Alert.provider_id == provider_id)
+
+    query = _apply_alerts_cursor(query, cursor, keyset)
+    query = query.limit(limit)
+    return query.all()
+
+
+def set_last_alert(tenant_id: str, alert: Alert, session: Session = None) -> None:
+    """
+    Upsert the LastAlert of the alert's fingerprint.
+
+    Args:
+        tenant_id (str): The tenant id.
+        alert (Alert): The alert, already flushed to the database.
+        session (Session, optional): The session to use, the caller is responsible for committing it.
+    """
+    set_last_alerts(tenant_id, [alert], session=session)
+
+
+def set_last_alerts(
+    tenant_id: str, alerts: List[Alert], session: Session = None
+) -> None:
+    """
+    Upsert the LastAlert of the fingerprints of a batch of alerts, using a single statement.
+
+    Args:
+        tenant_id (str): The tenant id.
+        alerts (List[Alert]): The alerts, already flushed to the database.
+        session (Session, optional): The session to use, the caller is responsible for committing it.
+    """
+    if session is None:
+        with Session(engine) as session:
+            _set_last_alerts(session, tenant_id, alerts)
+            session.commit()
+        return
+    _set_last_alerts(session, tenant_id, alerts)
+
+
+def _set_last_alerts(session: Session, tenant_id: str, alerts: List[Alert]) -> None:
+    # a single statement can't upsert the same row twice,
+    #   so the alerts of each fingerprint are merged first
+    rows = {}
+    for alert in alerts:
+        row = rows.get(alert.fingerprint)
+        if row is None:
+            rows[alert.fingerprint] = {
+                "tenant_id": tenant_id,
+                "fingerprint": alert.fingerprint,
+                "alert_id": alert.id,
+                "timestamp": alert.timestamp,
+                "first_timestamp": alert.timestamp,
+            }
+            continue
+        if alert.timestamp >= row["timestamp"]:
+            row["alert_id"] = alert.id
+            row["timestamp"] = alert.timestamp
+        row["first_timestamp"] = min(row["first_timestamp"], alert.timestamp)
+    values = list(rows.values())
+    if not values:
+        return
+
+    dialect = session.bind.dialect.name
+    # alerts may arrive out of order, the newest one is the last alert
+    #   and the oldest one is the first occurrence
+    if dialect in ["postgresql", "sqlite"]:
+        insert = (postgresql_insert if dialect == "postgresql" else sqlite_insert)(
+            LastAlert
+        ).values(values)
+        newer = insert.excluded.timestamp >= LastAlert.timestamp
+        statement = insert.on_conflict_do_update(
+            index_elements=["tenant_id", "fingerprint"],
+            set_={
+                "alert_id": case(
+                    (newer, insert.excluded.alert_id), else_=LastAlert.alert_id
+                ),
+                "timestamp": case(
+                    (newer, insert.excluded.timestamp), else_=LastAlert.timestamp
+                ),
+                "first_timestamp": (
+                    func.min(insert.excluded.first_timestamp, LastAlert.first_timestamp)
+                    if dialect == "sqlite"
+                    else func.least(
+                        insert.excluded.first_timestamp, LastAlert.first_timestamp
+                    )
+                ),
+            },
+        )
+        session.execute(statement)
+    elif dialect == "mysql":
+        insert = mysql_insert(LastAlert).values(values)
+        newer = insert.inserted.timestamp >= LastAlert.timestamp
+        # mysql applies the assignments in order, so timestamp must be the last one
+        statement = insert.on_duplicate_key_update(
+            [
+                (
+                    "alert_id",
+                    case((newer, insert.inserted.alert_id), else_=LastAlert.alert_id),
+                ),
+                (
+                    "first_timestamp",
+                    func.least(
+                        insert.inserted.first_timestamp, LastAlert.first_timestamp
+                    ),
+                ),
+                (
+                    "timestamp",
+                    case((newer, insert.inserted.timestamp), else_=LastAlert.timestamp),
+                ),
+            ]
+        )
+        session.execute(statement)
+    else:
+        existing = {
+            last_alert.fingerprint: last_alert
+            for last_alert in session.exec(
+                select(LastAlert)
+                .where(LastAlert.tenant_id == tenant_id)
+                .where(LastAlert.fingerprint.in_(list(rows)))
+            ).all()
+        }
+        for row in values:
+            last_alert = existing.get(row["fingerprint"])
+            if not last_alert:
+                session.add(LastAlert(**row))
+                continue
+            if row["timestamp"] >= last_alert.timestamp:
+                last_alert.alert_id = row["alert_id"]
+                last_alert.timestamp = row["timestamp"]
+            if row["first_timestamp"] < last_alert.first_timestamp:
+                last_alert.first_timestamp = row["first_timestamp"]
+            session.add(last_alert)
+
+
+def backfill_last_alerts(tenant_id: str | None = None) -> int:
+    """
+    Populate LastAlert from the alerts history, for databases created before it existed.
+
+    Args:
+        tenant_id (str, optional): Backfill only this tenant. Defaults to all tenants.
+
+    Returns:
+        int: The number of fingerprints backfilled.
+    """
+    with Session(engine) as session:
+        tenant_ids = (
+            [tenant_id]
+            if tenant_id
+            else [tenant.id for tenant in session.exec(select(Tenant)).all()]
+        )
+        backfilled = 0
+        for tenant in tenant_ids:
+            logger.info("Backfilling last alerts", extra={"tenant_id": tenant})
+            # the alerts are ordered by timestamp, so the last one of each fingerprint wins
+            alerts_with_start = _get_last_alerts_from_history(
+                session, tenant, limit=None
+            )
+            existing = {
+                last_alert.fingerprint: last_alert
+                for last_alert in session.exec(
+                    select(LastAlert).where(LastAlert.tenant_id == tenant)
+                ).all()
+            }
+            for alert, started_at in reversed(alerts_with_start):
+                last_alert = existing.get(alert.fingerprint)
+                if last_alert is None:
+                    last_alert = LastAlert(
+                        tenant_id=tenant,
+                        fingerprint=alert.fingerprint,
+                        alert_id=alert.id,
+                        timestamp=alert.timestamp,
+                        first_timestamp=started_at,
+                    )
+                    existing[alert.fingerprint] = last_alert
+                else:
+                    # the alerts ingested since the upgrade already set it
+                    if alert.timestamp > last_alert.timestamp:
+                        last_alert.alert_id = alert.id
+                        last_alert.timestamp = alert.timestamp
+                    last_alert.first_timestamp = min(
+                        last_alert.first_timestamp, started_at
+                    )
+                session.add(last_alert)
+                backfilled += 1
+            session.commit()
+            logger.info(
+                "Backfilled last alerts",
+                extra={"tenant_id": tenant, "fingerprints": len(existing)},
+            )
+    return backfilled
+
+
+def mark_backfill_completed(name: str) -> None:
+    with Session(engine) as session:
+        session.merge(Backfill(name=name))
+        session.commit()
+
+
+def run_pending_backfills() -> list[str]:
+    """
+    Run the one-time data backfills that didn't complete on this database yet.
+
+    The backfills are idempotent, a failed one runs again on the next startup.
+
+    Returns:
+        list[str]: The names of the backfills that ran.
+    """
+    backfills = {
+        "last_alerts": backfill_last_alerts,
+        "group_summaries": backfill_group_summaries,
+    }
+    with Session(engine) as session:
+        completed = set(session.exec(select(Backfill.name)).all())
+    ran = []
+    for name, backfill in backfills.items():
+        if name in completed:
+            continue
+        logger.info("Running backfill", extra={"backfill": name})
+        try:
+            backfill()
+        except Exception:
+            logger.exception(
+                "Backfill failed, it will run again on the next startup",
+                extra={"backfill": name},
+            )
+            continue
+        mark_backfill_completed(name)
+        logger.info("Backfill completed", extra={"backfill": name})
+        ran.append(name)
+    return ran
+
+
+def get_alerts_by_fingerprint(
+    tenant_id: str, fingerprint: str, limit=1, cursor=None, keyset=False
+) -> List[Alert]:
     """
     Get all alerts for a given fingerprint.
 
     Args:
         tenant_id (str): The tenant_id to filter the alerts by.
         fingerprint (str): The fingerprint to filter the alerts by.
+        limit (int, optional): The maximum number of alerts. Defaults to 1.
+        cursor (Tuple[datetime, UUID], optional): Keyset pagination cursor, see _apply_alerts_cursor.
+        keyset (bool, optional): Whether the query is keyset paginated, see _apply_alerts_cursor.
 
     Returns:
         List[Alert]: A list of Alert objects.
@@ -1021,7 +1637,7 @@ def get_alerts_by_fingerprint(tenant_id: str, fingerprint: str, limit=1) -> List
 
         query = query.filter(Alert.fingerprint == fingerprint)
 
-        query = query.order_by(Alert.timestamp.desc())
+        query = _apply_alerts_cursor(query, cursor, keyset)
 
         if limit:
             query = query.limit(limit)
@@ -1223,6 +1839,17 @@ def update_rule(
             rule.definition_cel = definition_cel
             rule.updated_by = updated_by
             rule.update_time = datetime.utcnow()
+            # the rule's groups now expire after the new timeframe (in python,
+            #   the date arithmetic isn't portable across the databases)
+            for summary in session.exec(
+                select(GroupSummary)
+                .where(GroupSummary.tenant_id == tenant_id)
+                .where(GroupSummary.rule_id == rule.id)
+            ):
+                summary.expires_at = summary.last_alert_time + timedelta(
+                    seconds=timeframe
+                )
+                session.add(summary)
             session.commit()
             session.refresh(rule)
             return rule
@@ -1374,17 +2001,197 @@ def assign_alert_to_group(
         group = session.exec(
             select(Group).options(joinedload(Group.alerts)).where(Group.id == group.id)
         ).first()
+        rule = session.exec(select(Rule).where(Rule.id == rule_id)).first()
+        try:
+            _update_group_summary(group, rule, alert_id)
+        except Exception:
+            logger.exception(
+                "Failed to update the group summary",
+                extra={"tenant_id": tenant_id, "group_id": str(group.id)},
+            )
     return group
 
 
-def get_groups(tenant_id):
+def _render_template(template: str | None, context: dict) -> str | None:
+    if not template:
+        return None
+    try:
+        return chevron.render(template, context)
+    except Exception:
+        logger.exception("Failed to render template", extra={"template": template})
+        return None
+
+
+def _render_group_summary(
+    group: Group, rule: Rule | None, summary: GroupSummary | None = None
+) -> GroupSummary:
+    """(Re)calculate the summary of a group from its (loaded) alerts"""
+    group_attributes = GroupDto.get_group_attributes(group.alerts)
+    last_alert_time = max(alert.timestamp for alert in group.alerts)
+    timeframe = rule.timeframe if rule else 0
+    if summary is None:
+        summary = GroupSummary(
+            group_id=group.id, tenant_id=group.tenant_id, rule_id=group.rule_id
+        )
+    summary.start_time = min(alert.timestamp for alert in group.alerts)
+    summary.last_alert_time = last_alert_time
+    summary.expires_at = last_alert_time + timedelta(seconds=timeframe)
+    summary.last_update_time = group_attributes.get("last_update_time")
+    summary.num_of_alerts = group_attributes.get("num_of_alerts")
+    summary.description = _render_template(
+        rule.group_description if rule else None,
+        {
+            "group": group_attributes,
+            # the grouping criteria fields, the same for all the alerts of the group
+            **group.alerts[0].event,
+        },
+    )
+    return summary
+
+
+def _render_group_alert_summary(
+    group: Group, alert: Alert, rule: Rule | None
+) -> GroupAlertSummary:
+    return GroupAlertSummary(
+        group_id=group.id,
+        alert_id=alert.id,
+        tenant_id=group.tenant_id,
+        timestamp=alert.timestamp,
+        alert_fingerprint=alert.fingerprint,
+        alert_summary=_render_template(
+            rule.item_description if rule else None, alert.event
+        ),
+    )
+
+
+def _update_group_summary(group: Group, rule: Rule | None, alert_id):
+    """Update the summary of the group with the alert that was just assigned to it
+
+    In its own session, so the group (and its alerts) stays loaded for the caller.
+    """
     with Session(engine) as session:
-        groups = session.exec(
-            select(Group)
-            .options(selectinload(Group.alerts))
-            .where(Group.tenant_id == tenant_id)
+        summary = session.get(GroupSummary, group.id)
+        if summary is None:
+            # a new group, or one from before the summaries, summarize all its alerts
+            session.add(_render_group_summary(group, rule))
+            alerts = group.alerts
+        else:
+            _render_group_summary(group, rule, summary)
+            alerts = [alert for alert in group.alerts if str(alert.id) == str(alert_id)]
+        for alert in alerts:
+            session.merge(_render_group_alert_summary(group, alert, rule))
+        session.commit()
+
+
+def backfill_group_summaries(tenant_id: str | None = None, batch_size=100) -> int:
+    """
+    Summarize the groups that were created before the group summaries existed.
+
+    Args:
+        tenant_id (str, optional): Backfill only this tenant. Defaults to all tenants.
+        batch_size (int, optional): The groups summarized per transaction.
+
+    Returns:
+        int: The number of groups backfilled.
+    """
+    backfilled = 0
+    with Session(engine) as session:
+        while True:
+            query = (
+                select(Group)
+                .outerjoin(GroupSummary, GroupSummary.group_id == Group.id)
+                .options(selectinload(Group.alerts))
+                .where(GroupSummary.group_id == None)  # noqa: E711
+                # a group is created with an alert, but just in case
+                .where(exists().where(AlertToGroup.group_id == Group.id))
+            )
+            if tenant_id:
+                query = query.where(Group.tenant_id == tenant_id)
+            groups = session.exec(query.limit(batch_size)).all()
+            if not groups:
+                break
+            logger.info(
+                "Backfilling group summaries",
+                extra={"tenant_id": tenant_id, "groups": len(groups)},
+            )
+            rule_ids = list({group.rule_id for group in groups})
+            rules = {
+                str(rule.id): rule
+                for rule in session.exec(select(Rule).where(Rule.id.in_(rule_ids)))
+            }
+            for group in groups:
+                rule = rules.get(str(group.rule_id))
+                session.add(_render_group_summary(group, rule))
+                for alert in group.alerts:
+                    session.merge(_render_group_alert_summary(group, alert, rule))
+            session.commit()
+            backfilled += len(groups)
+            if len(groups) < batch_size:
+                break
+    logger.info(
+        "Backfilled group summaries",
+        extra={"tenant_id": tenant_id, "groups": backfilled},
+    )
+    return backfilled
+
+
+def get_group_summaries(
+    tenant_id: str,
+    active_only: bool = True,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    cursor: Tuple[datetime, uuid.UUID] | None = None,
+    limit: int = 100,
+) -> list[Tuple[GroupSummary, list[GroupAlertSummary]]]:
+    """
+    A page of the groups' summaries, the recently updated groups first.
+
+    Args:
+        tenant_id (str): The tenant.
+        active_only (bool, optional): Only the groups that didn't expire (a new
+            alert would still be assigned to them). Defaults to True.
+        since (datetime, optional): Only the groups updated since.
+        until (datetime, optional): Only the groups that started before.
+        cursor (Tuple[datetime, UUID], optional): The (last_alert_time, group_id)
+            of the last group of the previous page.
+        limit (int, optional): The page size. Defaults to 100.
+
+    Returns:
+        The summaries and the summaries of their alerts, oldest alert first.
+    """
+    with Session(engine) as session:
+        query = select(GroupSummary).where(GroupSummary.tenant_id == tenant_id)
+        if active_only:
+            query = query.where(GroupSummary.expires_at > datetime.utcnow())
+        if since:
+            query = query.where(GroupSummary.last_alert_time >= since)
+        if until:
+            query = query.where(GroupSummary.start_time <= until)
+        if cursor:
+            cursor_timestamp, cursor_id = cursor
+            query = query.where(
+                or_(
+                    GroupSummary.last_alert_time < cursor_timestamp,
+                    and_(
+                        GroupSummary.last_alert_time == cursor_timestamp,
+                        GroupSummary.group_id < cursor_id,
+                    ),
+                )
+            )
+        summaries = session.exec(
+            query.order_by(
+                GroupSummary.last_alert_time.desc(), GroupSummary.group_id.desc()
+            ).limit(limit)
         ).all()
-    return groups
+        alert_summaries = {summary.group_id: [] for summary in summaries}
+        if summaries:
+            for alert_summary in session.exec(
+                select(GroupAlertSummary)
+                .where(GroupAlertSummary.group_id.in_(list(alert_summaries)))
+                .order_by(GroupAlertSummary.timestamp)
+            ).all():
+                alert_summaries[alert_summary.group_id].append(alert_summary)
+    return [(summary, alert_summaries[summary.group_id]) for summary in summaries]
 
 
 def get_rule(tenant_id, rule_id):
@@ -1474,6 +2281,45 @@ def get_last_alert_hash_by_fingerprint(tenant_id, fingerprint):
     return alert_hash
 
 
+def get_last_alert_hashes_by_fingerprints(
+    tenant_id, fingerprints: List[str]
+) -> dict[str, str | None]:
+    """
+    Get the alert hash of the last alert of each fingerprint, using a single DB query.
+
+    Args:
+        tenant_id (str): The tenant id.
+        fingerprints (List[str]): The fingerprints.
+
+    Returns:
+        dict[str, str | None]: The last alert hash by fingerprint, fingerprints without alerts are missing.
+    """
+    if not fingerprints:
+        return {}
+    with Session(engine) as session:
+        last_timestamps = (
+            select(
+                Alert.fingerprint,
+                func.max(Alert.timestamp).label("max_timestamp"),
+            )
+            .where(Alert.tenant_id == tenant_id)
+            .where(Alert.fingerprint.in_(set(fingerprints)))
+            .group_by(Alert.fingerprint)
+            .subquery()
+        )
+        rows = session.execute(
+            select(Alert.fingerprint, Alert.alert_hash).join(
+                last_timestamps,
+                and_(
+                    Alert.tenant_id == tenant_id,
+                    Alert.fingerprint == last_timestamps.c.fingerprint,
+                    Alert.timestamp == last_timestamps.c.max_timestamp,
+                ),
+            )
+        ).all()
+    return {fingerprint: alert_hash for fingerprint, alert_hash in rows}
+
+
 def update_key_last_used(
     tenant_id: str,
     reference_id: str,
@@ -1512,6 +2358,24 @@ def update_key_last_used(
         session.commit()
 
 
+def update_keys_last_used(last_used: dict[tuple[str, str], datetime]):
+    """
+    Updates the last used time of API keys, in a single transaction.
+
+    Args:
+        last_used (dict): (tenant_id, reference_id) -> when the key was last used.
+    """
+    with Session(engine) as session:
+        for (tenant_id, reference_id), used_at in last_used.items():
+            session.execute(
+                update(TenantApiKey)
+                .where(TenantApiKey.tenant_id == tenant_id)
+                .where(TenantApiKey.reference_id == reference_id)
+                .values(last_used=used_at)
+            )
+        session.commit()
+
+
 def get_linked_providers(tenant_id: str) -> List[Tuple[str, str, datetime]]:
     with Session(engine) as session:
         providers = (
@@ -1620,3 +2484,251 @@ def get_all_presets(tenant_id: str) -> List[Preset]:
             select(Preset).where(Preset.tenant_id == tenant_id)
         ).all()
     return presets
+
+
+def enqueue_ingest_queue_item(item: IngestQueueItem) -> IngestQueueItem:
+    with Session(engine) as session:
+        session.add(item)
+        session.commit()
+        session.refresh(item)
+    return item
+
+
+def _claimable_ingest_queue_items(expired_claims: datetime):
+    # pending items, or items that were claimed by a worker that didn't finish them in time
+    return or_(
+        IngestQueueItem.status == "pending",
+        and_(
+            IngestQueueItem.status == "processing",
+            IngestQueueItem.claimed_at < expired_claims,
+        ),
+    )
+
+
+def claim_ingest_queue_items(
+    worker_id: str, limit: int = 10, visibility_timeout: int = 300
+) -> List[IngestQueueItem]:
+    """
+    Claim the oldest claimable ingest queue items for a worker.
+
+    Items claimed by a worker that crashed are claimed again after the visibility timeout.
+
+    Args:
+        worker_id (str): The id of the claiming worker.
+        limit (int): The maximum number of items to claim.
+        visibility_timeout (int): Seconds after which a claimed item can be claimed again.
+
+    Returns:
+        List[IngestQueueItem]: The claimed items, oldest first.
+    """
+    now = datetime.utcnow()
+    claimable = _claimable_ingest_queue_items(
+        now - timedelta(seconds=visibility_timeout)
+    )
+    with Session(engine) as session:
+        candidates = session.exec(
+            select(IngestQueueItem.id)
+            .where(claimable)
+            .order_by(IngestQueueItem.enqueued_at)
+            .limit(limit)
+        ).all()
+        claimed = []
+        for item_id in candidates:
+            # the conditional update makes sure an item is claimed by a single worker
+            result = session.execute(
+                update(IngestQueueItem)
+                .where(IngestQueueItem.id == item_id)
+                .where(claimable)
+                .values(
+                    status="processing",
+                    claimed_by=worker_id,
+                    claimed_at=now,
+                    attempts=IngestQueueItem.attempts + 1,
+                )
+            )
+            if result.rowcount == 1:
+                claimed.append(item_id)
+        session.commit()
+        if not claimed:
+            return []
+        items = session.exec(
+            select(IngestQueueItem)
+            .where(IngestQueueItem.id.in_(claimed))
+            .order_by(IngestQueueItem.enqueued_at)
+        ).all()
+    return items
+
+
+def ack_ingest_queue_item(item_id: UUID) -> None:
+    with Session(engine) as session:
+        session.execute(delete(IngestQueueItem).where(IngestQueueItem.id == item_id))
+        session.commit()
+
+
+def nack_ingest_queue_item(item_id: UUID, error: str, max_attempts: int) -> bool:
+    """
+    Return an item to the queue after its processing failed.
+
+    Returns:
+        bool: Whether it'll be retried, items that reached max_attempts are marked as failed.
+    """
+    with Session(engine) as session:
+        item = session.exec(
+            select(IngestQueueItem).where(IngestQueueItem.id == item_id)
+        ).first()
+        if not item:
+            return False
+        retry = item.attempts < max_attempts
+        item.status = "pending" if retry else "failed"
+        item.claimed_by = None
+        item.claimed_at = None
+        item.error = error
+        session.add(item)
+        session.commit()
+    return retry
+
+
+def release_ingest_queue_items(
+    worker_id: str | None = None, visibility_timeout: int | None = None
+) -> int:
+    """
+    Return claimed items to the queue, either the items of a worker (e.g. on shutdown)
+    or the items whose claim expired (e.g. of a worker that crashed).
+
+    Returns:
+        int: The number of released items.
+    """
+    query = update(IngestQueueItem).where(IngestQueueItem.status == "processing")
+    if worker_id:
+        query = query.where(IngestQueueItem.claimed_by == worker_id)
+    if visibility_timeout is not None:
+        query = query.where(
+            IngestQueueItem.claimed_at
+            < datetime.utcnow() - timedelta(seconds=visibility_timeout)
+        )
+    with Session(engine) as session:
+        result = session.execute(
+            query.values(status="pending", claimed_by=None, claimed_at=None)
+        )
+        session.commit()
+    return result.rowcount
+
+
+def get_ingest_queue_stats() -> dict:
+    with Session(engine) as session:
+        counts = dict(
+            session.execute(
+                select(IngestQueueItem.status, func.count(IngestQueueItem.id)).group_by(
+                    IngestQueueItem.status
+                )
+            ).all()
+        )
+        oldest_pending = session.execute(
+            select(func.min(IngestQueueItem.enqueued_at)).where(
+                IngestQueueItem.status == "pending"
+            )
+        ).scalar()
+    return {
+        "pending": counts.get("pending", 0),
+        "processing": counts.get("processing", 0),
+        "failed": counts.get("failed", 0),
+        "oldest_pending": oldest_pending,
+    }
+
+
+def claim_provider_pulls(
+    provider_types: list[str], interval: int, limit: int = 20
+) -> List[ProviderPullState]:
+    """
+    Claim the installed providers that are due to be pulled (see providers_sync.py).
+
+    The providers that were installed since the last claim are due right away.
+
+    Args:
+        provider_types (list[str]): The types of the providers that can be pulled.
+        interval (int): Seconds until the claimed providers are due again.
+        limit (int): The maximum number of providers to claim.
+
+    Returns:
+        List[ProviderPullState]: The claimed providers, the longest overdue first.
+    """
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        new_providers = session.exec(
+            select(Provider.tenant_id, Provider.id, Provider.type)
+            .outerjoin(
+                ProviderPullState,
+                and_(
+                    ProviderPullState.tenant_id == Provider.tenant_id,
+                    ProviderPullState.provider_id == Provider.id,
+                ),
+            )
+            .where(Provider.type.in_(provider_types))
+            .where(ProviderPullState.provider_id == None)  # noqa: E711
+        ).all()
+        for tenant_id, provider_id, provider_type in new_providers:
+            try:
+                session.add(
+                    ProviderPullState(
+                        tenant_id=tenant_id,
+                        provider_id=provider_id,
+                        provider_type=provider_type,
+                        next_pull_time=now,
+                    )
+                )
+                session.commit()
+            except IntegrityError:
+                # added by another replica
+                session.rollback()
+        candidates = session.exec(
+            select(ProviderPullState.tenant_id, ProviderPullState.provider_id)
+            # the uninstalled providers are left behind
+            .join(
+                Provider,
+                and_(
+                    Provider.tenant_id == ProviderPullState.tenant_id,
+                    Provider.id == ProviderPullState.provider_id,
+                ),
+            )
+            .where(ProviderPullState.next_pull_time <= now)
+            .order_by(ProviderPullState.next_pull_time)
+            .limit(limit)
+        ).all()
+        claimed = []
+        for tenant_id, provider_id in candidates:
+            # the conditional update, a provider is claimed by a single replica
+            result = session.execute(
+                update(ProviderPullState)
+                .where(ProviderPullState.tenant_id == tenant_id)
+                .where(ProviderPullState.provider_id == provider_id)
+                .where(ProviderPullState.next_pull_time <= now)
+                .values(next_pull_time=now + timedelta(seconds=interval))
+            )
+            if result.rowcount == 1:
+                claimed.append((tenant_id, provider_id))
+        session.commit()
+        states = [
+            session.get(ProviderPullState, (tenant_id, provider_id))
+            for tenant_id, provider_id in claimed
+        ]
+    return states
+
+
+def update_provider_pull_state(
+    tenant_id: str,
+    provider_id: str,
+    watermark: datetime | None,
+    pulled_alerts: int,
+):
+    with Session(engine) as session:
+        session.execute(
+            update(ProviderPullState)
+            .where(ProviderPullState.tenant_id == tenant_id)
+            .where(ProviderPullState.provider_id == provider_id)
+            .values(
+                watermark=watermark,
+                last_pull_time=datetime.utcnow(),
+                last_pull_alerts=pulled_alerts,
+            )
+        )
+        session.commit()
@@ -14,13 +14,9 @@ from fastapi.security import (
 from pusher import Pusher
 from sqlmodel import Session
 
+from keep.api.core.auth_cache import AuthCache
 from keep.api.core.config import AuthenticationType
-from keep.api.core.db import (
-    get_api_key,
-    get_session,
-    get_user_by_api_key,
-    update_key_last_used,
-)
+from keep.api.core.db import get_session, get_user_by_api_key
 from keep.api.core.rbac import Admin as AdminRole
 from keep.api.core.rbac import get_role_by_role_name
 
@@ -162,21 +158,27 @@ class AuthVerifierMultiTenant:
             try:
                 auth_audience = os.environ.get("AUTH0_AUDIENCE")
                 issuer = f"https://{auth_domain}/"
-                jwt_signing_key = jwks_client.get_signing_key_from_jwt(token).key
-                payload = jwt.decode(
-                    token,
-                    jwt_signing_key,
-                    algorithms="RS256",
-                    audience=auth_audience,
-                    issuer=issuer,
-                    leeway=60,
+
+                def decode(token: str) -> dict:
+                    jwt_signing_key = jwks_client.get_signing_key_from_jwt(token).key
+                    return jwt.decode(
+                        token,
+                        jwt_signing_key,
+                        algorithms="RS256",
+                        audience=auth_audience,
+                        issuer=issuer,
+                        leeway=60,
+                    )
+
+                # the token is decoded (and verified) once, until it expires
+                payload, role = AuthCache.get_instance().get_token(
+                    "multi-tenant", token, decode, role_claim="keep_role"
                 )
                 tenant_id = payload.get("keep_tenant_id")
                 role_name = payload.get(
                     "keep_role", AdminRole.get_name()
                 )  # default to admin for backwards compatibility
                 email = payload.get("email")
-                role = get_role_by_role_name(role_name)
                 # validate scopes
                 if not role.has_scopes(self.scopes):
                     raise HTTPException(
@@ -212,20 +214,12 @@ class AuthVerifierMultiTenant:
         Returns:
             str: The tenant id.
         """
-        tenant_api_key = get_api_key(api_key)
-        if not tenant_api_key:
+        auth_cache = AuthCache.get_instance()
+        tenant_api_key = auth_cache.get_api_key(api_key)
+        if not tenant_api_key or tenant_api_key.is_deleted:
             raise HTTPException(status_code=401, detail="Invalid API Key")
-        # update last used
-        else:
-            logger.debug("Updating API Key last used")
-            try:
-                update_key_last_used(
-                    tenant_api_key.tenant_id, reference_id=tenant_api_key.reference_id
-                )
-            except Exception:
-                logger.exception("Failed to update API Key last used")
-                pass
-            logger.debug("Successfully updated API Key last used")
+        # update last used (in the background)
+        auth_cache.touch_api_key(tenant_api_key.tenant_id, tenant_api_key.reference_id)
 
         # validate scopes
         role = get_role_by_role_name(tenant_api_key.role)
@@ -295,8 +289,6 @@ class AuthVerifierSingleTenant:
         session: Session = Depends(get_session),
     ) -> AuthenticatedEntity:
         # if we don't want to use authentication, return the single tenant id
-        tenant_api_key = get_api_key(api_key)
-
         if (
             os.environ.get("AUTH_TYPE", AuthenticationType.NO_AUTH.value)
             == AuthenticationType.NO_AUTH.value
@@ -308,18 +300,12 @@ class AuthVerifierSingleTenant:
                 role=AdminRole.get_name(),
             )
 
-        if not tenant_api_key:
+        auth_cache = AuthCache.get_instance()
+        tenant_api_key = auth_cache.get_api_key(api_key)
+        if not tenant_api_key or tenant_api_key.is_deleted:
             raise HTTPException(status_code=401, detail="Invalid API Key")
-        else:
-            logger.debug("Updating API Key last used")
-            try:
-                update_key_last_used(
-                    tenant_api_key.tenant_id, reference_id=tenant_api_key.reference_id
-                )
-            except Exception:
-                logger.exception("Failed to update API Key last used")
-                pass
-            logger.debug("Successfully updated API Key last used")
+        # update last used (in the background)
+        auth_cache.touch_api_key(tenant_api_key.tenant_id, tenant_api_key.reference_id)
 
         role = get_role_by_role_name(tenant_api_key.role)
         # validate scopes
@@ -357,17 +343,18 @@ class AuthVerifierSingleTenant:
             raise HTTPException(status_code=401, detail="Missing JWT secret")
 
         try:
-            payload = jwt.decode(
+            # the token is decoded (and verified) once, until it expires
+            payload, role = AuthCache.get_instance().get_token(
+                "single-tenant",
                 token,
-                jwt_secret,
-                algorithms="HS256",
+                lambda token: jwt.decode(token, jwt_secret, algorithms="HS256"),
+                role_claim="role",
             )
             tenant_id = payload.get("tenant_id")
             email = payload.get("email")
             role_name = payload.get(
                 "role", AdminRole.get_name()
             )  # default to admin for backwards compatibility
-            role = get_role_by_role_name(role_name)
         except Exception:
             raise HTTPException(status_code=401, detail="Invalid JWT token")
         # validate scopes
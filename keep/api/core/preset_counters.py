@@ -0,0 +1,509 @@
+"""
+Per-preset alert counters, updated as alerts are ingested and enriched so GET /preset
+doesn't evaluate every preset over the last alerts of the tenant.
+"""
+
+import dataclasses
+import datetime
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from keep.api.core.db import (
+    get_alerts_by_fingerprint,
+    get_all_presets,
+    get_last_alerts,
+    get_last_alerts_changes,
+)
+from keep.api.models.alert import AlertDto, AlertStatus
+from keep.api.models.db.preset import Preset, PresetDto, StaticPresetsId
+from keep.api.utils.enrichment_helpers import convert_db_alerts_to_dto_alerts
+from keep.rulesengine.celactivation import build_filter_activations
+from keep.rulesengine.rulesengine import RulesEngine
+
+# seconds, every worker counts the alerts it ingests and catches up with the other
+#   workers (and replicas) from the database on every GET /preset, the reconciliation
+#   corrects what that can't see (e.g. a change committed while it was looked for)
+KEEP_PRESET_COUNTERS_RECONCILE_INTERVAL = int(
+    os.environ.get("KEEP_PRESET_COUNTERS_RECONCILE_INTERVAL", 60)
+)
+# the fingerprints that are counted, like GET /preset always did
+KEEP_PRESET_COUNTERS_MAX_ALERTS = int(
+    os.environ.get("KEEP_PRESET_COUNTERS_MAX_ALERTS", 1000)
+)
+
+# the changes are looked for a bit before the last time, for the changes that were
+#   committed late (and the clocks of other replicas)
+CHANGES_OVERLAP = datetime.timedelta(seconds=5)
+
+FEED_PRESET_ID = StaticPresetsId.FEED_PRESET_ID.value
+DISMISSED_PRESET_ID = StaticPresetsId.DISMISSED_PRESET_ID.value
+GROUPS_PRESET_ID = StaticPresetsId.GROUPS_PRESET_ID.value
+
+
+@dataclasses.dataclass
+class PresetCounter:
+    # the alerts that match the preset
+    alerts: int = 0
+    # ... that are firing and neither deleted nor dismissed
+    firing: int = 0
+    # ... that are noisy too
+    noisy_firing: int = 0
+
+    def should_do_noise_now(self, is_noisy: bool) -> bool:
+        # noisy presets make noise for every firing alert
+        return self.firing > 0 if is_noisy else self.noisy_firing > 0
+
+
+@dataclasses.dataclass(frozen=True)
+class _AlertState:
+    # the presets (including the static presets) the alert matches
+    presets: frozenset[str]
+    firing: bool
+    noisy_firing: bool
+    # when the dismissal expires (epoch), None if it doesn't
+    dismissed_until: float | None = None
+
+
+@dataclasses.dataclass
+class _TenantCounters:
+    # preset id -> (CEL query, is noisy), the presets without a query aren't counted
+    presets: dict[str, tuple[str, bool]]
+    # fingerprint -> state, the least recently received first
+    alerts: OrderedDict[str, _AlertState]
+    counters: dict[str, PresetCounter]
+    reconciled_at: float
+    # when (UTC) the alerts were read from the database by the reconciliation
+    synced_at: datetime.datetime
+    # when (UTC) the changes of the other workers were last looked for
+    checked_at: datetime.datetime
+    # bumped whenever the presets change, so states evaluated with the old ones
+    #   are evaluated again
+    version: int = 0
+    # fingerprint -> when its dismissal expires (epoch)
+    dismissals: dict[str, float] = dataclasses.field(default_factory=dict)
+    # fingerprint -> when (UTC) this worker counted its last change, since checked_at
+    seen: dict[str, datetime.datetime] = dataclasses.field(default_factory=dict)
+
+
+class PresetCounters:
+    def __init__(
+        self,
+        reconcile_interval: int = KEEP_PRESET_COUNTERS_RECONCILE_INTERVAL,
+        max_alerts: int = KEEP_PRESET_COUNTERS_MAX_ALERTS,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.reconcile_interval = reconcile_interval
+        self.max_alerts = max_alerts
+        self._tenants: dict[str, _TenantCounters] = {}
+        self._lock = threading.RLock()
+        # a tenant is reconciled by one thread at a time, the others wait for it
+        self._reconciling: dict[str, threading.Event] = {}
+        # tenant id -> the alerts updated during its reconciliation
+        #   (fingerprint -> (the alert or None if it was removed, received))
+        self._pending: dict[str, dict[str, tuple[AlertDto | None, bool]]] = {}
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.reconciliations = 0
+        self.updates = 0
+        self.caught_up = 0
+
+    @classmethod
+    def get_instance(cls) -> "PresetCounters":
+        if not hasattr(cls, "_instance"):
+            cls._instance = cls()
+        return cls._instance
+
+    def get_counters(
+        self, tenant_id: str, presets: list[Preset]
+    ) -> dict[str, PresetCounter]:
+        """The counters of the presets (and the static presets), by preset id
+
+        Args:
+            tenant_id (str): the tenant id.
+            presets (list[Preset]): the presets that are served, if one of them is
+                new or was changed the tenant is reconciled first.
+        """
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            up_to_date = tenant is not None and all(
+                tenant.presets.get(str(preset.id)) == self._preset_key(preset)
+                for preset in presets
+                if self._preset_key(preset)
+            )
+        if not up_to_date:
+            self.reconcile(tenant_id)
+            self._ensure_started()
+        else:
+            self._catch_up(tenant_id)
+        self._refresh_expired_dismissals(tenant_id)
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None:
+                return {}
+            return {
+                preset_id: dataclasses.replace(counter)
+                for preset_id, counter in tenant.counters.items()
+            }
+
+    def update(self, tenant_id: str, alerts: list[AlertDto], received: bool = True):
+        """Count the new state of the alerts
+
+        Args:
+            tenant_id (str): the tenant id.
+            alerts (list[AlertDto]): the alerts, with their enrichments.
+            received (bool): the alerts were just received (and not enriched), so they
+                are the last ones of the tenant.
+        """
+        if not alerts or (
+            tenant_id not in self._tenants and tenant_id not in self._pending
+        ):
+            # the tenant isn't counted (yet) by this process
+            return
+        # the last alert of a fingerprint in the batch wins
+        alerts = list({alert.fingerprint: alert for alert in alerts}.values())
+        while True:
+            with self._lock:
+                tenant = self._tenants.get(tenant_id)
+                pending = self._pending.get(tenant_id)
+                if pending is not None:
+                    # the reconciliation may have read the alerts before they changed
+                    for alert in alerts:
+                        pending[alert.fingerprint] = (alert, received)
+                if tenant is None:
+                    return
+                presets, version = tenant.presets, tenant.version
+            # evaluated outside of the lock, the ingestion of other tenants goes on
+            states = self._evaluate(presets, alerts)
+            with self._lock:
+                if self._tenants.get(tenant_id) is not tenant or (
+                    tenant.version != version
+                ):
+                    # reconciled or the presets changed in the meantime
+                    continue
+                seen_at = datetime.datetime.utcnow()
+                for alert, state in zip(alerts, states):
+                    self._set_state(tenant, alert.fingerprint, state, received)
+                    tenant.seen[alert.fingerprint] = seen_at
+                self.updates += len(alerts)
+                return
+
+    def refresh(self, tenant_id: str, fingerprints: list[str]):
+        """Count the alerts as they are in the database (e.g. after enriching them)"""
+        if not fingerprints or (
+            tenant_id not in self._tenants and tenant_id not in self._pending
+        ):
+            return
+        alerts = []
+        removed = []
+        for fingerprint in fingerprints:
+            db_alerts = get_alerts_by_fingerprint(tenant_id, fingerprint, limit=1)
+            if db_alerts:
+                alerts.extend(convert_db_alerts_to_dto_alerts(db_alerts))
+            else:
+                removed.append(fingerprint)
+        self.update(tenant_id, alerts, received=False)
+        if removed:
+            with self._lock:
+                pending = self._pending.get(tenant_id)
+                tenant = self._tenants.get(tenant_id)
+                for fingerprint in removed:
+                    if pending is not None:
+                        pending[fingerprint] = (None, False)
+                    if tenant is not None:
+                        self._set_state(tenant, fingerprint, None, received=False)
+                        tenant.seen[fingerprint] = datetime.datetime.utcnow()
+
+    def invalidate(self, tenant_id: str):
+        """Reconcile the tenant on its next GET /preset (e.g. its presets changed)"""
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is not None:
+                # no preset is up to date, so the next get_counters reconciles
+                tenant.presets = {}
+                tenant.version += 1
+
+    def reconcile(self, tenant_id: str):
+        """Count the presets of the tenant from scratch, from the database"""
+        with self._lock:
+            reconciled = self._reconciling.get(tenant_id)
+            if reconciled is None:
+                self._reconciling[tenant_id] = threading.Event()
+                # the alerts updated from now on are counted again on top of it
+                self._pending[tenant_id] = {}
+        if reconciled is not None:
+            # reconciled by another thread, the caller expects the counters to be there
+            reconciled.wait()
+            return
+        start = time.time()
+        try:
+            synced_at = datetime.datetime.utcnow()
+            presets = {
+                str(preset.id): self._preset_key(preset)
+                for preset in get_all_presets(tenant_id)
+                if self._preset_key(preset)
+            }
+            # the last alert of every fingerprint, the most recent first
+            alerts = {}
+            for alert in convert_db_alerts_to_dto_alerts(
+                get_last_alerts(tenant_id, limit=self.max_alerts)
+            ):
+                alerts.setdefault(alert.fingerprint, alert)
+            alerts = list(reversed(alerts.values()))
+            states = self._evaluate(presets, alerts)
+            with self._lock:
+                previous = self._tenants.get(tenant_id)
+                tenant = _TenantCounters(
+                    presets=presets,
+                    alerts=OrderedDict(),
+                    counters={},
+                    reconciled_at=time.monotonic(),
+                    synced_at=synced_at,
+                    checked_at=synced_at,
+                    version=previous.version + 1 if previous else 0,
+                )
+                for alert, state in zip(alerts, states):
+                    self._set_state(tenant, alert.fingerprint, state, received=True)
+                self._tenants[tenant_id] = tenant
+                pending = self._pending.pop(tenant_id, {})
+            # the (rare) updates that raced with the reconciliation
+            for fingerprint, (alert, received) in pending.items():
+                if alert is not None:
+                    self.update(tenant_id, [alert], received=received)
+                else:
+                    with self._lock:
+                        self._set_state(tenant, fingerprint, None, received=False)
+            self.reconciliations += 1
+            self.logger.info(
+                "Reconciled preset counters",
+                extra={
+                    "tenant_id": tenant_id,
+                    "presets": len(presets),
+                    "alerts": len(alerts),
+                    "time": time.time() - start,
+                },
+            )
+        except Exception:
+            self.logger.exception(
+                "Failed to reconcile preset counters", extra={"tenant_id": tenant_id}
+            )
+        finally:
+            with self._lock:
+                self._pending.pop(tenant_id, None)
+                self._reconciling.pop(tenant_id).set()
+
+    def clear(self):
+        with self._lock:
+            self._tenants.clear()
+
+    def stop(self):
+        """Stop the reconciliation thread"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tenants": len(self._tenants),
+                "alerts": sum(len(tenant.alerts) for tenant in self._tenants.values()),
+                "updates": self.updates,
+                "reconciliations": self.reconciliations,
+                "caught_up": self.caught_up,
+            }
+
+    @staticmethod
+    def _preset_key(preset: Preset) -> tuple[str, bool] | None:
+        cel_query = PresetDto(**preset.dict()).cel_query
+        return (cel_query, preset.is_noisy) if cel_query else None
+
+    @staticmethod
+    def _evaluate(
+        presets: dict[str, tuple[str, bool]], alerts: list[AlertDto]
+    ) -> list[_AlertState]:
+        """The state of every alert, each preset is evaluated once for all the alerts"""
+        activations = build_filter_activations(alerts) if presets else []
+        matches = {id(alert): set() for alert in alerts}
+        for preset_id, (cel_query, _) in presets.items():
+            for alert in RulesEngine.filter_alerts(alerts, cel_query, activations):
+                matches[id(alert)].add(preset_id)
+        states = []
+        for alert in alerts:
+            alert_presets = matches[id(alert)]
+            active = not alert.deleted and not alert.dismissed
+            if active:
+                alert_presets.add(FEED_PRESET_ID)
+            if alert.dismissed:
+                alert_presets.add(DISMISSED_PRESET_ID)
+            if alert.group:
+                alert_presets.add(GROUPS_PRESET_ID)
+            firing = active and alert.status == AlertStatus.FIRING.value
+            dismissed_until = None
+            if alert.dismissed and alert.dismissUntil not in (None, "forever"):
+                dismissed_until = (
+                    datetime.datetime.strptime(
+                        alert.dismissUntil, "%Y-%m-%dT%H:%M:%S.%fZ"
+                    )
+                    .replace(tzinfo=datetime.timezone.utc)
+                    .timestamp()
+                )
+            states.append(
+                _AlertState(
+                    presets=frozenset(alert_presets),
+                    firing=firing,
+                    noisy_firing=firing and alert.isNoisy,
+                    dismissed_until=dismissed_until,
+                )
+            )
+        return states
+
+    def _set_state(
+        self,
+        tenant: _TenantCounters,
+        fingerprint: str,
+        state: _AlertState | None,
+        received: bool,
+    ):
+        """Move the counters from the previous state of the alert to the new one,
+        must be called with the lock held"""
+        previous = tenant.alerts.get(fingerprint)
+        if previous is None and (state is None or not received):
+            # enriched, but not one of the counted fingerprints
+            return
+        if previous is not None:
+            self._count(tenant, previous, -1)
+        tenant.dismissals.pop(fingerprint, None)
+        if state is None:
+            del tenant.alerts[fingerprint]
+            return
+        if received:
+            # the last alert of the tenant, evicted last
+            tenant.alerts.pop(fingerprint, None)
+        # else, enriching an alert keeps its place
+        tenant.alerts[fingerprint] = state
+        if state.dismissed_until is not None:
+            tenant.dismissals[fingerprint] = state.dismissed_until
+        self._count(tenant, state, 1)
+        while len(tenant.alerts) > self.max_alerts:
+            evicted_fingerprint, evicted = tenant.alerts.popitem(last=False)
+            tenant.dismissals.pop(evicted_fingerprint, None)
+            self._count(tenant, evicted, -1)
+
+    @staticmethod
+    def _count(tenant: _TenantCounters, state: _AlertState, delta: int):
+        for preset_id in state.presets:
+            counter = tenant.counters.setdefault(preset_id, PresetCounter())
+            counter.alerts += delta
+            counter.firing += delta * state.firing
+            counter.noisy_firing += delta * state.noisy_firing
+
+    def _catch_up(self, tenant_id: str):
+        """Count the alerts that other workers received or enriched since the last time"""
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None:
+                return
+            since = tenant.checked_at - CHANGES_OVERLAP
+        checked_at = datetime.datetime.utcnow()
+        try:
+            received, enriched = get_last_alerts_changes(
+                tenant_id, since, limit=self.max_alerts + 1
+            )
+        except Exception:
+            self.logger.exception(
+                "Failed to look for the changes of the alerts",
+                extra={"tenant_id": tenant_id},
+            )
+            return
+        if len(received) > self.max_alerts or len(enriched) > self.max_alerts:
+            # more changes than alerts, from scratch is cheaper
+            self.reconcile(tenant_id)
+            return
+        with self._lock:
+            if self._tenants.get(tenant_id) is not tenant:
+                # reconciled in the meantime
+                return
+            tenant.checked_at = max(tenant.checked_at, checked_at)
+            # the changes before since are never looked for again
+            tenant.seen = {
+                fingerprint: seen_at
+                for fingerprint, seen_at in tenant.seen.items()
+                if seen_at >= since
+            }
+            unseen = [
+                {
+                    fingerprint
+                    for fingerprint, changed_at in changes.items()
+                    if changed_at > tenant.seen.get(fingerprint, tenant.synced_at)
+                }
+                for changes in (received, enriched)
+            ]
+        unseen_received, unseen_enriched = unseen
+        if not unseen_received and not unseen_enriched:
+            return
+        fingerprints = unseen_received | unseen_enriched
+        # the most recent first
+        alerts = convert_db_alerts_to_dto_alerts(
+            get_last_alerts(
+                tenant_id, limit=len(fingerprints), fingerprints=list(fingerprints)
+            )
+        )
+        # a new alert of a fingerprint makes it the last one, an enrichment doesn't
+        self.update(
+            tenant_id,
+            [
+                alert
+                for alert in reversed(alerts)
+                if alert.fingerprint in unseen_received
+            ],
+        )
+        self.update(
+            tenant_id,
+            [alert for alert in alerts if alert.fingerprint not in unseen_received],
+            received=False,
+        )
+        self.caught_up += len(alerts)
+
+    def _refresh_expired_dismissals(self, tenant_id: str):
+        now = time.time()
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None:
+                return
+            expired = [
+                fingerprint
+                for fingerprint, dismissed_until in tenant.dismissals.items()
+                if dismissed_until <= now
+            ]
+        if expired:
+            self.refresh(tenant_id, expired)
+
+    def _ensure_started(self):
+        if self._thread is not None or self._stop.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="preset-counters", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(min(self.reconcile_interval, 60))
+            if self._stop.is_set():
+                return
+            now = time.monotonic()
+            with self._lock:
+                tenants = [
+                    tenant_id
+                    for tenant_id, tenant in self._tenants.items()
+                    if now - tenant.reconciled_at >= self.reconcile_interval
+                ]
+            for tenant_id in tenants:
+                self.reconcile(tenant_id)
@@ -0,0 +1,383 @@
+"""
+Background publisher of the real-time updates (alerts, presets), coalescing them per
+tenant and sending them in batches, rate limited per channel.
+"""
+
+import abc
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import threading
+import time
+import typing
+import uuid
+from collections import OrderedDict
+
+from keep.api.core.dependencies import get_pusher_client
+from keep.api.utils.pusher_utils import PUSHER_MAX_MESSAGE_SIZE, pack_pusher_batches
+
+# "pusher" (Pusher or Soketi) or "local" (server-sent events from /realtime/events,
+#   it only reaches the clients of its own process, see keep/api/config.py)
+KEEP_REALTIME_TRANSPORT = os.environ.get("KEEP_REALTIME_TRANSPORT", "pusher")
+# seconds, the coalescing window
+KEEP_REALTIME_FLUSH_INTERVAL = float(
+    os.environ.get("KEEP_REALTIME_FLUSH_INTERVAL", 0.5)
+)
+# messages per second, per channel
+KEEP_REALTIME_CHANNEL_RATE = float(os.environ.get("KEEP_REALTIME_CHANNEL_RATE", 10))
+KEEP_REALTIME_MAX_BUFFERED_ALERTS = int(
+    os.environ.get("KEEP_REALTIME_MAX_BUFFERED_ALERTS", 10000)
+)
+
+
+class RealtimeTransport(abc.ABC):
+    @abc.abstractmethod
+    def send(self, channel: str, event_name: str, message: str):
+        """Send a message (JSON) to the clients subscribed to the channel"""
+
+
+class PusherTransport(RealtimeTransport):
+    def __init__(self, pusher_client):
+        self.pusher_client = pusher_client
+
+    def send(self, channel: str, event_name: str, message: str):
+        self.pusher_client.trigger(channel, event_name, message)
+
+
+class LocalBroadcaster(RealtimeTransport):
+    """Broadcasts the messages to the subscribers of this process
+
+    The subscribers are asyncio queues, fed on their event loop so a streaming
+    client awaits its queue instead of holding a thread.
+    """
+
+    def __init__(self, max_queued: int = 1000):
+        self.max_queued = max_queued
+        # channel -> the queues of its subscribers and their event loops
+        self._subscribers: dict[str, dict[asyncio.Queue, asyncio.AbstractEventLoop]] = (
+            {}
+        )
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        """Subscribe to the channel, from the event loop that reads the queue"""
+        loop = asyncio.get_running_loop()
+        subscriber = asyncio.Queue(maxsize=self.max_queued)
+        with self._lock:
+            self._subscribers.setdefault(channel, {})[subscriber] = loop
+        return subscriber
+
+    def unsubscribe(self, channel: str, subscriber: asyncio.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(channel, {})
+            subscribers.pop(subscriber, None)
+            if not subscribers:
+                self._subscribers.pop(channel, None)
+
+    def send(self, channel: str, event_name: str, message: str):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, {}).items())
+        for subscriber, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, subscriber, (event_name, message))
+            except RuntimeError:
+                # the loop is closed, the subscriber is gone
+                self.unsubscribe(channel, subscriber)
+
+    @staticmethod
+    def _put(subscriber: asyncio.Queue, item: tuple[str, str]):
+        try:
+            subscriber.put_nowait(item)
+        except asyncio.QueueFull:
+            # a slow client misses updates instead of holding the others back
+            pass
+
+
+@dataclasses.dataclass
+class _ChannelBuffer:
+    # fingerprint -> the last update of the alert
+    alerts: OrderedDict[str, dict] = dataclasses.field(default_factory=OrderedDict)
+    # preset id -> the preset update
+    presets: OrderedDict[str, dict] = dataclasses.field(default_factory=OrderedDict)
+    # (event name, message), sent as is after the alerts and the presets
+    events: list[tuple[str, str]] = dataclasses.field(default_factory=list)
+    # the rate limit token bucket
+    tokens: float = 0.0
+    refilled_at: float = 0.0
+
+    def empty(self) -> bool:
+        return not (self.alerts or self.presets or self.events)
+
+
+class RealtimePublisher:
+    def __init__(
+        self,
+        transport: RealtimeTransport | None,
+        flush_interval: float = KEEP_REALTIME_FLUSH_INTERVAL,
+        channel_rate: float = KEEP_REALTIME_CHANNEL_RATE,
+        max_buffered_alerts: int = KEEP_REALTIME_MAX_BUFFERED_ALERTS,
+        max_message_size: int = PUSHER_MAX_MESSAGE_SIZE,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.transport = transport
+        self.flush_interval = flush_interval
+        self.channel_rate = channel_rate
+        self.max_buffered_alerts = max_buffered_alerts
+        self.max_message_size = max_message_size
+        # channel -> what wasn't sent yet
+        self._buffers: dict[str, _ChannelBuffer] = {}
+        self._lock = threading.Lock()
+        # a single flush at a time, so the messages of a channel keep their order
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.published = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.messages = 0
+        self.errors = 0
+        self.rate_limited = 0
+
+    @classmethod
+    def get_instance(cls) -> "RealtimePublisher":
+        if not hasattr(cls, "_instance"):
+            cls._instance = cls(cls._get_transport())
+        return cls._instance
+
+    @staticmethod
+    def _get_transport() -> RealtimeTransport | None:
+        if KEEP_REALTIME_TRANSPORT == "local":
+            return LocalBroadcaster()
+        try:
+            pusher_client = get_pusher_client()
+        except Exception:
+            logging.getLogger(__name__).exception(
+                "Failed to create the pusher client, real-time updates are disabled"
+            )
+            return None
+        return PusherTransport(pusher_client) if pusher_client else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.transport is not None
+
+    def publish_alerts(self, tenant_id: str, alerts: list[dict]):
+        """Send the alerts (AlertDto dicts) to the tenant's clients, coalesced"""
+        if not self.enabled or not alerts:
+            return
+        with self._lock:
+            buffer = self._buffer(tenant_id)
+            for alert in alerts:
+                fingerprint = alert.get("fingerprint") or str(uuid.uuid4())
+                if fingerprint in buffer.alerts:
+                    self.coalesced += 1
+                    del buffer.alerts[fingerprint]
+                buffer.alerts[fingerprint] = alert
+            self.published += len(alerts)
+            while len(buffer.alerts) > self.max_buffered_alerts:
+                buffer.alerts.popitem(last=False)
+                self.dropped += 1
+        self._ensure_started()
+
+    def publish_presets(self, tenant_id: str, presets: list[dict]):
+        """Send the presets updates (PresetDto dicts) to the tenant's clients
+
+        The updates of a preset within the coalescing window are merged, their
+        alerts counts added up.
+        """
+        if not self.enabled or not presets:
+            return
+        with self._lock:
+            buffer = self._buffer(tenant_id)
+            for preset in presets:
+                preset_id = str(preset.get("id") or preset.get("name"))
+                previous = buffer.presets.get(preset_id)
+                if previous is not None:
+                    self.coalesced += 1
+                    preset = {
+                        **preset,
+                        "alerts_count": (previous.get("alerts_count") or 0)
+                        + (preset.get("alerts_count") or 0),
+                        "should_do_noise_now": bool(
+                            previous.get("should_do_noise_now")
+                            or preset.get("should_do_noise_now")
+                        ),
+                    }
+                buffer.presets[preset_id] = preset
+        self._ensure_started()
+
+    def publish(self, tenant_id: str, event_name: str, data: typing.Any):
+        """Send an event as is, after the alerts and presets published before it"""
+        if not self.enabled:
+            return
+        message = data if isinstance(data, str) else json.dumps(data, default=str)
+        with self._lock:
+            self._buffer(tenant_id).events.append((event_name, message))
+        self._ensure_started()
+
+    def flush(self, rate_limit: bool = True):
+        """Send what was buffered, up to the channels' rate limit"""
+        with self._flush_lock:
+            with self._lock:
+                channels = [
+                    channel
+                    for channel, buffer in self._buffers.items()
+                    if not buffer.empty()
+                ]
+            for channel in channels:
+                try:
+                    self._flush_channel(channel, rate_limit)
+                except Exception:
+                    self.logger.exception(
+                        "Failed to send real-time updates", extra={"channel": channel}
+                    )
+
+    def stop(self):
+        """Stop the background thread, sending what's buffered"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush(rate_limit=False)
+
+    def clear(self):
+        with self._lock:
+            self._buffers.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "transport": type(self.transport).__name__ if self.transport else None,
+                "published": self.published,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "messages": self.messages,
+                "errors": self.errors,
+                "rate_limited": self.rate_limited,
+                "buffered_alerts": sum(
+                    len(buffer.alerts) for buffer in self._buffers.values()
+                ),
+            }
+
+    def _buffer(self, tenant_id: str) -> _ChannelBuffer:
+        channel = f"private-{tenant_id}"
+        buffer = self._buffers.get(channel)
+        if buffer is None:
+            buffer = self._buffers[channel] = _ChannelBuffer(
+                tokens=self.channel_rate, refilled_at=time.monotonic()
+            )
+        return buffer
+
+    def _flush_channel(self, channel: str, rate_limit: bool):
+        with self._lock:
+            buffer = self._buffers[channel]
+            now = time.monotonic()
+            buffer.tokens = min(
+                self.channel_rate,
+                buffer.tokens + (now - buffer.refilled_at) * self.channel_rate,
+            )
+            buffer.refilled_at = now
+            alerts = list(buffer.alerts.items())
+            presets = list(buffer.presets.items())
+            events = buffer.events
+            buffer.alerts, buffer.presets, buffer.events = (
+                OrderedDict(),
+                OrderedDict(),
+                [],
+            )
+
+        def take() -> bool:
+            if not rate_limit:
+                return True
+            with self._lock:
+                if buffer.tokens < 1:
+                    return False
+                buffer.tokens -= 1
+                return True
+
+        sent_alerts = self._send_packed(
+            channel, "async-alerts", [alert for _, alert in alerts], take
+        )
+        sent_presets = 0
+        if sent_alerts == len(alerts):
+            sent_presets = self._send_packed(
+                channel, "async-presets", [preset for _, preset in presets], take
+            )
+        sent_events = 0
+        if sent_presets == len(presets):
+            for event_name, message in events:
+                if not take():
+                    break
+                self._send(channel, event_name, message)
+                sent_events += 1
+
+        if (sent_alerts, sent_presets, sent_events) == (
+            len(alerts),
+            len(presets),
+            len(events),
+        ):
+            return
+        # rate limited, what's left goes back in front of what was published since
+        with self._lock:
+            self.rate_limited += 1
+            buffer.alerts = self._merge_back(alerts[sent_alerts:], buffer.alerts)
+            for preset_id, preset in presets[sent_presets:]:
+                buffer.presets.setdefault(preset_id, preset)
+            buffer.events = events[sent_events:] + buffer.events
+
+    @staticmethod
+    def _merge_back(unsent: list[tuple[str, dict]], newer: OrderedDict) -> OrderedDict:
+        merged = OrderedDict(
+            (fingerprint, alert)
+            for fingerprint, alert in unsent
+            if fingerprint not in newer
+        )
+        merged.update(newer)
+        return merged
+
+    def _send_packed(
+        self,
+        channel: str,
+        event_name: str,
+        items: list[dict],
+        take: typing.Callable[[], bool],
+    ) -> int:
+        """Send the items packed, returns how many of them were sent"""
+        sent = 0
+        for count, message in pack_pusher_batches(items, self.max_message_size):
+            if not take():
+                break
+            self._send(channel, event_name, message)
+            sent += count
+        return sent
+
+    def _send(self, channel: str, event_name: str, message: str):
+        try:
+            self.transport.send(channel, event_name, message)
+            self.messages += 1
+        except Exception:
+            # not sent again, the clients refresh from the API
+            self.errors += 1
+            self.logger.exception(
+                "Failed to push to the client",
+                extra={"channel": channel, "event_name": event_name},
+            )
+
+    def _ensure_started(self):
+        if self._thread is not None or self._stop.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="realtime-publisher", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self.flush()
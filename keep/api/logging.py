@@ -1,33 +1,197 @@
-import copy
+import datetime
 import inspect
+import json
 import logging
 import logging.config
 import os
+import threading
 
 # tb: small hack to avoid the InsecureRequestWarning logs
 import urllib3
 
-from keep.api.consts import RUNNING_IN_CLOUD_RUN
 from keep.api.core.db import push_logs_to_db
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
-class WorkflowDBHandler(logging.Handler):
-    def __init__(self):
-        super().__init__()
-        self.records = []
+KEEP_WORKFLOW_LOGS_BATCH_SIZE = int(
+    os.environ.get("KEEP_WORKFLOW_LOGS_BATCH_SIZE", 500)
+)
+# seconds
+KEEP_WORKFLOW_LOGS_FLUSH_INTERVAL = float(
+    os.environ.get("KEEP_WORKFLOW_LOGS_FLUSH_INTERVAL", 1)
+)
+# bytes (approximately), records are dropped when the buffers are full
+KEEP_WORKFLOW_LOGS_MAX_BUFFER_SIZE = int(
+    os.environ.get("KEEP_WORKFLOW_LOGS_MAX_BUFFER_SIZE", 50 * 1024 * 1024)
+)
+# bytes, bigger steps contexts are not stored with the logs
+KEEP_WORKFLOW_LOGS_MAX_CONTEXT_SIZE = 1024 * 64
+
+
+class WorkflowLogShipper:
+    """Ships the workflow logs to the database from a background thread
+
+    The records are buffered per workflow execution and inserted in batches of up
+    to KEEP_WORKFLOW_LOGS_BATCH_SIZE records, at least every
+    KEEP_WORKFLOW_LOGS_FLUSH_INTERVAL seconds, so the workflows don't wait for the
+    database. When the buffers are full the new records are dropped, and the number
+    of records dropped is logged with the execution's next records.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = KEEP_WORKFLOW_LOGS_BATCH_SIZE,
+        flush_interval: float = KEEP_WORKFLOW_LOGS_FLUSH_INTERVAL,
+        max_buffer_size: int = KEEP_WORKFLOW_LOGS_MAX_BUFFER_SIZE,
+    ):
+        # not a workflow logger, so its logs are not shipped
+        self.logger = logging.getLogger(__name__)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer_size = max_buffer_size
+        # workflow execution id -> its buffered records
+        self._buffers: dict[str, list[dict]] = {}
+        # workflow execution id -> the number of its records that were dropped
+        self._dropped: dict[str, int] = {}
+        self._buffered = 0
+        self._buffer_size = 0
+        self._lock = threading.Lock()
+        # serializes the writes of the writer thread and flush(wait=True)
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.shipped = 0
+        self.dropped = 0
+
+    @classmethod
+    def get_instance(cls) -> "WorkflowLogShipper":
+        if not hasattr(cls, "_instance"):
+            cls._instance = cls()
+        return cls._instance
+
+    def enqueue(self, log_entry: dict, size: int):
+        """Buffer a log record of a workflow execution
+
+        Args:
+            log_entry (dict): workflow_execution_id, timestamp, message and context
+            size (int): the approximate size of the record, in bytes
+        """
+        workflow_execution_id = log_entry["workflow_execution_id"]
+        with self._lock:
+            if self._buffer_size + size > self.max_buffer_size:
+                self._dropped[workflow_execution_id] = (
+                    self._dropped.get(workflow_execution_id, 0) + 1
+                )
+                self.dropped += 1
+                return
+            self._buffers.setdefault(workflow_execution_id, []).append(log_entry)
+            self._buffered += 1
+            self._buffer_size += size
+            full_batch = self._buffered >= self.batch_size
+        self._ensure_started()
+        if full_batch:
+            self._wakeup.set()
+
+    def flush(self, wait: bool = False):
+        """Ship the buffered records now
+
+        Args:
+            wait (bool): write them from the calling thread (e.g. on shutdown)
+                instead of waking up the writer thread
+        """
+        if wait:
+            self._write()
+        else:
+            self._wakeup.set()
 
+    def stop(self):
+        """Stop the writer thread, shipping the buffered records"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self._write()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "buffered": self._buffered,
+                "buffer_size": self._buffer_size,
+                "shipped": self.shipped,
+                "dropped": self.dropped,
+            }
+
+    def _ensure_started(self):
+        if self._thread is not None or self._stop.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="workflow-logs-shipper", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._write()
+
+    def _write(self):
+        with self._write_lock:
+            with self._lock:
+                buffers, self._buffers = self._buffers, {}
+                dropped, self._dropped = self._dropped, {}
+                self._buffered = 0
+                self._buffer_size = 0
+            log_entries = []
+            for workflow_execution_id, count in dropped.items():
+                log_entries.append(
+                    {
+                        "workflow_execution_id": workflow_execution_id,
+                        "timestamp": datetime.datetime.utcnow(),
+                        "message": f"{count} log records were dropped (buffer full)",
+                        "context": None,
+                    }
+                )
+            for records in buffers.values():
+                log_entries.extend(records)
+            for i in range(0, len(log_entries), self.batch_size):
+                batch = log_entries[i : i + self.batch_size]
+                try:
+                    push_logs_to_db(batch)
+                    self.shipped += len(batch)
+                except Exception:
+                    self.logger.exception(
+                        "Failed to ship workflow logs", extra={"records": len(batch)}
+                    )
+                    with self._lock:
+                        self.dropped += len(batch)
+
+
+class WorkflowDBHandler(logging.Handler):
     def emit(self, record):
         # we want to push only workflow logs to the DB
-        if hasattr(record, "workflow_execution_id") and record.workflow_execution_id:
-            self.records.append(record)
-
-    def push_logs_to_db(self):
-        # Convert log records to a list of dictionaries and clean the self.records buffer
-        log_entries, self.records = [record.__dict__ for record in self.records], []
-        # Push log entries to the database
-        push_logs_to_db(log_entries)
+        if not getattr(record, "workflow_execution_id", None):
+            return
+        try:
+            message = record.getMessage()[0:255]
+            context = getattr(record, "context", None)
+            context_size = getattr(record, "context_size", 0)
+            WorkflowLogShipper.get_instance().enqueue(
+                {
+                    "workflow_execution_id": record.workflow_execution_id,
+                    "timestamp": datetime.datetime.utcfromtimestamp(record.created),
+                    "message": message,
+                    "context": context if isinstance(context, dict) else None,
+                },
+                len(message) + context_size,
+            )
+        except Exception:
+            self.handleError(record)
 
 
 class WorkflowLoggerAdapter(logging.LoggerAdapter):
@@ -38,50 +202,41 @@ class WorkflowLoggerAdapter(logging.LoggerAdapter):
         self.workflow_id = workflow_id
         self.workflow_execution_id = workflow_execution_id
         self.context_manager = context_manager
+        # the steps context version that was last attached to a log
+        self._logged_context_version = None
         super().__init__(logger, None)
 
     def process(self, msg, kwargs):
-        extra = copy.deepcopy(kwargs.get("extra", {}))
+        extra = dict(kwargs.get("extra", {}))
         extra["tenant_id"] = self.tenant_id
         extra["workflow_id"] = self.workflow_id
         extra["workflow_execution_id"] = self.workflow_execution_id
-        # add the steps/actions context
-        # todo: more robust
-        # added: protection from big steps context (< 64kb)
-        if self.context_manager.steps_context_size < 1024 * 64:
-            extra["context"] = (self.context_manager.steps_context,)
-        else:
-            extra["context"] = "truncated (context size > 64kb)"
+        # a snapshot of the steps/actions context is attached to the first log
+        #   after it changed, and not copied onto every log
+        context_version = self.context_manager.steps_context_version
+        if context_version != self._logged_context_version:
+            self._logged_context_version = context_version
+            extra["context"], extra["context_size"] = self._snapshot_context()
 
         kwargs["extra"] = extra
         return msg, kwargs
 
+    def _snapshot_context(self) -> tuple[dict | str, int]:
+        # protection from big steps context (< 64kb)
+        context_size = self.context_manager.steps_context_size
+        if context_size >= KEEP_WORKFLOW_LOGS_MAX_CONTEXT_SIZE:
+            return "truncated (context size > 64kb)", 0
+        try:
+            # workaround to serialize any object
+            serialized = json.dumps(self.context_manager.steps_context, default=str)
+        except Exception:
+            return "failed to serialize the context", 0
+        return json.loads(serialized), len(serialized)
+
     def dump(self):
+        """Ship the execution's logs, without waiting for them to be written"""
         self.logger.info("Dumping workflow logs")
-        # TODO - this is a POC level code.
-        # TODO - we should:
-        # TODO - 1. find the right handler to push the logs to the DB
-        # TODO - 2. find a better way to push the logs async (maybe another service)
-        workflow_db_handler = next(
-            iter(
-                [
-                    handler
-                    for handler in (
-                        # tb: for some reason, when running in cloud run, the handler is nested in another handler
-                        #   this needs to be handled in a better way
-                        self.logger.parent.parent.handlers
-                        if RUNNING_IN_CLOUD_RUN
-                        else self.logger.parent.handlers
-                    )
-                    if isinstance(handler, WorkflowDBHandler)
-                ]
-            ),
-            None,
-        )
-        if workflow_db_handler:
-            workflow_db_handler.push_logs_to_db()
-        else:
-            self.logger.warning("No WorkflowDBHandler found")
+        WorkflowLogShipper.get_instance().flush()
         self.logger.info("Workflow logs dumped")
 
 
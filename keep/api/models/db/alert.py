@@ -81,6 +81,64 @@ class Group(SQLModel, table=True):
         ).hexdigest()
 
 
+# the rendered summary of a group, maintained when an alert is assigned to it
+#   (see assign_alert_to_group) so listing the groups doesn't load their alerts
+class GroupSummary(SQLModel, table=True):
+    group_id: UUID = Field(
+        sa_column=Column(
+            UUIDType(binary=False),
+            ForeignKey("group.id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    tenant_id: str = Field(foreign_key="tenant.id", index=True)
+    rule_id: UUID = Field(
+        sa_column=Column(
+            UUIDType(binary=False), ForeignKey("rule.id", ondelete="CASCADE")
+        ),
+    )
+    # the timestamp of the first alert of the group
+    start_time: datetime = Field(
+        sa_column=Column(datetime_column_type, nullable=False),
+    )
+    # the timestamp of the last alert of the group
+    last_alert_time: datetime = Field(
+        sa_column=Column(datetime_column_type, index=True, nullable=False),
+    )
+    # last_alert_time + the rule timeframe, a later alert opens a new group
+    expires_at: datetime = Field(
+        sa_column=Column(datetime_column_type, index=True, nullable=False),
+    )
+    # the last lastReceived of the alerts, as reported by the providers
+    last_update_time: str | None
+    num_of_alerts: int = 0
+    description: str | None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+# the rendered summary (the rule item_description) of every alert of a group
+class GroupAlertSummary(SQLModel, table=True):
+    group_id: UUID = Field(
+        sa_column=Column(
+            UUIDType(binary=False),
+            ForeignKey("group.id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    alert_id: UUID = Field(foreign_key="alert.id", primary_key=True)
+    tenant_id: str = Field(foreign_key="tenant.id")
+    timestamp: datetime = Field(
+        sa_column=Column(datetime_column_type, nullable=False),
+    )
+    alert_fingerprint: str
+    alert_summary: str | None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
 class Alert(SQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     tenant_id: str = Field(foreign_key="tenant.id")
@@ -118,10 +176,30 @@ class Alert(SQLModel, table=True):
         arbitrary_types_allowed = True
 
 
+# the last alert of each fingerprint, maintained on ingest (see set_last_alert)
+#   so reading the current alerts doesn't need to group the entire alert history
+class LastAlert(SQLModel, table=True):
+    tenant_id: str = Field(foreign_key="tenant.id", primary_key=True)
+    fingerprint: str = Field(primary_key=True)
+    alert_id: UUID = Field(foreign_key="alert.id")
+    # when the fingerprint was last seen (the timestamp of alert_id)
+    timestamp: datetime = Field(
+        sa_column=Column(datetime_column_type, index=True, nullable=False),
+    )
+    # when the fingerprint was first seen (startedAt)
+    first_timestamp: datetime = Field(
+        sa_column=Column(datetime_column_type, nullable=False),
+    )
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
 class AlertEnrichment(SQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     tenant_id: str = Field(foreign_key="tenant.id")
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    # when the alert was last enriched
+    timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
     alert_fingerprint: str = Field(unique=True)
     enrichments: dict = Field(sa_column=Column(JSON))
 
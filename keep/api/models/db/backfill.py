@@ -0,0 +1,10 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+# the one-time data backfills that completed on this database
+#   (see run_pending_backfills), so they don't run again on every startup
+class Backfill(SQLModel, table=True):
+    name: str = Field(primary_key=True)
+    completed_at: datetime = Field(default_factory=datetime.utcnow)
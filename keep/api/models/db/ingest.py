@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import TEXT
+from sqlmodel import JSON, Column, Field, SQLModel
+
+from keep.api.models.db.alert import datetime_column_type
+
+
+# events received by /alerts/event that are waiting to be processed,
+#   used by the DB backed ingest queue (see keep/ingestqueue)
+class IngestQueueItem(SQLModel, table=True):
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    tenant_id: str = Field(foreign_key="tenant.id")
+    # "provider" events are formatted by the provider, "generic" ones are already AlertDto
+    kind: str = Field(default="provider")
+    provider_type: Optional[str]
+    provider_id: Optional[str]
+    fingerprint: Optional[str]
+    api_key_name: Optional[str]
+    # {"event": <the raw event>}, since the event may be a list
+    payload: dict = Field(sa_column=Column(JSON))
+    # pending -> processing -> deleted when acknowledged, or failed after too many attempts
+    status: str = Field(default="pending", index=True)
+    enqueued_at: datetime = Field(
+        sa_column=Column(datetime_column_type, index=True, nullable=False),
+        default_factory=datetime.utcnow,
+    )
+    claimed_by: Optional[str]
+    claimed_at: Optional[datetime] = Field(sa_column=Column(datetime_column_type))
+    attempts: int = Field(default=0)
+    error: Optional[str] = Field(sa_column=Column(TEXT))
@@ -3,6 +3,8 @@ from typing import Optional
 
 from sqlmodel import JSON, Column, Field, SQLModel
 
+from keep.api.models.db.alert import datetime_column_type
+
 
 class Provider(SQLModel, table=True):
     id: str = Field(default=None, primary_key=True)
@@ -21,3 +23,21 @@ class Provider(SQLModel, table=True):
     class Config:
         orm_mode = True
         unique_together = ["tenant_id", "name"]
+
+
+# the background pull of an installed provider, see keep/providers/providers_sync.py
+class ProviderPullState(SQLModel, table=True):
+    tenant_id: str = Field(foreign_key="tenant.id", primary_key=True)
+    provider_id: str = Field(primary_key=True)
+    provider_type: str
+    # the provider is due after this time, claimed by moving it forward
+    next_pull_time: datetime = Field(
+        sa_column=Column(datetime_column_type, index=True, nullable=False),
+        default_factory=datetime.utcnow,
+    )
+    # the lastReceived (UTC) of the newest alert that was pulled,
+    #   the next pull asks only for newer alerts
+    watermark: Optional[datetime] = Field(sa_column=Column(datetime_column_type))
+    last_pull_time: Optional[datetime] = Field(sa_column=Column(datetime_column_type))
+    # how many alerts the last pull returned
+    last_pull_alerts: int = Field(default=0)
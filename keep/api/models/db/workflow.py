@@ -23,6 +23,21 @@ class Workflow(SQLModel, table=True):
         orm_mode = True
 
 
+# the schedule of the interval workflows, the scheduler claims the due ones
+#   (see get_workflows_that_should_run)
+class WorkflowSchedule(SQLModel, table=True):
+    workflow_id: str = Field(foreign_key="workflow.id", primary_key=True)
+    tenant_id: str = Field(foreign_key="tenant.id")
+    interval: int
+    next_run_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    # the last execution number, incremented when the workflow is claimed
+    execution_number: int = Field(default=0)
+    # the last execution, a running workflow isn't claimed again until it finishes (or times out)
+    last_execution_id: Optional[str]
+    last_started_at: Optional[datetime]
+    is_running: bool = Field(default=False)
+
+
 class WorkflowExecution(SQLModel, table=True):
     __table_args__ = (
         UniqueConstraint("workflow_id", "execution_number", "is_running", "timeslot"),
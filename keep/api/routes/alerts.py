@@ -5,13 +5,20 @@ import datetime
 import json
 import logging
 import os
+import typing
 
 import celpy
 import dateutil.parser
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse
-from opentelemetry import trace
-from pusher import Pusher
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlmodel import Session
 
 from keep.api.alert_deduplicator.alert_deduplicator import AlertDeduplicator
@@ -23,14 +30,16 @@ from keep.api.core.db import (
     get_alerts_with_filters,
     get_all_presets,
     get_enrichment,
+    get_enrichments,
     get_last_alerts,
     get_session,
+    get_session_sync,
+    set_last_alert,
+    set_last_alerts,
 )
-from keep.api.core.dependencies import (
-    AuthenticatedEntity,
-    AuthVerifier,
-    get_pusher_client,
-)
+from keep.api.core.dependencies import AuthenticatedEntity, AuthVerifier
+from keep.api.core.preset_counters import PresetCounters
+from keep.api.core.realtime_publisher import RealtimePublisher
 from keep.api.models.alert import (
     AlertDto,
     AlertStatus,
@@ -40,270 +49,278 @@ from keep.api.models.alert import (
 )
 from keep.api.models.db.alert import Alert, AlertRaw
 from keep.api.models.db.preset import PresetDto
+from keep.api.models.provider import Provider
 from keep.api.utils.email_utils import EmailTemplates, send_email
-from keep.api.utils.enrichment_helpers import parse_and_enrich_deleted_and_assignees
-from keep.contextmanager.contextmanager import ContextManager
+from keep.api.utils.enrichment_helpers import convert_db_alerts_to_dto_alerts
+from keep.api.utils.pagination import (
+    NDJSON_MEDIA_TYPE,
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+    iterate_alert_pages,
+    ndjson_lines,
+)
+from keep.ingestqueue.ingest_queue import IngestTask, get_ingest_queue
 from keep.providers.providers_factory import ProvidersFactory
+from keep.providers.providers_puller import ProvidersPuller
+from keep.providers.providers_sync import is_providers_sync_enabled
+from keep.rulesengine.celactivation import build_filter_activations
+from keep.rulesengine.celsql import translate_cel_to_sql
 from keep.rulesengine.rulesengine import RulesEngine
 from keep.workflowmanager.workflowmanager import WorkflowManager
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
-tracer = trace.get_tracer(__name__)
 
+# the most alerts a page (or a stream) can be limited to
+MAX_ALERTS_LIMIT = 10000
 
-def convert_db_alerts_to_dto_alerts(alerts: list[Alert]) -> list[AlertDto]:
-    """
-    Enriches the alerts with the enrichment data.
-
-    Args:
-        alerts (list[Alert]): The alerts to enrich.
 
-    Returns:
-        list[AlertDto]: The enriched alerts.
-    """
-    alerts_dto = []
-    with tracer.start_as_current_span("alerts_enrichment"):
-        # enrich the alerts with the enrichment data
-        for alert in alerts:
-            if alert.alert_enrichment:
-                alert.event.update(alert.alert_enrichment.enrichments)
-            try:
-                alert_dto = AlertDto(**alert.event)
-                if alert.alert_enrichment:
-                    parse_and_enrich_deleted_and_assignees(
-                        alert_dto, alert.alert_enrichment.enrichments
-                    )
-            except Exception:
-                # should never happen but just in case
-                logger.exception(
-                    "Failed to parse alert",
-                    extra={
-                        "alert": alert,
-                    },
-                )
-                continue
-            # enrich provider id when it's possible
-            if alert_dto.providerId is None:
-                alert_dto.providerId = alert.provider_id
-            alerts_dto.append(alert_dto)
-    return alerts_dto
-
-
-def pull_alerts_from_providers(
-    tenant_id: str, pusher_client: Pusher | None, sync: bool = False
-) -> list[AlertDto]:
+def pull_alerts_from_providers(tenant_id: str, sync: bool = False) -> list[AlertDto]:
     """
     Pulls alerts from the installed providers.
     tb: THIS FUNCTION NEEDS TO BE REFACTORED!
 
     Args:
         tenant_id (str): The tenant id.
-        pusher_client (Pusher | None): The pusher client.
         sync (bool, optional): Whether the process is sync or not. Defaults to False.
 
     Raises:
-        HTTPException: If the pusher client is None and the process is not sync.
+        HTTPException: If the real-time updates are disabled and it's not sync.
 
     Returns:
         list[AlertDto]: The pulled alerts.
     """
-    if pusher_client is None and sync is False:
+    if not RealtimePublisher.get_instance().enabled and sync is False:
         raise HTTPException(500, "Cannot pull alerts async when pusher is disabled.")
+    return [
+        alert
+        for provider_alerts in iterate_alerts_from_providers(tenant_id, sync)
+        for alert in provider_alerts
+    ]
 
-    context_manager = ContextManager(
-        tenant_id=tenant_id,
-        workflow_id=None,
-    )
 
+def iterate_alerts_from_providers(
+    tenant_id: str, sync: bool = False
+) -> typing.Iterator[list[AlertDto]]:
+    """
+    Pulls alerts from the installed providers concurrently, see ProvidersPuller.
+
+    Yields:
+        list[AlertDto]: The last alerts of every provider, as soon as it was pulled
+            (sync), otherwise they are sent to the clients (see RealtimePublisher).
+    """
     logger.info(
         f"{'Asynchronously' if sync is False else 'Synchronously'} pulling alerts from installed providers"
     )
 
-    sync_alerts = []  # if we're running in sync mode
-    for provider in ProvidersFactory.get_installed_providers(tenant_id=tenant_id):
-        provider_class = ProvidersFactory.get_provider(
-            context_manager=context_manager,
-            provider_id=provider.id,
-            provider_type=provider.type,
-            provider_config=provider.details,
+    providers = ProvidersFactory.get_installed_providers(tenant_id=tenant_id)
+    # the providers are yielded as soon as each of them was pulled
+    providers_puller = ProvidersPuller.get_instance()
+    for provider, sorted_provider_alerts_by_fingerprint in providers_puller.pull(
+        tenant_id, providers
+    ):
+        logger.info(
+            f"Pulled alerts from provider {provider.type} ({provider.id}) (alerts: {len(sorted_provider_alerts_by_fingerprint)})",
+            extra={
+                "provider_type": provider.type,
+                "provider_id": provider.id,
+                "tenant_id": tenant_id,
+                "number_of_fingerprints": len(
+                    sorted_provider_alerts_by_fingerprint.keys()
+                ),
+            },
         )
+        if not sorted_provider_alerts_by_fingerprint:
+            continue
+        last_alerts = [
+            alerts[0] for alerts in sorted_provider_alerts_by_fingerprint.values()
+        ]
+        if sync:
+            yield last_alerts
+            continue
         try:
-            logger.info(
-                f"Pulling alerts from provider {provider.type} ({provider.id})",
-                extra={
-                    "provider_type": provider.type,
-                    "provider_id": provider.id,
-                    "tenant_id": tenant_id,
-                },
-            )
-            sorted_provider_alerts_by_fingerprint = (
-                provider_class.get_alerts_by_fingerprint(tenant_id=tenant_id)
-            )
-            logger.info(
-                f"Pulled alerts from provider {provider.type} ({provider.id})",
-                extra={
-                    "provider_type": provider.type,
-                    "provider_id": provider.id,
-                    "tenant_id": tenant_id,
-                    "number_of_fingerprints": len(
-                        sorted_provider_alerts_by_fingerprint.keys()
-                    ),
-                },
-            )
-
-            if sorted_provider_alerts_by_fingerprint:
-                last_alerts = [
-                    alerts[0]
-                    for alerts in sorted_provider_alerts_by_fingerprint.values()
-                ]
-                if sync:
-                    sync_alerts.extend(last_alerts)
-                    logger.info(
-                        f"Pulled alerts from provider {provider.type} ({provider.id}) (alerts: {len(sorted_provider_alerts_by_fingerprint)})",
-                        extra={
-                            "provider_type": provider.type,
-                            "provider_id": provider.id,
-                            "tenant_id": tenant_id,
-                        },
-                    )
-                    continue
-
-                logger.info("Batch sending pulled alerts via pusher")
-                batch_send = []
-                previous_compressed_batch = ""
-                new_compressed_batch = ""
-                number_of_alerts_in_batch = 0
-                # tb: this might be too slow in the future and we might need to refactor
-                for alert in last_alerts:
-                    alert_dict = alert.dict()
-                    batch_send.append(alert_dict)
-                    new_compressed_batch = json.dumps(batch_send)
-                    if len(new_compressed_batch) <= 10240:
-                        number_of_alerts_in_batch += 1
-                        previous_compressed_batch = new_compressed_batch
-                    elif pusher_client:
-                        pusher_client.trigger(
-                            f"private-{tenant_id}",
-                            "async-alerts",
-                            previous_compressed_batch,
-                        )
-                        batch_send = [alert_dict]
-                        new_compressed_batch = ""
-                        number_of_alerts_in_batch = 1
-
-                # this means we didn't get to this ^ else statement and loop ended
-                #   so we need to send the rest of the alerts
-                if (
-                    new_compressed_batch
-                    and len(new_compressed_batch) < 10240
-                    and pusher_client
-                ):
-                    pusher_client.trigger(
-                        f"private-{tenant_id}",
-                        "async-alerts",
-                        new_compressed_batch,
-                    )
-                logger.info("Sent batch of pulled alerts via pusher")
-                # Also update the presets
-                try:
-                    presets = get_all_presets(tenant_id)
-                    presets_do_update = []
-                    for preset in presets:
-                        # filter the alerts based on the search query
-                        preset_dto = PresetDto(**preset.dict())
-                        filtered_alerts = RulesEngine.filter_alerts(
-                            last_alerts, preset_dto.cel_query
-                        )
-                        # if not related alerts, no need to update
-                        if not filtered_alerts:
-                            continue
-                        presets_do_update.append(preset_dto)
-                        preset_dto.alerts_count = len(filtered_alerts)
-                        # update noisy
-                        if preset.is_noisy:
-                            firing_filtered_alerts = list(
-                                filter(
-                                    lambda alert: alert.status
-                                    == AlertStatus.FIRING.value,
-                                    filtered_alerts,
-                                )
-                            )
-                            # if there are firing alerts, then do noise
-                            if firing_filtered_alerts:
-                                logger.info("Noisy preset is noisy")
-                                preset_dto.should_do_noise_now = True
-                        # else if at least one of the alerts has .isNoisy
-                        elif any(
-                            alert.isNoisy and alert.status == AlertStatus.FIRING.value
-                            for alert in filtered_alerts
-                            if hasattr(alert, "isNoisy")
-                        ):
-                            logger.info("Noisy preset is noisy")
-                            preset_dto.should_do_noise_now = True
-                    # send with pusher
-                    if pusher_client:
-                        try:
-                            pusher_client.trigger(
-                                f"private-{tenant_id}",
-                                "async-presets",
-                                json.dumps(
-                                    [p.dict() for p in presets_do_update], default=str
-                                ),
-                            )
-                        except Exception:
-                            logger.exception("Failed to send presets via pusher")
-                except Exception:
-                    logger.exception(
-                        "Failed to send presets via pusher",
-                        extra={
-                            "provider_type": provider.type,
-                            "provider_id": provider.id,
-                            "tenant_id": tenant_id,
-                        },
-                    )
-            logger.info(
-                f"Pulled alerts from provider {provider.type} ({provider.id}) (alerts: {len(sorted_provider_alerts_by_fingerprint)})",
-                extra={
-                    "provider_type": provider.type,
-                    "provider_id": provider.id,
-                    "tenant_id": tenant_id,
-                },
-            )
+            _send_pulled_alerts(tenant_id, provider, last_alerts)
         except Exception as e:
             logger.warning(
-                f"Could not fetch alerts from provider due to {e}",
+                f"Could not send the pulled alerts due to {e}",
                 extra={
                     "provider_id": provider.id,
                     "provider_type": provider.type,
                     "tenant_id": tenant_id,
                 },
             )
-            pass
-    if sync is False and pusher_client:
-        pusher_client.trigger(f"private-{tenant_id}", "async-done", {})
+    if sync is False:
+        # sent after the pulled alerts
+        RealtimePublisher.get_instance().publish(tenant_id, "async-done", {})
     logger.info("Fetched alerts from installed providers")
-    return sync_alerts
+
+
+def _send_pulled_alerts(
+    tenant_id: str,
+    provider: Provider,
+    last_alerts: list[AlertDto],
+):
+    """Send the alerts pulled from a provider (and the presets they update)"""
+    realtime_publisher = RealtimePublisher.get_instance()
+    # coalesced and packed into messages by the publisher
+    realtime_publisher.publish_alerts(
+        tenant_id, [alert.dict() for alert in last_alerts]
+    )
+    # Also update the presets
+    try:
+        presets = get_all_presets(tenant_id)
+        presets_do_update = []
+        last_alerts_activations = (
+            build_filter_activations(last_alerts) if presets else []
+        )
+        for preset in presets:
+            # filter the alerts based on the search query
+            preset_dto = PresetDto(**preset.dict())
+            filtered_alerts = RulesEngine.filter_alerts(
+                last_alerts,
+                preset_dto.cel_query,
+                last_alerts_activations,
+            )
+            # if not related alerts, no need to update
+            if not filtered_alerts:
+                continue
+            presets_do_update.append(preset_dto)
+            preset_dto.alerts_count = len(filtered_alerts)
+            # update noisy
+            if preset.is_noisy:
+                firing_filtered_alerts = list(
+                    filter(
+                        lambda alert: alert.status == AlertStatus.FIRING.value,
+                        filtered_alerts,
+                    )
+                )
+                # if there are firing alerts, then do noise
+                if firing_filtered_alerts:
+                    logger.info("Noisy preset is noisy")
+                    preset_dto.should_do_noise_now = True
+            # else if at least one of the alerts has .isNoisy
+            elif any(
+                alert.isNoisy and alert.status == AlertStatus.FIRING.value
+                for alert in filtered_alerts
+                if hasattr(alert, "isNoisy")
+            ):
+                logger.info("Noisy preset is noisy")
+                preset_dto.should_do_noise_now = True
+        realtime_publisher.publish_presets(
+            tenant_id, [p.dict() for p in presets_do_update]
+        )
+    except Exception:
+        logger.exception(
+            "Failed to send presets via pusher",
+            extra={
+                "provider_type": provider.type,
+                "provider_id": provider.id,
+                "tenant_id": tenant_id,
+            },
+        )
+
+
+def _decode_cursor_or_400(cursor: str | None):
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _set_next_cursor(response: Response | None, page: list[Alert], limit: int):
+    # a full page means there might be more alerts
+    if response is not None and page and len(page) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(page[-1])
+
+
+def _stream_alerts(
+    fetch_page, cursor=None, limit: int | None = None, cel: str | None = None
+):
+    """Stream the alerts of a keyset paginated query as they come out of the database.
+
+    Args:
+        fetch_page: fetches a page of Alerts, given the cursor and the page size
+        cursor (optional): where to start from
+        limit (int, optional): the maximum number of alerts to stream
+        cel (str, optional): CEL expression to filter the alerts with
+    """
+    streamed = 0
+    for page in iterate_alert_pages(fetch_page, cursor=cursor):
+        alerts_dto = convert_db_alerts_to_dto_alerts(page)
+        if cel:
+            alerts_dto = RulesEngine.filter_alerts(alerts_dto, cel)
+        if limit is not None:
+            alerts_dto = alerts_dto[: limit - streamed]
+        yield from ndjson_lines(alerts_dto)
+        streamed += len(alerts_dto)
+        if limit is not None and streamed >= limit:
+            return
 
 
 @router.get(
     "",
-    description="Get last alerts occurrence",
+    description="Get last alerts occurrence. Supports keyset pagination (limit/cursor, "
+    f"the next page cursor is returned in the {NEXT_CURSOR_HEADER} header) "
+    "and NDJSON streaming (stream=true).",
 )
 def get_all_alerts(
     background_tasks: BackgroundTasks,
     sync: bool = False,
+    limit: int | None = Query(None, ge=1, le=MAX_ALERTS_LIMIT),
+    cursor: str | None = None,
+    stream: bool = False,
+    response: Response = None,
     authenticated_entity: AuthenticatedEntity = Depends(AuthVerifier(["read:alert"])),
-    pusher_client: Pusher | None = Depends(get_pusher_client),
 ) -> list[AlertDto]:
     tenant_id = authenticated_entity.tenant_id
+    alerts_cursor = _decode_cursor_or_400(cursor)
     logger.info(
         "Fetching alerts from DB",
         extra={
             "tenant_id": tenant_id,
+            "cursor": cursor,
+            "stream": stream,
         },
     )
-    db_alerts = get_last_alerts(tenant_id=tenant_id)
+    # pulled alerts are not paginated, they are only part of the first page,
+    #   with the providers sync they are in the db already
+    pull_from_providers = alerts_cursor is None and not is_providers_sync_enabled()
+    if pull_from_providers and not sync:
+        logger.info("Adding task to async fetch alerts from providers")
+        background_tasks.add_task(pull_alerts_from_providers, tenant_id)
+        logger.info("Added task to async fetch alerts from providers")
+
+    if stream:
+
+        def _stream():
+            yield from _stream_alerts(
+                lambda page_cursor, page_size: get_last_alerts(
+                    tenant_id=tenant_id,
+                    limit=page_size,
+                    cursor=page_cursor,
+                    keyset=True,
+                ),
+                cursor=alerts_cursor,
+                limit=limit,
+            )
+            if pull_from_providers and sync:
+                # streamed as soon as every provider was pulled
+                for provider_alerts in iterate_alerts_from_providers(
+                    tenant_id, sync=True
+                ):
+                    yield from ndjson_lines(provider_alerts)
+
+        return StreamingResponse(_stream(), media_type=NDJSON_MEDIA_TYPE)
+
+    page_limit = limit or 1000
+    db_alerts = get_last_alerts(
+        tenant_id=tenant_id,
+        limit=page_limit,
+        cursor=alerts_cursor,
+        keyset=limit is not None or alerts_cursor is not None,
+    )
+    _set_next_cursor(response, db_alerts, page_limit)
     enriched_alerts_dto = convert_db_alerts_to_dto_alerts(db_alerts)
     logger.info(
         "Fetched alerts from DB",
@@ -312,23 +329,26 @@ def get_all_alerts(
         },
     )
 
-    if sync:
-        enriched_alerts_dto.extend(
-            pull_alerts_from_providers(tenant_id, pusher_client, sync=True)
-        )
-    else:
-        logger.info("Adding task to async fetch alerts from providers")
-        background_tasks.add_task(pull_alerts_from_providers, tenant_id, pusher_client)
-        logger.info("Added task to async fetch alerts from providers")
+    if pull_from_providers and sync:
+        enriched_alerts_dto.extend(pull_alerts_from_providers(tenant_id, sync=True))
 
     return enriched_alerts_dto
 
 
-@router.get("/{fingerprint}/history", description="Get alert history")
+@router.get(
+    "/{fingerprint}/history",
+    description="Get alert history. Supports keyset pagination (limit/cursor, "
+    f"the next page cursor is returned in the {NEXT_CURSOR_HEADER} header) "
+    "and NDJSON streaming (stream=true).",
+)
 def get_alert_history(
     fingerprint: str,
     provider_id: str | None = None,
     provider_type: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_ALERTS_LIMIT),
+    cursor: str | None = None,
+    stream: bool = False,
+    response: Response = None,
     authenticated_entity: AuthenticatedEntity = Depends(AuthVerifier(["read:alert"])),
 ) -> list[AlertDto]:
     logger.info(
@@ -338,12 +358,41 @@ def get_alert_history(
             "tenant_id": authenticated_entity.tenant_id,
         },
     )
+    alerts_cursor = _decode_cursor_or_400(cursor)
+    if stream:
+        return StreamingResponse(
+            _stream_alerts(
+                lambda page_cursor, page_size: get_alerts_by_fingerprint(
+                    tenant_id=authenticated_entity.tenant_id,
+                    fingerprint=fingerprint,
+                    limit=page_size,
+                    cursor=page_cursor,
+                    keyset=True,
+                ),
+                cursor=alerts_cursor,
+                limit=limit,
+            ),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+
+    page_limit = limit or 1000
     db_alerts = get_alerts_by_fingerprint(
-        tenant_id=authenticated_entity.tenant_id, fingerprint=fingerprint, limit=1000
+        tenant_id=authenticated_entity.tenant_id,
+        fingerprint=fingerprint,
+        limit=page_limit,
+        cursor=alerts_cursor,
+        keyset=limit is not None or alerts_cursor is not None,
     )
+    _set_next_cursor(response, db_alerts, page_limit)
     enriched_alerts_dto = convert_db_alerts_to_dto_alerts(db_alerts)
 
-    if provider_id is not None and provider_type is not None:
+    # pulled alerts are not paginated, they are only part of the first page
+    if (
+        provider_id is not None
+        and provider_type is not None
+        and alerts_cursor is None
+        and not is_providers_sync_enabled()
+    ):
         try:
             installed_provider = ProvidersFactory.get_installed_provider(
                 tenant_id=authenticated_entity.tenant_id,
@@ -427,6 +476,7 @@ def delete_alert(
             "assignees": assignees_last_receievd,
         },
     )
+    PresetCounters.get_instance().refresh(tenant_id, [delete_alert.fingerprint])
 
     logger.info(
         "Deleted alert successfully",
@@ -473,6 +523,7 @@ def assign_alert(
         fingerprint=fingerprint,
         enrichments={"assignees": assignees_last_receievd},
     )
+    PresetCounters.get_instance().refresh(tenant_id, [fingerprint])
 
     try:
         if not unassign:  # if we're assigning the alert to someone, send email
@@ -521,8 +572,8 @@ def handle_formatted_events(
     session: Session,
     raw_events: list[dict],
     formatted_events: list[AlertDto],
-    pusher_client: Pusher,
     provider_id: str | None = None,
+    raise_on_failure: bool = False,
 ):
     logger.info(
         "Asyncronusly adding new alerts to the DB",
@@ -533,11 +584,24 @@ def handle_formatted_events(
             "tenant_id": tenant_id,
         },
     )
+    # batch ingestion stores the entire batch with a constant number of queries,
+    #   the per event ingestion is kept as a fallback
+    batch_ingestion = os.environ.get("KEEP_BATCH_INGESTION", "true") == "true"
+
     # first, filter out any deduplicated events
     alert_deduplicator = AlertDeduplicator(tenant_id)
+    if batch_ingestion:
+        deduplication_results = alert_deduplicator.is_deduplicated_batch(
+            formatted_events
+        )
+    else:
+        deduplication_results = [
+            alert_deduplicator.is_deduplicated(event) for event in formatted_events
+        ]
 
-    for event in formatted_events:
-        event_hash, event_deduplicated = alert_deduplicator.is_deduplicated(event)
+    for event, (event_hash, event_deduplicated) in zip(
+        formatted_events, deduplication_results
+    ):
         event.alert_hash = event_hash
         event.isDuplicate = event_deduplicated
 
@@ -546,6 +610,7 @@ def handle_formatted_events(
         filter(lambda event: not event.isDuplicate, formatted_events)
     )
 
+    enriched_formatted_events = []
     try:
         # keep raw events in the DB if the user wants to
         # this is mainly for debugging and research purposes
@@ -556,72 +621,21 @@ def handle_formatted_events(
                     raw_alert=raw_event,
                 )
                 session.add(alert)
-        enriched_formatted_events = []
-        for formatted_event in formatted_events:
-            formatted_event.pushed = True
-
-            enrichments_bl = EnrichmentsBl(tenant_id, session)
-            # Post format enrichment
-            try:
-                formatted_event = enrichments_bl.run_extraction_rules(formatted_event)
-            except Exception:
-                logger.exception("Failed to run post-formatting extraction rules")
-
-            # Make sure the lastReceived is a valid date string
-            # tb: we do this because `AlertDto` object lastReceived is a string and not a datetime object
-            # TODO: `AlertDto` object `lastReceived` should be a datetime object so we can easily validate with pydantic
-            if not formatted_event.lastReceived:
-                formatted_event.lastReceived = datetime.datetime.now(
-                    tz=datetime.timezone.utc
-                ).isoformat()
-            else:
-                try:
-                    dateutil.parser.isoparse(formatted_event.lastReceived)
-                except ValueError:
-                    logger.warning("Invalid lastReceived date, setting to now")
-                    formatted_event.lastReceived = datetime.datetime.now(
-                        tz=datetime.timezone.utc
-                    ).isoformat()
-
-            alert = Alert(
-                tenant_id=tenant_id,
-                provider_type=provider_type,
-                event=formatted_event.dict(),
-                provider_id=provider_id,
-                fingerprint=formatted_event.fingerprint,
-                alert_hash=formatted_event.alert_hash,
-            )
-            session.add(alert)
-            session.flush()
-            session.refresh(alert)
-            formatted_event.event_id = str(alert.id)
-            alert_dto = AlertDto(**formatted_event.dict())
-
-            # Mapping
-            try:
-                enrichments_bl.run_mapping_rules(alert_dto)
-            except Exception:
-                logger.exception("Failed to run mapping rules")
-
-            alert_enrichment = get_enrichment(
-                tenant_id=tenant_id, fingerprint=formatted_event.fingerprint
-            )
-            if alert_enrichment:
-                for enrichment in alert_enrichment.enrichments:
-                    # set the enrichment
-                    value = alert_enrichment.enrichments[enrichment]
-                    setattr(alert_dto, enrichment, value)
-            if pusher_client:
-                try:
-                    pusher_client.trigger(
-                        f"private-{tenant_id}",
-                        "async-alerts",
-                        json.dumps([alert_dto.dict()]),
-                    )
-                except Exception:
-                    logger.exception("Failed to push alert to the client")
-            enriched_formatted_events.append(alert_dto)
+        store_formatted_events = (
+            _store_formatted_events_batch
+            if batch_ingestion
+            else _store_formatted_events_per_event
+        )
+        enriched_formatted_events = store_formatted_events(
+            tenant_id,
+            provider_type,
+            session,
+            formatted_events,
+            provider_id,
+        )
         session.commit()
+        # only after the commit, so a failed batch doesn't deduplicate its retry
+        alert_deduplicator.update_index(enriched_formatted_events)
         logger.info(
             "Asyncronusly added new alerts to the DB",
             extra={
@@ -641,6 +655,9 @@ def handle_formatted_events(
                 "tenant_id": tenant_id,
             },
         )
+        # e.g. the ingest workers retry the events
+        if raise_on_failure:
+            raise
     try:
         # Now run any workflow that should run based on this alert
         # TODO: this should publish event
@@ -671,16 +688,9 @@ def handle_formatted_events(
             logger.info("Added group alerts to the workflow manager queue")
             # Now send the grouped alerts to the client
             logger.info("Sending grouped alerts to the client")
-            for grouped_alert in grouped_alerts:
-                if pusher_client:
-                    try:
-                        pusher_client.trigger(
-                            f"private-{tenant_id}",
-                            "async-alerts",
-                            json.dumps([grouped_alert.dict()]),
-                        )
-                    except Exception:
-                        logger.exception("Failed to push alert to the client")
+            RealtimePublisher.get_instance().publish_alerts(
+                tenant_id, [grouped_alert.dict() for grouped_alert in grouped_alerts]
+            )
             logger.info("Sent grouped alerts to the client")
     except Exception:
         logger.exception(
@@ -693,14 +703,32 @@ def handle_formatted_events(
             },
         )
     # Now we need to update the presets
+    try:
+        PresetCounters.get_instance().update(tenant_id, enriched_formatted_events)
+    except Exception:
+        logger.exception(
+            "Failed to update the presets counters",
+            extra={
+                "provider_type": provider_type,
+                "num_of_alerts": len(formatted_events),
+                "provider_id": provider_id,
+                "tenant_id": tenant_id,
+            },
+        )
     try:
         presets = get_all_presets(tenant_id)
         presets_do_update = []
+        # convert the alerts to CEL activations once and reuse them for all the presets
+        events_activations = (
+            build_filter_activations(enriched_formatted_events) if presets else []
+        )
         for preset in presets:
             # filter the alerts based on the search query
             preset_dto = PresetDto(**preset.dict())
             filtered_alerts = RulesEngine.filter_alerts(
-                enriched_formatted_events, preset_dto.cel_query
+                enriched_formatted_events,
+                preset_dto.cel_query,
+                events_activations,
             )
             # if not related alerts, no need to update
             if not filtered_alerts:
@@ -727,16 +755,9 @@ def handle_formatted_events(
             ):
                 logger.info("Noisy preset is noisy")
                 preset_dto.should_do_noise_now = True
-        # send with pusher
-        if pusher_client:
-            try:
-                pusher_client.trigger(
-                    f"private-{tenant_id}",
-                    "async-presets",
-                    json.dumps([p.dict() for p in presets_do_update], default=str),
-                )
-            except Exception:
-                logger.exception("Failed to send presets via pusher")
+        RealtimePublisher.get_instance().publish_presets(
+            tenant_id, [p.dict() for p in presets_do_update]
+        )
     except Exception:
         logger.exception(
             "Failed to send presets via pusher",
@@ -749,6 +770,294 @@ def handle_formatted_events(
         )
 
 
+def _ensure_last_received(formatted_event: AlertDto):
+    # Make sure the lastReceived is a valid date string
+    # tb: we do this because `AlertDto` object lastReceived is a string and not a datetime object
+    # TODO: `AlertDto` object `lastReceived` should be a datetime object so we can easily validate with pydantic
+    if not formatted_event.lastReceived:
+        formatted_event.lastReceived = datetime.datetime.now(
+            tz=datetime.timezone.utc
+        ).isoformat()
+    else:
+        try:
+            dateutil.parser.isoparse(formatted_event.lastReceived)
+        except ValueError:
+            logger.warning("Invalid lastReceived date, setting to now")
+            formatted_event.lastReceived = datetime.datetime.now(
+                tz=datetime.timezone.utc
+            ).isoformat()
+
+
+def _store_formatted_events_per_event(
+    tenant_id,
+    provider_type,
+    session: Session,
+    formatted_events: list[AlertDto],
+    provider_id: str | None = None,
+) -> list[AlertDto]:
+    """Store the alerts one by one, the caller is responsible for committing the session"""
+    enriched_formatted_events = []
+    for formatted_event in formatted_events:
+        formatted_event.pushed = True
+
+        enrichments_bl = EnrichmentsBl(tenant_id, session)
+        # Post format enrichment
+        try:
+            formatted_event = enrichments_bl.run_extraction_rules(formatted_event)
+        except Exception:
+            logger.exception("Failed to run post-formatting extraction rules")
+
+        _ensure_last_received(formatted_event)
+
+        alert = Alert(
+            tenant_id=tenant_id,
+            provider_type=provider_type,
+            event=formatted_event.dict(),
+            provider_id=provider_id,
+            fingerprint=formatted_event.fingerprint,
+            alert_hash=formatted_event.alert_hash,
+        )
+        session.add(alert)
+        session.flush()
+        session.refresh(alert)
+        set_last_alert(tenant_id, alert, session=session)
+        formatted_event.event_id = str(alert.id)
+        alert_dto = AlertDto(**formatted_event.dict())
+
+        # Mapping
+        try:
+            enrichments_bl.run_mapping_rules(alert_dto)
+        except Exception:
+            logger.exception("Failed to run mapping rules")
+
+        alert_enrichment = get_enrichment(
+            tenant_id=tenant_id, fingerprint=formatted_event.fingerprint
+        )
+        if alert_enrichment:
+            for enrichment in alert_enrichment.enrichments:
+                # set the enrichment
+                value = alert_enrichment.enrichments[enrichment]
+                setattr(alert_dto, enrichment, value)
+        RealtimePublisher.get_instance().publish_alerts(tenant_id, [alert_dto.dict()])
+        enriched_formatted_events.append(alert_dto)
+    return enriched_formatted_events
+
+
+def _store_formatted_events_batch(
+    tenant_id,
+    provider_type,
+    session: Session,
+    formatted_events: list[AlertDto],
+    provider_id: str | None = None,
+) -> list[AlertDto]:
+    """Store a batch of alerts with a constant number of queries (unless mapping rules match),
+    the caller is responsible for committing the session"""
+    # the rules are loaded once for the entire batch
+    enrichments_bl = EnrichmentsBl(tenant_id, session)
+    alerts: list[tuple[AlertDto, Alert]] = []
+    for formatted_event in formatted_events:
+        formatted_event.pushed = True
+        # Post format enrichment
+        try:
+            formatted_event = enrichments_bl.run_extraction_rules(formatted_event)
+        except Exception:
+            logger.exception("Failed to run post-formatting extraction rules")
+
+        _ensure_last_received(formatted_event)
+
+        alerts.append(
+            (
+                formatted_event,
+                Alert(
+                    tenant_id=tenant_id,
+                    provider_type=provider_type,
+                    event=formatted_event.dict(),
+                    provider_id=provider_id,
+                    fingerprint=formatted_event.fingerprint,
+                    alert_hash=formatted_event.alert_hash,
+                ),
+            )
+        )
+    if not alerts:
+        return []
+
+    # the ids and timestamps are generated on the client side,
+    #   so a single flush inserts all the alerts without refreshing them
+    session.add_all([alert for _, alert in alerts])
+    session.flush()
+    set_last_alerts(tenant_id, [alert for _, alert in alerts], session=session)
+
+    alert_dtos = []
+    for formatted_event, alert in alerts:
+        formatted_event.event_id = str(alert.id)
+        alert_dto = AlertDto(**formatted_event.dict())
+        # Mapping
+        try:
+            enrichments_bl.run_mapping_rules(alert_dto)
+        except Exception:
+            logger.exception("Failed to run mapping rules")
+        alert_dtos.append(alert_dto)
+
+    # fetched after the mapping rules, since they enrich the alerts as well
+    alerts_enrichments = {
+        alert_enrichment.alert_fingerprint: alert_enrichment.enrichments
+        for alert_enrichment in get_enrichments(
+            tenant_id,
+            list({alert_dto.fingerprint for alert_dto in alert_dtos}),
+            session=session,
+        )
+    }
+    for alert_dto in alert_dtos:
+        for enrichment, value in alerts_enrichments.get(
+            alert_dto.fingerprint, {}
+        ).items():
+            setattr(alert_dto, enrichment, value)
+
+    RealtimePublisher.get_instance().publish_alerts(
+        tenant_id, [alert_dto.dict() for alert_dto in alert_dtos]
+    )
+    return alert_dtos
+
+
+def _format_generic_event(
+    tenant_id: str,
+    session: Session,
+    event: AlertDto | list[AlertDto] | dict,
+    fingerprint: str | None = None,
+    api_key_name: str | None = None,
+) -> list[AlertDto]:
+    enrichments_bl = EnrichmentsBl(tenant_id, session)
+    # Pre format enrichment
+    try:
+        event = enrichments_bl.run_extraction_rules(event)
+    except Exception:
+        logger.exception("Failed to run pre-formatting extraction rules")
+
+    if isinstance(event, dict):
+        event = [AlertDto(**event)]
+
+    if isinstance(event, AlertDto):
+        event = [event]
+
+    for _alert in event:
+        # if not source, set it to keep
+        if not _alert.source:
+            _alert.source = ["keep"]
+
+        if fingerprint:
+            _alert.fingerprint = fingerprint
+
+        if api_key_name:
+            _alert.apiKeyRef = api_key_name
+    return event
+
+
+def _format_provider_event(
+    tenant_id: str,
+    provider_type: str,
+    session: Session,
+    event: dict | list,
+    provider_id: str | None = None,
+    fingerprint: str | None = None,
+) -> list[AlertDto] | None:
+    """Format a raw event with the provider, None if it shouldn't be pushed to the client
+
+    Raises:
+        Exception: if the provider failed to format the event
+    """
+    enrichments_bl = EnrichmentsBl(tenant_id, session)
+    # Pre format enrichment
+    try:
+        enrichments_bl.run_extraction_rules(event)
+    except Exception as exc:
+        logger.warning(
+            "Failed to run pre-formatting extraction rules",
+            extra={"exception": str(exc)},
+        )
+
+    # Each provider should implement a format_alert method that returns an AlertDto
+    # object that will later be returned to the client.
+    logger.info(
+        f"Trying to format alert with {provider_type}",
+        extra={
+            "provider_type": provider_type,
+            "provider_id": provider_id,
+            "tenant_id": tenant_id,
+        },
+    )
+
+    # if we have provider id, let's try to init the provider class with it
+    provider_instance = None
+    if provider_id:
+        try:
+            provider_instance = ProvidersFactory.get_installed_provider(
+                tenant_id, provider_id, provider_type
+            )
+        except Exception as e:
+            logger.warning(f"Failed to get provider instance due to {str(e)}")
+
+    provider_class = ProvidersFactory.get_provider_class(provider_type)
+    formatted_events = provider_class.format_alert(event, provider_instance)
+
+    if isinstance(formatted_events, AlertDto):
+        # override the fingerprint if it's provided
+        if fingerprint:
+            formatted_events.fingerprint = fingerprint
+        formatted_events = [formatted_events]
+
+    logger.info(
+        f"Formatted alerts with {provider_type}",
+        extra={
+            "provider_type": provider_type,
+            "provider_id": provider_id,
+            "tenant_id": tenant_id,
+        },
+    )
+    return formatted_events
+
+
+def process_ingest_task(task: IngestTask):
+    """
+    Process an event that was received through the ingest queue (see keep/ingestqueue).
+
+    Raises:
+        Exception: if the event couldn't be formatted or stored, so it'll be retried
+    """
+    with get_session_sync() as session:
+        if task.kind == "generic":
+            # generic events are formatted before they are queued
+            raw_events = task.event
+            formatted_events = [AlertDto(**event) for event in task.event]
+            # the alerts pulled by the providers sync have their provider type
+            provider_type = task.provider_type or (
+                formatted_events[0].source[0] if formatted_events else "keep"
+            )
+        else:
+            raw_events = task.event if isinstance(task.event, list) else [task.event]
+            formatted_events = _format_provider_event(
+                task.tenant_id,
+                task.provider_type,
+                session,
+                task.event,
+                task.provider_id,
+                task.fingerprint,
+            )
+            provider_type = task.provider_type
+        # If the format_alert does not return an AlertDto object, it means that the event
+        # should not be pushed to the client.
+        if not formatted_events:
+            return
+        handle_formatted_events(
+            task.tenant_id,
+            provider_type,
+            session,
+            raw_events,
+            formatted_events,
+            task.provider_id,
+            raise_on_failure=True,
+        )
+
+
 @router.post(
     "/event",
     description="Receive a generic alert event",
@@ -758,10 +1067,10 @@ def handle_formatted_events(
 async def receive_generic_event(
     event: AlertDto | list[AlertDto] | dict,
     bg_tasks: BackgroundTasks,
+    response: Response,
     fingerprint: str | None = None,
     authenticated_entity: AuthenticatedEntity = Depends(AuthVerifier(["write:alert"])),
     session: Session = Depends(get_session),
-    pusher_client: Pusher = Depends(get_pusher_client),
 ):
     """
     A generic webhook endpoint that can be used by any provider to send alerts to Keep.
@@ -773,30 +1082,23 @@ async def receive_generic_event(
         session (Session, optional): Defaults to Depends(get_session).
     """
     tenant_id = authenticated_entity.tenant_id
+    event = _format_generic_event(
+        tenant_id, session, event, fingerprint, authenticated_entity.api_key_name
+    )
 
-    enrichments_bl = EnrichmentsBl(tenant_id, session)
-    # Pre format enrichment
-    try:
-        event = enrichments_bl.run_extraction_rules(event)
-    except Exception:
-        logger.exception("Failed to run pre-formatting extraction rules")
-
-    if isinstance(event, dict):
-        event = [AlertDto(**event)]
-
-    if isinstance(event, AlertDto):
-        event = [event]
-
-    for _alert in event:
-        # if not source, set it to keep
-        if not _alert.source:
-            _alert.source = ["keep"]
-
-        if fingerprint:
-            _alert.fingerprint = fingerprint
-
-        if authenticated_entity.api_key_name:
-            _alert.apiKeyRef = authenticated_entity.api_key_name
+    ingest_queue = get_ingest_queue()
+    if ingest_queue:
+        ingest_queue.put(
+            IngestTask(
+                tenant_id=tenant_id,
+                kind="generic",
+                event=[json.loads(_alert.json()) for _alert in event],
+                fingerprint=fingerprint,
+                api_key_name=authenticated_entity.api_key_name,
+            )
+        )
+        response.status_code = 202
+        return event
 
     bg_tasks.add_task(
         handle_formatted_events,
@@ -805,7 +1107,6 @@ async def receive_generic_event(
         session,
         event,
         event,
-        pusher_client,
     )
 
     return event
@@ -818,11 +1119,11 @@ async def receive_event(
     provider_type: str,
     request: Request,
     bg_tasks: BackgroundTasks,
+    response: Response,
     provider_id: str | None = None,
     fingerprint: str | None = None,
     authenticated_entity: AuthenticatedEntity = Depends(AuthVerifier(["write:alert"])),
     session: Session = Depends(get_session),
-    pusher_client: Pusher = Depends(get_pusher_client),
 ) -> dict[str, str]:
     tenant_id = authenticated_entity.tenant_id
     provider_class = ProvidersFactory.get_provider_class(provider_type)
@@ -842,6 +1143,31 @@ async def receive_event(
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON")
 
+    # with an ingest queue, the raw event is formatted and stored by the ingest workers
+    ingest_queue = get_ingest_queue()
+    if ingest_queue:
+        task = IngestTask(
+            tenant_id=tenant_id,
+            kind="provider",
+            event=event,
+            provider_type=provider_type,
+            provider_id=provider_id,
+            fingerprint=fingerprint,
+            api_key_name=authenticated_entity.api_key_name,
+        )
+        ingest_queue.put(task)
+        logger.info(
+            "Queued event",
+            extra={
+                "provider_type": provider_type,
+                "provider_id": provider_id,
+                "tenant_id": tenant_id,
+                "task_id": task.id,
+            },
+        )
+        response.status_code = 202
+        return {"status": "queued", "task_id": task.id}
+
     # else, process the event
     logger.info(
         "Handling event",
@@ -852,53 +1178,9 @@ async def receive_event(
         },
     )
 
-    enrichments_bl = EnrichmentsBl(tenant_id, session)
-    # Pre format enrichment
     try:
-        enrichments_bl.run_extraction_rules(event)
-    except Exception as exc:
-        logger.warning(
-            "Failed to run pre-formatting extraction rules",
-            extra={"exception": str(exc)},
-        )
-
-    try:
-        # Each provider should implement a format_alert method that returns an AlertDto
-        # object that will later be returned to the client.
-        logger.info(
-            f"Trying to format alert with {provider_type}",
-            extra={
-                "provider_type": provider_type,
-                "provider_id": provider_id,
-                "tenant_id": tenant_id,
-            },
-        )
-
-        # if we have provider id, let's try to init the provider class with it
-        provider_instance = None
-        if provider_id:
-            try:
-                provider_instance = ProvidersFactory.get_installed_provider(
-                    tenant_id, provider_id, provider_type
-                )
-            except Exception as e:
-                logger.warning(f"Failed to get provider instance due to {str(e)}")
-
-        formatted_events = provider_class.format_alert(event, provider_instance)
-
-        if isinstance(formatted_events, AlertDto):
-            # override the fingerprint if it's provided
-            if fingerprint:
-                formatted_events.fingerprint = fingerprint
-            formatted_events = [formatted_events]
-
-        logger.info(
-            f"Formatted alerts with {provider_type}",
-            extra={
-                "provider_type": provider_type,
-                "provider_id": provider_id,
-                "tenant_id": tenant_id,
-            },
+        formatted_events = _format_provider_event(
+            tenant_id, provider_type, session, event, provider_id, fingerprint
         )
         # If the format_alert does not return an AlertDto object, it means that the event
         # should not be pushed to the client.
@@ -910,7 +1192,6 @@ async def receive_event(
                 session,
                 event_copy if isinstance(event_copy, list) else [event_copy],
                 formatted_events,
-                pusher_client,
                 provider_id,
             )
         logger.info(
@@ -945,7 +1226,14 @@ def get_alert(
             "tenant_id": tenant_id,
         },
     )
-    # TODO: once pulled alerts will be in the db too, this should be changed
+    db_alerts = get_alerts_by_fingerprint(
+        tenant_id=tenant_id, fingerprint=fingerprint, limit=1
+    )
+    if db_alerts:
+        return convert_db_alerts_to_dto_alerts(db_alerts)[0]
+    if is_providers_sync_enabled():
+        # the pulled alerts are in the db too
+        raise HTTPException(status_code=404, detail="Alert not found")
     all_alerts = get_all_alerts(
         background_tasks=None, authenticated_entity=authenticated_entity, sync=True
     )
@@ -963,7 +1251,6 @@ def get_alert(
 def enrich_alert(
     enrich_data: EnrichAlertRequestBody,
     background_tasks: BackgroundTasks,
-    pusher_client: Pusher = Depends(get_pusher_client),
     authenticated_entity: AuthenticatedEntity = Depends(AuthVerifier(["write:alert"])),
 ) -> dict[str, str]:
     tenant_id = authenticated_entity.tenant_id
@@ -992,19 +1279,14 @@ def enrich_alert(
             return {"status": "failed"}
 
         enriched_alerts_dto = convert_db_alerts_to_dto_alerts(alert)
-        # use pusher to push the enriched alert to the client
-        if pusher_client:
-            logger.info("Pushing enriched alert to the client")
-            try:
-                pusher_client.trigger(
-                    f"private-{tenant_id}",
-                    "async-alerts",
-                    json.dumps([enriched_alerts_dto[0].dict()]),
-                )
-                logger.info("Pushed enriched alert to the client")
-            except Exception:
-                logger.exception("Failed to push alert to the client")
-                pass
+        # e.g. dismissing an alert moves it from the feed to the dismissed preset
+        PresetCounters.get_instance().update(
+            tenant_id, enriched_alerts_dto, received=False
+        )
+        # push the enriched alert to the client
+        RealtimePublisher.get_instance().publish_alerts(
+            tenant_id, [enriched_alerts_dto[0].dict()]
+        )
         logger.info(
             "Alert enriched successfully",
             extra={"fingerprint": enrich_data.fingerprint, "tenant_id": tenant_id},
@@ -1018,10 +1300,17 @@ def enrich_alert(
 
 @router.post(
     "/search",
-    description="Search alerts",
+    description="Search alerts. Supports keyset pagination (limit/cursor) where limit is "
+    "the number of alerts scanned per page, so a page may hold fewer matching alerts "
+    f"(the next page cursor is returned in the {NEXT_CURSOR_HEADER} header), "
+    "and NDJSON streaming (stream=true).",
 )
 async def search_alerts(
     search_request: SearchAlertsRequest,  # Use the model directly
+    limit: int | None = Query(None, ge=1, le=MAX_ALERTS_LIMIT),
+    cursor: str | None = None,
+    stream: bool = False,
+    response: Response = None,
     authenticated_entity: AuthenticatedEntity = Depends(AuthVerifier(["read:alert"])),
 ) -> list[AlertDto]:
     tenant_id = authenticated_entity.tenant_id
@@ -1047,17 +1336,61 @@ async def search_alerts(
                 status_code=400,
                 detail="Timeframe cannot be more than 14 days",
             )
+        # push down whatever we can from the search query to the database
+        #   the translated predicate is only a pre-filter, the CEL query is
+        #   still evaluated on the returned alerts
+        translation = None
+        if search_query:
+            translation = translate_cel_to_sql(
+                RulesEngine.preprocess_cel_expression(search_query)
+            )
+            logger.info(
+                "Translated search query",
+                extra={
+                    "tenant_id": tenant_id,
+                    "pushed_down": translation.pushed_down,
+                    "fully_pushed_down": translation.fully_pushed_down,
+                },
+            )
+        alerts_cursor = _decode_cursor_or_400(cursor)
+
+        def _fetch_page(page_cursor, page_size, keyset=True):
+            return get_alerts_with_filters(
+                tenant_id=tenant_id,
+                time_delta=timeframe_in_days,
+                cel_filter=translation.clause if translation else None,
+                cursor=page_cursor,
+                limit=page_size,
+                keyset=keyset,
+            )
+
+        if stream:
+            return StreamingResponse(
+                _stream_alerts(
+                    _fetch_page, cursor=alerts_cursor, limit=limit, cel=search_query
+                ),
+                media_type=NDJSON_MEDIA_TYPE,
+            )
+
         # get the alerts
-        alerts = get_alerts_with_filters(
-            tenant_id=tenant_id, time_delta=timeframe_in_days
+        page_limit = limit or 10000
+        alerts = _fetch_page(
+            alerts_cursor,
+            page_limit,
+            keyset=limit is not None or alerts_cursor is not None,
         )
+        _set_next_cursor(response, alerts, page_limit)
         # convert the alerts to DTO
         alerts_dto = convert_db_alerts_to_dto_alerts(alerts)
         # filter the alerts based on the search query
         filtered_alerts = RulesEngine.filter_alerts(alerts_dto, search_query)
         logger.info(
             "Searched alerts",
-            extra={"tenant_id": tenant_id},
+            extra={
+                "tenant_id": tenant_id,
+                "fetched_alerts": len(alerts_dto),
+                "filtered_alerts": len(filtered_alerts),
+            },
         )
         # return the filtered alerts
         return filtered_alerts
@@ -1072,7 +1405,8 @@ async def search_alerts(
                 "column": e.column,
             },
         )
-
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Failed to search alerts", extra={"error": str(e)})
         raise HTTPException(status_code=500, detail="Failed to search alerts")
@@ -1,64 +1,84 @@
+import datetime
 import logging
 
-import chevron
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 
-from keep.api.core.db import get_groups as get_groups_db
-from keep.api.core.db import get_rule as get_rule_db
+from keep.api.core.db import get_group_summaries
 from keep.api.core.dependencies import AuthenticatedEntity, AuthVerifier
 from keep.api.models.group import AlertSummaryDto, GroupDto
+from keep.api.utils.pagination import (
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_keyset_cursor,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def _to_utc(value: datetime.datetime | None) -> datetime.datetime | None:
+    # the group times are stored as naive UTC
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
 @router.get(
     "/",
-    description="Get groups",
+    description="Get groups, the recently updated first. Only the active groups "
+    "(that new alerts are still assigned to) unless include_expired=true. Supports "
+    "keyset pagination (limit/cursor, the next page cursor is returned in the "
+    f"{NEXT_CURSOR_HEADER} header) and a time window (since/until).",
 )
 def get_groups(
+    include_expired: bool = False,
+    since: datetime.datetime | None = None,
+    until: datetime.datetime | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    response: Response = None,
     authenticated_entity: AuthenticatedEntity = Depends(AuthVerifier(["read:alert"])),
-) -> list[dict]:
+) -> list[GroupDto]:
     tenant_id = authenticated_entity.tenant_id
     logger.info(
         "Fetching groups",
         extra={
             "tenant_id": tenant_id,
+            "include_expired": include_expired,
+            "cursor": cursor,
         },
     )
-    # first, get groups
-    groups = get_groups_db(tenant_id)
-    groups_dtos = []
-    # build the group dto
-    for group in groups:
-        rule = get_rule_db(tenant_id, group.rule_id)
-        # calc the group start time and last update time from the alerts
-        # TODO: group should expose fields and how it calculates them
-        #       now we "support" start_time,
-        group_attributes = GroupDto.get_group_attributes(group.alerts)
-        context = {
-            "group": group_attributes,
-            # Shahar: first, group have at least one alert.
-            #         second, the only supported {{ }} are the ones in the group
-            #          attributes, so we can use the first alert because they are the same for any other alert in the group
-            **group.alerts[0].event,
-        }
-        group_description = chevron.render(rule.group_description, context)
-        alerts_summary_dtos = []
-        for alert in group.alerts:
-            # render the alert summary
-            alert_summary = chevron.render(rule.item_description, alert.event)
-            alert_summary_dto = AlertSummaryDto(
-                alert_summary=alert_summary,
-                alert_fingerprint=alert.fingerprint,
-            )
-            alerts_summary_dtos.append(alert_summary_dto)
-        group_dto = GroupDto(
-            group_description=group_description,
-            start_time=group_attributes.get("start_time"),
-            last_update_time=group_attributes.get("last_update_time"),
-            alerts=alerts_summary_dtos,
+    try:
+        groups_cursor = decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    groups = get_group_summaries(
+        tenant_id,
+        active_only=not include_expired,
+        since=_to_utc(since),
+        until=_to_utc(until),
+        cursor=groups_cursor,
+        limit=limit,
+    )
+    groups_dtos = [
+        GroupDto(
+            group_description=summary.description,
+            start_time=str(summary.start_time),
+            last_update_time=summary.last_update_time,
+            alerts=[
+                AlertSummaryDto(
+                    alert_summary=alert_summary.alert_summary,
+                    alert_fingerprint=alert_summary.alert_fingerprint,
+                )
+                for alert_summary in alert_summaries
+            ],
+        )
+        for summary, alert_summaries in groups
+    ]
+    # a full page means there might be more groups
+    if response is not None and len(groups) == limit:
+        last_summary, _ = groups[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_keyset_cursor(
+            last_summary.last_alert_time, last_summary.group_id
         )
-        groups_dtos.append(group_dto)
-    # last, process the alerts and return the groups
     return groups_dtos
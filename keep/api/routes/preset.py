@@ -1,18 +1,14 @@
 import logging
-import time
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlmodel import Session, select
 
-from keep.api.core.db import get_last_alerts
 from keep.api.core.db import get_presets as get_presets_db
 from keep.api.core.db import get_session
 from keep.api.core.dependencies import AuthenticatedEntity, AuthVerifier
-from keep.api.models.alert import AlertStatus
+from keep.api.core.preset_counters import PresetCounter, PresetCounters
 from keep.api.models.db.preset import Preset, PresetDto, PresetOption, StaticPresetsId
-from keep.api.routes.alerts import convert_db_alerts_to_dto_alerts
-from keep.rulesengine.rulesengine import RulesEngine
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -30,84 +26,23 @@ def get_presets(
     # both global and private presets
     presets = get_presets_db(tenant_id=tenant_id, email=authenticated_entity.email)
     logger.info("Got all presets")
-    # for noisy presets, check if it needs to do noise now
-    # TODO: improve performance e.g. using status as a filter
-    # TODO: move this duplicate code to a module
+    # the counts are maintained incrementally, see keep/api/core/preset_counters.py
+    counters = PresetCounters.get_instance().get_counters(tenant_id, presets)
     presets_dto = []
-    # get the alerts
-    alerts = get_last_alerts(tenant_id=tenant_id)
-
-    # deduplicate fingerprints
-    # shahar: this is backward compatibility for before we had milliseconds in the timestamp
-    #          note that we want to keep the order of the alerts
-    #          so we will keep the first alert and remove the rest
-    dedup_alerts = []
-    seen_fingerprints = set()
-    for alert in alerts:
-        if alert.fingerprint not in seen_fingerprints:
-            dedup_alerts.append(alert)
-            seen_fingerprints.add(alert.fingerprint)
-        # this shouldn't appear with time (after migrating to milliseconds in timestamp)
-        else:
-            logger.info("Skipping fingerprint", extra={"alert_id": alert.id})
-    alerts = dedup_alerts
-    # convert the alerts to DTO
-    alerts_dto = convert_db_alerts_to_dto_alerts(alerts)
     for preset in presets:
-        logger.info("Checking if preset is noisy")
         preset_dto = PresetDto(**preset.dict())
         if not preset_dto.cel_query:
             logger.warning("No CEL query found in preset options")
             presets_dto.append(preset_dto)
             continue
-
-        preset_query = preset_dto.cel_query
-        # filter the alerts based on the search query
-        start = time.time()
-        logger.info("Filtering alerts", extra={"preset_id": preset.id})
-        filtered_alerts = RulesEngine.filter_alerts(alerts_dto, preset_query)
-        logger.info(
-            "Filtered alerts",
-            extra={"preset_id": preset.id, "time": time.time() - start},
-        )
-        preset_dto.alerts_count = len(filtered_alerts)
-        # update noisy
-        if preset.is_noisy:
-            firing_filtered_alerts = list(
-                filter(
-                    lambda alert: alert.status == AlertStatus.FIRING.value
-                    and not alert.deleted
-                    and not alert.dismissed,
-                    filtered_alerts,
-                )
-            )
-            # if there are firing alerts, then do noise
-            if firing_filtered_alerts:
-                logger.info("Noisy preset is noisy")
-                preset_dto.should_do_noise_now = True
-            else:
-                logger.info("Noisy preset is not noisy")
-                preset_dto.should_do_noise_now = False
-        # else if one of the alerts are isNoisy
-        elif any(
-            alert.isNoisy
-            and alert.status == AlertStatus.FIRING.value
-            and not alert.deleted
-            and not alert.dismissed
-            for alert in filtered_alerts
-        ):
-            logger.info("Preset is noisy")
-            preset_dto.should_do_noise_now = True
+        counter = counters.get(str(preset.id), PresetCounter())
+        preset_dto.alerts_count = counter.alerts
+        # for noisy presets, check if it needs to do noise now
+        preset_dto.should_do_noise_now = counter.should_do_noise_now(preset.is_noisy)
         presets_dto.append(preset_dto)
 
     # add static presets - feed, correlation, deleted and dismissed
-    isNoisy = any(
-        alert.isNoisy
-        and AlertStatus.FIRING.value == alert.status
-        and not alert.deleted
-        and not alert.dismissed
-        for alert in alerts_dto
-    )
+    feed_counter = counters.get(StaticPresetsId.FEED_PRESET_ID.value, PresetCounter())
     feed_preset = PresetDto(
         id=StaticPresetsId.FEED_PRESET_ID.value,
         name="feed",
@@ -115,10 +50,8 @@ def get_presets(
         created_by=None,
         is_private=False,
         is_noisy=False,
-        should_do_noise_now=isNoisy,
-        alerts_count=len(
-            [alert for alert in alerts_dto if not alert.deleted and not alert.dismissed]
-        ),
+        should_do_noise_now=feed_counter.should_do_noise_now(False),
+        alerts_count=feed_counter.alerts,
     )
     dismissed_preset = PresetDto(
         id=StaticPresetsId.DISMISSED_PRESET_ID.value,
@@ -128,7 +61,9 @@ def get_presets(
         is_private=False,
         is_noisy=False,
         should_do_noise_now=False,
-        alerts_count=len([alert for alert in alerts_dto if alert.dismissed]),
+        alerts_count=counters.get(
+            StaticPresetsId.DISMISSED_PRESET_ID.value, PresetCounter()
+        ).alerts,
     )
     groups_preset = PresetDto(
         id=StaticPresetsId.GROUPS_PRESET_ID.value,
@@ -138,7 +73,9 @@ def get_presets(
         is_private=False,
         is_noisy=False,
         should_do_noise_now=False,
-        alerts_count=len([alert for alert in alerts_dto if alert.group]),
+        alerts_count=counters.get(
+            StaticPresetsId.GROUPS_PRESET_ID.value, PresetCounter()
+        ).alerts,
     )
     presets_dto.append(feed_preset)
     presets_dto.append(dismissed_preset)
@@ -180,6 +117,7 @@ def create_preset(
     session.add(preset)
     session.commit()
     session.refresh(preset)
+    PresetCounters.get_instance().invalidate(tenant_id)
     logger.info("Created preset")
     return PresetDto(**preset.dict())
 
@@ -203,6 +141,7 @@ def delete_preset(
         raise HTTPException(404, "Preset not found")
     session.delete(preset)
     session.commit()
+    PresetCounters.get_instance().invalidate(tenant_id)
     logger.info("Deleted preset", extra={"uuid": uuid})
     return {}
 
@@ -239,5 +178,6 @@ def update_preset(
     preset.options = options_dict
     session.commit()
     session.refresh(preset)
+    PresetCounters.get_instance().invalidate(tenant_id)
     logger.info("Updated preset", extra={"uuid": uuid})
     return PresetDto(**preset.dict())
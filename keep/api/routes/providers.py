@@ -29,6 +29,7 @@ from keep.providers.base.provider_exceptions import (
 )
 from keep.providers.providers_factory import ProvidersFactory
 from keep.secretmanager.secretmanagerfactory import SecretManagerFactory
+from keep.workflowmanager.workflowcache import WorkflowCache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -339,6 +340,7 @@ def delete_provider(
         # delete the provider anyway
         session.delete(provider)
         session.commit()
+        WorkflowCache.get_instance().invalidate_providers(tenant_id)
     except sqlalchemy.orm.exc.NoResultFound:
         raise HTTPException(404, detail="Provider not found")
     except Exception:
@@ -497,6 +499,7 @@ async def update_provider(
     provider.installed_by = updated_by
     provider.validatedScopes = validated_scopes
     session.commit()
+    WorkflowCache.get_instance().invalidate_providers(tenant_id)
     logger.info("Updated provider", extra={"provider_id": provider_id})
     return {
         "details": provider_config,
@@ -587,6 +590,7 @@ async def install_provider(
     try:
         session.add(provider_model)
         session.commit()
+        WorkflowCache.get_instance().invalidate_providers(tenant_id)
     except IntegrityError:
         raise HTTPException(
             status_code=409,
@@ -676,6 +680,7 @@ async def install_provider_oauth2(
         )
         session.add(provider)
         session.commit()
+        WorkflowCache.get_instance().invalidate_providers(tenant_id)
         return JSONResponse(
             status_code=200,
             content={
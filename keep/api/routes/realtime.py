@@ -0,0 +1,53 @@
+import asyncio
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from keep.api.core.dependencies import AuthenticatedEntity, AuthVerifier
+from keep.api.core.realtime_publisher import LocalBroadcaster, RealtimePublisher
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# seconds, a comment is sent when there's nothing else so proxies keep the stream
+KEEPALIVE_INTERVAL = 15
+
+
+@router.get(
+    "/events",
+    description="Stream the real-time updates of the tenant as server-sent events "
+    "(KEEP_REALTIME_TRANSPORT=local)",
+)
+async def stream_events(
+    authenticated_entity: AuthenticatedEntity = Depends(AuthVerifier(["read:alert"])),
+) -> StreamingResponse:
+    broadcaster = RealtimePublisher.get_instance().transport
+    if not isinstance(broadcaster, LocalBroadcaster):
+        raise HTTPException(
+            status_code=404,
+            detail="Real-time updates are not served by the backend, "
+            "KEEP_REALTIME_TRANSPORT is not local",
+        )
+    channel = f"private-{authenticated_entity.tenant_id}"
+    subscriber = broadcaster.subscribe(channel)
+    logger.info("Client subscribed to real-time updates", extra={"channel": channel})
+
+    async def _stream():
+        try:
+            while True:
+                try:
+                    event_name, message = await asyncio.wait_for(
+                        subscriber.get(), timeout=KEEPALIVE_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event_name}\ndata: {message}\n\n"
+        finally:
+            broadcaster.unsubscribe(channel, subscriber)
+            logger.info(
+                "Client unsubscribed from real-time updates", extra={"channel": channel}
+            )
+
+    return StreamingResponse(_stream(), media_type="text/event-stream")
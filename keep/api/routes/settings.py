@@ -12,6 +12,7 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from sqlmodel import Session
 
+from keep.api.core.auth_cache import AuthCache
 from keep.api.core.config import AuthenticationType, config
 from keep.api.core.db import create_user as create_user_in_db
 from keep.api.core.db import delete_user as delete_user_from_db
@@ -501,6 +502,7 @@ def delete_api_key(
                 status_code=500,
                 detail=f"Unable to flag Api key ({keyId}) as deactivated",
             )
+        AuthCache.get_instance().invalidate_api_key(tenant_id, api_key.reference_id)
 
         logger.info(f"Api key ({keyId}) has been deactivated")
         return {"message": "Api key has been deactivated"}
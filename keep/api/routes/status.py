@@ -1,12 +1,17 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
+from keep.api.core.realtime_publisher import RealtimePublisher
 from keep.event_subscriber.event_subscriber import EventSubscriber
+from keep.ingestqueue.ingest_queue import get_ingest_queue
+from keep.providers.http_sessions import HttpSessions
+from keep.providers.providers_puller import ProvidersPuller
+from keep.workflowmanager.workflowmanager import WorkflowManager
 
 router = APIRouter()
 
 
 @router.get("", description="simple status endpoint")
-def status() -> dict:
+def status(request: Request) -> dict:
     """
     Does nothing but return 200 response code
 
@@ -14,7 +19,23 @@ def status() -> dict:
         dict: empty JSON object
     """
     event_subscriber = EventSubscriber.get_instance()
-    return {
+    status = {
         "status": "OK",
         "consumer": event_subscriber.status(),
     }
+    ingest_worker_pool = getattr(request.app.state, "ingest_worker_pool", None)
+    if ingest_worker_pool:
+        status["ingest"] = ingest_worker_pool.status()
+    elif get_ingest_queue():
+        # no ingest workers in this process
+        status["ingest"] = get_ingest_queue().stats()
+    workflow_manager = WorkflowManager.get_instance()
+    if workflow_manager.started:
+        status["workflows"] = workflow_manager.scheduler.executor.status()
+    status["providers_pull"] = ProvidersPuller.get_instance().stats()
+    status["providers_http"] = HttpSessions.get_instance().stats()
+    status["realtime"] = RealtimePublisher.get_instance().stats()
+    providers_sync = getattr(request.app.state, "providers_sync", None)
+    if providers_sync:
+        status["providers_sync"] = providers_sync.stats()
+    return status
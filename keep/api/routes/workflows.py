@@ -26,7 +26,7 @@ from keep.api.core.db import (
     get_workflow,
 )
 from keep.api.core.db import get_workflow_executions as get_workflow_executions_db
-from keep.api.core.db import get_workflow_id_by_name
+from keep.api.core.db import get_workflow_id_by_name, set_workflow_schedule
 from keep.api.core.dependencies import AuthenticatedEntity, AuthVerifier
 from keep.api.models.alert import AlertDto
 from keep.api.models.workflow import (
@@ -41,6 +41,7 @@ from keep.parser.parser import Parser
 from keep.providers.providers_factory import ProvidersFactory
 from keep.workflowmanager.workflowmanager import WorkflowManager
 from keep.workflowmanager.workflowstore import WorkflowStore
+from keep.workflowmanager.workflowtriggerindex import WorkflowTriggerIndex
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -335,10 +336,13 @@ async def update_workflow_by_id(
     workflow_from_db.description = workflow.get("description")
     workflow_from_db.interval = workflow_interval
     workflow_from_db.workflow_raw = yaml.dump(workflow)
+    workflow_from_db.revision += 1
     workflow_from_db.last_updated = datetime.datetime.now()
     session.add(workflow_from_db)
+    set_workflow_schedule(session, workflow_from_db)
     session.commit()
     session.refresh(workflow_from_db)
+    WorkflowTriggerIndex.get_instance().invalidate(tenant_id)
     logger.info(f"Updated workflow {workflow_id}", extra={"tenant_id": tenant_id})
     return WorkflowCreateOrUpdateDTO(workflow_id=workflow_id, status="updated")
 
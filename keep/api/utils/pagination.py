@@ -0,0 +1,77 @@
+"""
+Keyset (cursor) pagination and NDJSON streaming helpers for the alerts API.
+
+Alerts are paginated on (timestamp, id), newest first. The cursor handed to the
+client is an opaque, url-safe encoding of the (timestamp, id) of the last alert
+of the page.
+"""
+
+import base64
+import datetime
+import json
+import typing
+import uuid
+
+from keep.api.models.alert import AlertDto
+from keep.api.models.db.alert import Alert
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# the page size used when streaming alerts from the database
+STREAM_PAGE_SIZE = 500
+
+AlertsCursor = typing.Tuple[datetime.datetime, uuid.UUID]
+
+
+def encode_cursor(alert: Alert) -> str:
+    return encode_keyset_cursor(alert.timestamp, alert.id)
+
+
+def encode_keyset_cursor(timestamp: datetime.datetime, id: uuid.UUID) -> str:
+    """Encode a (timestamp, id) keyset, e.g. of a group summary, see decode_cursor"""
+    payload = json.dumps([timestamp.isoformat(), str(id)])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str | None) -> AlertsCursor | None:
+    """Decode a cursor created by encode_cursor.
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        timestamp, alert_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.datetime.fromisoformat(timestamp), uuid.UUID(alert_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def iterate_alert_pages(
+    fetch_page: typing.Callable[[AlertsCursor | None, int], list[Alert]],
+    page_size: int = STREAM_PAGE_SIZE,
+    cursor: AlertsCursor | None = None,
+) -> typing.Iterator[list[Alert]]:
+    """Iterate over the pages of a keyset paginated alerts query until it's exhausted.
+
+    Args:
+        fetch_page: fetches a page, given the cursor and the page size
+        page_size (int): the page size
+        cursor (AlertsCursor, optional): where to start from
+
+    Yields:
+        list[Alert]: the pages
+    """
+    while True:
+        page = fetch_page(cursor, page_size)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        cursor = (page[-1].timestamp, page[-1].id)
+
+
+def ndjson_lines(alerts: typing.Iterable[AlertDto]) -> typing.Iterator[str]:
+    for alert in alerts:
+        yield alert.json() + "\n"
@@ -0,0 +1,49 @@
+import json
+import typing
+
+# pusher rejects messages larger than 10KB
+PUSHER_MAX_MESSAGE_SIZE = 10 * 1024
+
+
+def pack_pusher_messages(
+    items: list[dict], max_size: int = PUSHER_MAX_MESSAGE_SIZE
+) -> typing.Iterator[str]:
+    """Pack items into as few JSON list messages as possible, each one up to max_size bytes.
+
+    An item that doesn't fit in a message by itself is sent alone.
+
+    Args:
+        items (list[dict]): the items
+        max_size (int): the maximum message size, in bytes
+
+    Yields:
+        str: the messages, JSON lists of items
+    """
+    for _, message in pack_pusher_batches(items, max_size):
+        yield message
+
+
+def pack_pusher_batches(
+    items: typing.Iterable[dict], max_size: int = PUSHER_MAX_MESSAGE_SIZE
+) -> typing.Iterator[tuple[int, str]]:
+    """Like pack_pusher_messages, with the number of items in every message.
+
+    Every item is serialized once and the size of the message is accounted
+    incrementally, so packing is linear in the number of items.
+
+    Yields:
+        tuple[int, str]: the number of items in the message and the message
+    """
+    batch, batch_size = [], 2  # the brackets
+    for item in items:
+        serialized = json.dumps(item, default=str)
+        # the item and its separator
+        item_size = len(serialized.encode()) + (2 if batch else 0)
+        if batch and batch_size + item_size > max_size:
+            yield len(batch), "[" + ", ".join(batch) + "]"
+            batch, batch_size = [], 2
+            item_size = len(serialized.encode())
+        batch.append(serialized)
+        batch_size += item_size
+    if batch:
+        yield len(batch), "[" + ", ".join(batch) + "]"
@@ -5,6 +5,7 @@ from uuid import uuid4
 
 from sqlmodel import Session, select
 
+from keep.api.core.auth_cache import AuthCache
 from keep.api.core.rbac import Admin as AdminRole
 from keep.api.core.rbac import Role
 from keep.api.core.rbac import Webhook as WebhookRole
@@ -86,6 +87,8 @@ def update_api_key_internal(
             api_key.encode("utf-8")
         ).hexdigest()
         session.commit()
+        # the old key is no longer valid
+        AuthCache.get_instance().invalidate_api_key(tenant_id, unique_api_key_id)
 
         return api_key
 
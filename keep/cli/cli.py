@@ -314,6 +314,50 @@ def api(multi_tenant: bool, port: int, host: str):
     api.run(app)
 
 
+@cli.command(name="backfill-last-alerts")
+@click.option(
+    "--tenant-id",
+    "-t",
+    type=str,
+    required=False,
+    help="Backfill only this tenant (defaults to all tenants)",
+)
+def backfill_last_alerts(tenant_id: str | None):
+    """Populate the last alerts table from the alerts history (for databases created before it existed)."""
+    from keep.api.core.db import backfill_last_alerts as backfill_last_alerts_db
+    from keep.api.core.db import create_db_and_tables, mark_backfill_completed
+
+    # make sure the last alerts table exists
+    create_db_and_tables()
+    backfilled = backfill_last_alerts_db(tenant_id=tenant_id)
+    if not tenant_id:
+        # the server doesn't need to run it again on startup
+        mark_backfill_completed("last_alerts")
+    click.echo(click.style(f"Backfilled {backfilled} last alerts", bold=True))
+
+
+@cli.command(name="backfill-group-summaries")
+@click.option(
+    "--tenant-id",
+    "-t",
+    type=str,
+    required=False,
+    help="Backfill only this tenant (defaults to all tenants)",
+)
+def backfill_group_summaries(tenant_id: str | None):
+    """Summarize the alert groups created before the group summaries existed."""
+    from keep.api.core.db import backfill_group_summaries as backfill_group_summaries_db
+    from keep.api.core.db import create_db_and_tables, mark_backfill_completed
+
+    # make sure the group summaries tables exist
+    create_db_and_tables()
+    backfilled = backfill_group_summaries_db(tenant_id=tenant_id)
+    if not tenant_id:
+        # the server doesn't need to run it again on startup
+        mark_backfill_completed("group_summaries")
+    click.echo(click.style(f"Backfilled {backfilled} group summaries", bold=True))
+
+
 @cli.command()
 @click.option(
     "--alerts-directory",
@@ -1,6 +1,11 @@
 # TODO - refactor context manager to support multitenancy in a more robust way
+import copy
+import itertools
 import logging
 import os
+import pickle
+import threading
+import zlib
 
 import click
 from pympler.asizeof import asizeof
@@ -8,6 +13,25 @@ from pympler.asizeof import asizeof
 from keep.api.core.db import get_last_workflow_execution_by_workflow_id, get_session
 from keep.api.logging import WorkflowLoggerAdapter
 
+# bytes (approximately), bigger step results are moved out of the context, 0 - never
+KEEP_STEP_RESULTS_SPILL_SIZE = int(
+    os.environ.get("KEEP_STEP_RESULTS_SPILL_SIZE", 5 * 1024 * 1024)
+)
+# bytes (approximately), beyond it all the new step results are moved out of the context
+KEEP_CONTEXT_MAX_SIZE = int(os.environ.get("KEEP_CONTEXT_MAX_SIZE", 50 * 1024 * 1024))
+
+
+class SpilledResults:
+    """A reference to step results that were moved out of the steps context
+    (see ContextManager.set_step_context), they are loaded back by get_full_context"""
+
+    def __init__(self, key: int, size: int):
+        self.key = key
+        self.size = size
+
+    def __repr__(self):
+        return f"<spilled results ({self.size} bytes)>"
+
 
 class ContextManager:
     def __init__(self, tenant_id, workflow_id=None, workflow_execution_id=None):
@@ -18,7 +42,22 @@ class ContextManager:
         self.workflow_id = workflow_id
         self.tenant_id = tenant_id
         self.steps_context = {}
+        # the approximate size of the step results kept in the context, in bytes
         self.steps_context_size = 0
+        # step id -> the approximate size of its results kept in the context
+        self._steps_results_sizes = {}
+        # bumped whenever the steps context changes (see WorkflowLoggerAdapter)
+        self.steps_context_version = 0
+        # the compressed step results that were moved out of the context
+        self._spilled_results: dict[int, bytes] = {}
+        # shared with the foreach item contexts, so their spilled results don't collide
+        self._spilled_results_keys = itertools.count()
+        # the steps whose results (or some of them, for foreach) were spilled
+        self._spilled_steps = set()
+        # the last spilled results that were loaded, (key, results)
+        self._loaded_results = None
+        # steps (and foreach items) may run concurrently, see Workflow.run_steps
+        self._lock = threading.RLock()
         self.providers_context = {}
         self.event_context = {}
         self.foreach_context = {
@@ -98,7 +137,7 @@ class ContextManager:
                             anyway, this should be refactored to something more structured
         """
         full_context = {
-            "steps": self.steps_context,
+            "steps": self._get_steps_context(),
             "foreach": self.foreach_context,
             "event": self.event_context,
             "last_workflow_results": self.last_workflow_execution_results,
@@ -117,6 +156,63 @@ class ContextManager:
     def set_for_each_context(self, value):
         self.foreach_context["value"] = value
 
+    def fork_foreach_context(self, step_id, value) -> "ContextManager":
+        """A context for running one foreach item of a step concurrently with the others
+
+        The item has its own foreach context, aliases and results of the step, the rest
+        of the context is shared (read only), see merge_foreach_context.
+        """
+        context_manager = copy.copy(self)
+        context_manager.foreach_context = {"value": value}
+        with self._lock:
+            context_manager.aliases = dict(self.aliases)
+            context_manager.steps_context = {
+                **self.steps_context,
+                step_id: {"provider_parameters": {}, "results": []},
+            }
+            context_manager._steps_results_sizes = {
+                **self._steps_results_sizes,
+                step_id: 0,
+            }
+            context_manager._spilled_steps = set(self._spilled_steps)
+        context_manager._loaded_results = None
+        return context_manager
+
+    def merge_foreach_context(self, step_id, item_context: "ContextManager"):
+        """Add the results of a foreach item (see fork_foreach_context)"""
+        with self._lock:
+            if step_id not in self.steps_context:
+                self.steps_context[step_id] = {
+                    "provider_parameters": {},
+                    "results": [],
+                }
+            step_context = self.steps_context[step_id]
+            item_step_context = item_context.steps_context[step_id]
+            if item_step_context["results"]:
+                if not isinstance(step_context.get("results"), list):
+                    step_context["results"] = []
+                step_context["results"].extend(item_step_context["results"])
+            if item_step_context["provider_parameters"]:
+                step_context["provider_parameters"] = item_step_context[
+                    "provider_parameters"
+                ]
+            conditions = item_step_context.get("conditions", {})
+            for condition_name, results in conditions.items():
+                step_context.setdefault("conditions", {}).setdefault(
+                    condition_name, []
+                ).extend(results)
+            size = item_context._steps_results_sizes[step_id]
+            self._steps_results_sizes[step_id] = (
+                self._steps_results_sizes.get(step_id, 0) + size
+            )
+            self.steps_context_size += size
+            if step_id in item_context._spilled_steps:
+                self._spilled_steps.add(step_id)
+            self.steps_context["this"] = step_context
+            self.aliases.update(item_context.aliases)
+            self.foreach_context = item_context.foreach_context
+            self.steps_context_version += 1
+
     def set_condition_results(
         self,
         action_id,
@@ -140,49 +236,137 @@ class ContextManager:
             condition_alias (_type_, optional): _description_. Defaults to None.
             value (_type_): the raw value which the condition was compared to. this is relevant only for foreach conditions
         """
-        if action_id not in self.steps_context:
-            self.steps_context[action_id] = {"conditions": {}, "results": {}}
-        if "conditions" not in self.steps_context[action_id]:
-            self.steps_context[action_id]["conditions"] = {condition_name: []}
-        if condition_name not in self.steps_context[action_id]["conditions"]:
-            self.steps_context[action_id]["conditions"][condition_name] = []
-
-        self.steps_context[action_id]["conditions"][condition_name].append(
-            {
-                "value": value,
-                "compare_value": compare_value,
-                "compare_to": compare_to,
-                "result": result,
-                "type": condition_type,
-                "alias": condition_alias,
-                **kwargs,
-            }
-        )
-        # update the current for each context
-        self.foreach_context.update(
-            {"compare_value": compare_value, "compare_to": compare_to, **kwargs}
-        )
-        if condition_alias:
-            self.aliases[condition_alias] = result
+        with self._lock:
+            if action_id not in self.steps_context:
+                self.steps_context[action_id] = {"conditions": {}, "results": {}}
+            if "conditions" not in self.steps_context[action_id]:
+                self.steps_context[action_id]["conditions"] = {condition_name: []}
+            if condition_name not in self.steps_context[action_id]["conditions"]:
+                self.steps_context[action_id]["conditions"][condition_name] = []
+
+            self.steps_context[action_id]["conditions"][condition_name].append(
+                {
+                    "value": value,
+                    "compare_value": compare_value,
+                    "compare_to": compare_to,
+                    "result": result,
+                    "type": condition_type,
+                    "alias": condition_alias,
+                    **kwargs,
+                }
+            )
+            # update the current for each context
+            self.foreach_context.update(
+                {
+                    "compare_value": compare_value,
+                    "compare_to": compare_to,
+                    **kwargs,
+                }
+            )
+            if condition_alias:
+                self.aliases[condition_alias] = result
+            self.steps_context_version += 1
 
     def set_step_provider_paremeters(self, step_id, provider_parameters):
-        if step_id not in self.steps_context:
-            self.steps_context[step_id] = {"provider_parameters": {}, "results": []}
-        self.steps_context[step_id]["provider_parameters"] = provider_parameters
+        with self._lock:
+            if step_id not in self.steps_context:
+                self.steps_context[step_id] = {
+                    "provider_parameters": {},
+                    "results": [],
+                }
+            self.steps_context[step_id]["provider_parameters"] = provider_parameters
+            self.steps_context_version += 1
 
     def set_step_context(self, step_id, results, foreach=False):
-        if step_id not in self.steps_context:
-            self.steps_context[step_id] = {"provider_parameters": {}, "results": []}
-
-        # If this is a foreach step, we need to append the results to the list
-        # so we can iterate over them
-        if foreach:
-            self.steps_context[step_id]["results"].append(results)
-        else:
-            self.steps_context[step_id]["results"] = results
-        # this is an alias to the current step output
-        self.steps_context["this"] = self.steps_context[step_id]
-        self.steps_context_size = asizeof(self.steps_context)
+        # only the new results are measured, the context may be big (e.g. foreach)
+        size, serialized = self._measure_results(results)
+        with self._lock:
+            if step_id not in self.steps_context:
+                self.steps_context[step_id] = {
+                    "provider_parameters": {},
+                    "results": [],
+                }
+
+            if serialized is not None and (
+                (KEEP_STEP_RESULTS_SPILL_SIZE and size > KEEP_STEP_RESULTS_SPILL_SIZE)
+                or self.steps_context_size + size > KEEP_CONTEXT_MAX_SIZE
+            ):
+                results = self._spill_results(step_id, serialized, size)
+                size = 0
+
+            # If this is a foreach step, we need to append the results to the list
+            # so we can iterate over them
+            if foreach:
+                self.steps_context[step_id]["results"].append(results)
+                step_size = self._steps_results_sizes.get(step_id, 0) + size
+            else:
+                self.steps_context[step_id]["results"] = results
+                step_size = size
+            # this is an alias to the current step output
+            self.steps_context["this"] = self.steps_context[step_id]
+            self.steps_context_size += step_size - self._steps_results_sizes.get(
+                step_id, 0
+            )
+            self._steps_results_sizes[step_id] = step_size
+            self.steps_context_version += 1
+
+    def _measure_results(self, results) -> tuple[int, bytes | None]:
+        """The approximate size of the results, and the results serialized (if they can be)"""
+        try:
+            serialized = pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL)
+            return len(serialized), serialized
+        except Exception:
+            # e.g. a client object, it can't be moved out of the context
+            return asizeof(results), None
+
+    def _spill_results(self, step_id, serialized: bytes, size: int) -> SpilledResults:
+        key = next(self._spilled_results_keys)
+        self._spilled_results[key] = zlib.compress(serialized)
+        self._spilled_steps.add(step_id)
+        self.logger.info(
+            "Step results moved out of the context",
+            extra={
+                "step_id": step_id,
+                "size": size,
+                "compressed_size": len(self._spilled_results[key]),
+                "workflow_id": self.workflow_id,
+            },
+        )
+        return SpilledResults(key, size)
+
+    def _load_results(self, results):
+        if isinstance(results, SpilledResults):
+            # a foreach renders the same results for every item, load them once
+            if self._loaded_results is None or self._loaded_results[0] != results.key:
+                self._loaded_results = (
+                    results.key,
+                    pickle.loads(zlib.decompress(self._spilled_results[results.key])),
+                )
+            return self._loaded_results[1]
+        if isinstance(results, list) and any(
+            isinstance(item, SpilledResults) for item in results
+        ):
+            return [self._load_results(item) for item in results]
+        return results
+
+    def _get_steps_context(self) -> dict:
+        """The steps context, with the spilled results loaded back"""
+        if not self._spilled_steps:
+            return self.steps_context
+        with self._lock:
+            steps_context = dict(self.steps_context)
+        for step_id in self._spilled_steps:
+            step_context = self.steps_context.get(step_id)
+            if not isinstance(step_context, dict):
+                continue
+            loaded_step_context = {
+                **step_context,
+                "results": self._load_results(step_context.get("results")),
+            }
+            steps_context[step_id] = loaded_step_context
+            if self.steps_context.get("this") is step_context:
+                steps_context["this"] = loaded_step_context
+        return steps_context
 
     def get_last_workflow_run(self, workflow_id):
         return get_last_workflow_execution_by_workflow_id(self.tenant_id, workflow_id)
@@ -0,0 +1,321 @@
+"""
+Queues that decouple receiving events (/alerts/event) from processing them.
+
+The API puts the raw events on the queue and returns 202, and a pool of ingest
+workers (see IngestWorkerPool) processes them. The delivery is at-least-once:
+a task is removed from the queue only after it was processed (ack), tasks that
+failed are retried (nack) until they reach the maximum number of attempts.
+
+Backends (KEEP_INGEST_QUEUE):
+    - none (default): no queue, the events are processed in a background task of the request
+    - memory: an in-process queue, the pending tasks are lost if the process crashes
+    - db: a table backed queue, shared by all the replicas. Tasks that were claimed
+          by a worker that crashed are claimed again after the visibility timeout.
+
+Other backends (e.g. Redis) should implement IngestQueue and be registered in INGEST_QUEUE_BACKENDS.
+"""
+
+import abc
+import dataclasses
+import datetime
+import logging
+import os
+import queue
+import threading
+import typing
+import uuid
+
+from keep.api.core.db import (
+    ack_ingest_queue_item,
+    claim_ingest_queue_items,
+    enqueue_ingest_queue_item,
+    get_ingest_queue_stats,
+    nack_ingest_queue_item,
+    release_ingest_queue_items,
+)
+from keep.api.models.db.ingest import IngestQueueItem
+
+# the attempts after which a task is dropped (memory) or marked as failed (db)
+KEEP_INGEST_MAX_ATTEMPTS = int(os.environ.get("KEEP_INGEST_MAX_ATTEMPTS", 3))
+# seconds after which a task claimed by a worker can be claimed by another one (db)
+KEEP_INGEST_VISIBILITY_TIMEOUT = int(
+    os.environ.get("KEEP_INGEST_VISIBILITY_TIMEOUT", 300)
+)
+
+
+@dataclasses.dataclass
+class IngestTask:
+    tenant_id: str
+    # the raw event, as received by /alerts/event/{provider_type},
+    #   or the AlertDto dicts received by /alerts/event
+    event: dict | list
+    # "provider" or "generic"
+    kind: str = "provider"
+    provider_type: str | None = None
+    provider_id: str | None = None
+    fingerprint: str | None = None
+    api_key_name: str | None = None
+    id: str = dataclasses.field(default_factory=lambda: str(uuid.uuid4()))
+    enqueued_at: datetime.datetime = dataclasses.field(
+        default_factory=datetime.datetime.utcnow
+    )
+    attempts: int = 0
+
+
+class IngestQueue(abc.ABC):
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    @abc.abstractmethod
+    def put(self, task: IngestTask) -> None:
+        """Add a task to the queue"""
+
+    @abc.abstractmethod
+    def get(self, worker_id: str, timeout: float = 1.0) -> IngestTask | None:
+        """Claim the next task, waiting up to timeout seconds for one.
+
+        The task must be acknowledged (ack) or returned to the queue (nack).
+        """
+
+    @abc.abstractmethod
+    def ack(self, task: IngestTask) -> None:
+        """Remove a processed task from the queue"""
+
+    @abc.abstractmethod
+    def nack(self, task: IngestTask, error: str) -> bool:
+        """Return a task that failed to the queue
+
+        Returns:
+            bool: whether the task will be retried
+        """
+
+    @abc.abstractmethod
+    def depth(self) -> int:
+        """The number of tasks waiting to be processed"""
+
+    @abc.abstractmethod
+    def lag(self) -> float:
+        """How long (seconds) the oldest waiting task is waiting"""
+
+    def recover(self) -> int:
+        """Return the tasks of workers that crashed to the queue, called when the workers start
+
+        Returns:
+            int: the number of recovered tasks
+        """
+        return 0
+
+    def release(self, worker_id: str) -> int:
+        """Return the tasks claimed by a worker that is shutting down to the queue"""
+        return 0
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "depth": self.depth(),
+            "lag_seconds": round(self.lag(), 3),
+        }
+
+    @property
+    @abc.abstractmethod
+    def backend(self) -> str:
+        pass
+
+
+class InMemoryIngestQueue(IngestQueue):
+    backend = "memory"
+
+    def __init__(self):
+        super().__init__()
+        self._queue: queue.Queue[IngestTask] = queue.Queue()
+        self._lock = threading.Lock()
+        # task id -> task, the tasks waiting in the queue
+        self._pending: dict[str, IngestTask] = {}
+        # task id -> task, the tasks claimed by workers
+        self._in_flight: dict[str, IngestTask] = {}
+
+    def put(self, task: IngestTask) -> None:
+        with self._lock:
+            self._pending[task.id] = task
+        self._queue.put(task)
+
+    def get(self, worker_id: str, timeout: float = 1.0) -> IngestTask | None:
+        try:
+            task = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        with self._lock:
+            self._pending.pop(task.id, None)
+            task.attempts += 1
+            self._in_flight[task.id] = task
+        return task
+
+    def ack(self, task: IngestTask) -> None:
+        with self._lock:
+            self._in_flight.pop(task.id, None)
+
+    def nack(self, task: IngestTask, error: str) -> bool:
+        with self._lock:
+            self._in_flight.pop(task.id, None)
+        if task.attempts >= KEEP_INGEST_MAX_ATTEMPTS:
+            self.logger.error(
+                "Dropping ingest task after too many attempts",
+                extra={
+                    "task_id": task.id,
+                    "tenant_id": task.tenant_id,
+                    "attempts": task.attempts,
+                    "error": error,
+                },
+            )
+            return False
+        self.put(task)
+        return True
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def lag(self) -> float:
+        with self._lock:
+            if not self._pending:
+                return 0.0
+            oldest = min(task.enqueued_at for task in self._pending.values())
+        return (datetime.datetime.utcnow() - oldest).total_seconds()
+
+
+class DbIngestQueue(IngestQueue):
+    backend = "db"
+
+    def __init__(
+        self,
+        visibility_timeout: int = KEEP_INGEST_VISIBILITY_TIMEOUT,
+        poll_interval: float = 0.5,
+    ):
+        super().__init__()
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        # put wakes up the local workers, the workers of other replicas poll
+        self._new_tasks = threading.Event()
+
+    def put(self, task: IngestTask) -> None:
+        item = IngestQueueItem(
+            id=uuid.UUID(task.id),
+            tenant_id=task.tenant_id,
+            kind=task.kind,
+            provider_type=task.provider_type,
+            provider_id=task.provider_id,
+            fingerprint=task.fingerprint,
+            api_key_name=task.api_key_name,
+            payload={"event": task.event},
+            enqueued_at=task.enqueued_at,
+        )
+        enqueue_ingest_queue_item(item)
+        self._new_tasks.set()
+
+    def get(self, worker_id: str, timeout: float = 1.0) -> IngestTask | None:
+        deadline = datetime.datetime.utcnow() + datetime.timedelta(seconds=timeout)
+        while True:
+            items = claim_ingest_queue_items(
+                worker_id, limit=1, visibility_timeout=self.visibility_timeout
+            )
+            if items:
+                return self._to_task(items[0])
+            remaining = (deadline - datetime.datetime.utcnow()).total_seconds()
+            if remaining <= 0:
+                return None
+            self._new_tasks.clear()
+            self._new_tasks.wait(min(self.poll_interval, remaining))
+
+    def ack(self, task: IngestTask) -> None:
+        ack_ingest_queue_item(uuid.UUID(task.id))
+
+    def nack(self, task: IngestTask, error: str) -> bool:
+        retry = nack_ingest_queue_item(
+            uuid.UUID(task.id), error, KEEP_INGEST_MAX_ATTEMPTS
+        )
+        if retry:
+            self._new_tasks.set()
+        else:
+            self.logger.error(
+                "Ingest task failed too many times, marked as failed",
+                extra={
+                    "task_id": task.id,
+                    "tenant_id": task.tenant_id,
+                    "attempts": task.attempts,
+                    "error": error,
+                },
+            )
+        return retry
+
+    def depth(self) -> int:
+        return get_ingest_queue_stats()["pending"]
+
+    def lag(self) -> float:
+        return self._lag(get_ingest_queue_stats()["oldest_pending"])
+
+    @staticmethod
+    def _lag(oldest_pending: datetime.datetime | None) -> float:
+        if not oldest_pending:
+            return 0.0
+        return max((datetime.datetime.utcnow() - oldest_pending).total_seconds(), 0.0)
+
+    def recover(self) -> int:
+        recovered = release_ingest_queue_items(
+            visibility_timeout=self.visibility_timeout
+        )
+        if recovered:
+            self.logger.warning(
+                "Recovered ingest tasks of workers that didn't finish them",
+                extra={"recovered": recovered},
+            )
+        return recovered
+
+    def release(self, worker_id: str) -> int:
+        return release_ingest_queue_items(worker_id=worker_id)
+
+    def stats(self) -> dict:
+        stats = get_ingest_queue_stats()
+        return {
+            "backend": self.backend,
+            "depth": stats["pending"],
+            "lag_seconds": round(self._lag(stats["oldest_pending"]), 3),
+            "processing": stats["processing"],
+            "failed": stats["failed"],
+        }
+
+    @staticmethod
+    def _to_task(item: IngestQueueItem) -> IngestTask:
+        return IngestTask(
+            id=str(item.id),
+            tenant_id=item.tenant_id,
+            kind=item.kind,
+            event=item.payload["event"],
+            provider_type=item.provider_type,
+            provider_id=item.provider_id,
+            fingerprint=item.fingerprint,
+            api_key_name=item.api_key_name,
+            enqueued_at=item.enqueued_at,
+            attempts=item.attempts,
+        )
+
+
+INGEST_QUEUE_BACKENDS: dict[str, typing.Type[IngestQueue]] = {
+    InMemoryIngestQueue.backend: InMemoryIngestQueue,
+    DbIngestQueue.backend: DbIngestQueue,
+}
+
+
+_ingest_queues: dict[str, IngestQueue] = {}
+_ingest_queues_lock = threading.Lock()
+
+
+def get_ingest_queue() -> IngestQueue | None:
+    """The process-wide ingest queue (KEEP_INGEST_QUEUE), None if events are processed without a queue"""
+    backend = os.environ.get("KEEP_INGEST_QUEUE", "none")
+    if backend == "none":
+        return None
+    with _ingest_queues_lock:
+        if backend not in _ingest_queues:
+            if backend not in INGEST_QUEUE_BACKENDS:
+                raise ValueError(f"Unknown ingest queue backend: {backend}")
+            _ingest_queues[backend] = INGEST_QUEUE_BACKENDS[backend]()
+        return _ingest_queues[backend]
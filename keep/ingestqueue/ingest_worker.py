@@ -0,0 +1,158 @@
+import logging
+import os
+import socket
+import threading
+import time
+import typing
+import uuid
+
+from opentelemetry import metrics
+
+from keep.ingestqueue.ingest_queue import IngestQueue, IngestTask
+
+KEEP_INGEST_WORKERS = int(os.environ.get("KEEP_INGEST_WORKERS", 4))
+
+
+class IngestWorkerPool:
+    """A pool of threads that process the tasks of an ingest queue"""
+
+    def __init__(
+        self,
+        ingest_queue: IngestQueue,
+        handler: typing.Callable[[IngestTask], None],
+        workers: int = KEEP_INGEST_WORKERS,
+        poll_timeout: float = 1.0,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.queue = ingest_queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_timeout = poll_timeout
+        # unique per process, so the tasks of a process can be released on shutdown
+        self.pool_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+        self._draining = threading.Event()
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.started = False
+        self._metrics_registered = False
+
+    def start(self):
+        if self.started:
+            self.logger.info("Ingest workers already started")
+            return
+        recovered = self.queue.recover()
+        self.logger.info(
+            "Starting ingest workers",
+            extra={
+                "workers": self.workers,
+                "backend": self.queue.backend,
+                "recovered": recovered,
+            },
+        )
+        self._stop.clear()
+        self._draining.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work,
+                args=(f"{self.pool_id}-{i}",),
+                name=f"ingest-worker-{i}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        self._register_metrics()
+        self.started = True
+
+    def stop(self, drain_timeout: float = 30.0):
+        """Stop the workers, after draining the queue for up to drain_timeout seconds
+
+        The tasks of an in-process queue are lost when the process exits, so they
+        are processed before stopping. Tasks of a shared queue are left for other replicas.
+        """
+        if not self.started:
+            return
+        self.logger.info("Stopping ingest workers", extra={"depth": self.queue.depth()})
+        if self.queue.backend == "memory":
+            self._draining.set()
+        else:
+            self._stop.set()
+        deadline = time.monotonic() + drain_timeout
+        for thread in self._threads:
+            thread.join(timeout=max(deadline - time.monotonic(), 0))
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=self.poll_timeout * 2)
+        self._threads = []
+        for i in range(self.workers):
+            self.queue.release(f"{self.pool_id}-{i}")
+        self.started = False
+        self.logger.info(
+            "Ingest workers stopped",
+            extra={"depth": self.queue.depth(), "processed": self.processed},
+        )
+
+    def status(self) -> dict:
+        return {
+            **self.queue.stats(),
+            "workers": len([thread for thread in self._threads if thread.is_alive()]),
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+    def _work(self, worker_id: str):
+        while not self._stop.is_set():
+            task = self.queue.get(worker_id, timeout=self.poll_timeout)
+            if task is None:
+                if self._draining.is_set():
+                    # nothing left to drain
+                    return
+                continue
+            self._process(task)
+
+    def _process(self, task: IngestTask):
+        extra = {
+            "task_id": task.id,
+            "tenant_id": task.tenant_id,
+            "provider_type": task.provider_type,
+            "provider_id": task.provider_id,
+            "attempts": task.attempts,
+        }
+        try:
+            self.handler(task)
+        except Exception as e:
+            self.logger.exception("Failed to process ingest task", extra=extra)
+            with self._lock:
+                self.failed += 1
+            try:
+                self.queue.nack(task, str(e))
+            except Exception:
+                # the task will be claimed again after the visibility timeout
+                self.logger.exception("Failed to return ingest task", extra=extra)
+            return
+        with self._lock:
+            self.processed += 1
+        try:
+            self.queue.ack(task)
+        except Exception:
+            # at-least-once, the task may be processed again
+            self.logger.exception("Failed to acknowledge ingest task", extra=extra)
+
+    def _register_metrics(self):
+        if self._metrics_registered:
+            return
+        self._metrics_registered = True
+        meter = metrics.get_meter(__name__)
+        meter.create_observable_gauge(
+            "keep_ingest_queue_depth",
+            callbacks=[lambda options: [metrics.Observation(self.queue.depth())]],
+            description="The number of events waiting to be processed",
+        )
+        meter.create_observable_gauge(
+            "keep_ingest_queue_lag",
+            callbacks=[lambda options: [metrics.Observation(self.queue.lag())]],
+            unit="s",
+            description="How long the oldest waiting event is waiting",
+        )
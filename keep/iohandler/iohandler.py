@@ -3,17 +3,23 @@ import copy
 
 # TODO: fix this! It screws up the eval statement if these are not imported
 import inspect
-import io
 import logging
 import re
-import sys
 
 import astunparse
-import chevron
 import requests
 
 import keep.functions as keep_functions
 from keep.contextmanager.contextmanager import ContextManager
+from keep.iohandler.template import (
+    KeepFunction,
+    argument_index,
+    compile_template,
+    escape_keep_function,
+    extract_keep_functions,
+    parse_keep_function,
+    substitute_arguments,
+)
 from keep.step.step_provider_parameter import StepProviderParameter
 
 
@@ -35,21 +41,14 @@ class IOHandler:
         ):
             self.shorten_urls = True
 
-    def render(self, template, safe=False, default=""):
+    def render(self, template, safe=False, default="", context=None):
         # rendering is only support for strings
         if not isinstance(template, str):
             return template
-        # check if inside the mustache is object in the context
-        if template.count("}}") != template.count("{{"):
-            raise Exception(
-                f"Invalid template - number of }} and {{ does not match {template}"
-            )
-        # TODO - better validate functions
-        if template.count("(") != template.count(")"):
-            raise Exception(
-                f"Invalid template - number of ( and ) does not match {template}"
-            )
-        val = self.parse(template, safe, default)
+        compiled = compile_template(template)
+        if compiled.error:
+            raise Exception(compiled.error)
+        val = self.parse(template, safe, default, context)
         return val
 
     def quote(self, template):
@@ -66,59 +65,7 @@ class IOHandler:
         return re.sub(pattern, replacement, template)
 
     def extract_keep_functions(self, text):
-        matches = []
-        i = 0
-        while i < len(text):
-            if text[i : i + 5] == "keep.":
-                start = i
-                func_start = text.find("(", start)
-                if func_start > -1:  # Opening '(' found after "keep."
-                    i = func_start + 1  # Move i to the character after '('
-                    parent_count = 1
-                    in_string = False
-                    escape_next = False
-                    quote_char = ""
-                    escapes = {}
-                    while i < len(text) and (parent_count > 0 or in_string):
-                        if text[i] == "\\" and in_string and not escape_next:
-                            escape_next = True
-                            i += 1
-                            continue
-                        elif text[i] in ('"', "'"):
-                            if not in_string:
-                                in_string = True
-                                quote_char = text[i]
-                            elif (
-                                text[i] == quote_char
-                                and not escape_next
-                                and (
-                                    str(text[i + 1]).isalnum() == False
-                                    and str(text[i + 1]) != " "
-                                )  # end of statement, arg, etc. if its alpha numeric or whitespace, we just need to escape it
-                            ):
-                                in_string = False
-                                quote_char = ""
-                            elif text[i] == quote_char and not escape_next:
-                                escapes[i] = text[
-                                    i
-                                ]  # Save the quote character where we need to escape for valid ast parsing
-                        elif text[i] == "(" and not in_string:
-                            parent_count += 1
-                        elif text[i] == ")" and not in_string:
-                            parent_count -= 1
-
-                        escape_next = False
-                        i += 1
-
-                    if parent_count == 0:
-                        matches.append((text[start:i], escapes))
-                    continue  # Skip the increment at the end of the loop to continue from the current position
-                else:
-                    # If no '(' found, increment i to move past "keep."
-                    i += 5
-            else:
-                i += 1
-        return matches
+        return list(extract_keep_functions(text))
 
     def _trim_token_error(self, token):
         # trim too long tokens so that the error message will be readable
@@ -133,97 +80,81 @@ class IOHandler:
         else:
             return token
 
-    def parse(self, string, safe=False, default=""):
-        """Use AST module to parse 'call stack'-like string and return the result
+    def parse(self, string, safe=False, default="", context=None):
+        """Render the string and evaluate its keep.* function calls
 
         Example -
             string = "first(split('1 2 3', ' '))" ==> 1
 
+        Only the calls written in the string are evaluated, they are compiled with
+        the template (see compile_template). keep.* text that comes from the
+        context, e.g. an alert's description, is rendered as is.
+
         Args:
-            tree (_type_): _description_
+            string (str): the template
+            context (dict, optional): the context to render with, defaults to the
+                full context of the workflow
 
         Returns:
-            _type_: _description_
+            str: the rendered string
         """
-        # break the string to tokens
-        # this will break the following string to 3 tokens:
-        # string - "Number of errors: {{ steps.grep.condition.threshold.compare_to }}
-        #               [threshold was set to len({{ steps.grep.condition.threshold.value }})]
-        #               Error: split({{ foreach.value }},'a', 'b')
-        #               and first(split({{ foreach.value }},'a', 'b'))"
-        # tokens (with {{ expressions }} already rendered) -
-        #           len({{ steps.grep.condition.threshold.value }})
-        #           split({{ foreach.value }},'a', 'b')
-        #           first(split({{ foreach.value }},'a', 'b'))
-
-        # first render everything using chevron
-        # inject the context
-        string = self._render(string, safe, default)
-
-        # Now, extract the token if exists -
-        parsed_string = copy.copy(string)
-        tokens = self.extract_keep_functions(parsed_string)
-        if len(tokens) == 0:
-            return parsed_string
-        elif len(tokens) == 1:
-            token, escapes = tokens[0]
-            token_to_replace = token
-            try:
-                escapes_counter = 0
-                if escapes:
-                    for escape in escapes:
-                        token = (
-                            token[: escape + escapes_counter]
-                            + "\\"
-                            + token[escape + escapes_counter :]
-                        )
-                        escapes_counter += 1  # we need to increment the counter because we added a character
-                val = self._parse_token(token)
-            except Exception as e:
-                # trim stacktrace since we have limitation on the error message
-                trimmed_token = self._trim_token_error(token)
-                err_message = str(e).splitlines()[-1]
-                raise Exception(
-                    f"Got {e.__class__.__name__} while parsing token '{trimmed_token}': {err_message}"
-                )
-            parsed_string = parsed_string.replace(token_to_replace, str(val))
-            return parsed_string
-        # this basically for complex expressions with functions and operators
-        for token in tokens:
-            token, escapes = token
-            token_to_replace = token
-            try:
-                if escapes:
-                    for escape in escapes:
-                        token = token[:escape] + "\\" + token[escape:]
-                val = self._parse_token(token)
-            except Exception as e:
-                trimmed_token = self._trim_token_error(token)
-                err_message = str(e).splitlines()[-1]
-                raise Exception(
-                    f"Got {e.__class__.__name__} while parsing token '{trimmed_token}': {err_message}"
-                )
-            parsed_string = parsed_string.replace(token_to_replace, str(val))
+        return self._render(string, safe, default, context, evaluate_functions=True)
+
+    def _call_keep_function(self, function: KeepFunction, arguments: list[str]):
+        # chevron.render will escape the quotes, we need to unescape them
+        arguments = [argument.replace("&quot;", '"') for argument in arguments]
+        if function.tree is None:
+            # its tags aren't plain arguments, it's parsed once they are rendered
+            token = escape_keep_function(arguments[0])
+        else:
+            token = function.source
+        try:
+            if function.tree is None:
+                return self._parse_token(parse_keep_function(token).body[0].value)
+            return self._parse_token(function.tree, arguments)
+        except Exception as e:
+            # trim stacktrace since we have limitation on the error message
+            trimmed_token = self._trim_token_error(token)
+            err_message = str(e).splitlines()[-1]
+            raise Exception(
+                f"Got {e.__class__.__name__} while parsing token '{trimmed_token}': {err_message}"
+            )
 
-        return parsed_string
+    def _parse_token(self, tree: ast.Call, arguments: list[str] | None = None):
+        """Evaluate a keep.* function call
 
-    def _parse_token(self, token):
-        # else, it contains a function e.g. len({{ value }}) or split({{ value }}, 'a', 'b')
-        def _parse(self, tree):
-            if isinstance(tree, ast.Module):
-                return _parse(self, tree.body[0].value)
+        Args:
+            tree (ast.Call): the call, see KeepFunction.tree
+            arguments (list[str], optional): the rendered arguments of a compiled call
+        """
 
+        # else, it contains a function e.g. len({{ value }}) or split({{ value }}, 'a', 'b')
+        def _parse(self, tree, arguments=None):
             if isinstance(tree, ast.Call):
                 func = tree.func
-                args = tree.args
+                args = []
+                for arg in tree.args:
+                    index = None
+                    if arguments is not None and isinstance(arg, ast.Name):
+                        index = argument_index(arg.id)
+                    if index is None:
+                        args.append((arg, arguments))
+                        continue
+                    # a rendered tag, e.g. keep.len({{ steps.this.results }}),
+                    #   parsed as the arguments it renders to
+                    token = escape_keep_function(f"keep._({arguments[index]})")
+                    rendered_args = parse_keep_function(token).body[0].value.args
+                    args.extend((rendered_arg, None) for rendered_arg in rendered_args)
                 # if its another function
                 _args = []
-                for arg in args:
+                for arg, arg_arguments in args:
                     _arg = None
                     if isinstance(arg, ast.Call):
-                        _arg = _parse(self, arg)
+                        _arg = _parse(self, arg, arg_arguments)
                     elif isinstance(arg, ast.Str) or isinstance(arg, ast.Constant):
                         _arg = str(arg.s)
+                        if arg_arguments is not None and isinstance(arg.s, str):
+                            _arg = substitute_arguments(_arg, arg_arguments)
                     elif isinstance(arg, ast.Dict):
                         _arg = ast.literal_eval(arg)
                     # set is basically {{ value }}
@@ -270,81 +201,68 @@ class IOHandler:
                 val = keep_func(*_args) if not kwargs else keep_func(*_args, **kwargs)
                 return val
 
-        try:
-            tree = ast.parse(token)
-        except SyntaxError as e:
-            if "unterminated string literal" in str(e):
-                # try to HTML escape the string
-                # this is happens when libraries such as datadog api client
-                # HTML escapes the string and then ast.parse fails ()
-                # https://github.com/keephq/keep/issues/137
-                import html
-
-                tree = ast.parse(
-                    html.unescape(token.replace("\r\n", "").replace("\n", ""))
-                )
-            else:
-                # for strings such as "45%\n", we need to escape
-                tree = ast.parse(token.encode("unicode_escape"))
-        return _parse(self, tree)
+        return _parse(self, tree, arguments)
 
-    def _render(self, key: str, safe=False, default=""):
-        if "{{^" in key or "{{ ^" in key:
+    def _render(
+        self, key: str, safe=False, default="", context=None, evaluate_functions=False
+    ):
+        compiled = compile_template(key)
+        if compiled.has_inverted_sections:
             self.logger.debug(
                 "Safe render is not supported when there are inverted sections."
             )
             safe = False
 
-        context = self.context_manager.get_full_context()
-        # TODO: protect from multithreaded where another thread will print to stderr, but thats a very rare case and we shouldn't care much
-        original_stderr = sys.stderr
-        sys.stderr = io.StringIO()
-        rendered = chevron.render(key, context, warn=True)
+        if context is None:
+            context = self.context_manager.get_full_context()
+        rendered, missing_keys = compiled.render(
+            context, self._call_keep_function if evaluate_functions else None
+        )
         # chevron.render will escape the quotes, we need to unescape them
         rendered = rendered.replace("&quot;", '"')
-        stderr_output = sys.stderr.getvalue()
-        sys.stderr = original_stderr
         # If render should failed if value does not exists
-        if safe and "Could not find key" in stderr_output:
+        if safe and missing_keys:
+            missing_keys = [
+                f"'{missing_key}'" for missing_key in dict.fromkeys(missing_keys)
+            ]
             # if more than one keys missing, pretiffy the error
-            if stderr_output.count("Could not find key") > 1:
-                missing_keys = stderr_output.split("Could not find key")
-                missing_keys = [
-                    missing_key.strip().replace("\n", "")
-                    for missing_key in missing_keys[1:]
-                ]
-                missing_keys = list(set(missing_keys))
+            if len(missing_keys) > 1:
                 err = "Could not find keys: " + ", ".join(missing_keys)
             else:
-                err = stderr_output.replace("\n", "")
+                err = f"Could not find key {missing_keys[0]}"
             raise RenderException(f"{err} in the context.")
         if not rendered:
             return default
         return rendered
 
-    def render_context(self, context_to_render: dict):
+    def render_context(self, context_to_render: dict, context: dict | None = None):
         """
         Iterates the provider context and renders it using the workflow context.
+
+        Args:
+            context (dict, optional): the workflow context, built once if not given
         """
+        if context is None:
+            context = self.context_manager.get_full_context()
         # Don't modify the original context
         context_to_render = copy.deepcopy(context_to_render)
         for key, value in context_to_render.items():
             if isinstance(value, str):
                 context_to_render[key] = self._render_template_with_context(
-                    value, safe=True
+                    value, safe=True, context=context
                 )
             elif isinstance(value, list):
-                context_to_render[key] = self._render_list_context(value)
+                context_to_render[key] = self._render_list_context(value, context)
             elif isinstance(value, dict):
-                context_to_render[key] = self.render_context(value)
+                context_to_render[key] = self.render_context(value, context)
             elif isinstance(value, StepProviderParameter):
                 safe = value.safe and value.default is not None
                 context_to_render[key] = self._render_template_with_context(
-                    value.key, safe=safe, default=value.default
+                    value.key, safe=safe, default=value.default, context=context
                 )
         return context_to_render
 
-    def _render_list_context(self, context_to_render: list):
+    def _render_list_context(self, context_to_render: list, context: dict):
         """
         Iterates the provider context and renders it using the workflow context.
         """
@@ -352,27 +270,32 @@ class IOHandler:
             value = context_to_render[i]
             if isinstance(value, str):
                 context_to_render[i] = self._render_template_with_context(
-                    value, safe=True
+                    value, safe=True, context=context
                 )
             if isinstance(value, list):
-                context_to_render[i] = self._render_list_context(value)
+                context_to_render[i] = self._render_list_context(value, context)
             if isinstance(value, dict):
-                context_to_render[i] = self.render_context(value)
+                context_to_render[i] = self.render_context(value, context)
         return context_to_render
 
     def _render_template_with_context(
-        self, template: str, safe: bool = False, default: str = ""
+        self,
+        template: str,
+        safe: bool = False,
+        default: str = "",
+        context: dict | None = None,
     ) -> str:
         """
         Renders a template with the given context.
 
         Args:
             template (str): template (string) to render
+            context (dict, optional): the workflow context
 
         Returns:
             str: rendered template
         """
-        rendered_template = self.render(template, safe, default)
+        rendered_template = self.render(template, safe, default, context)
 
         # shorten urls if enabled
         if self.shorten_urls:
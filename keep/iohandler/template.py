@@ -0,0 +1,504 @@
+"""
+Compiled templates for IOHandler: mustache tokens and keep.* function calls,
+compiled once per template source and rendered without chevron's stderr capture.
+"""
+
+import ast
+import dataclasses
+import functools
+import html
+import itertools
+import os
+import re
+import typing
+from collections.abc import Callable, Iterator, Sequence
+
+import chevron
+from chevron.tokenizer import tokenize
+
+KEEP_TEMPLATES_CACHE_SIZE = int(os.environ.get("KEEP_TEMPLATES_CACHE_SIZE", 10000))
+
+Token = tuple[str, str]
+
+# a tag of a keep.* function call argument, in the call parsed with the template
+_ARGUMENT = "__keep_template_{}__"
+_ARGUMENT_RE = re.compile(r"__keep_template_(\d+)__")
+_TAG_RE = re.compile(r"\{\{\{.*?\}\}\}|\{\{.*?\}\}", re.DOTALL)
+# where a keep.* function call is in the template, tokenized as literal text
+_FUNCTION_MARKER = "\x00{}\x00"
+_FUNCTION_MARKER_RE = re.compile(r"\x00(\d+)\x00")
+
+
+@dataclasses.dataclass(frozen=True)
+class KeepFunction:
+    # the call in the template, e.g. keep.len({{ steps.this.results }})
+    source: str
+    tokens: tuple[Token, ...]
+    # the call parsed once, its arguments' tags replaced by _ARGUMENT names.
+    #   None if the tags aren't plain arguments, it's parsed after rendering then
+    tree: ast.Call | None
+    # the templates rendered for every call: the arguments' tags (by their
+    #   _ARGUMENT index), or the whole call when it's parsed after rendering
+    arguments: tuple[tuple[Token, ...], ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class Template:
+    source: str
+    # the keep.* function calls are ("keep function", <index in functions>) tokens
+    tokens: tuple[Token, ...]
+    functions: tuple[KeepFunction, ...]
+    # missing keys can't be detected reliably in inverted sections
+    has_inverted_sections: bool
+    # why the template is invalid, raised when it's rendered
+    error: str | None = None
+
+    def render(
+        self,
+        context: dict,
+        call_function: Callable[[KeepFunction, list[str]], typing.Any] | None = None,
+    ) -> tuple[str, list[str]]:
+        """Render the template with the context
+
+        Args:
+            call_function: evaluates a keep.* function call, with its rendered
+                arguments. Without it, the calls are rendered as text.
+
+        Returns:
+            tuple[str, list[str]]: the rendered text, and the keys that are missing
+                from the context (once per occurrence, in the order they were looked up)
+        """
+        missing_keys = []
+        rendered = _render(
+            iter(self.tokens), [context], missing_keys, self.functions, call_function
+        )
+        return rendered, missing_keys
+
+
+@functools.lru_cache(maxsize=KEEP_TEMPLATES_CACHE_SIZE)
+def compile_template(source: str) -> Template:
+    """Compile (and cache) a template, raises chevron's ChevronError for bad tags
+
+    Only the keep.* function calls of the template itself are compiled and
+    evaluated, keep.* text coming from the context (e.g. an alert) is rendered as is.
+    """
+    error = None
+    # check if inside the mustache is object in the context
+    if source.count("}}") != source.count("{{"):
+        error = f"Invalid template - number of }} and {{ does not match {source}"
+    # TODO - better validate functions
+    elif source.count("(") != source.count(")"):
+        error = f"Invalid template - number of ( and ) does not match {source}"
+    if error:
+        return Template(source, (), (), False, error)
+    functions = ()
+    # the set delimiter tags change what a tag is, the calls aren't compiled then
+    if "keep." in source and "{{=" not in source:
+        source_with_markers, functions = _compile_functions(source)
+    else:
+        source_with_markers = source
+    tokens = []
+    for tag, key in tokenize(source_with_markers):
+        if tag != "literal" or not functions:
+            tokens.append((tag, key))
+            continue
+        # split the literal text around the function calls' markers
+        for i, part in enumerate(_FUNCTION_MARKER_RE.split(key)):
+            if i % 2:
+                tokens.append(("keep function", part))
+            elif part:
+                tokens.append(("literal", part))
+    return Template(
+        source=source,
+        tokens=tuple(tokens),
+        functions=functions,
+        has_inverted_sections=any(
+            tag == "inverted section"
+            for tag, _ in itertools.chain(
+                tokens, *(function.tokens for function in functions)
+            )
+        ),
+    )
+
+
+def _compile_functions(source: str) -> tuple[str, tuple[KeepFunction, ...]]:
+    """Find the keep.* function calls of a template and compile them
+
+    Returns:
+        the template with the calls replaced by markers, and the calls
+    """
+    tags = []
+
+    def _argument(match: re.Match) -> str:
+        tags.append(match.group(0))
+        return _ARGUMENT.format(len(tags) - 1)
+
+    # the tags are replaced by names, so they are scanned (and parsed) as arguments
+    text = _TAG_RE.sub(_argument, source)
+    functions = []
+    parts = []
+    position = 0
+    for call, _ in extract_keep_functions(text):
+        try:
+            function = _compile_function(call, tags)
+        except chevron.ChevronError:
+            # a section that isn't closed in the call, it's rendered as text
+            continue
+        start = text.find(call, position)
+        parts.append(text[position:start])
+        parts.append(_FUNCTION_MARKER.format(len(functions)))
+        position = start + len(call)
+        functions.append(function)
+    parts.append(text[position:])
+
+    def _tag(match: re.Match) -> str:
+        return tags[int(match.group(1))]
+
+    return _ARGUMENT_RE.sub(_tag, "".join(parts)), tuple(functions)
+
+
+def _compile_function(call: str, tags: list[str]) -> KeepFunction:
+    call_tags = []
+
+    def _argument(match: re.Match) -> str:
+        call_tags.append(tags[int(match.group(1))])
+        return _ARGUMENT.format(len(call_tags) - 1)
+
+    # the arguments numbered from 0 in every call
+    call = _ARGUMENT_RE.sub(_argument, call)
+    source = _ARGUMENT_RE.sub(lambda match: call_tags[int(match.group(1))], call)
+    tokens = tuple(tokenize(source))
+    tree = None
+    # only the variables can be rendered as arguments, not the sections
+    if all(_is_variable(tag) for tag in call_tags):
+        tree = _parse_function_tree(call)
+    if tree is None:
+        return KeepFunction(source, tokens, None, (tokens,))
+    return KeepFunction(
+        source, tokens, tree, tuple(tuple(tokenize(tag)) for tag in call_tags)
+    )
+
+
+def _is_variable(tag: str) -> bool:
+    if tag.startswith("{{{"):
+        return True
+    # "&" is a variable too, not escaped
+    return tag[2:].lstrip()[:1] not in ("#", "^", "/", "!", ">", "=")
+
+
+def _parse_function_tree(call: str) -> ast.Call | None:
+    """Parse a call whose arguments' tags are _ARGUMENT names, if the names are
+    plain arguments (a name, or in a string) of the keep.* functions"""
+    try:
+        tree = parse_keep_function(escape_keep_function(call))
+        tree = tree.body[0].value
+    except Exception:
+        return None
+    return tree if _arguments_are_plain(tree) else None
+
+
+def _arguments_are_plain(tree: ast.AST) -> bool:
+    if not isinstance(tree, ast.Call) or _ARGUMENT_RE.search(ast.dump(tree.func)):
+        return False
+    for arg in tree.args:
+        if isinstance(arg, ast.Call):
+            if not _arguments_are_plain(arg):
+                return False
+        elif isinstance(arg, ast.Name):
+            if _ARGUMENT_RE.search(arg.id) and not _ARGUMENT_RE.fullmatch(arg.id):
+                return False
+        elif not isinstance(arg, ast.Constant) and _ARGUMENT_RE.search(ast.dump(arg)):
+            return False
+    return True
+
+
+def argument_index(name: str) -> int | None:
+    """The index of the argument a name of a compiled call stands for"""
+    match = _ARGUMENT_RE.fullmatch(name)
+    return int(match.group(1)) if match else None
+
+
+def substitute_arguments(text: str, arguments: list[str]) -> str:
+    """Substitute the rendered arguments in a string of a compiled call"""
+    return _ARGUMENT_RE.sub(lambda match: arguments[int(match.group(1))], text)
+
+
+def escape_keep_function(token: str) -> str:
+    """Escape the quotes (inside the strings) of a keep.* function call to parse it"""
+    functions = extract_keep_functions(token)
+    if not functions or not token.startswith(functions[0][0]):
+        return token
+    escapes_counter = 0
+    for escape in functions[0][1]:
+        token = (
+            token[: escape + escapes_counter] + "\\" + token[escape + escapes_counter :]
+        )
+        # we need to increment the counter because we added a character
+        escapes_counter += 1
+    return token
+
+
+def extract_keep_functions(text: str) -> tuple[tuple[str, dict[int, str]], ...]:
+    """Find the keep.* function calls in a (rendered) text
+
+    Returns:
+        tuple[tuple[str, dict[int, str]], ...]: every function call, and the positions
+            of the quotes that should be escaped to parse it
+    """
+    matches = []
+    i = 0
+    while i < len(text):
+        if text[i : i + 5] == "keep.":
+            start = i
+            func_start = text.find("(", start)
+            if func_start > -1:  # Opening '(' found after "keep."
+                i = func_start + 1  # Move i to the character after '('
+                parent_count = 1
+                in_string = False
+                escape_next = False
+                quote_char = ""
+                escapes = {}
+                while i < len(text) and (parent_count > 0 or in_string):
+                    if text[i] == "\\" and in_string and not escape_next:
+                        escape_next = True
+                        i += 1
+                        continue
+                    elif text[i] in ('"', "'"):
+                        if not in_string:
+                            in_string = True
+                            quote_char = text[i]
+                        elif (
+                            text[i] == quote_char
+                            and not escape_next
+                            and (
+                                str(text[i + 1]).isalnum() == False
+                                and str(text[i + 1]) != " "
+                            )  # end of statement, arg, etc. if its alpha numeric or whitespace, we just need to escape it
+                        ):
+                            in_string = False
+                            quote_char = ""
+                        elif text[i] == quote_char and not escape_next:
+                            escapes[i] = text[
+                                i
+                            ]  # Save the quote character where we need to escape for valid ast parsing
+                    elif text[i] == "(" and not in_string:
+                        parent_count += 1
+                    elif text[i] == ")" and not in_string:
+                        parent_count -= 1
+
+                    escape_next = False
+                    i += 1
+
+                if parent_count == 0:
+                    matches.append((text[start:i], escapes))
+                continue  # Skip the increment at the end of the loop to continue from the current position
+            else:
+                # If no '(' found, increment i to move past "keep."
+                i += 5
+        else:
+            i += 1
+    return tuple(matches)
+
+
+def parse_keep_function(token: str) -> ast.Module:
+    """Parse a keep.* function call"""
+    try:
+        return ast.parse(token)
+    except SyntaxError as e:
+        if "unterminated string literal" in str(e):
+            # try to HTML escape the string
+            # this is happens when libraries such as datadog api client
+            # HTML escapes the string and then ast.parse fails ()
+            # https://github.com/keephq/keep/issues/137
+            return ast.parse(html.unescape(token.replace("\r\n", "").replace("\n", "")))
+        # for strings such as "45%\n", we need to escape
+        return ast.parse(token.encode("unicode_escape"))
+
+
+def _render(
+    tokens: Iterator[Token],
+    scopes: list,
+    missing_keys: list[str],
+    functions: Sequence[KeepFunction] = (),
+    call_function: Callable[[KeepFunction, list[str]], typing.Any] | None = None,
+) -> str:
+    """chevron.renderer.render (0.14), without partials, with the keep.* functions"""
+    output = ""
+    for tag, key in tokens:
+        # Set the current scope
+        current_scope = scopes[0]
+
+        # If we're an end tag
+        if tag == "end":
+            # Pop out of the latest scope
+            del scopes[0]
+
+        # If the current scope is falsy and not the only scope
+        elif not current_scope and len(scopes) != 1:
+            if tag in ["section", "inverted section"]:
+                # Set the most recent scope to a falsy value
+                scopes.insert(0, False)
+
+        elif tag == "literal":
+            output += key
+
+        elif tag == "keep function":
+            function = functions[int(key)]
+            if call_function is None:
+                output += _render(iter(function.tokens), scopes, missing_keys)
+            else:
+                arguments = [
+                    _render(iter(argument), scopes, missing_keys)
+                    for argument in function.arguments
+                ]
+                output += str(call_function(function, arguments))
+
+        elif tag == "variable":
+            thing = _get_key(key, scopes, missing_keys)
+            if thing is True and key == ".":
+                # if we've coerced into a boolean by accident
+                # (inverted tags do this)
+                # then get the un-coerced object (next in the stack)
+                thing = scopes[1]
+            if not isinstance(thing, str):
+                thing = str(thing)
+            output += _html_escape(thing)
+
+        elif tag == "no escape":
+            thing = _get_key(key, scopes, missing_keys)
+            if not isinstance(thing, str):
+                thing = str(thing)
+            output += thing
+
+        elif tag == "section":
+            scope = _get_key(key, scopes, missing_keys)
+            if isinstance(scope, Callable):
+                # lambdas get the text of the section, rendered by chevron
+                output += scope(
+                    _section_text(tokens, key, functions),
+                    lambda template, data=None: chevron.render(
+                        template, scopes=data and [data] + scopes or scopes
+                    ),
+                )
+            elif isinstance(scope, (Sequence, Iterator)) and not isinstance(scope, str):
+                # Gather up all the tags inside the section
+                # (And don't be tricked by nested end tags with the same key)
+                tags = []
+                tags_with_same_key = 0
+                for token in tokens:
+                    if token == ("section", key):
+                        tags_with_same_key += 1
+                    if token == ("end", key):
+                        tags_with_same_key -= 1
+                        if tags_with_same_key < 0:
+                            break
+                    tags.append(token)
+
+                # For every item in the scope, render the section with it
+                for thing in scope:
+                    output += _render(
+                        iter(tags),
+                        [thing] + scopes,
+                        missing_keys,
+                        functions,
+                        call_function,
+                    )
+            else:
+                # Otherwise we're just a scope section
+                scopes.insert(0, scope)
+
+        elif tag == "inverted section":
+            # Add the flipped scope to the scopes
+            scope = _get_key(key, scopes, missing_keys)
+            scopes.insert(0, not scope)
+
+        # comments, set delimiters and partials (not supported) render nothing
+    return output
+
+
+def _get_key(key: str, scopes: list, missing_keys: list[str]) -> typing.Any:
+    """chevron.renderer._get_key, reports the missing keys instead of printing them"""
+    # If the key is a dot
+    if key == ".":
+        # Then just return the current scope
+        return scopes[0]
+
+    # Loop through the scopes
+    for scope in scopes:
+        try:
+            # For every dot seperated key
+            for child in key.split("."):
+                # Move into the scope
+                try:
+                    # Try subscripting (Normal dictionaries)
+                    scope = scope[child]
+                except (TypeError, AttributeError):
+                    try:
+                        scope = getattr(scope, child)
+                    except (TypeError, AttributeError):
+                        # Try as a list
+                        scope = scope[int(child)]
+
+            # Return an empty string if falsy, with two exceptions
+            # 0 should return 0, and False should return False
+            if scope in (0, False):
+                return scope
+
+            try:
+                # This allows for custom falsy data types
+                # https://github.com/noahmorrison/chevron/issues/35
+                if scope._CHEVRON_return_scope_when_falsy:
+                    return scope
+            except AttributeError:
+                return scope or ""
+        except (AttributeError, KeyError, IndexError, ValueError):
+            # We couldn't find the key in the current scope
+            # We'll try again on the next pass
+            pass
+
+    # We couldn't find the key in any of the scopes
+    missing_keys.append(key)
+    return ""
+
+
+def _html_escape(string: str) -> str:
+    """HTML escape all of these " & < >"""
+    # & must be handled first
+    return (
+        string.replace("&", "&amp;")
+        .replace('"', "&quot;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+    )
+
+
+def _section_text(
+    tokens: Iterator[Token], key: str, functions: Sequence[KeepFunction]
+) -> str:
+    """The text of a section, up to its end tag"""
+    text = ""
+    for token in tokens:
+        if token == ("end", key):
+            break
+        tag_type, tag_key = token
+        if tag_type == "literal":
+            text += tag_key
+        elif tag_type == "keep function":
+            text += functions[int(tag_key)].source
+        elif tag_type == "no escape":
+            text += "{{& %s }}" % tag_key
+        else:
+            text += "{{%s %s}}" % (
+                {
+                    "comment": "!",
+                    "section": "#",
+                    "inverted section": "^",
+                    "end": "/",
+                    "partial": ">",
+                    "set delimiter": "=",
+                    "no escape": "&",
+                    "variable": "",
+                }[tag_type],
+                tag_key,
+            )
+    return text
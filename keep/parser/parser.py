@@ -1,6 +1,7 @@
 import json
 import logging
 import os
+import re
 import typing
 
 import yaml
@@ -13,6 +14,9 @@ from keep.step.step import Step, StepType
 from keep.step.step_provider_parameter import StepProviderParameter
 from keep.workflowmanager.workflow import Workflow, WorkflowStrategy
 
+# {{ steps.<name>... }} references in the steps and actions templates
+STEPS_REFERENCE = re.compile(r"\bsteps\.([\w-]+)")
+
 
 class Parser:
     def __init__(self):
@@ -126,6 +130,7 @@ class Parser:
         workflow_tags = self._parse_tags(workflow)
         workflow_steps = self._parse_steps(context_manager, workflow)
         workflow_actions = self._parse_actions(context_manager, workflow)
+        self._parse_dependencies(workflow_steps, workflow_actions)
         workflow_interval = self.parse_interval(workflow)
         on_failure_action = self._get_on_failure_action(workflow)
         workflow_triggers = self.get_triggers_from_workflow(workflow)
@@ -150,6 +155,7 @@ class Parser:
             context_manager=context_manager,
             workflow_providers_type=workflow_provider_types,
             workflow_strategy=workflow_strategy,
+            workflow_actions_concurrency=int(workflow.get("actions-concurrency", 1)),
         )
         self.logger.debug("Workflow parsed successfully")
         return workflow
@@ -338,6 +344,72 @@ class Parser:
         self.logger.debug("Steps parsed successfully")
         return workflow_steps_parsed
 
+    def _parse_dependencies(
+        self, workflow_steps: typing.List[Step], workflow_actions: typing.List[Step]
+    ):
+        """
+        Set the steps each step depends on, and the actions each action depends on
+        (the actions run after all the steps), so independent steps run concurrently.
+
+        A step depends on the previous steps it references ({{ steps.<name> }} or
+        the aliases of their conditions), and on the steps in its `depends_on`.
+        A step that references {{ steps.this }} depends on the order the steps ran
+        in, so it has no dependencies (None) and the workflow runs in order.
+
+        Raises:
+            ValueError: depends_on references an unknown step or a circular dependency.
+        """
+        for steps, previous_steps in (
+            (workflow_steps, []),
+            (workflow_actions, workflow_steps),
+        ):
+            names = [step.step_id for step in steps]
+            previous_names = {step.step_id for step in previous_steps}
+            for i, step in enumerate(steps):
+                config = json.dumps(step.config, default=str)
+                references = set(STEPS_REFERENCE.findall(config))
+                if "this" in references:
+                    step.dependencies = None
+                    continue
+                dependencies = {name for name in names[:i] if name in references}
+                for previous_step in steps[:i]:
+                    for condition in previous_step.conditions:
+                        alias = condition.get("alias")
+                        if alias and re.search(
+                            rf"(?<![\w.-]){re.escape(alias)}(?![\w-])", config
+                        ):
+                            dependencies.add(previous_step.step_id)
+                depends_on = step.config.get("depends_on", [])
+                if isinstance(depends_on, str):
+                    depends_on = [depends_on]
+                for name in depends_on:
+                    if name in names and name != step.step_id:
+                        dependencies.add(name)
+                    elif name not in previous_names:
+                        raise ValueError(
+                            f"{step.step_id} depends on an unknown step {name}"
+                        )
+                step.dependencies = [name for name in names if name in dependencies]
+            self._check_circular_dependencies(steps)
+
+    @staticmethod
+    def _check_circular_dependencies(steps: typing.List[Step]):
+        done = {step.step_id for step in steps if step.dependencies is None}
+        pending = [step for step in steps if step.dependencies is not None]
+        while pending:
+            ready = [
+                step
+                for step in pending
+                if all(dependency in done for dependency in step.dependencies)
+            ]
+            if not ready:
+                raise ValueError(
+                    "Circular dependency between "
+                    + ", ".join(step.step_id for step in pending)
+                )
+            done.update(step.step_id for step in ready)
+            pending = [step for step in pending if step not in ready]
+
     def _get_step_provider(self, context_manager: ContextManager, _step: dict) -> dict:
         step_provider = _step.get("provider")
         try:
@@ -6,6 +6,7 @@ import abc
 import copy
 import datetime
 import hashlib
+import inspect
 import itertools
 import json
 import logging
@@ -15,6 +16,7 @@ import re
 import uuid
 from typing import Literal, Optional
 
+import dateutil.parser
 import opentelemetry.trace as trace
 import requests
 
@@ -22,6 +24,7 @@ from keep.api.core.db import enrich_alert, get_enrichments
 from keep.api.models.alert import AlertDto, AlertSeverity, AlertStatus
 from keep.api.utils.enrichment_helpers import parse_and_enrich_deleted_and_assignees
 from keep.contextmanager.contextmanager import ContextManager
+from keep.providers.http_sessions import HttpSessions
 from keep.providers.models.provider_config import ProviderConfig, ProviderScope
 from keep.providers.models.provider_method import ProviderMethod
 
@@ -72,6 +75,22 @@ class BaseProvider(metaclass=abc.ABCMeta):
         # tb: we can have this overriden by customer configuration, when initializing the provider
         self.fingerprint_fields = self.FINGERPRINT_FIELDS
 
+    def get_http_session(
+        self, url: str, credentials: Optional[object] = None
+    ) -> requests.Session:
+        """
+        A pooled, keep-alive session to the url's server, with default timeouts and
+        retries (see keep/providers/http_sessions.py).
+
+        Args:
+            url (str): Any url of the server.
+            credentials (object, optional): What the requests authenticate with.
+                Defaults to the provider's authentication config.
+        """
+        if credentials is None:
+            credentials = self.config.authentication
+        return HttpSessions.get_instance().get_session(url, credentials)
+
     def _extract_type(self):
         """
         Extract the provider type from the provider class name.
@@ -86,6 +105,22 @@ class BaseProvider(metaclass=abc.ABCMeta):
         )
         return name_with_spaces.replace(" ", ".")
 
+    def clone(self, context_manager: ContextManager) -> "BaseProvider":
+        """
+        Copy the provider for another workflow run, without validating its config again.
+
+        Args:
+            context_manager (ContextManager): The context of the run.
+
+        Returns:
+            BaseProvider: A shallow copy bound to the context, the config is shared.
+        """
+        provider = copy.copy(self)
+        provider.context_manager = context_manager
+        provider.logger = context_manager.get_logger()
+        provider.results = []
+        return provider
+
     @abc.abstractmethod
     def dispose(self):
         """
@@ -311,17 +346,43 @@ class BaseProvider(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError("get_alerts() method not implemented")
 
-    def get_alerts(self) -> list[AlertDto]:
+    def get_alerts(self, since: datetime.datetime | None = None) -> list[AlertDto]:
         """
         Get alerts from the provider.
+
+        Args:
+            since (datetime.datetime, optional): Only the alerts received after this
+                time (UTC). Providers whose _get_alerts accepts `since` ask their API
+                for these alerts only, the alerts of the others are filtered.
         """
         with tracer.start_as_current_span(f"{self.__class__.__name__}-get_alerts"):
-            alerts = self._get_alerts()
+            if since is None:
+                alerts = self._get_alerts()
+            elif "since" in inspect.signature(self._get_alerts).parameters:
+                alerts = self._get_alerts(since=since)
+            else:
+                alerts = []
+                for alert in self._get_alerts():
+                    received = BaseProvider.get_alert_received_time(alert)
+                    # the alerts without a (valid) lastReceived are always returned
+                    if received is None or received > since:
+                        alerts.append(alert)
             # enrich alerts with provider id
             for alert in alerts:
                 alert.providerId = self.provider_id
             return alerts
 
+    @staticmethod
+    def get_alert_received_time(alert: AlertDto) -> datetime.datetime | None:
+        """The lastReceived of the alert (naive UTC), None if it's invalid"""
+        try:
+            received = dateutil.parser.isoparse(alert.lastReceived)
+        except (TypeError, ValueError):
+            return None
+        if received.tzinfo is not None:
+            received = received.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return received
+
     def get_alerts_by_fingerprint(self, tenant_id: str) -> dict[str, list[AlertDto]]:
         """
         Get alerts from the provider grouped by fingerprint, sorted by lastReceived.
@@ -537,7 +598,9 @@ class BaseProvider(metaclass=abc.ABCMeta):
             "Accept": "application/json",
             "X-API-KEY": self.context_manager.api_key,
         }
-        response = requests.post(url, json=alert_model.dict(), headers=headers)
+        response = self.get_http_session(url).post(
+            url, json=alert_model.dict(), headers=headers
+        )
         try:
             response.raise_for_status()
             self.logger.info("Alert pushed successfully")
@@ -555,7 +555,7 @@ class DatadogProvider(BaseProvider):
                 )
         return monitors
 
-    def _get_alerts(self) -> list[AlertDto]:
+    def _get_alerts(self, since: datetime.datetime | None = None) -> list[AlertDto]:
         formatted_alerts = []
         with ApiClient(self.configuration) as api_client:
             # tb: when it's out of beta, we should move to api v2
@@ -568,9 +568,16 @@ class DatadogProvider(BaseProvider):
             api = EventsApi(api_client)
             end = datetime.datetime.now()
             # tb: we can make timedelta configurable by the user if we want
-            start = datetime.datetime.now() - datetime.timedelta(days=14)
+            start = int(
+                (datetime.datetime.now() - datetime.timedelta(days=14)).timestamp()
+            )
+            if since is not None:
+                # only the events after the last pull (since is UTC)
+                start = max(
+                    start, int(since.replace(tzinfo=datetime.timezone.utc).timestamp())
+                )
             results = api.list_events(
-                start=int(start.timestamp()),
+                start=start,
                 end=int(end.timestamp()),
                 tags="source:alert",
             )
@@ -120,13 +120,17 @@ class GrafanaProvider(BaseProvider):
                 f"https://{self.authentication_config.host}"
             )
 
+    @property
+    def _http(self) -> requests.Session:
+        return self.get_http_session(self.authentication_config.host)
+
     def validate_scopes(self) -> dict[str, bool | str]:
         headers = {"Authorization": f"Bearer {self.authentication_config.token}"}
         permissions_api = (
             f"{self.authentication_config.host}/api/access-control/user/permissions"
         )
         try:
-            response = requests.get(
+            response = self._http.get(
                 permissions_api, headers=headers, timeout=5, verify=False
             ).json()
         except requests.exceptions.ConnectionError:
@@ -154,7 +158,7 @@ class GrafanaProvider(BaseProvider):
     def get_alerts_configuration(self, alert_id: str | None = None):
         api = f"{self.authentication_config.host}{APIEndpoints.ALERTING_PROVISIONING.value}/alert-rules"
         headers = {"Authorization": f"Bearer {self.authentication_config.token}"}
-        response = requests.get(api, verify=False, headers=headers)
+        response = self._http.get(api, verify=False, headers=headers)
         if not response.ok:
             self.logger.warning(
                 "Could not get alerts", extra={"response": response.json()}
@@ -171,7 +175,7 @@ class GrafanaProvider(BaseProvider):
         self.logger.info("Deploying alert")
         api = f"{self.authentication_config.host}{APIEndpoints.ALERTING_PROVISIONING.value}/alert-rules"
         headers = {"Authorization": f"Bearer {self.authentication_config.token}"}
-        response = requests.post(api, verify=False, json=alert, headers=headers)
+        response = self._http.post(api, verify=False, json=alert, headers=headers)
 
         if not response.ok:
             response_json = response.json()
@@ -239,7 +243,7 @@ class GrafanaProvider(BaseProvider):
         contacts_api = f"{self.authentication_config.host}{APIEndpoints.ALERTING_PROVISIONING.value}/contact-points"
         try:
             self.logger.info("Getting contact points")
-            all_contact_points = requests.get(
+            all_contact_points = self._http.get(
                 contacts_api, verify=False, headers=headers
             )
             all_contact_points.raise_for_status()
@@ -259,7 +263,7 @@ class GrafanaProvider(BaseProvider):
         self.logger.info("Getting Grafana version")
         try:
             health_api = f"{self.authentication_config.host}/api/health"
-            health_response = requests.get(
+            health_response = self._http.get(
                 health_api, verify=False, headers=headers
             ).json()
             grafana_version = health_response["version"]
@@ -275,7 +279,7 @@ class GrafanaProvider(BaseProvider):
                 webhook["settings"]["url"] = keep_api_url
                 webhook["settings"]["authorization_scheme"] = "digest"
                 webhook["settings"]["authorization_credentials"] = api_key
-                requests.put(
+                self._http.put(
                     f'{contacts_api}/{webhook["uid"]}',
                     verify=False,
                     json=webhook,
@@ -294,7 +298,7 @@ class GrafanaProvider(BaseProvider):
                         "authorization_credentials": api_key,
                     },
                 }
-                response = requests.post(
+                response = self._http.post(
                     contacts_api,
                     verify=False,
                     json=webhook,
@@ -309,7 +313,7 @@ class GrafanaProvider(BaseProvider):
             if webhook_exists:
                 webhook = webhook_exists[0]
                 webhook["settings"]["url"] = f"{keep_api_url}&api_key={api_key}"
-                requests.put(
+                self._http.put(
                     f'{contacts_api}/{webhook["uid"]}',
                     verify=False,
                     json=webhook,
@@ -326,7 +330,7 @@ class GrafanaProvider(BaseProvider):
                         "url": f"{keep_api_url}?api_key={api_key}",
                     },
                 }
-                response = requests.post(
+                response = self._http.post(
                     contacts_api,
                     verify=False,
                     json=webhook,
@@ -339,7 +343,7 @@ class GrafanaProvider(BaseProvider):
         if setup_alerts:
             self.logger.info("Setting up alerts")
             policies_api = f"{self.authentication_config.host}{APIEndpoints.ALERTING_PROVISIONING.value}/policies"
-            all_policies = requests.get(
+            all_policies = self._http.get(
                 policies_api, verify=False, headers=headers
             ).json()
             policy_exists = any(
@@ -374,7 +378,7 @@ class GrafanaProvider(BaseProvider):
                         "continue": True,
                     }
                 )
-                requests.put(
+                self._http.put(
                     policies_api,
                     verify=False,
                     json=all_policies,
@@ -435,14 +439,21 @@ class GrafanaProvider(BaseProvider):
                         continue
         return alert_dtos
 
-    def _get_alerts(self) -> list[AlertDto]:
+    def _get_alerts(self, since: datetime.datetime | None = None) -> list[AlertDto]:
         week_ago = int(
             (datetime.datetime.now() - datetime.timedelta(days=7)).timestamp()
         )
+        if since is not None:
+            # only the history after the last pull (since is UTC)
+            week_ago = max(
+                week_ago, int(since.replace(tzinfo=datetime.timezone.utc).timestamp())
+            )
         now = int(datetime.datetime.now().timestamp())
         api_endpoint = f"{self.authentication_config.host}/api/v1/rules/history?from={week_ago}&to={now}&limit=0"
         headers = {"Authorization": f"Bearer {self.authentication_config.token}"}
-        response = requests.get(api_endpoint, verify=False, headers=headers, timeout=3)
+        response = self._http.get(
+            api_endpoint, verify=False, headers=headers, timeout=3
+        )
         if not response.ok:
             raise ProviderException("Failed to get alerts from Grafana")
         events_history = response.json()
@@ -4,7 +4,6 @@ HttpProvider is a class that provides a way to send HTTP requests.
 import json
 import typing
 
-import requests
 from requests.exceptions import JSONDecodeError
 
 from keep.contextmanager.contextmanager import ContextManager
@@ -103,20 +102,21 @@ class HttpProvider(BaseProvider):
                 "params": params,
             },
         )
+        session = self.get_http_session(url)
         if method == "GET":
-            response = requests.get(
+            response = session.get(
                 url, headers=headers, params=params, proxies=proxies, **kwargs
             )
         elif method == "POST":
-            response = requests.post(
+            response = session.post(
                 url, headers=headers, json=body, proxies=proxies, **kwargs
             )
         elif method == "PUT":
-            response = requests.put(
+            response = session.put(
                 url, headers=headers, json=body, proxies=proxies, **kwargs
             )
         elif method == "DELETE":
-            response = requests.delete(
+            response = session.delete(
                 url, headers=headers, json=body, proxies=proxies, **kwargs
             )
         else:
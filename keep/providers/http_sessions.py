@@ -0,0 +1,238 @@
+"""
+Pooled, keep-alive HTTP sessions for the providers, with default timeouts and retries,
+shared by the provider instances of the process (see BaseProvider.get_http_session).
+"""
+
+import dataclasses
+import hashlib
+import http.cookiejar
+import json
+import os
+import threading
+import time
+import typing
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# seconds
+KEEP_PROVIDERS_HTTP_CONNECT_TIMEOUT = float(
+    os.environ.get("KEEP_PROVIDERS_HTTP_CONNECT_TIMEOUT", 5)
+)
+# seconds
+KEEP_PROVIDERS_HTTP_READ_TIMEOUT = float(
+    os.environ.get("KEEP_PROVIDERS_HTTP_READ_TIMEOUT", 30)
+)
+KEEP_PROVIDERS_HTTP_RETRIES = int(os.environ.get("KEEP_PROVIDERS_HTTP_RETRIES", 3))
+# seconds, the retries wait backoff * 2 ** (retry - 1)
+KEEP_PROVIDERS_HTTP_BACKOFF = float(os.environ.get("KEEP_PROVIDERS_HTTP_BACKOFF", 0.5))
+# seconds, the longest Retry-After that is waited for before a retry
+KEEP_PROVIDERS_HTTP_MAX_RETRY_AFTER = float(
+    os.environ.get("KEEP_PROVIDERS_HTTP_MAX_RETRY_AFTER", 30)
+)
+# connections kept alive per host
+KEEP_PROVIDERS_HTTP_POOL_SIZE = int(os.environ.get("KEEP_PROVIDERS_HTTP_POOL_SIZE", 10))
+KEEP_PROVIDERS_HTTP_MAX_SESSIONS = int(
+    os.environ.get("KEEP_PROVIDERS_HTTP_MAX_SESSIONS", 256)
+)
+
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+@dataclasses.dataclass
+class HttpRequestStats:
+    requests: int = 0
+    # the requests that raised (connection errors, timeouts)
+    errors: int = 0
+    # the responses with a 5xx status
+    server_errors: int = 0
+    # seconds, including the retries
+    total_duration: float = 0.0
+    max_duration: float = 0.0
+
+
+class CappedRetry(Retry):
+    """A Retry that waits at most max_retry_after seconds for a Retry-After header"""
+
+    def __init__(
+        self,
+        *args,
+        max_retry_after: float = KEEP_PROVIDERS_HTTP_MAX_RETRY_AFTER,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+
+    def new(self, **kwargs):
+        # the retries are copied after every attempt
+        retry = super().new(**kwargs)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.max_retry_after)
+
+
+class PooledSession(requests.Session):
+    """A session with default timeouts that records its requests"""
+
+    def __init__(
+        self,
+        timeout: tuple[float, float],
+        on_request: typing.Callable[[str, float, int | None], None],
+    ):
+        super().__init__()
+        self.timeout = timeout
+        self._on_request = on_request
+        # shared by several provider instances, keep no state between requests
+        self.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+
+    def request(self, method, url, *args, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        start = time.monotonic()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException:
+            self._on_request(url, time.monotonic() - start, None)
+            raise
+        self._on_request(url, time.monotonic() - start, response.status_code)
+        return response
+
+
+class HttpSessions:
+    def __init__(
+        self,
+        connect_timeout: float = KEEP_PROVIDERS_HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = KEEP_PROVIDERS_HTTP_READ_TIMEOUT,
+        retries: int = KEEP_PROVIDERS_HTTP_RETRIES,
+        backoff: float = KEEP_PROVIDERS_HTTP_BACKOFF,
+        max_retry_after: float = KEEP_PROVIDERS_HTTP_MAX_RETRY_AFTER,
+        pool_size: int = KEEP_PROVIDERS_HTTP_POOL_SIZE,
+        max_sessions: int = KEEP_PROVIDERS_HTTP_MAX_SESSIONS,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after
+        self.pool_size = pool_size
+        self.max_sessions = max_sessions
+        # (base url, credentials hash) -> session
+        self._sessions: OrderedDict[tuple[str, str], PooledSession] = OrderedDict()
+        # host -> stats
+        self._stats: dict[str, HttpRequestStats] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "HttpSessions":
+        if not hasattr(cls, "_instance"):
+            cls._instance = cls()
+        return cls._instance
+
+    def get_session(self, url: str, credentials: typing.Any = None) -> PooledSession:
+        """The pooled session of the url's scheme and host and the credentials
+
+        Args:
+            url (str): any url of the server, only its scheme and host are used.
+            credentials (Any, optional): what the requests authenticate with (a token,
+                the provider's authentication config), JSON serializable. The
+                instances with other credentials get another session.
+        """
+        parsed_url = urlparse(url)
+        base_url = f"{parsed_url.scheme}://{parsed_url.netloc}".lower()
+        credentials_hash = hashlib.sha256(
+            json.dumps(credentials, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        key = (base_url, credentials_hash)
+        evicted = []
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+                return session
+            session = self._create_session()
+            self._sessions[key] = session
+            while len(self._sessions) > self.max_sessions:
+                evicted.append(self._sessions.popitem(last=False)[1])
+        for evicted_session in evicted:
+            # closes its idle connections, a request still using it opens a new pool
+            evicted_session.close()
+        return session
+
+    def clear(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._stats.clear()
+        for session in sessions:
+            session.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            stats = {
+                "hosts": {
+                    host: dataclasses.asdict(host_stats)
+                    for host, host_stats in self._stats.items()
+                },
+                "sessions": len(sessions),
+            }
+        connections = 0
+        pooled_requests = 0
+        for session in sessions:
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for pool_key in pools.keys():
+                    pool = pools.get(pool_key)
+                    if pool is None:
+                        continue
+                    connections += pool.num_connections
+                    pooled_requests += pool.num_requests
+        # pooled_requests / connections tells how well the connections are reused
+        stats["connections"] = connections
+        stats["pooled_requests"] = pooled_requests
+        return stats
+
+    def _create_session(self) -> PooledSession:
+        session = PooledSession(self.timeout, self._record)
+        retry = CappedRetry(
+            total=self.retries,
+            # the connections that failed before anything was sent
+            connect=self.retries,
+            # a request that may have been processed isn't sent again, its error
+            #   (e.g. ReadTimeout) is raised as is
+            read=False,
+            status=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=RETRY_STATUSES,
+            respect_retry_after_header=True,
+            max_retry_after=self.max_retry_after,
+            # the last response is returned, the callers check its status
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _record(self, url: str, duration: float, status_code: int | None):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            stats = self._stats.setdefault(host, HttpRequestStats())
+            stats.requests += 1
+            if status_code is None:
+                stats.errors += 1
+            elif status_code >= 500:
+                stats.server_errors += 1
+            stats.total_duration += duration
+            stats.max_duration = max(stats.max_duration, duration)
@@ -8,7 +8,6 @@ import os
 from typing import Optional
 
 import pydantic
-import requests
 from requests.auth import HTTPBasicAuth
 
 from keep.api.models.alert import AlertDto, AlertSeverity, AlertStatus
@@ -120,8 +119,9 @@ receivers:
                 self.authentication_config.username, self.authentication_config.password
             )
 
-        response = requests.get(
-            f"{self.authentication_config.url}/api/v1/query",
+        url = f"{self.authentication_config.url}/api/v1/query"
+        response = self.get_http_session(url).get(
+            url,
             params={"query": query},
             auth=(
                 auth
@@ -142,8 +142,9 @@ receivers:
             auth = HTTPBasicAuth(
                 self.authentication_config.username, self.authentication_config.password
             )
-        response = requests.get(
-            f"{self.authentication_config.url}/api/v1/alerts",
+        url = f"{self.authentication_config.url}/api/v1/alerts"
+        response = self.get_http_session(url).get(
+            url,
             auth=auth,
         )
         response.raise_for_status()
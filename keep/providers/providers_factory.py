@@ -374,6 +374,13 @@ class ProvidersFactory:
         providers = []
         context_manager = ContextManager(tenant_id=tenant_id)
         secret_manager = SecretManagerFactory.get_secret_manager(context_manager)
+        secrets = {}
+        if include_details:
+            # read all the providers secrets at once
+            secrets = secret_manager.read_secrets(
+                [f"{tenant_id}_{p.type}_{p.id}" for p in installed_providers],
+                is_json=True,
+            )
         for p in installed_providers:
             provider: Provider = next(
                 filter(
@@ -392,11 +399,7 @@ class ProvidersFactory:
             try:
                 provider_auth = {"name": p.name}
                 if include_details:
-                    provider_auth.update(
-                        secret_manager.read_secret(
-                            secret_name=f"{tenant_id}_{p.type}_{p.id}", is_json=True
-                        )
-                    )
+                    provider_auth.update(secrets[f"{tenant_id}_{p.type}_{p.id}"])
             # Somehow the provider is installed but the secret is missing, probably bug in deletion
             # TODO: solve its root cause
             except Exception:
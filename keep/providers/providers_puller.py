@@ -0,0 +1,305 @@
+"""
+Concurrent, time-budgeted pulling of alerts from the installed providers, with a
+breaker for the providers that keep timing out.
+"""
+
+import dataclasses
+import functools
+import logging
+import os
+import threading
+import time
+import typing
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from keep.api.models.alert import AlertDto
+from keep.api.models.provider import Provider
+from keep.contextmanager.contextmanager import ContextManager
+from keep.providers.base.base_provider import BaseProvider
+from keep.providers.providers_factory import ProvidersFactory
+
+# process-wide, a provider that was given up on keeps its worker until it returns
+KEEP_PROVIDERS_PULL_MAX_WORKERS = int(
+    os.environ.get("KEEP_PROVIDERS_PULL_MAX_WORKERS", 10)
+)
+# seconds, per provider
+KEEP_PROVIDERS_PULL_TIMEOUT = float(os.environ.get("KEEP_PROVIDERS_PULL_TIMEOUT", 10))
+# seconds, for all the providers
+KEEP_PROVIDERS_PULL_DEADLINE = float(os.environ.get("KEEP_PROVIDERS_PULL_DEADLINE", 30))
+# consecutive timeouts
+KEEP_PROVIDERS_PULL_BREAKER_THRESHOLD = int(
+    os.environ.get("KEEP_PROVIDERS_PULL_BREAKER_THRESHOLD", 3)
+)
+# seconds
+KEEP_PROVIDERS_PULL_BREAKER_COOLDOWN = int(
+    os.environ.get("KEEP_PROVIDERS_PULL_BREAKER_COOLDOWN", 300)
+)
+
+
+@dataclasses.dataclass
+class ProviderPullStats:
+    pulls: int = 0
+    errors: int = 0
+    # gave up on the provider (KEEP_PROVIDERS_PULL_TIMEOUT)
+    timeouts: int = 0
+    # gave up on the provider (KEEP_PROVIDERS_PULL_DEADLINE)
+    deadlines: int = 0
+    # not pulled, the breaker was open
+    skipped: int = 0
+    # seconds, of the pulls that finished
+    total_duration: float = 0.0
+    max_duration: float = 0.0
+
+
+@dataclasses.dataclass
+class _Breaker:
+    consecutive_timeouts: int = 0
+    # monotonic, None - closed
+    open_until: float | None = None
+
+
+def _get_alerts_by_fingerprint(
+    provider_instance: BaseProvider, provider: Provider, tenant_id: str
+) -> dict[str, list[AlertDto]]:
+    return provider_instance.get_alerts_by_fingerprint(tenant_id=tenant_id)
+
+
+class ProvidersPuller:
+    def __init__(
+        self,
+        max_workers: int = KEEP_PROVIDERS_PULL_MAX_WORKERS,
+        timeout: float = KEEP_PROVIDERS_PULL_TIMEOUT,
+        deadline: float = KEEP_PROVIDERS_PULL_DEADLINE,
+        breaker_threshold: int = KEEP_PROVIDERS_PULL_BREAKER_THRESHOLD,
+        breaker_cooldown: int = KEEP_PROVIDERS_PULL_BREAKER_COOLDOWN,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.deadline = deadline
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        # provider type -> stats
+        self._stats: dict[str, ProviderPullStats] = {}
+        # (tenant id, provider id) -> breaker
+        self._breakers: dict[tuple[str, str], _Breaker] = {}
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    @classmethod
+    def get_instance(cls) -> "ProvidersPuller":
+        if not hasattr(cls, "_instance"):
+            cls._instance = cls()
+        return cls._instance
+
+    def pull(
+        self,
+        tenant_id: str,
+        providers: list[Provider],
+        get_alerts: typing.Callable[[BaseProvider, Provider], typing.Any] | None = None,
+    ) -> typing.Iterator[tuple[Provider, typing.Any]]:
+        """Pull the alerts from the providers concurrently
+
+        Args:
+            tenant_id (str): the tenant id.
+            providers (list[Provider]): the installed providers, with their details.
+            get_alerts (Callable, optional): pulls the alerts of a provider, given
+                its instance. Defaults to BaseProvider.get_alerts_by_fingerprint.
+
+        Yields:
+            tuple[Provider, Any]: every provider that was pulled, as soon as it was,
+                and what get_alerts returned (by default its alerts grouped by
+                fingerprint). The providers that failed, timed out or were skipped
+                are logged and not yielded.
+        """
+        if get_alerts is None:
+            get_alerts = functools.partial(
+                _get_alerts_by_fingerprint, tenant_id=tenant_id
+            )
+        start = time.monotonic()
+        # provider id -> when it started (monotonic), set by the worker
+        started: dict[str, float] = {}
+        futures: dict[Future, Provider] = {}
+        for provider in providers:
+            if not self._allow(tenant_id, provider):
+                self._record(provider, "skipped")
+                self.logger.warning(
+                    "Not pulling alerts from provider, it keeps timing out",
+                    extra={
+                        "provider_id": provider.id,
+                        "provider_type": provider.type,
+                        "tenant_id": tenant_id,
+                    },
+                )
+                continue
+            future = self._get_executor().submit(
+                self._pull_provider, tenant_id, provider, started, get_alerts
+            )
+            futures[future] = provider
+
+        deadline = start + self.deadline
+        while futures:
+            now = time.monotonic()
+            # the providers that finished in the meantime are collected below
+            late = [future for future in futures if not future.done()]
+            for future in late:
+                provider = futures[future]
+                duration = now - started.get(provider.id, now)
+                if duration >= self.timeout:
+                    del futures[future]
+                    self._give_up(tenant_id, provider, "timeout", duration)
+            if now >= deadline:
+                for future in late:
+                    provider = futures.pop(future, None)
+                    if provider is None:
+                        continue
+                    # the providers that didn't start yet won't
+                    future.cancel()
+                    duration = now - started.get(provider.id, now)
+                    self._give_up(tenant_id, provider, "deadline", duration)
+            if not futures:
+                break
+            # a provider that starts in the meantime times out in self.timeout at most
+            next_check = min(
+                [deadline, now + self.timeout]
+                + [
+                    started[provider.id] + self.timeout
+                    for provider in futures.values()
+                    if provider.id in started
+                ]
+            )
+            done, _ = wait(
+                futures, timeout=max(next_check - now, 0), return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                provider = futures.pop(future)
+                duration = time.monotonic() - started.get(provider.id, start)
+                try:
+                    alerts_by_fingerprint = future.result()
+                except Exception as e:
+                    self._record(provider, "error", duration)
+                    self._breaker_result(tenant_id, provider, timed_out=False)
+                    self.logger.warning(
+                        f"Could not fetch alerts from provider due to {e}",
+                        extra={
+                            "provider_id": provider.id,
+                            "provider_type": provider.type,
+                            "tenant_id": tenant_id,
+                            "duration": duration,
+                        },
+                    )
+                    continue
+                self._record(provider, "ok", duration)
+                self._breaker_result(tenant_id, provider, timed_out=False)
+                yield provider, alerts_by_fingerprint
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "providers": {
+                    provider_type: dataclasses.asdict(stats)
+                    for provider_type, stats in self._stats.items()
+                },
+                "open_breakers": sum(
+                    1
+                    for breaker in self._breakers.values()
+                    if breaker.open_until is not None and breaker.open_until > now
+                ),
+            }
+
+    def stop(self):
+        """Stop the workers, the pulls that are running aren't waited for"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="providers-pull"
+                )
+            return self._executor
+
+    @staticmethod
+    def _pull_provider(
+        tenant_id: str,
+        provider: Provider,
+        started: dict[str, float],
+        get_alerts: typing.Callable[[BaseProvider, Provider], typing.Any],
+    ):
+        started[provider.id] = time.monotonic()
+        context_manager = ContextManager(tenant_id=tenant_id, workflow_id=None)
+        provider_class = ProvidersFactory.get_provider(
+            context_manager=context_manager,
+            provider_id=provider.id,
+            provider_type=provider.type,
+            provider_config=provider.details,
+        )
+        return get_alerts(provider_class, provider)
+
+    def _give_up(self, tenant_id: str, provider: Provider, reason: str, duration):
+        self._record(provider, reason, duration)
+        if reason == "timeout":
+            self._breaker_result(tenant_id, provider, timed_out=True)
+        self.logger.warning(
+            f"Gave up on pulling alerts from provider ({reason})",
+            extra={
+                "provider_id": provider.id,
+                "provider_type": provider.type,
+                "tenant_id": tenant_id,
+                "duration": duration,
+            },
+        )
+
+    def _allow(self, tenant_id: str, provider: Provider) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            breaker = self._breakers.get((tenant_id, provider.id))
+            if breaker is None or breaker.open_until is None:
+                return True
+            if now < breaker.open_until:
+                return False
+            # half open, a single pull goes through and closes or opens it again
+            breaker.open_until = now + self.breaker_cooldown
+            return True
+
+    def _breaker_result(self, tenant_id: str, provider: Provider, timed_out: bool):
+        key = (tenant_id, provider.id)
+        with self._lock:
+            if not timed_out:
+                self._breakers.pop(key, None)
+                return
+            breaker = self._breakers.setdefault(key, _Breaker())
+            breaker.consecutive_timeouts += 1
+            if breaker.consecutive_timeouts >= self.breaker_threshold:
+                breaker.open_until = time.monotonic() + self.breaker_cooldown
+                self.logger.warning(
+                    "Provider keeps timing out, not pulling it for a while",
+                    extra={
+                        "provider_id": provider.id,
+                        "provider_type": provider.type,
+                        "tenant_id": tenant_id,
+                        "consecutive_timeouts": breaker.consecutive_timeouts,
+                        "cooldown": self.breaker_cooldown,
+                    },
+                )
+
+    def _record(self, provider: Provider, outcome: str, duration: float = 0.0):
+        with self._lock:
+            stats = self._stats.setdefault(provider.type, ProviderPullStats())
+            if outcome == "skipped":
+                stats.skipped += 1
+                return
+            stats.pulls += 1
+            if outcome == "error":
+                stats.errors += 1
+            elif outcome == "timeout":
+                stats.timeouts += 1
+            elif outcome == "deadline":
+                stats.deadlines += 1
+            if outcome in ("ok", "error"):
+                stats.total_duration += duration
+                stats.max_duration = max(stats.max_duration, duration)
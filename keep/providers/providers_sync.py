@@ -0,0 +1,209 @@
+"""
+Background, incremental pulling of the installed providers into the database, through
+the ingest pipeline (see BaseProvider.get_alerts for the watermarks).
+"""
+
+import datetime
+import json
+import logging
+import os
+import threading
+import typing
+from collections import defaultdict
+
+from keep.api.core.db import claim_provider_pulls, update_provider_pull_state
+from keep.api.models.alert import AlertDto
+from keep.api.models.provider import Provider
+from keep.ingestqueue.ingest_queue import IngestTask, get_ingest_queue
+from keep.providers.base.base_provider import BaseProvider
+from keep.providers.providers_factory import ProvidersFactory
+from keep.providers.providers_puller import ProvidersPuller
+
+# seconds, 0 - disabled (the providers are pulled by GET /alerts)
+KEEP_PROVIDERS_SYNC_INTERVAL = int(os.environ.get("KEEP_PROVIDERS_SYNC_INTERVAL", 0))
+# seconds, for the late alerts (the deduplication drops the repeated ones)
+KEEP_PROVIDERS_SYNC_WATERMARK_OVERLAP = int(
+    os.environ.get("KEEP_PROVIDERS_SYNC_WATERMARK_OVERLAP", 60)
+)
+# the providers claimed at once
+KEEP_PROVIDERS_SYNC_BATCH_SIZE = int(
+    os.environ.get("KEEP_PROVIDERS_SYNC_BATCH_SIZE", 20)
+)
+# the alerts of an ingest task
+KEEP_PROVIDERS_SYNC_TASK_SIZE = int(
+    os.environ.get("KEEP_PROVIDERS_SYNC_TASK_SIZE", 500)
+)
+
+
+def is_providers_sync_enabled() -> bool:
+    return KEEP_PROVIDERS_SYNC_INTERVAL > 0
+
+
+class ProvidersSync:
+    def __init__(
+        self,
+        handler: typing.Callable[[IngestTask], None],
+        interval: int = KEEP_PROVIDERS_SYNC_INTERVAL,
+        overlap: int = KEEP_PROVIDERS_SYNC_WATERMARK_OVERLAP,
+        batch_size: int = KEEP_PROVIDERS_SYNC_BATCH_SIZE,
+        task_size: int = KEEP_PROVIDERS_SYNC_TASK_SIZE,
+    ):
+        self.logger = logging.getLogger(__name__)
+        # processes the pulled alerts when there's no ingest queue
+        self.handler = handler
+        self.interval = interval
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.task_size = task_size
+        self._pullable_types: list[str] | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.pulls = 0
+        self.pulled_alerts = 0
+        self.failed = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.logger.info(
+            "Starting the providers sync", extra={"interval": self.interval}
+        )
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="providers-sync", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "pulls": self.pulls,
+            "pulled_alerts": self.pulled_alerts,
+            "failed": self.failed,
+        }
+
+    def sync(self) -> int:
+        """Pull the providers that are due
+
+        Returns:
+            int: the number of providers that were pulled
+        """
+        states = claim_provider_pulls(
+            self.get_pullable_types(), self.interval, self.batch_size
+        )
+        states_by_tenant = defaultdict(dict)
+        for state in states:
+            states_by_tenant[state.tenant_id][state.provider_id] = state
+        pulled = 0
+        for tenant_id, tenant_states in states_by_tenant.items():
+            providers = [
+                provider
+                for provider in ProvidersFactory.get_installed_providers(tenant_id)
+                if provider.id in tenant_states
+            ]
+
+            def get_alerts(provider_instance: BaseProvider, provider: Provider):
+                watermark = tenant_states[provider.id].watermark
+                since = (
+                    watermark - datetime.timedelta(seconds=self.overlap)
+                    if watermark
+                    else None
+                )
+                return provider_instance.get_alerts(since=since)
+
+            for provider, alerts in ProvidersPuller.get_instance().pull(
+                tenant_id, providers, get_alerts=get_alerts
+            ):
+                state = tenant_states[provider.id]
+                try:
+                    self._ingest(tenant_id, provider, alerts)
+                except Exception:
+                    self.failed += 1
+                    self.logger.exception(
+                        "Failed to ingest the alerts pulled from provider",
+                        extra={
+                            "tenant_id": tenant_id,
+                            "provider_id": provider.id,
+                            "provider_type": provider.type,
+                        },
+                    )
+                    # pulled again from the same watermark next time
+                    continue
+                received_times = [
+                    received
+                    for received in map(BaseProvider.get_alert_received_time, alerts)
+                    if received is not None
+                ]
+                if state.watermark:
+                    received_times.append(state.watermark)
+                update_provider_pull_state(
+                    tenant_id,
+                    provider.id,
+                    max(received_times) if received_times else None,
+                    len(alerts),
+                )
+                self.pulls += 1
+                self.pulled_alerts += len(alerts)
+                pulled += 1
+                self.logger.info(
+                    "Pulled alerts from provider",
+                    extra={
+                        "tenant_id": tenant_id,
+                        "provider_id": provider.id,
+                        "provider_type": provider.type,
+                        "alerts": len(alerts),
+                        "since": state.watermark,
+                    },
+                )
+        return pulled
+
+    def get_pullable_types(self) -> list[str]:
+        """The types of the providers that implement _get_alerts"""
+        if self._pullable_types is None:
+            pullable_types = []
+            for provider in ProvidersFactory.get_all_providers():
+                try:
+                    provider_class = ProvidersFactory.get_provider_class(provider.type)
+                except Exception:
+                    continue
+                if provider_class._get_alerts is not BaseProvider._get_alerts:
+                    pullable_types.append(provider.type)
+            self._pullable_types = pullable_types
+        return self._pullable_types
+
+    def _ingest(self, tenant_id: str, provider: Provider, alerts: list[AlertDto]):
+        # the oldest first, so the newest alert of a fingerprint is its last alert
+        alerts = sorted(
+            alerts,
+            key=lambda alert: BaseProvider.get_alert_received_time(alert)
+            or datetime.datetime.min,
+        )
+        ingest_queue = get_ingest_queue()
+        for i in range(0, len(alerts), self.task_size):
+            chunk = alerts[i : i + self.task_size]
+            task = IngestTask(
+                tenant_id=tenant_id,
+                kind="generic",
+                event=[json.loads(alert.json()) for alert in chunk],
+                provider_type=provider.type,
+                provider_id=provider.id,
+            )
+            if ingest_queue:
+                ingest_queue.put(task)
+            else:
+                self.handler(task)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception:
+                self.logger.exception("Failed to sync the providers")
+            # the providers are due at different times, check often
+            self._stop.wait(min(self.interval, 10))
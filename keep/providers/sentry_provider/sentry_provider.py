@@ -102,6 +102,10 @@ class SentryProvider(BaseProvider):
             self.config.authentication.get("api_url") or self.SENTRY_DEFAULT_API
         )
 
+    @property
+    def _http(self) -> requests.Session:
+        return self.get_http_session(self.sentry_api)
+
     @property
     def __headers(self) -> dict:
         return {"Authorization": f"Bearer {self.authentication_config.api_key}"}
@@ -131,7 +135,7 @@ class SentryProvider(BaseProvider):
         }
 
         params = {"limit": 100}
-        response = requests.get(
+        response = self._http.get(
             self.get_events_url(project, time), headers=headers, params=params
         )
         response.raise_for_status()
@@ -151,7 +155,7 @@ class SentryProvider(BaseProvider):
         for scope in self.PROVIDER_SCOPES:
             if scope.name == "event:read":
                 if self.project_slug:
-                    response = requests.get(
+                    response = self._http.get(
                         f"{self.sentry_api}/projects/{self.sentry_org_slug}/{self.project_slug}/issues/",
                         headers=self.__headers,
                     )
@@ -160,7 +164,7 @@ class SentryProvider(BaseProvider):
                         validated_scopes[scope.name] = response_json.get("detail")
                         continue
                 else:
-                    projects_response = requests.get(
+                    projects_response = self._http.get(
                         f"{self.sentry_api}/projects/",
                         headers=self.__headers,
                     )
@@ -170,7 +174,7 @@ class SentryProvider(BaseProvider):
                         continue
                     projects = projects_response.json()
                     project_slug = projects[0].get("slug")
-                    response = requests.get(
+                    response = self._http.get(
                         f"{self.sentry_api}/projects/{self.sentry_org_slug}/{project_slug}/issues/",
                         headers=self.__headers,
                     )
@@ -180,7 +184,7 @@ class SentryProvider(BaseProvider):
                         continue
                 validated_scopes[scope.name] = True
             elif scope.name == "project:read":
-                response = requests.get(
+                response = self._http.get(
                     f"{self.sentry_api}/projects/",
                     headers=self.__headers,
                 )
@@ -190,7 +194,7 @@ class SentryProvider(BaseProvider):
                     continue
                 validated_scopes[scope.name] = True
             elif scope.name == "project:write":
-                response = requests.post(
+                response = self._http.post(
                     f"{self.sentry_api}/projects/{self.sentry_org_slug}/{self.project_slug or project_slug}/plugins/webhooks/",
                     headers=self.__headers,
                 )
@@ -290,7 +294,7 @@ class SentryProvider(BaseProvider):
             project_slugs = [self.project_slug]
         else:
             # Get all projects if no project slug was given
-            projects_response = requests.get(
+            projects_response = self._http.get(
                 f"{self.sentry_api}/projects/",
                 headers=self.__headers,
             )
@@ -302,7 +306,7 @@ class SentryProvider(BaseProvider):
 
         for project_slug in project_slugs:
             self.logger.info(f"Setting up webhook for project {project_slug}")
-            webhooks_request = requests.get(
+            webhooks_request = self._http.get(
                 f"{self.sentry_api}/projects/{self.sentry_org_slug}/{project_slug}/plugins/webhooks/",
                 headers=self.__headers,
             )
@@ -334,20 +338,20 @@ class SentryProvider(BaseProvider):
                 continue
             existing_webhooks.append(f"{keep_api_url}&api_key={api_key}")
             # Update the webhooks urls
-            update_response = requests.put(
+            update_response = self._http.put(
                 f"{self.sentry_api}/projects/{self.sentry_org_slug}/{project_slug}/plugins/webhooks/",
                 headers=self.__headers,
                 json={"urls": "\n".join(existing_webhooks)},
             )
             update_response.raise_for_status()
             # Enable webhooks plugin for project
-            requests.post(
+            self._http.post(
                 f"{self.sentry_api}/projects/{self.sentry_org_slug}/{project_slug}/plugins/webhooks/",
                 headers=self.__headers,
             ).raise_for_status()
             # TODO: make sure keep alert does not exist and if it doesnt create it.
             alert_rule_name = f"Keep Alert Rule - {project_slug}"
-            alert_rules_response = requests.get(
+            alert_rules_response = self._http.get(
                 f"{self.sentry_api}/projects/{self.sentry_org_slug}/{project_slug}/rules/",
                 headers=self.__headers,
             ).json()
@@ -384,7 +388,7 @@ class SentryProvider(BaseProvider):
                     "status": "active",
                 }
                 try:
-                    requests.post(
+                    self._http.post(
                         f"{self.sentry_api}/projects/{self.sentry_org_slug}/{project_slug}/rules/",
                         headers=self.__headers,
                         json=alert_payload,
@@ -415,7 +419,7 @@ class SentryProvider(BaseProvider):
         Returns:
             dict: issues by id
         """
-        issues_response = requests.get(
+        issues_response = self._http.get(
             f"{self.sentry_api}/projects/{self.sentry_org_slug}/{project_slug}/issues/?query=*",
             headers=self.__headers,
         )
@@ -427,7 +431,7 @@ class SentryProvider(BaseProvider):
         all_events_by_project = {}
         all_issues_by_project = {}
         if self.authentication_config.project_slug:
-            response = requests.get(
+            response = self._http.get(
                 f"{self.sentry_api}/projects/{self.sentry_org_slug}/{self.project_slug}/events/",
                 headers=self.__headers,
                 timeout=SentryProvider.DEFAULT_TIMEOUT,
@@ -439,7 +443,7 @@ class SentryProvider(BaseProvider):
                 self.project_slug
             )
         else:
-            projects_response = requests.get(
+            projects_response = self._http.get(
                 f"{self.sentry_api}/projects/",
                 headers=self.__headers,
                 timeout=SentryProvider.DEFAULT_TIMEOUT,
@@ -449,7 +453,7 @@ class SentryProvider(BaseProvider):
             projects = projects_response.json()
             for project in projects:
                 project_slug = project.get("slug")
-                response = requests.get(
+                response = self._http.get(
                     f"{self.sentry_api}/projects/{self.sentry_org_slug}/{project_slug}/events/",
                     headers=self.__headers,
                     timeout=SentryProvider.DEFAULT_TIMEOUT,
@@ -0,0 +1,91 @@
+"""
+Building CEL activations for alerts.
+
+Evaluating a CEL program needs the alert converted to CEL values. Doing it with
+`celpy.json_to_cel(json.loads(json.dumps(alert.dict(), default=str)))` costs a
+pydantic dump, a JSON serialize and a JSON parse per alert per expression, so
+this module converts the payload directly and lets callers build the
+activations of a batch of alerts once and reuse them for every expression.
+"""
+
+import typing
+
+import celpy
+
+from keep.api.models.alert import AlertDto, AlertSeverity
+
+
+def to_json_compatible(value: typing.Any) -> typing.Any:
+    """Convert a value to what `json.loads(json.dumps(value, default=str))` would return,
+    without actually serializing it."""
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        # str subclasses (e.g. pydantic's AnyHttpUrl) are serialized as plain strings
+        return value if type(value) is str else str.__str__(value)  # noqa: E721
+    if isinstance(value, int):
+        return value if type(value) is int else int(value)  # noqa: E721
+    if isinstance(value, float):
+        return value if type(value) is float else float(value)  # noqa: E721
+    if isinstance(value, dict):
+        return {
+            _to_json_key(key): to_json_compatible(val) for key, val in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [to_json_compatible(item) for item in value]
+    return str(value)
+
+
+def _to_json_key(key: typing.Any) -> str:
+    if isinstance(key, str):
+        return str.__str__(key)
+    if key is None or isinstance(key, bool):
+        # that's how json.dumps serializes them as keys
+        return {None: "null", True: "true", False: "false"}[key]
+    if isinstance(key, (int, float)):
+        return str(to_json_compatible(key))
+    return str(key)
+
+
+def alert_to_cel_payload(alert: AlertDto | dict) -> dict:
+    """The JSON compatible payload of an alert, as used by the CEL evaluations"""
+    payload = alert.dict() if isinstance(alert, AlertDto) else alert
+    return to_json_compatible(payload)
+
+
+def build_activation(payload: dict) -> celpy.celtypes.Value:
+    return celpy.json_to_cel(payload)
+
+
+def build_rule_activation(alert: AlertDto) -> celpy.celtypes.Value:
+    """Build the activation used to evaluate the rules (grouping) sub-rules of an alert"""
+    payload = alert_to_cel_payload(alert)
+    # workaround since source is a list
+    # todo: fix this in the future
+    payload["source"] = payload["source"][0]
+    return build_activation(payload)
+
+
+def build_filter_activations(
+    alerts: list[AlertDto],
+) -> list[celpy.celtypes.Value]:
+    """Build the activations used by RulesEngine.filter_alerts for a batch of alerts.
+
+    Build it once per request and pass it to every RulesEngine.filter_alerts call
+    over the same alerts (e.g. one per preset).
+
+    Args:
+        alerts (list[AlertDto]): list of alerts
+
+    Returns:
+        list: the activations, in the same order as the alerts
+    """
+    activations = []
+    for alert in alerts:
+        payload = alert_to_cel_payload(alert)
+        # TODO: workaround since source is a list
+        #       should be fixed in the future
+        payload["source"] = ",".join(payload["source"] or [])
+        payload["severity"] = AlertSeverity(payload["severity"].lower()).order
+        activations.append(build_activation(payload))
+    return activations
@@ -0,0 +1,96 @@
+"""
+Process-wide cache of compiled CEL programs.
+
+Compiling a CEL expression (parsing it with lark and building the runner) is
+far more expensive than evaluating it, and the same handful of expressions
+(presets, rules, deduplication matchers, extraction conditions) are evaluated
+over and over again. This module keeps a size-bounded LRU of compiled programs
+keyed by the normalized expression so every evaluation path shares them.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import celpy
+
+DEFAULT_CEL_CACHE_SIZE = int(os.environ.get("KEEP_CEL_CACHE_SIZE", 1024))
+
+
+class CelProgramCache:
+    def __init__(self, max_size: int = DEFAULT_CEL_CACHE_SIZE):
+        self.logger = logging.getLogger(__name__)
+        self.max_size = max_size
+        self._programs: OrderedDict[str, celpy.Runner] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def get_instance(cls) -> "CelProgramCache":
+        if not hasattr(cls, "_instance"):
+            cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def normalize(expression: str) -> str:
+        # only the surrounding whitespace is safe to drop, anything inside the
+        #   expression may be part of a string literal
+        return expression.strip()
+
+    def get_program(self, expression: str) -> celpy.Runner:
+        """Get a compiled program for the CEL expression, compiling it on a miss.
+
+        Args:
+            expression (str): the CEL expression
+
+        Raises:
+            celpy.CELParseError: if the expression is not valid CEL (never cached)
+
+        Returns:
+            celpy.Runner: the compiled program
+        """
+        key = self.normalize(expression)
+        with self._lock:
+            program = self._programs.get(key)
+            if program is not None:
+                self._programs.move_to_end(key)
+                self.hits += 1
+                return program
+            self.misses += 1
+            # the underlying lark parser is shared and not thread safe, so compile
+            #   under the lock as well (misses are rare, so this is cheap)
+            env = celpy.Environment()
+            program = env.program(env.compile(key))
+            self._programs[key] = program
+            if len(self._programs) > self.max_size:
+                evicted, _ = self._programs.popitem(last=False)
+                self.evictions += 1
+                self.logger.debug(
+                    "Evicted CEL program from cache", extra={"expression": evicted}
+                )
+            return program
+
+    def clear(self):
+        with self._lock:
+            self._programs.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._programs),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def get_cel_program(expression: str) -> celpy.Runner:
+    """Shortcut for getting a compiled program from the process-wide cache"""
+    return CelProgramCache.get_instance().get_program(expression)
@@ -0,0 +1,370 @@
+"""
+Translating CEL search queries into SQL predicates.
+
+Only a common subset of CEL is translated (equality, `in`, `&&`/`||`, severity
+comparisons and `contains`/`startsWith` on top-level and `labels.*` fields).
+The translated predicate is a *pre-filter*: it never drops an alert that the CEL
+expression would match, but it may keep alerts that it doesn't (e.g. LIKE is
+case insensitive on some databases), so the CEL expression must still be
+evaluated on the returned alerts (RulesEngine.filter_alerts). Anything that
+can't be translated is simply left for that evaluation:
+    - in `a && b`, whichever side can be translated is pushed down
+    - in `a || b`, both sides must be translated for it to be pushed down
+    - negations, arithmetic, ternaries, macros etc. are never pushed down
+"""
+
+import ast as python_ast
+import dataclasses
+import logging
+
+import lark
+from sqlalchemy import and_, false, func, or_
+
+from keep.api.models.alert import AlertSeverity, AlertStatus
+from keep.api.models.db.alert import Alert, AlertEnrichment
+from keep.rulesengine.celcache import get_cel_program
+
+# top level fields that are stored as-is in the alert event (or its enrichments)
+#   fields that are computed or normalized by AlertDto (e.g. dismissed,
+#   lastReceived, environment) are deliberately left out
+STRING_FIELDS = ["id", "name", "service", "description", "message", "note"]
+# nodes that only wrap a single child
+PASSTHROUGH_NODES = [
+    "expr",
+    "conditionalor",
+    "conditionaland",
+    "relation",
+    "addition",
+    "multiplication",
+    "unary",
+    "member",
+    "primary",
+    "paren_expr",
+]
+COMPARISON_NODES = {
+    "relation_eq": "==",
+    "relation_ne": "!=",
+    "relation_lt": "<",
+    "relation_le": "<=",
+    "relation_gt": ">",
+    "relation_ge": ">=",
+    "relation_in": "in",
+}
+# characters that can't be matched safely against the JSON text of the source list
+UNSAFE_SOURCE_CHARACTERS = [",", '"', "\\"]
+
+
+@dataclasses.dataclass
+class CelSqlTranslation:
+    # the SQL predicate, None if nothing could be pushed down
+    clause: object | None
+    # the parts of the CEL expression that were pushed down to the database
+    pushed_down: list[str]
+    # whether the entire CEL expression was pushed down
+    fully_pushed_down: bool
+
+
+class CelToSqlTranslator:
+    def __init__(self, cel: str):
+        """
+        Args:
+            cel (str): the CEL expression, already preprocessed with
+                RulesEngine.preprocess_cel_expression (severities as numbers)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.cel = cel
+        self._pushed_down = []
+        self._fully_pushed_down = True
+
+    def translate(self) -> CelSqlTranslation:
+        """Translate the CEL expression to a SQL predicate over Alert and AlertEnrichment.
+
+        Raises:
+            celpy.CELParseError: if the expression is not valid CEL
+
+        Returns:
+            CelSqlTranslation: the translation
+        """
+        tree = get_cel_program(self.cel).ast
+        clause = self._translate(tree, record=True)
+        if clause is None:
+            self._fully_pushed_down = False
+        return CelSqlTranslation(
+            clause=clause,
+            pushed_down=self._pushed_down,
+            fully_pushed_down=self._fully_pushed_down,
+        )
+
+    def _translate(self, node: lark.Tree, record: bool):
+        node = self._unwrap(node)
+        if node.data == "conditionaland":
+            left = self._translate(node.children[0], record)
+            right = self._translate(node.children[1], record)
+            clauses = [clause for clause in [left, right] if clause is not None]
+            if not clauses:
+                return None
+            return and_(*clauses)
+        if node.data == "conditionalor":
+            left = self._translate(node.children[0], record=False)
+            right = self._translate(node.children[1], record=False)
+            if left is None or right is None:
+                self._fully_pushed_down = False
+                return None
+            clause = or_(left, right)
+        elif (
+            node.data == "relation"
+            and len(node.children) == 2
+            and node.children[0].data in COMPARISON_NODES
+        ):
+            # e.g. relation(relation_eq(relation(<left>)), addition(<right>))
+            clause = self._translate_comparison(
+                COMPARISON_NODES[node.children[0].data],
+                node.children[0].children[0],
+                node.children[1],
+            )
+        elif node.data == "member_dot_arg":
+            clause = self._translate_method(node)
+        else:
+            clause = None
+
+        if clause is None:
+            self._fully_pushed_down = False
+        elif record:
+            self._pushed_down.append(self._source_text(node))
+        return clause
+
+    def _translate_comparison(self, operator: str, left: lark.Tree, right: lark.Tree):
+        field = self._field(left)
+        if operator == "in":
+            literals = self._list_literal(right)
+            if field is None or literals is None:
+                return None
+            return self._field_in(field, literals)
+
+        literal = self._literal(right)
+        # support "value == field" as well
+        if field is None and operator in ["==", "!="]:
+            field, literal = self._field(right), self._literal(left)
+        if field is None or literal is None:
+            return None
+        return self._field_compare(field, operator, literal)
+
+    def _translate_method(self, node: lark.Tree):
+        if len(node.children) != 3:
+            return None
+        member, method, args = node.children
+        if method not in ["contains", "startsWith"]:
+            return None
+        field = self._field(member)
+        arguments = [self._literal(arg) for arg in args.children]
+        if field is None or len(arguments) != 1:
+            return None
+        argument = arguments[0]
+        if not isinstance(argument, str) or not argument:
+            return None
+
+        if field == ("source",):
+            # source is evaluated as the comma-joined list, and stored as a JSON list
+            if not self._safe_for_source(argument):
+                return None
+            if method == "startsWith":
+                argument = f'"{argument}'
+            return self._value(field).contains(argument, autoescape=True)
+        if field[0] in ["severity", "status"]:
+            return None
+        if method == "contains":
+            return self._value(field).contains(argument, autoescape=True)
+        return self._value(field).startswith(argument, autoescape=True)
+
+    def _field_compare(self, field: tuple, operator: str, literal):
+        if field == ("severity",):
+            if type(literal) is not int:  # noqa: E721
+                return None
+            return self._enum_clause(
+                field,
+                [
+                    severity.value
+                    for severity in AlertSeverity
+                    if self._compare(severity.order, operator, literal)
+                ],
+                [severity.value for severity in AlertSeverity],
+                AlertSeverity.INFO.value,
+            )
+        if not isinstance(literal, str):
+            return None
+        if field == ("status",):
+            if operator not in ["==", "!="]:
+                return None
+            return self._status_clause(
+                [
+                    status.value
+                    for status in AlertStatus
+                    if self._compare(status.value, operator, literal)
+                ]
+            )
+        if operator != "==":
+            return None
+        if field == ("source",):
+            return self._source_clause([literal])
+        return self._value(field) == literal
+
+    def _field_in(self, field: tuple, literals: list):
+        if field == ("severity",):
+            if any(type(literal) is not int for literal in literals):  # noqa: E721
+                return None
+            return self._enum_clause(
+                field,
+                [
+                    severity.value
+                    for severity in AlertSeverity
+                    if severity.order in literals
+                ],
+                [severity.value for severity in AlertSeverity],
+                AlertSeverity.INFO.value,
+            )
+        if any(not isinstance(literal, str) for literal in literals):
+            return None
+        if field == ("status",):
+            return self._status_clause(
+                [status.value for status in AlertStatus if status.value in literals]
+            )
+        if field == ("source",):
+            return self._source_clause(literals)
+        return self._value(field).in_(literals)
+
+    def _status_clause(self, statuses: list[str]):
+        # dismissed alerts are turned into suppressed ones by AlertDto
+        #   regardless of their stored status, so that can't be pushed down
+        if AlertStatus.SUPPRESSED.value in statuses:
+            return None
+        return self._enum_clause(
+            ("status",),
+            statuses,
+            [status.value for status in AlertStatus],
+            AlertStatus.FIRING.value,
+        )
+
+    def _enum_clause(self, field: tuple, matching: list, all_values: list, default):
+        value = self._value(field)
+        clauses = [value.in_(matching)] if matching else []
+        # AlertDto falls back to the default value when the value is missing or invalid
+        if default in matching:
+            clauses.append(or_(value.is_(None), value.notin_(all_values)))
+        if not clauses:
+            return false()
+        return or_(*clauses)
+
+    def _source_clause(self, sources: list[str]):
+        # source == "x" means that the (comma-joined) source is exactly "x",
+        #   so "x" must be an element of the stored JSON list
+        if not all(source and self._safe_for_source(source) for source in sources):
+            return None
+        value = self._value(("source",))
+        return or_(
+            *[value.contains(f'"{source}"', autoescape=True) for source in sources]
+        )
+
+    @staticmethod
+    def _safe_for_source(value: str) -> bool:
+        return value.isascii() and not any(
+            char in value for char in UNSAFE_SOURCE_CHARACTERS
+        )
+
+    @staticmethod
+    def _compare(value, operator: str, literal) -> bool:
+        return {
+            "==": value == literal,
+            "!=": value != literal,
+            "<": value < literal,
+            "<=": value <= literal,
+            ">": value > literal,
+            ">=": value >= literal,
+        }[operator]
+
+    @staticmethod
+    def _value(field: tuple):
+        if field == ("fingerprint",):
+            return Alert.fingerprint
+        path = field[0] if len(field) == 1 else field
+        # enrichments override the event attributes (see convert_db_alerts_to_dto_alerts)
+        return func.coalesce(
+            AlertEnrichment.enrichments[path].as_string(),
+            Alert.event[path].as_string(),
+        )
+
+    def _field(self, node: lark.Tree) -> tuple | None:
+        node = self._unwrap(node)
+        if node.data == "ident":
+            name = str(node.children[0])
+            if name in STRING_FIELDS + ["source", "severity", "status", "fingerprint"]:
+                return (name,)
+            return None
+        if node.data == "member_dot":
+            member, attribute = node.children
+            if self._ident(member) == "labels":
+                return ("labels", str(attribute))
+            return None
+        if node.data == "member_index":
+            member, index = node.children
+            key = self._literal(index)
+            if self._ident(member) == "labels" and isinstance(key, str):
+                return ("labels", key)
+        return None
+
+    def _ident(self, node: lark.Tree) -> str | None:
+        node = self._unwrap(node)
+        if node.data == "ident":
+            return str(node.children[0])
+        return None
+
+    def _literal(self, node: lark.Tree):
+        node = self._unwrap(node)
+        if node.data != "literal":
+            return None
+        token = str(node.children[0])
+        if token.isdigit():
+            return int(token)
+        # only plain (non raw, non bytes, non triple quoted) strings are supported
+        if (
+            len(token) >= 2
+            and token[0] in ["'", '"']
+            and token[-1] == token[0]
+            and not token.startswith(token[0] * 3)
+        ):
+            try:
+                return python_ast.literal_eval(token)
+            except (ValueError, SyntaxError):
+                return None
+        return None
+
+    def _list_literal(self, node: lark.Tree) -> list | None:
+        node = self._unwrap(node)
+        if node.data != "list_lit":
+            return None
+        if not node.children:
+            return []
+        literals = [self._literal(item) for item in node.children[0].children]
+        if any(literal is None for literal in literals):
+            return None
+        return literals
+
+    @staticmethod
+    def _unwrap(node: lark.Tree) -> lark.Tree:
+        while (
+            node.data in PASSTHROUGH_NODES
+            and len(node.children) == 1
+            and isinstance(node.children[0], lark.Tree)
+        ):
+            node = node.children[0]
+        return node
+
+    def _source_text(self, node: lark.Tree) -> str:
+        try:
+            return self.cel[node.meta.start_pos : node.meta.end_pos]
+        except AttributeError:
+            return str(node)
+
+
+def translate_cel_to_sql(cel: str) -> CelSqlTranslation:
+    """Translate a (preprocessed) CEL expression to a SQL pre-filter, see CelToSqlTranslator"""
+    return CelToSqlTranslator(cel).translate()
@@ -1,5 +1,5 @@
+import functools
 import itertools
-import json
 import logging
 import re
 
@@ -9,8 +9,14 @@ import chevron
 from keep.api.core.db import assign_alert_to_group as assign_alert_to_group_db
 from keep.api.core.db import create_alert as create_alert_db
 from keep.api.core.db import get_rules as get_rules_db
+from keep.api.core.db import set_last_alert
 from keep.api.models.alert import AlertDto, AlertSeverity, AlertStatus
 from keep.api.models.group import GroupDto
+from keep.rulesengine.celactivation import (
+    build_filter_activations,
+    build_rule_activation,
+)
+from keep.rulesengine.celcache import get_cel_program
 
 
 class RulesEngine:
@@ -47,15 +53,24 @@ class RulesEngine:
         self.logger.info("Running rules")
         rules = get_rules_db(tenant_id=self.tenant_id)
 
+        # build the activations once and reuse them for every rule
+        activations = []
+        for event in events:
+            try:
+                activations.append(build_rule_activation(event))
+            except Exception:
+                # _check_if_rule_apply will fail (and log) on this event
+                activations.append(None)
+
         groups = []
         for rule in rules:
             self.logger.info(f"Evaluating rule {rule.name}")
-            for event in events:
+            for event, activation in zip(events, activations):
                 self.logger.info(
                     f"Checking if rule {rule.name} apply to event {event.id}"
                 )
                 try:
-                    rule_result = self._check_if_rule_apply(rule, event)
+                    rule_result = self._check_if_rule_apply(rule, event, activation)
                 except Exception:
                     self.logger.exception(
                         f"Failed to evaluate rule {rule.name} on event {event.id}"
@@ -154,6 +169,7 @@ class RulesEngine:
                 },
                 fingerprint=group_fingerprint,
             )
+            set_last_alert(self.tenant_id, group_alert)
             grouped_alerts.append(group_alert)
             self.logger.info(f"Created alert {group_alert.id} for group {group.id}")
         self.logger.info(f"Rules ran, {len(grouped_alerts)} alerts created")
@@ -174,21 +190,17 @@ class RulesEngine:
         return sub_rules
 
     # TODO: a lot of unit tests to write here
-    def _check_if_rule_apply(self, rule, event: AlertDto):
+    def _check_if_rule_apply(self, rule, event: AlertDto, activation=None):
         sub_rules = self._extract_subrules(rule.definition_cel)
-        payload = event.dict()
-        # workaround since source is a list
-        # todo: fix this in the future
-        payload["source"] = payload["source"][0]
+        # the activation is the same for all the subrules
+        if activation is None:
+            activation = build_rule_activation(event)
 
         # what we do here is to compile the CEL rule and evaluate it
         #   https://github.com/cloud-custodian/cel-python
         #   https://github.com/google/cel-spec
-        env = celpy.Environment()
         for sub_rule in sub_rules:
-            ast = env.compile(sub_rule)
-            prgm = env.program(ast)
-            activation = celpy.json_to_cel(json.loads(json.dumps(payload, default=str)))
+            prgm = get_cel_program(sub_rule)
             try:
                 r = prgm.evaluate(activation)
             except celpy.evaluation.CELEvalError as e:
@@ -313,6 +325,7 @@ class RulesEngine:
         return group_payload
 
     @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def preprocess_cel_expression(cel_expression: str) -> str:
         """Preprocess CEL expressions to replace string-based comparisons with numeric values where applicable."""
 
@@ -353,35 +366,32 @@ class RulesEngine:
         return modified_expression
 
     @staticmethod
-    def filter_alerts(alerts: list[AlertDto], cel: str):
+    def filter_alerts(alerts: list[AlertDto], cel: str, activations: list = None):
         """This function filters alerts according to a CEL
 
         Args:
             alerts (list[AlertDto]): list of alerts
             cel (str): CEL expression
+            activations (list, optional): the alerts activations, built with
+                build_filter_activations. Pass it when filtering the same alerts
+                with several expressions so the alerts are converted only once.
 
         Returns:
             list[AlertDto]: list of alerts that are related to the cel
         """
         logger = logging.getLogger(__name__)
-        env = celpy.Environment()
         # if the cel is empty, return all the alerts
         if not cel:
             logger.debug("No CEL expression provided")
             return alerts
         # preprocess the cel expression
         cel = RulesEngine.preprocess_cel_expression(cel)
-        ast = env.compile(cel)
-        prgm = env.program(ast)
+        # compiled programs are shared process-wide, see keep/rulesengine/celcache.py
+        prgm = get_cel_program(cel)
+        if activations is None:
+            activations = build_filter_activations(alerts)
         filtered_alerts = []
-        for alert in alerts:
-            payload = alert.dict()
-            # TODO: workaround since source is a list
-            #       should be fixed in the future
-            payload["source"] = ",".join(payload["source"])
-            payload["severity"] = AlertSeverity(payload["severity"].lower()).order
-
-            activation = celpy.json_to_cel(json.loads(json.dumps(payload, default=str)))
+        for alert, activation in zip(alerts, activations):
             try:
                 r = prgm.evaluate(activation)
             except celpy.evaluation.CELEvalError as e:
@@ -0,0 +1,162 @@
+"""
+Read-through cache over any secret manager backend.
+
+The providers configuration is read from the secret manager whenever the installed
+providers are listed (the providers page, parsing workflows, pulling alerts), and
+with the K8S / Vault / GCP backends every read is a network round trip. The cached
+manager keeps the secrets it read for KEEP_SECRETS_CACHE_TTL seconds, and the
+secrets that couldn't be read for KEEP_SECRETS_CACHE_NEGATIVE_TTL seconds, so a
+missing secret doesn't cost a round trip on every listing either.
+
+Writing or deleting a secret through the manager invalidates it. With several
+replicas, a secret changed by another replica is picked up after the TTL.
+"""
+
+import copy
+import os
+import threading
+import time
+import typing
+from collections import OrderedDict
+
+from keep.contextmanager.contextmanager import ContextManager
+from keep.secretmanager.secretmanager import BaseSecretManager
+
+# seconds
+KEEP_SECRETS_CACHE_TTL = int(os.environ.get("KEEP_SECRETS_CACHE_TTL", 60))
+# seconds
+KEEP_SECRETS_CACHE_NEGATIVE_TTL = int(
+    os.environ.get("KEEP_SECRETS_CACHE_NEGATIVE_TTL", 10)
+)
+KEEP_SECRETS_CACHE_SIZE = int(os.environ.get("KEEP_SECRETS_CACHE_SIZE", 10000))
+
+
+class SecretNotFoundException(Exception):
+    pass
+
+
+class CachedSecretManager(BaseSecretManager):
+    def __init__(
+        self,
+        context_manager: ContextManager,
+        secret_manager: BaseSecretManager,
+        ttl: int = KEEP_SECRETS_CACHE_TTL,
+        negative_ttl: int = KEEP_SECRETS_CACHE_NEGATIVE_TTL,
+        max_size: int = KEEP_SECRETS_CACHE_SIZE,
+    ):
+        super().__init__(context_manager)
+        self.secret_manager = secret_manager
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        # (secret_name, is_json) -> (the secret or the exception raised reading it, when it expires)
+        self._secrets: OrderedDict[
+            tuple[str, bool], tuple[str | dict | Exception, float]
+        ] = OrderedDict()
+        # bumped on every invalidation, so a read that raced with a write isn't cached
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def read_secret(self, secret_name: str, is_json: bool = False) -> str | dict:
+        found, value, generation = self._get(secret_name, is_json)
+        if not found:
+            try:
+                value = self.secret_manager.read_secret(secret_name, is_json=is_json)
+            except Exception as e:
+                self._set(secret_name, is_json, e, generation)
+                raise
+            self._set(secret_name, is_json, value, generation)
+        if isinstance(value, Exception):
+            raise value
+        # the callers may modify the secret
+        return copy.deepcopy(value)
+
+    def read_secrets(
+        self, secret_names: list[str], is_json: bool = False
+    ) -> dict[str, str | dict]:
+        secrets = {}
+        missing = []
+        generation = self._generation
+        for secret_name in dict.fromkeys(secret_names):
+            found, value, _ = self._get(secret_name, is_json)
+            if not found:
+                missing.append(secret_name)
+            elif not isinstance(value, Exception):
+                secrets[secret_name] = value
+        if missing:
+            read = self.secret_manager.read_secrets(missing, is_json=is_json)
+            for secret_name in missing:
+                if secret_name in read:
+                    self._set(secret_name, is_json, read[secret_name], generation)
+                    secrets[secret_name] = read[secret_name]
+                else:
+                    self._set(
+                        secret_name,
+                        is_json,
+                        SecretNotFoundException(f"Secret {secret_name} not found"),
+                        generation,
+                    )
+        return copy.deepcopy(secrets)
+
+    def write_secret(self, secret_name: str, secret_value: str) -> None:
+        try:
+            self.secret_manager.write_secret(secret_name, secret_value)
+        finally:
+            self.invalidate(secret_name)
+
+    def delete_secret(self, secret_name: str) -> None:
+        try:
+            self.secret_manager.delete_secret(secret_name)
+        finally:
+            self.invalidate(secret_name)
+
+    def invalidate(self, secret_name: str | None = None):
+        """Read the secret (or all the secrets) from the backend on the next read"""
+        with self._lock:
+            self._generation += 1
+            if secret_name is None:
+                self._secrets.clear()
+                return
+            self._secrets.pop((secret_name, False), None)
+            self._secrets.pop((secret_name, True), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._secrets),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _get(self, secret_name: str, is_json: bool) -> tuple[bool, typing.Any, int]:
+        """Returns whether the secret is cached, its cached value and the cache generation"""
+        key = (secret_name, is_json)
+        with self._lock:
+            entry = self._secrets.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self.misses += 1
+                return False, None, self._generation
+            self._secrets.move_to_end(key)
+            self.hits += 1
+            return True, entry[0], self._generation
+
+    def _set(
+        self,
+        secret_name: str,
+        is_json: bool,
+        value: str | dict | Exception,
+        generation: int,
+    ):
+        ttl = self.negative_ttl if isinstance(value, Exception) else self.ttl
+        key = (secret_name, is_json)
+        with self._lock:
+            if generation != self._generation:
+                # the secret may have been written while it was read
+                return
+            self._secrets[key] = (value, time.monotonic() + ttl)
+            self._secrets.move_to_end(key)
+            while len(self._secrets) > self.max_size:
+                self._secrets.popitem(last=False)
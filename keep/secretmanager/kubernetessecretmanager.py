@@ -20,6 +20,8 @@ class KubernetesSecretManager(BaseSecretManager):
         # kubernetes.config.load_config()  # when running locally
         kubernetes.config.load_incluster_config()
         self.api = kubernetes.client.CoreV1Api()
+        # False once listing the secrets was forbidden (e.g. RBAC allows only get)
+        self.can_list_secrets = True
 
     def write_secret(self, secret_name: str, secret_value: str) -> None:
         """
@@ -71,15 +73,13 @@ class KubernetesSecretManager(BaseSecretManager):
     def read_secret(self, secret_name: str, is_json: bool = False) -> str | dict:
         # k8s requirements: https://kubernetes.io/docs/concepts/overview/working-with-objects/names/#names
         secret_name = secret_name.replace("_", "-")
-        self.logger.info("Getting secret", extra={"secret_name": secret_name})
+        self.logger.debug("Getting secret", extra={"secret_name": secret_name})
         try:
             response = self.api.read_namespaced_secret(
                 name=secret_name, namespace=self.namespace
             )
-            secret_data = base64.b64decode(response.data.get("value", "")).decode()
-            if is_json:
-                secret_data = json.loads(secret_data)
-            self.logger.info(
+            secret_data = self._decode_secret(response, is_json)
+            self.logger.debug(
                 "Got secret successfully", extra={"secret_name": secret_name}
             )
             return secret_data
@@ -90,6 +90,68 @@ class KubernetesSecretManager(BaseSecretManager):
             )
             raise
 
+    def read_secrets(
+        self, secret_names: list[str], is_json: bool = False
+    ) -> dict[str, str | dict]:
+        """
+        Reads several secrets by listing the namespace's secrets, instead of a call per secret.
+        Falls back to reading them one by one if the secrets can't be listed.
+
+        Args:
+            secret_names (list[str]): The names of the secrets.
+            is_json (bool): Whether to json.loads the secrets.
+
+        Returns:
+            dict[str, str | dict]: The secrets by name, missing secrets are not returned.
+        """
+        if not self.can_list_secrets:
+            return super().read_secrets(secret_names, is_json=is_json)
+        # k8s secret name -> the requested names
+        requested = {}
+        for secret_name in secret_names:
+            requested.setdefault(secret_name.replace("_", "-"), []).append(secret_name)
+        self.logger.debug("Listing secrets", extra={"secrets": len(requested)})
+        secrets = {}
+        _continue = None
+        try:
+            while True:
+                response = self.api.list_namespaced_secret(
+                    namespace=self.namespace, limit=500, _continue=_continue
+                )
+                for item in response.items:
+                    for secret_name in requested.get(item.metadata.name, []):
+                        try:
+                            secrets[secret_name] = self._decode_secret(item, is_json)
+                        except Exception:
+                            self.logger.warning(
+                                "Failed to decode secret",
+                                extra={"secret_name": secret_name},
+                            )
+                _continue = response.metadata._continue
+                if not _continue:
+                    break
+        except ApiException as e:
+            self.logger.warning(
+                "Failed to list secrets, reading them one by one",
+                extra={"error": str(e), "status": e.status},
+            )
+            if e.status == 403:
+                # the service account may only get secrets, don't try again
+                self.can_list_secrets = False
+            return super().read_secrets(secret_names, is_json=is_json)
+        self.logger.debug(
+            "Listed secrets successfully",
+            extra={"secrets": len(requested), "found": len(secrets)},
+        )
+        return secrets
+
+    @staticmethod
+    def _decode_secret(secret, is_json: bool) -> str | dict:
+        secret_data = base64.b64decode((secret.data or {}).get("value", "")).decode()
+        if is_json:
+            secret_data = json.loads(secret_data)
+        return secret_data
+
     def delete_secret(self, secret_name: str) -> None:
         self.logger.info("Deleting secret", extra={"secret_name": secret_name})
         try:
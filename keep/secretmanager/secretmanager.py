@@ -24,6 +24,32 @@ class BaseSecretManager(metaclass=abc.ABCMeta):
             " for {}".format(self.__class__.__name__)
         )
 
+    def read_secrets(
+        self, secret_names: list[str], is_json: bool = False
+    ) -> dict[str, str | dict]:
+        """
+        Read several secrets from the secret manager.
+
+        The default reads the secrets one by one, backends that can list their
+        secrets override it to read them in a few calls.
+
+        Args:
+            secret_names (list[str]): The names of the secrets to read.
+            is_json (bool): Whether to try and convert to python dictionary or not (json.loads)
+
+        Returns:
+            dict[str, str | dict]: The secret values by name, secrets that couldn't be read are missing.
+        """
+        secrets = {}
+        for secret_name in secret_names:
+            try:
+                secrets[secret_name] = self.read_secret(secret_name, is_json=is_json)
+            except Exception:
+                self.logger.warning(
+                    "Failed to read secret", extra={"secret_name": secret_name}
+                )
+        return secrets
+
     @abc.abstractmethod
     def write_secret(self, secret_name: str, secret_value: str) -> None:
         """
@@ -1,9 +1,16 @@
 import enum
+import os
+import threading
 
 from keep.api.core.config import config
 from keep.contextmanager.contextmanager import ContextManager
+from keep.secretmanager.cachedsecretmanager import CachedSecretManager
 from keep.secretmanager.secretmanager import BaseSecretManager
 
+KEEP_SECRETS_CACHE_ENABLED = (
+    os.environ.get("KEEP_SECRETS_CACHE_ENABLED", "true") == "true"
+)
+
 
 class SecretManagerTypes(enum.Enum):
     FILE = "file"
@@ -13,16 +20,55 @@ class SecretManagerTypes(enum.Enum):
 
 
 class SecretManagerFactory:
+    # secret manager type -> the cached secret manager, shared by the whole process
+    _secret_managers: dict[SecretManagerTypes, CachedSecretManager] = {}
+    _lock = threading.Lock()
+
     @staticmethod
     def get_secret_manager(
         context_manager: ContextManager,
         secret_manager_type: SecretManagerTypes = None,
         **kwargs,
     ) -> BaseSecretManager:
+        """Get the (cached) secret manager of the given type, the configured one by default"""
         if not secret_manager_type:
             secret_manager_type = SecretManagerTypes[
                 config("SECRET_MANAGER_TYPE", default="FILE").upper()
             ]
+        if kwargs or not KEEP_SECRETS_CACHE_ENABLED:
+            return SecretManagerFactory._create_secret_manager(
+                context_manager, secret_manager_type, **kwargs
+            )
+        with SecretManagerFactory._lock:
+            secret_manager = SecretManagerFactory._secret_managers.get(
+                secret_manager_type
+            )
+            if secret_manager is None:
+                # shared by all the tenants, so it's not bound to the caller's context
+                shared_context_manager = ContextManager(tenant_id=None)
+                secret_manager = CachedSecretManager(
+                    shared_context_manager,
+                    SecretManagerFactory._create_secret_manager(
+                        shared_context_manager, secret_manager_type
+                    ),
+                )
+                SecretManagerFactory._secret_managers[secret_manager_type] = (
+                    secret_manager
+                )
+        return secret_manager
+
+    @staticmethod
+    def clear():
+        """Drop the cached secret managers (and their cached secrets)"""
+        with SecretManagerFactory._lock:
+            SecretManagerFactory._secret_managers.clear()
+
+    @staticmethod
+    def _create_secret_manager(
+        context_manager: ContextManager,
+        secret_manager_type: SecretManagerTypes,
+        **kwargs,
+    ) -> BaseSecretManager:
         if secret_manager_type == SecretManagerTypes.FILE:
             from keep.secretmanager.filesecretmanager import FileSecretManager
 
@@ -53,13 +53,29 @@ class VaultSecretManager(BaseSecretManager):
         )
 
     def read_secret(self, secret_name: str, is_json: bool = False) -> str | dict:
-        self.logger.info("Getting secret", extra={"secret_name": secret_name})
+        self.logger.debug("Getting secret", extra={"secret_name": secret_name})
         secret = self.client.secrets.kv.v2.read_secret_version(path=secret_name)
-        self.logger.info(
+        self.logger.debug(
             "Secret retrieved successfully", extra={"secret_name": secret_name}
         )
         return secret["data"]["data"]
 
+    def read_secrets(
+        self, secret_names: list[str], is_json: bool = False
+    ) -> dict[str, str | dict]:
+        # KV v2 can't read several secrets at once, but listing the secrets first
+        # saves the round trips of the secrets that don't exist
+        try:
+            response = self.client.secrets.kv.v2.list_secrets(path="")
+            existing = set(response["data"]["keys"])
+        except Exception:
+            self.logger.warning("Failed to list secrets, reading them one by one")
+            existing = set(secret_names)
+        return super().read_secrets(
+            [secret_name for secret_name in secret_names if secret_name in existing],
+            is_json=is_json,
+        )
+
     def delete_secret(self, secret_name: str) -> None:
         self.logger.info("Deleting secret", extra={"secret_name": secret_name})
         self.client.secrets.kv.delete_metadata_and_all_versions(secret_name)
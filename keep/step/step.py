@@ -1,4 +1,8 @@
+import copy
+import datetime
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 
 from keep.conditions.condition_factory import ConditionFactory
@@ -9,6 +13,9 @@ from keep.providers.base.base_provider import BaseProvider
 from keep.step.step_provider_parameter import StepProviderParameter
 from keep.throttles.throttle_factory import ThrottleFactory
 
+# the maximum number of foreach items that run concurrently (see foreach-concurrency)
+KEEP_FOREACH_MAX_CONCURRENCY = int(os.environ.get("KEEP_FOREACH_MAX_CONCURRENCY", 50))
+
 
 class StepType(Enum):
     STEP = "step"
@@ -41,19 +48,52 @@ class Step:
         self.__retry = self.on_failure.get("retry", {})
         self.__retry_count = self.__retry.get("count", 0)
         self.__retry_interval = self.__retry.get("interval", 0)
+        # items, failures and latencies of the last foreach run (see _run_foreach)
+        self.foreach_results = None
+        # the steps (or actions) this step waits for when the workflow runs steps
+        #   concurrently, None - run in order (see Parser._parse_dependencies)
+        self.dependencies: list[str] | None = None
+        # when the last run started and how long it took
+        self.timing = None
+
+    def clone(self, context_manager: ContextManager) -> "Step":
+        """Copy the step (and its provider) for another workflow run"""
+        step = copy.copy(self)
+        step.context_manager = context_manager
+        step.provider = self.provider.clone(context_manager)
+        step.io_handler = IOHandler(context_manager)
+        step.conditions_results = {}
+        step.logger = context_manager.get_logger()
+        step.foreach_results = None
+        step.timing = None
+        return step
 
     @property
     def foreach(self):
         return self.config.get("foreach")
 
+    @property
+    def foreach_concurrency(self) -> int:
+        """How many foreach items run concurrently, 1 (default) runs them in order"""
+        concurrency = int(self.config.get("foreach-concurrency", 1))
+        return max(1, min(concurrency, KEEP_FOREACH_MAX_CONCURRENCY))
+
     @property
     def name(self):
         return self.step_id
 
-    def run(self):
+    def run(self, isolated: bool = False):
+        """Run the step
+
+        Args:
+            isolated (bool): other steps run concurrently on the same context, so the
+                foreach items run on their own context (see _run_foreach_concurrently)
+        """
+        started_at = datetime.datetime.utcnow()
+        start = time.monotonic()
         try:
             if self.config.get("foreach"):
-                did_action_run = self._run_foreach()
+                did_action_run = self._run_foreach(isolated)
             else:
                 did_action_run = self._run_single()
             return did_action_run
@@ -62,6 +102,11 @@ class Step:
                 "Failed to run step %s with error %s", self.step_id, e, exc_info=True
             )
             raise ActionError(e)
+        finally:
+            self.timing = {
+                "started_at": started_at.isoformat(),
+                "duration": round(time.monotonic() - start, 3),
+            }
 
     def _check_throttling(self, action_name):
         throttling = self.config.get("throttle")
@@ -98,25 +143,70 @@ class Step:
             return []
         return len(foreach_items) == 1 and foreach_items[0] or zip(*foreach_items)
 
-    def _run_foreach(self):
+    def _run_foreach(self, isolated: bool = False):
         """Evaluate the action for each item, when using the `foreach` attribute (see foreach.md)"""
         # the item holds the value we are going to iterate over
-        items = self._get_foreach_items()
+        items = list(self._get_foreach_items())
+        concurrency = min(self.foreach_concurrency, len(items))
+        start = time.monotonic()
+        if concurrency > 1 or (isolated and items):
+            outcomes = self._run_foreach_concurrently(items, concurrency)
+        else:
+            outcomes = (self._run_foreach_item(item) for item in items)
         any_action_run = False
+        latencies = []
+        failed = 0
         # apply ALL conditions (the decision whether to run or not is made in the end)
-        for item in items:
-            self.context_manager.set_for_each_context(item)
-            try:
-                did_action_run = self._run_single()
-            except Exception as e:
-                self.logger.error(f"Failed to run action with error {e}")
+        for did_action_run, latency, error in outcomes:
+            latencies.append(round(latency, 3))
+            if error:
+                failed += 1
+                self.logger.error(f"Failed to run action with error {error}")
                 continue
             # If at least one item triggered an action, return True
             # TODO - do it per item
             if did_action_run:
                 any_action_run = True
+        self.foreach_results = {
+            "items": len(items),
+            "failed": failed,
+            "concurrency": max(concurrency, 1),
+            "duration": round(time.monotonic() - start, 3),
+            "latencies": latencies,
+        }
         return any_action_run
 
+    def _run_foreach_item(self, item):
+        """Returns whether the action ran, how long it took and the error it raised"""
+        self.context_manager.set_for_each_context(item)
+        start = time.monotonic()
+        try:
+            did_action_run = self._run_single()
+        except Exception as e:
+            return False, time.monotonic() - start, e
+        return did_action_run, time.monotonic() - start, None
+
+    def _run_foreach_concurrently(self, items: list, concurrency: int):
+        """Run the items on a thread pool, every item with its own foreach context
+        and a copy of the step, and yield their outcomes in the items order"""
+
+        def run_item(item):
+            context_manager = self.context_manager.fork_foreach_context(
+                self.step_id, item
+            )
+            step = self.clone(context_manager)
+            return step, step._run_foreach_item(item)
+
+        with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix=f"foreach-{self.step_id}"
+        ) as executor:
+            for step, outcome in executor.map(run_item, items):
+                self.context_manager.merge_foreach_context(
+                    self.step_id, step.context_manager
+                )
+                self.provider.results.extend(step.provider.results)
+                yield outcome
+
     def _run_single(self):
         # Initialize all conditions
         conditions = []
@@ -1,10 +1,16 @@
 import enum
+import os
 import typing
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 from keep.contextmanager.contextmanager import ContextManager
 from keep.iohandler.iohandler import IOHandler
 from keep.step.step import Step, StepError
 
+# how many steps (or actions) of a workflow run concurrently, 1 - in order.
+#   the actions run in order unless the workflow sets actions-concurrency
+KEEP_WORKFLOW_MAX_CONCURRENCY = int(os.environ.get("KEEP_WORKFLOW_MAX_CONCURRENCY", 10))
+
 
 class WorkflowStrategy(enum.Enum):
     # if a workflow run on the same fingerprint, skip the workflow
@@ -31,6 +37,7 @@ class Workflow:
         workflow_providers_type: typing.List[str] = [],
         workflow_strategy: WorkflowStrategy = WorkflowStrategy.NONPARALLEL_WITH_RETRY.value,
         on_failure: Step = None,
+        workflow_actions_concurrency: int = 1,
     ):
         self.workflow_id = workflow_id
         self.workflow_owners = workflow_owners
@@ -44,27 +51,71 @@ class Workflow:
         self.workflow_providers_type = workflow_providers_type
         self.workflow_strategy = workflow_strategy
         self.on_failure = on_failure
+        # the actions may rely on running one after the other (e.g. notify, then
+        #   open a ticket), so they run concurrently only if the workflow says so
+        self.workflow_actions_concurrency = workflow_actions_concurrency
         self.context_manager = context_manager
         self.io_nandler = IOHandler(context_manager)
         self.logger = self.context_manager.get_logger()
 
+    def clone(self) -> "Workflow":
+        """Copy the parsed workflow for a new run, with a fresh context
+
+        The steps and providers are copied (not parsed again), and the providers
+        configuration is taken from this workflow's context, so no secrets are read.
+        """
+        context_manager = ContextManager(
+            tenant_id=self.context_manager.tenant_id,
+            workflow_id=self.context_manager.workflow_id,
+        )
+        context_manager.providers_context = dict(self.context_manager.providers_context)
+        return Workflow(
+            context_manager=context_manager,
+            workflow_id=self.workflow_id,
+            workflow_owners=self.workflow_owners,
+            workflow_tags=self.workflow_tags,
+            workflow_interval=self.workflow_interval,
+            workflow_triggers=self.workflow_triggers,
+            workflow_steps=[
+                step.clone(context_manager) for step in self.workflow_steps
+            ],
+            workflow_actions=[
+                action.clone(context_manager) for action in self.workflow_actions
+            ],
+            workflow_description=self.workflow_description,
+            workflow_providers=self.workflow_providers,
+            workflow_providers_type=self.workflow_providers_type,
+            workflow_strategy=self.workflow_strategy,
+            on_failure=(
+                self.on_failure.clone(context_manager) if self.on_failure else None
+            ),
+            workflow_actions_concurrency=self.workflow_actions_concurrency,
+        )
+
     def run_steps(self):
         self.logger.debug(f"Running steps for workflow {self.workflow_id}")
-        for step in self.workflow_steps:
-            try:
-                self.logger.info("Running step %s", step.step_id)
-                step_ran = step.run()
-                if step_ran:
-                    self.logger.info("Step %s ran successfully", step.step_id)
-            except StepError as e:
-                self.logger.error(f"Step {step.step_id} failed: {e}")
-                raise
+        concurrency = KEEP_WORKFLOW_MAX_CONCURRENCY
+        if self._runs_concurrently(self.workflow_steps, concurrency):
+            self._run_concurrently(self.workflow_steps, self.run_step, concurrency)
+        else:
+            for step in self.workflow_steps:
+                self.run_step(step)
         self.logger.debug(f"Steps for workflow {self.workflow_id} ran successfully")
 
-    def run_action(self, action: Step):
+    def run_step(self, step: Step, isolated: bool = False):
+        try:
+            self.logger.info("Running step %s", step.step_id)
+            step_ran = step.run(isolated=isolated)
+            if step_ran:
+                self.logger.info("Step %s ran successfully", step.step_id)
+        except StepError as e:
+            self.logger.error(f"Step {step.step_id} failed: {e}")
+            raise
+
+    def run_action(self, action: Step, isolated: bool = False):
         self.logger.info("Running action %s", action.name)
         try:
-            action_ran = action.run()
+            action_ran = action.run(isolated=isolated)
             action_error = None
             if action_ran:
                 self.logger.info("Action %s ran successfully", action.name)
@@ -78,14 +129,89 @@ class Workflow:
         self.logger.debug("Running actions")
         actions_firing = []
         actions_errors = []
+        concurrency = min(
+            self.workflow_actions_concurrency, KEEP_WORKFLOW_MAX_CONCURRENCY
+        )
+        if self._runs_concurrently(self.workflow_actions, concurrency):
+            outcomes = self._run_concurrently(
+                self.workflow_actions, self.run_action, concurrency
+            )
+        else:
+            outcomes = {
+                action.step_id: self.run_action(action)
+                for action in self.workflow_actions
+            }
         for action in self.workflow_actions:
-            action_status, action_error = self.run_action(action)
+            if action.step_id not in outcomes:
+                continue
+            action_status, action_error = outcomes[action.step_id]
             if action_error:
                 actions_firing.append(action_status)
                 actions_errors.append(action_error)
         self.logger.debug("Actions run")
         return actions_firing, actions_errors
 
+    def _runs_concurrently(self, steps: typing.List[Step], concurrency: int) -> bool:
+        """Whether the steps (or actions) run concurrently, by their dependencies"""
+        return (
+            concurrency > 1
+            and len(steps) > 1
+            # {{ steps.this }} depends on the order all the steps and actions ran in
+            and all(
+                step.dependencies is not None
+                for step in self.workflow_steps + self.workflow_actions
+            )
+        )
+
+    def _run_concurrently(
+        self, steps: typing.List[Step], run: typing.Callable, concurrency: int
+    ) -> dict[str, typing.Any]:
+        """
+        Run the steps on a thread pool, each once the steps it depends on are done.
+
+        Args:
+            steps (list[Step]): the steps (or actions) to run.
+            run (Callable): runs a step, called with isolated=True.
+            concurrency (int): how many steps run at the same time.
+
+        Returns:
+            dict: step id -> what run returned, for the steps that ran.
+
+        Raises:
+            Exception: the first error raised by run, no step starts after it.
+        """
+        pending = list(steps)
+        running = {}
+        done = set()
+        outcomes = {}
+        error = None
+        with ThreadPoolExecutor(
+            max_workers=min(concurrency, len(steps)),
+            thread_name_prefix=f"workflow-{self.workflow_id}",
+        ) as executor:
+            while pending or running:
+                if error is None:
+                    for step in [
+                        step
+                        for step in pending
+                        if all(dependency in done for dependency in step.dependencies)
+                    ]:
+                        pending.remove(step)
+                        running[executor.submit(run, step, isolated=True)] = step
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    step = running.pop(future)
+                    done.add(step.step_id)
+                    try:
+                        outcomes[step.step_id] = future.result()
+                    except Exception as e:
+                        error = error or e
+        if error is not None:
+            raise error
+        return outcomes
+
     def run(self, workflow_execution_id):
         self.logger.info(f"Running workflow {self.workflow_id}")
         self.context_manager.set_execution_context(workflow_execution_id)
@@ -0,0 +1,137 @@
+"""
+Process-wide cache of the parsed workflows of every tenant.
+
+Parsing a workflow loads its yaml, reads the configuration (secrets) of every
+installed provider of the tenant and initializes the providers of its steps and
+actions. Doing it for every run makes every event-triggered and interval-triggered
+run pay for it, so the parsed workflow is kept as a template and every run gets a
+clone of it (see Workflow.clone) with a fresh context.
+
+A template is used as long as the workflow's version (revision, last_updated) and
+the tenant's providers version didn't change. The providers version is bumped by
+invalidate_providers() whenever a provider is installed, updated or deleted, and
+templates older than KEEP_WORKFLOWS_CACHE_TTL seconds are parsed again to pick up
+the providers changed through other replicas.
+"""
+
+import logging
+import os
+import threading
+import time
+import typing
+from collections import OrderedDict
+from datetime import datetime
+
+from keep.workflowmanager.workflow import Workflow
+
+KEEP_WORKFLOWS_CACHE_SIZE = int(os.environ.get("KEEP_WORKFLOWS_CACHE_SIZE", 1000))
+# seconds
+KEEP_WORKFLOWS_CACHE_TTL = int(os.environ.get("KEEP_WORKFLOWS_CACHE_TTL", 300))
+
+
+class WorkflowCache:
+    def __init__(
+        self,
+        max_size: int = KEEP_WORKFLOWS_CACHE_SIZE,
+        ttl: int = KEEP_WORKFLOWS_CACHE_TTL,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.max_size = max_size
+        self.ttl = ttl
+        # (tenant_id, workflow_id) -> (workflow version, providers version, template, when it was parsed)
+        self._templates: OrderedDict[
+            tuple[str, str], tuple[tuple[int, datetime], int, Workflow, float]
+        ] = OrderedDict()
+        # tenant_id -> providers version
+        self._providers_versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def get_instance(cls) -> "WorkflowCache":
+        if not hasattr(cls, "_instance"):
+            cls._instance = cls()
+        return cls._instance
+
+    def get(
+        self,
+        tenant_id: str,
+        workflow_id: str,
+        version: tuple[int, datetime],
+        parse: typing.Callable[[], Workflow],
+    ) -> Workflow:
+        """Get a clone of the parsed workflow, parsing it on a miss
+
+        Args:
+            version (tuple[int, datetime]): the (revision, last_updated) of the workflow
+            parse (typing.Callable[[], Workflow]): parses the workflow on a miss
+
+        Returns:
+            Workflow: a workflow that can be run, never the cached template itself
+        """
+        key = (tenant_id, workflow_id)
+        now = time.monotonic()
+        with self._lock:
+            providers_version = self._providers_versions.get(tenant_id, 0)
+            entry = self._templates.get(key)
+            if (
+                entry is not None
+                and entry[0] == version
+                and entry[1] == providers_version
+                and now - entry[3] < self.ttl
+            ):
+                self._templates.move_to_end(key)
+                self.hits += 1
+                template = entry[2]
+            else:
+                self.misses += 1
+                template = None
+        if template is None:
+            # parsed outside of the lock, parsing reads the providers secrets
+            template = parse()
+            with self._lock:
+                # the providers may have changed while parsing, the next get parses again
+                self._templates[key] = (version, providers_version, template, now)
+                self._templates.move_to_end(key)
+                while len(self._templates) > self.max_size:
+                    self._templates.popitem(last=False)
+            self.logger.debug(
+                "Parsed workflow",
+                extra={"tenant_id": tenant_id, "workflow_id": workflow_id},
+            )
+        return template.clone()
+
+    def invalidate(self, tenant_id: str, workflow_id: str | None = None):
+        """Drop the parsed workflow (or all the parsed workflows) of the tenant"""
+        with self._lock:
+            if workflow_id is None:
+                keys = [key for key in self._templates if key[0] == tenant_id]
+            else:
+                keys = [(tenant_id, workflow_id)]
+            for key in keys:
+                self._templates.pop(key, None)
+
+    def invalidate_providers(self, tenant_id: str):
+        """Parse the tenant's workflows again on their next run,
+        should be called whenever a provider is installed, updated or deleted"""
+        with self._lock:
+            self._providers_versions[tenant_id] = (
+                self._providers_versions.get(tenant_id, 0) + 1
+            )
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+            self._providers_versions.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._templates),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
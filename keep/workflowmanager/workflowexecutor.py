@@ -0,0 +1,220 @@
+"""
+A bounded pool of threads that run the workflows of the scheduler.
+
+Running every workflow in its own thread lets an alert storm start thousands of
+threads that exhaust the database pool. The executor runs at most
+KEEP_WORKFLOWS_MAX_CONCURRENCY workflows at once, and queues up to
+KEEP_WORKFLOWS_QUEUE_SIZE more, manual runs ahead of event runs ahead of interval runs.
+"""
+
+import dataclasses
+import enum
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+import typing
+
+from opentelemetry import metrics
+
+KEEP_WORKFLOWS_MAX_CONCURRENCY = int(
+    os.environ.get("KEEP_WORKFLOWS_MAX_CONCURRENCY", 8)
+)
+KEEP_WORKFLOWS_QUEUE_SIZE = int(os.environ.get("KEEP_WORKFLOWS_QUEUE_SIZE", 1000))
+
+
+class WorkflowRunPriority(enum.IntEnum):
+    # lower runs first
+    MANUAL = 0
+    EVENT = 1
+    INTERVAL = 2
+
+
+@dataclasses.dataclass(order=True)
+class WorkflowRun:
+    priority: WorkflowRunPriority
+    # the submission order, for FIFO within the same priority
+    sequence: int
+    func: typing.Callable = dataclasses.field(compare=False)
+    args: tuple = dataclasses.field(compare=False, default=())
+    submitted_at: float = dataclasses.field(
+        compare=False, default_factory=time.monotonic
+    )
+
+
+class WorkflowExecutor:
+    def __init__(
+        self,
+        max_concurrency: int = KEEP_WORKFLOWS_MAX_CONCURRENCY,
+        queue_size: int = KEEP_WORKFLOWS_QUEUE_SIZE,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self._queue: queue.PriorityQueue[WorkflowRun] = queue.PriorityQueue(
+            maxsize=queue_size
+        )
+        self._sequence = itertools.count()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._accepting = False
+        self._stop = threading.Event()
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._metrics_registered = False
+
+    def start(self):
+        with self._lock:
+            if self._accepting:
+                return
+            self._accepting = True
+            self._stop.clear()
+            for i in range(self.max_concurrency):
+                thread = threading.Thread(
+                    target=self._work, name=f"workflow-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+        self._register_metrics()
+        self.logger.info(
+            "Workflows executor started",
+            extra={
+                "max_concurrency": self.max_concurrency,
+                "queue_size": self.queue_size,
+            },
+        )
+
+    def submit(
+        self,
+        func: typing.Callable,
+        *args,
+        priority: WorkflowRunPriority = WorkflowRunPriority.EVENT,
+    ) -> bool:
+        """Queue a workflow run
+
+        Returns:
+            bool: False if the executor is stopped or its queue is full, the caller decides
+                  whether to retry the run later or to fail it
+        """
+        if not self._accepting:
+            with self._lock:
+                self.rejected += 1
+            return False
+        run = WorkflowRun(priority, next(self._sequence), func, args)
+        try:
+            self._queue.put_nowait(run)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            self.logger.warning(
+                "Workflows queue is full, rejecting the workflow run",
+                extra={"priority": priority.name, "queue_size": self.queue_size},
+            )
+            return False
+        return True
+
+    def is_full(self) -> bool:
+        return self._queue.full()
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stop(self, drain_timeout: float = 30.0):
+        """Stop accepting runs, wait up to drain_timeout seconds for the queued and
+        active runs to finish, and stop the workers"""
+        with self._lock:
+            self._accepting = False
+        self.logger.info(
+            "Stopping workflows executor",
+            extra={"depth": self.depth(), "active": self.active},
+        )
+        deadline = time.monotonic() + drain_timeout
+        # unfinished_tasks counts the queued runs and the runs that didn't finish yet
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stop.set()
+        dropped = 0
+        while True:
+            try:
+                self._queue.get_nowait()
+                dropped += 1
+            except queue.Empty:
+                break
+        for thread in self._threads:
+            thread.join(timeout=max(deadline - time.monotonic(), 0.1))
+        self._threads = []
+        self.logger.info(
+            "Workflows executor stopped",
+            extra={"completed": self.completed, "dropped": dropped},
+        )
+
+    def status(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "depth": self.depth(),
+            "active": self.active,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                run = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self.active += 1
+            started_at = time.monotonic()
+            try:
+                run.func(*run.args)
+            except Exception:
+                # the runs handle their own failures, this shouldn't happen
+                self.logger.exception("Workflow run failed")
+                with self._lock:
+                    self.failed += 1
+            finally:
+                finished_at = time.monotonic()
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+                self._queue.task_done()
+                if self._metrics_registered:
+                    attributes = {"priority": run.priority.name.lower()}
+                    self._queue_latency.record(
+                        started_at - run.submitted_at, attributes=attributes
+                    )
+                    self._run_latency.record(
+                        finished_at - started_at, attributes=attributes
+                    )
+
+    def _register_metrics(self):
+        if self._metrics_registered:
+            return
+        meter = metrics.get_meter(__name__)
+        meter.create_observable_gauge(
+            "keep_workflows_queue_depth",
+            callbacks=[lambda options: [metrics.Observation(self.depth())]],
+            description="The number of workflow runs waiting for a worker",
+        )
+        meter.create_observable_gauge(
+            "keep_workflows_active_runs",
+            callbacks=[lambda options: [metrics.Observation(self.active)]],
+            description="The number of workflows running",
+        )
+        self._queue_latency = meter.create_histogram(
+            "keep_workflows_queue_latency",
+            unit="s",
+            description="How long a workflow run waited for a worker",
+        )
+        self._run_latency = meter.create_histogram(
+            "keep_workflows_run_latency",
+            unit="s",
+            description="How long a workflow run took",
+        )
+        self._metrics_registered = True
@@ -1,6 +1,5 @@
 import logging
 import os
-import re
 import typing
 import uuid
 
@@ -15,6 +14,10 @@ from keep.providers.providers_factory import ProviderConfigurationException
 from keep.workflowmanager.workflow import Workflow
 from keep.workflowmanager.workflowscheduler import WorkflowScheduler
 from keep.workflowmanager.workflowstore import WorkflowStore
+from keep.workflowmanager.workflowtriggerindex import (
+    IndexedTrigger,
+    WorkflowTriggerIndex,
+)
 
 
 class WorkflowManager:
@@ -31,6 +34,7 @@ class WorkflowManager:
         self.logger = logging.getLogger(__name__)
         self.scheduler = WorkflowScheduler(self)
         self.workflow_store = WorkflowStore()
+        self.trigger_index = WorkflowTriggerIndex.get_instance()
         self.started = False
 
     async def start(self):
@@ -46,146 +50,133 @@ class WorkflowManager:
         self.scheduler.stop()
         self.started = False
 
-    def _apply_filter(self, filter_val, value):
-        # if it's a regex, apply it
-        if filter_val.startswith('r"'):
-            try:
-                # remove the r" and the last "
-                pattern = re.compile(filter_val[2:-1])
-                return pattern.findall(value)
-            except Exception as e:
-                self.logger.error(
-                    f"Error applying regex filter: {filter_val} on value: {value}",
-                    extra={"exception": e},
-                )
-                return False
-        else:
-            return value == filter_val
-
     def insert_events(self, tenant_id, events: typing.List[AlertDto]):
+        # only the triggers that may match an event are evaluated (see WorkflowTriggerIndex),
+        #   and only the workflows that should run are materialized
+        trigger_index = self.trigger_index.get(tenant_id)
         for event in events:
-            all_workflow_models = self.workflow_store.get_all_workflows(tenant_id)
-            for workflow_model in all_workflow_models:
-                try:
-                    # get the actual workflow that can be triggered
-                    workflow = self.workflow_store.get_workflow(
-                        tenant_id, workflow_model.id
-                    )
-                # the provider is not configured, hence the workflow cannot be triggered
-                # todo - handle it better
-                # todo2 - handle if more than one provider is not configured
-                except ProviderConfigurationException as e:
-                    self.logger.warning(
-                        f"Workflow have a provider that is not configured: {e}"
-                    )
-                    continue
-                except Exception as e:
-                    # TODO: how to handle workflows that aren't properly parsed/configured?
-                    self.logger.error(f"Error getting workflow: {e}")
+            # the workflows materialized for this event
+            workflows: dict[str, Workflow] = {}
+            for indexed_trigger in trigger_index.candidates(
+                event, self._get_event_value
+            ):
+                if not self._trigger_matches(event, indexed_trigger):
                     continue
-                for trigger in workflow.workflow_triggers:
-                    # TODO: handle it better
-                    if not trigger.get("type") == "alert":
-                        continue
-                    should_run = True
-                    # apply filters
-                    for filter in trigger.get("filters", []):
-                        # TODO: more sophisticated filtering/attributes/nested, etc
-                        filter_key = filter.get("key")
-                        filter_val = filter.get("value")
-                        event_val = self._get_event_value(event, filter_key)
-                        if not event_val:
-                            self.logger.warning(
-                                "Failed to run filter, skipping the event. Probably misconfigured workflow."
-                            )
-                            should_run = False
-                            continue
-                        # if its list, check if the filter is in the list
-                        if isinstance(event_val, list):
-                            for val in event_val:
-                                # if one filter applies, it should run
-                                if self._apply_filter(filter_val, val):
-                                    should_run = True
-                                    break
-                                should_run = False
-                        # elif the filter is string/int/float, compare them:
-                        elif type(event_val) in [
-                            int,
-                            str,
-                            float,
-                        ]:
-                            if not self._apply_filter(filter_val, event_val):
-                                self.logger.debug(
-                                    "Filter didn't match, skipping",
+                trigger = indexed_trigger.trigger
+                workflow_id = indexed_trigger.workflow_id
+                # enrich the alert with more data
+                self.logger.info("Found a workflow to run")
+                event.trigger = "alert"
+                # prepare the alert with the enrichment
+                self.logger.info("Enriching alert")
+                alert_enrichment = get_enrichment(tenant_id, event.fingerprint)
+                if alert_enrichment:
+                    for k, v in alert_enrichment.enrichments.items():
+                        setattr(event, k, v)
+                self.logger.info("Alert enriched")
+                # apply only_on_change (https://github.com/keephq/keep/issues/801)
+                fields_that_needs_to_be_change = trigger.get("only_on_change", [])
+                should_run = True
+                # if there are fields that needs to be changed, get the previous alert
+                if fields_that_needs_to_be_change:
+                    previous_alert = get_previous_alert_by_fingerprint(
+                        tenant_id, event.fingerprint
+                    )
+                    # now compare:
+                    #   (no previous alert means that the workflow should run)
+                    if previous_alert:
+                        for field in fields_that_needs_to_be_change:
+                            # the field hasn't change
+                            if getattr(event, field) == previous_alert.event.get(field):
+                                self.logger.info(
+                                    "Skipping the workflow because the field hasn't change",
                                     extra={
-                                        "filter_key": filter_key,
-                                        "filter_val": filter_val,
+                                        "field": field,
                                         "event": event,
+                                        "previous_alert": previous_alert,
                                     },
                                 )
                                 should_run = False
                                 break
-                        # other types currently does not supported
-                        else:
-                            self.logger.warning(
-                                "Could not run the filter on unsupported type, skipping the event. Probably misconfigured workflow."
-                            )
-                            should_run = False
-                            break
 
-                    if not should_run:
-                        continue
-                    # enrich the alert with more data
-                    self.logger.info("Found a workflow to run")
-                    event.trigger = "alert"
-                    # prepare the alert with the enrichment
-                    self.logger.info("Enriching alert")
-                    alert_enrichment = get_enrichment(tenant_id, event.fingerprint)
-                    if alert_enrichment:
-                        for k, v in alert_enrichment.enrichments.items():
-                            setattr(event, k, v)
-                    self.logger.info("Alert enriched")
-                    # apply only_on_change (https://github.com/keephq/keep/issues/801)
-                    fields_that_needs_to_be_change = trigger.get("only_on_change", [])
-                    # if there are fields that needs to be changed, get the previous alert
-                    if fields_that_needs_to_be_change:
-                        previous_alert = get_previous_alert_by_fingerprint(
-                            tenant_id, event.fingerprint
+                if not should_run:
+                    continue
+                if workflow_id not in workflows:
+                    try:
+                        # get the actual workflow that can be triggered
+                        workflows[workflow_id] = (
+                            self.workflow_store.get_workflow_from_yaml(
+                                tenant_id,
+                                workflow_id,
+                                trigger_index.workflows[workflow_id].workflow_yaml,
+                                version=trigger_index.workflows[workflow_id].version,
+                            )
                         )
-                        # now compare:
-                        #   (no previous alert means that the workflow should run)
-                        if previous_alert:
-                            for field in fields_that_needs_to_be_change:
-                                # the field hasn't change
-                                if getattr(event, field) == previous_alert.event.get(
-                                    field
-                                ):
-                                    self.logger.info(
-                                        "Skipping the workflow because the field hasn't change",
-                                        extra={
-                                            "field": field,
-                                            "event": event,
-                                            "previous_alert": previous_alert,
-                                        },
-                                    )
-                                    should_run = False
-                                    break
-
-                    if not should_run:
-                        continue
-                    # Lastly, if the workflow should run, add it to the scheduler
-                    self.logger.info("Adding workflow to run")
-                    with self.scheduler.lock:
-                        self.scheduler.workflows_to_run.append(
-                            {
-                                "workflow": workflow,
-                                "workflow_id": workflow_model.id,
-                                "tenant_id": tenant_id,
-                                "triggered_by": "alert",
-                                "event": event,
-                            }
+                    # the provider is not configured, hence the workflow cannot be triggered
+                    # todo - handle it better
+                    # todo2 - handle if more than one provider is not configured
+                    except ProviderConfigurationException as e:
+                        self.logger.warning(
+                            f"Workflow have a provider that is not configured: {e}"
                         )
-                    self.logger.info("Workflow added to run")
+                        continue
+                    except Exception as e:
+                        # TODO: how to handle workflows that aren't properly parsed/configured?
+                        self.logger.error(f"Error getting workflow: {e}")
+                        continue
+                # Lastly, if the workflow should run, add it to the scheduler
+                self.logger.info("Adding workflow to run")
+                with self.scheduler.lock:
+                    self.scheduler.workflows_to_run.append(
+                        {
+                            "workflow": workflows[workflow_id],
+                            "workflow_id": workflow_id,
+                            "tenant_id": tenant_id,
+                            "triggered_by": "alert",
+                            "event": event,
+                        }
+                    )
+                self.logger.info("Workflow added to run")
+                self.scheduler.wakeup()
+
+    def _trigger_matches(self, event: AlertDto, trigger: IndexedTrigger) -> bool:
+        # all the filters should match
+        for filter in trigger.filters:
+            # TODO: more sophisticated filtering/attributes/nested, etc
+            event_val = self._get_event_value(event, filter.key) if filter.key else None
+            if not event_val:
+                self.logger.warning(
+                    "Failed to run filter, skipping the event. Probably misconfigured workflow."
+                )
+                return False
+            # if its list, check if the filter is in the list
+            if isinstance(event_val, list):
+                # if one value applies, the filter matches
+                if not any(filter.apply(val) for val in event_val):
+                    return False
+            # elif the filter is string/int/float, compare them:
+            elif type(event_val) in [
+                int,
+                str,
+                float,
+            ]:
+                if not filter.apply(event_val):
+                    self.logger.debug(
+                        "Filter didn't match, skipping",
+                        extra={
+                            "filter_key": filter.key,
+                            "filter_val": filter.value,
+                            "event": event,
+                        },
+                    )
+                    return False
+            # other types currently does not supported
+            else:
+                self.logger.warning(
+                    "Could not run the filter on unsupported type, skipping the event. Probably misconfigured workflow."
+                )
+                return False
+        return True
 
     def _get_event_value(self, event, filter_key):
         # if the filter key is a nested key, get the value
@@ -306,6 +297,13 @@ class WorkflowManager:
             workflow_results.update(
                 {step.name: step.provider.results for step in workflow.workflow_steps}
             )
+        # when every step and action ran and for how long, the items, failures and
+        #   latencies of the foreach steps and actions
+        for step in (workflow.workflow_steps or []) + workflow.workflow_actions:
+            if step.timing:
+                workflow_results[f"{step.name}.timing"] = step.timing
+            if step.foreach_results:
+                workflow_results[f"{step.name}.foreach"] = step.foreach_results
         try:
             save_workflow_results(
                 tenant_id=workflow.context_manager.tenant_id,
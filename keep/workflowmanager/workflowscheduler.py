@@ -1,6 +1,8 @@
+import datetime
 import enum
 import hashlib
 import logging
+import os
 import threading
 import time
 import typing
@@ -11,14 +13,27 @@ from sqlalchemy.exc import IntegrityError
 
 from keep.api.core.db import create_workflow_execution
 from keep.api.core.db import finish_workflow_execution as finish_workflow_execution_db
-from keep.api.core.db import get_enrichment, get_previous_execution_id
+from keep.api.core.db import (
+    get_enrichment,
+    get_next_workflow_run_at,
+    get_previous_execution_id,
+)
 from keep.api.core.db import get_workflow as get_workflow_db
-from keep.api.core.db import get_workflows_that_should_run
+from keep.api.core.db import get_workflows_that_should_run, sync_workflow_schedules
 from keep.api.models.alert import AlertDto
 from keep.providers.providers_factory import ProviderConfigurationException
 from keep.workflowmanager.workflow import Workflow, WorkflowStrategy
+from keep.workflowmanager.workflowexecutor import WorkflowExecutor, WorkflowRunPriority
 from keep.workflowmanager.workflowstore import WorkflowStore
 
+# the scheduler sleeps until the next interval workflow is due, but at most this many seconds
+#   (to pick up workflows created by other replicas)
+KEEP_SCHEDULER_MAX_POLL_INTERVAL = float(
+    os.environ.get("KEEP_SCHEDULER_MAX_POLL_INTERVAL", 10)
+)
+# how often the schedules are reconciled with the workflows
+KEEP_SCHEDULER_SYNC_INTERVAL = int(os.environ.get("KEEP_SCHEDULER_SYNC_INTERVAL", 300))
+
 
 class WorkflowStatus(enum.Enum):
     SUCCESS = "success"
@@ -38,9 +53,15 @@ class WorkflowScheduler:
         self.workflows_to_run = []
         self._stop = False
         self.lock = Lock()
+        # runs the workflows with a bounded concurrency
+        self.executor = WorkflowExecutor()
+        # wakes up the scheduler loop, e.g. when there are new event workflows to run
+        self._wakeup = threading.Event()
+        self._last_sync = 0.0
 
     async def start(self):
         self.logger.info("Starting workflows scheduler")
+        self.executor.start()
         thread = threading.Thread(target=self._start)
         thread.start()
         self.threads.append(thread)
@@ -48,9 +69,15 @@ class WorkflowScheduler:
 
     def _handle_interval_workflows(self):
         workflows = []
+        if self.executor.is_full():
+            # don't claim executions that can't run, they'll be claimed on the next iteration
+            self.logger.warning("Workflows queue is full, skipping interval workflows")
+            return
         try:
-            # get all workflows that should run due to interval
-            workflows = get_workflows_that_should_run()
+            # get all workflows that should run due to interval (as many as can be queued)
+            workflows = get_workflows_that_should_run(
+                limit=min(self.executor.queue_size - self.executor.depth(), 100)
+            )
         except Exception as e:
             self.logger.error(f"Error getting workflows that should run: {e}")
             pass
@@ -81,12 +108,21 @@ class WorkflowScheduler:
                     error=f"Error getting workflow: {e}",
                 )
                 continue
-            thread = threading.Thread(
-                target=self._run_workflow,
-                args=[tenant_id, workflow_id, workflow, workflow_execution_id],
-            )
-            thread.start()
-            self.threads.append(thread)
+            if not self.executor.submit(
+                self._run_workflow,
+                tenant_id,
+                workflow_id,
+                workflow,
+                workflow_execution_id,
+                priority=WorkflowRunPriority.INTERVAL,
+            ):
+                self._finish_workflow_execution(
+                    tenant_id=tenant_id,
+                    workflow_id=workflow_id,
+                    workflow_execution_id=workflow_execution_id,
+                    status=WorkflowStatus.ERROR,
+                    error="The workflows queue is full",
+                )
 
     def _run_workflow(
         self,
@@ -174,6 +210,7 @@ class WorkflowScheduler:
                     "event": alert,
                 }
             )
+        self.wakeup()
         return workflow_execution_id
 
     def _get_unique_execution_number(self, fingerprint=None):
@@ -244,6 +281,11 @@ class WorkflowScheduler:
 
             event = workflow_to_run.get("event")
             triggered_by = workflow_to_run.get("triggered_by")
+            priority = (
+                WorkflowRunPriority.MANUAL
+                if triggered_by == "manual"
+                else WorkflowRunPriority.EVENT
+            )
             if triggered_by == "manual":
                 triggered_by_user = workflow_to_run.get("triggered_by_user")
                 triggered_by = f"manually by {triggered_by_user}"
@@ -343,28 +385,76 @@ class WorkflowScheduler:
                     )
                     continue
             # Last, run the workflow
-            thread = threading.Thread(
-                target=self._run_workflow,
-                args=[tenant_id, workflow_id, workflow, workflow_execution_id, event],
+            if not self.executor.submit(
+                self._run_workflow,
+                tenant_id,
+                workflow_id,
+                workflow,
+                workflow_execution_id,
+                event,
+                priority=priority,
+            ):
+                # the queue is full, try again on the next iteration
+                #   (the execution is already created, so it isn't created again)
+                with self.lock:
+                    self.workflows_to_run.append(
+                        {
+                            **workflow_to_run,
+                            "workflow": workflow,
+                            "workflow_execution_id": workflow_execution_id,
+                            "event": event,
+                        }
+                    )
+
+    def wakeup(self):
+        """Run the scheduler loop now, instead of waiting for the next due workflow"""
+        self._wakeup.set()
+
+    def _sync_schedules(self):
+        if time.monotonic() - self._last_sync < KEEP_SCHEDULER_SYNC_INTERVAL:
+            return
+        self._last_sync = time.monotonic()
+        changes = sync_workflow_schedules()
+        if changes:
+            self.logger.info(
+                "Synced the workflows schedules", extra={"changes": changes}
             )
-            thread.start()
-            self.threads.append(thread)
+
+    def _get_sleep_time(self) -> float:
+        # event workflows that couldn't run yet (e.g. collisions) are retried every second
+        with self.lock:
+            if self.workflows_to_run:
+                return 1
+        if self.executor.is_full():
+            return 1
+        next_run_at = get_next_workflow_run_at()
+        if not next_run_at:
+            return KEEP_SCHEDULER_MAX_POLL_INTERVAL
+        seconds_until_due = (next_run_at - datetime.datetime.utcnow()).total_seconds()
+        return min(max(seconds_until_due, 0.1), KEEP_SCHEDULER_MAX_POLL_INTERVAL)
 
     def _start(self):
         self.logger.info("Starting workflows scheduler")
         while not self._stop:
+            # anything that wakes the loop from now on is handled in this iteration or the next one
+            self._wakeup.clear()
             # get all workflows that should run now
             self.logger.debug("Getting workflows that should run...")
+            sleep_time = 1
             try:
+                self._sync_schedules()
                 self._handle_interval_workflows()
                 self._handle_event_workflows()
+                sleep_time = self._get_sleep_time()
             except Exception as e:
                 # This is the "mainloop" of the scheduler, we don't want to crash it
                 # But any exception here should be investigated
                 self.logger.error(f"Error getting workflows that should run: {e}")
                 pass
-            self.logger.debug("Sleeping until next iteration")
-            time.sleep(1)
+            self.logger.debug(
+                "Sleeping until next iteration", extra={"sleep_time": sleep_time}
+            )
+            self._wakeup.wait(sleep_time)
         self.logger.info("Workflows scheduler stopped")
 
     def run_workflows(self, workflows: typing.List[Workflow]):
@@ -383,9 +473,12 @@ class WorkflowScheduler:
     def stop(self):
         self.logger.info("Stopping scheduled workflows")
         self._stop = True
+        self._wakeup.set()
         # Now wait for the threads to finish
         for thread in self.threads:
             thread.join()
+        # and for the queued and running workflows
+        self.executor.stop()
         self.logger.info("Scheduled workflows stopped")
 
     def _run_workflows_with_interval(
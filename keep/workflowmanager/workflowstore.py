@@ -1,3 +1,5 @@
+import copy
+import datetime
 import io
 import logging
 import os
@@ -15,16 +17,20 @@ from keep.api.core.db import (
     get_all_workflows_yamls,
     get_raw_workflow,
     get_workflow_execution,
+    get_workflow_version,
     get_workflows_with_last_execution,
 )
 from keep.parser.parser import Parser
 from keep.workflowmanager.workflow import Workflow
+from keep.workflowmanager.workflowcache import WorkflowCache
+from keep.workflowmanager.workflowtriggerindex import WorkflowTriggerIndex
 
 
 class WorkflowStore:
     def __init__(self):
         self.parser = Parser()
         self.logger = logging.getLogger(__name__)
+        self.cache = WorkflowCache.get_instance()
 
     def get_workflow_execution(self, tenant_id: str, workflow_execution_id: str):
         workflow_execution = get_workflow_execution(tenant_id, workflow_execution_id)
@@ -48,6 +54,7 @@ class WorkflowStore:
             interval=interval,
             workflow_raw=yaml.dump(workflow),
         )
+        WorkflowTriggerIndex.get_instance().invalidate(tenant_id)
         self.logger.info(f"Workflow {workflow_id} created successfully")
         return workflow
 
@@ -59,6 +66,8 @@ class WorkflowStore:
             raise HTTPException(
                 status_code=404, detail=f"Workflow {workflow_id} not found"
             )
+        WorkflowTriggerIndex.get_instance().invalidate(tenant_id)
+        self.cache.invalidate(tenant_id, workflow_id)
 
     def _parse_workflow_to_dict(self, workflow_path: str) -> dict:
         """
@@ -87,14 +96,54 @@ class WorkflowStore:
         return yaml.dump(valid_workflow_yaml)
 
     def get_workflow(self, tenant_id: str, workflow_id: str) -> Workflow:
-        workflow = get_raw_workflow(tenant_id, workflow_id)
-        if not workflow:
+        # only the version is read, the raw workflow is read (and parsed) on a cache miss
+        version = get_workflow_version(tenant_id, workflow_id)
+        if not version:
             raise HTTPException(
                 status_code=404,
                 detail=f"Workflow {workflow_id} not found",
             )
-        workflow_yaml = yaml.safe_load(workflow)
-        workflow = self.parser.parse(tenant_id, workflow_yaml)
+
+        def parse() -> Workflow:
+            workflow = get_raw_workflow(tenant_id, workflow_id)
+            if not workflow:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Workflow {workflow_id} not found",
+                )
+            return self._parse_workflow(
+                tenant_id, workflow_id, yaml.safe_load(workflow)
+            )
+
+        return self.cache.get(tenant_id, workflow_id, version, parse)
+
+    def get_workflow_from_yaml(
+        self,
+        tenant_id: str,
+        workflow_id: str,
+        workflow_yaml: dict,
+        version: tuple[int, datetime.datetime] | None = None,
+    ) -> Workflow:
+        """Materialize a workflow from its already loaded yaml (e.g. from the trigger index)
+
+        Args:
+            version (tuple[int, datetime], optional): the (revision, last_updated) of
+                the yaml, the parsed workflow is cached by it. Defaults to None (not cached).
+        """
+        if version is None:
+            return self._parse_workflow(tenant_id, workflow_id, workflow_yaml)
+        return self.cache.get(
+            tenant_id,
+            workflow_id,
+            version,
+            lambda: self._parse_workflow(tenant_id, workflow_id, workflow_yaml),
+        )
+
+    def _parse_workflow(
+        self, tenant_id: str, workflow_id: str, workflow_yaml: dict
+    ) -> Workflow:
+        # the parser may modify the yaml, and it may be cached by the caller
+        workflow = self.parser.parse(tenant_id, copy.deepcopy(workflow_yaml))
         if len(workflow) > 1:
             raise HTTPException(
                 status_code=500,
@@ -0,0 +1,269 @@
+"""
+Index of the alert triggers of the tenants' workflows.
+
+Matching an alert against the workflows used to load, parse and materialize
+(providers, secrets) every workflow of the tenant for every event, before even
+checking the trigger filters. The index keeps the triggers of each tenant in
+memory, with their regex filters pre-compiled and the triggers bucketed by one of
+their exact-match filters, so matching an event only evaluates the triggers that
+can match it, and only the workflows that matched are materialized.
+
+The index of a tenant is rebuilt (only the workflows that changed are parsed again)
+after invalidate() is called, i.e. when a workflow is created, updated or deleted,
+and the workflows versions are checked every KEEP_WORKFLOW_TRIGGERS_REFRESH_INTERVAL
+seconds to pick up the changes made by other replicas.
+"""
+
+import dataclasses
+import logging
+import os
+import re
+import threading
+import time
+import typing
+from datetime import datetime
+
+import yaml
+
+from keep.api.core.db import get_workflows_by_ids, get_workflows_versions
+
+KEEP_WORKFLOW_TRIGGERS_REFRESH_INTERVAL = int(
+    os.environ.get("KEEP_WORKFLOW_TRIGGERS_REFRESH_INTERVAL", 30)
+)
+
+
+@dataclasses.dataclass
+class TriggerFilter:
+    key: str
+    value: typing.Any
+    # the compiled regex of r"..." filters
+    pattern: re.Pattern | None = None
+    # a regex that failed to compile never matches
+    invalid: bool = False
+
+    @property
+    def is_exact(self) -> bool:
+        return self.pattern is None and not self.invalid
+
+    def apply(self, value) -> bool:
+        if self.invalid:
+            return False
+        if self.pattern is not None:
+            try:
+                return bool(self.pattern.findall(value))
+            except Exception:
+                # e.g. the value is not a string
+                return False
+        return value == self.value
+
+
+@dataclasses.dataclass
+class IndexedTrigger:
+    workflow_id: str
+    # the trigger as written in the workflow (e.g. for only_on_change)
+    trigger: dict
+    filters: list[TriggerFilter]
+
+
+@dataclasses.dataclass
+class IndexedWorkflow:
+    workflow_id: str
+    version: tuple[int, datetime]
+    # the parsed yaml, materialized into a Workflow only when one of its triggers matches
+    #   (None if the workflow is invalid, it's kept so it isn't parsed again until it changes)
+    workflow_yaml: dict | None
+    triggers: list[IndexedTrigger]
+
+
+class TenantTriggerIndex:
+    def __init__(self, workflows: dict[str, IndexedWorkflow]):
+        self.workflows = workflows
+        # filter key -> filter value -> the triggers with this exact-match filter
+        self.buckets: dict[str, dict[typing.Any, list[IndexedTrigger]]] = {}
+        # triggers without an exact-match filter, evaluated for every event
+        self.unbucketed: list[IndexedTrigger] = []
+        # the position of each trigger, so the candidates keep the workflows order
+        self._order: dict[int, int] = {}
+        for workflow in workflows.values():
+            for trigger in workflow.triggers:
+                self._order[id(trigger)] = len(self._order)
+                bucket_filter = next(
+                    (
+                        filt
+                        for filt in trigger.filters
+                        if filt.is_exact
+                        and isinstance(filt.key, str)
+                        and _is_hashable(filt.value)
+                    ),
+                    None,
+                )
+                if bucket_filter is None:
+                    self.unbucketed.append(trigger)
+                    continue
+                self.buckets.setdefault(bucket_filter.key, {}).setdefault(
+                    bucket_filter.value, []
+                ).append(trigger)
+
+    def candidates(
+        self, event, get_event_value: typing.Callable
+    ) -> list[IndexedTrigger]:
+        """The triggers that may match the event, in the order of the workflows"""
+        candidates = list(self.unbucketed)
+        for key, bucket in self.buckets.items():
+            event_val = get_event_value(event, key)
+            if not event_val:
+                continue
+            values = event_val if isinstance(event_val, list) else [event_val]
+            for value in values:
+                if _is_hashable(value):
+                    candidates.extend(bucket.get(value, []))
+        # a trigger may be found through several values of a list
+        unique_candidates = {id(trigger): trigger for trigger in candidates}
+        return [
+            unique_candidates[trigger_id]
+            for trigger_id in sorted(unique_candidates, key=self._order.__getitem__)
+        ]
+
+
+class WorkflowTriggerIndex:
+    def __init__(self, refresh_interval: int = KEEP_WORKFLOW_TRIGGERS_REFRESH_INTERVAL):
+        self.logger = logging.getLogger(__name__)
+        self.refresh_interval = refresh_interval
+        # tenant_id -> (index, when the workflows versions were checked)
+        self._tenants: dict[str, tuple[TenantTriggerIndex, float]] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    @classmethod
+    def get_instance(cls) -> "WorkflowTriggerIndex":
+        if not hasattr(cls, "_instance"):
+            cls._instance = cls()
+        return cls._instance
+
+    def get(self, tenant_id: str) -> TenantTriggerIndex:
+        """Get the trigger index of the tenant, (re)building it if it was invalidated or expired"""
+        with self._lock:
+            entry = self._tenants.get(tenant_id)
+            now = time.monotonic()
+            if entry is not None and now - entry[1] < self.refresh_interval:
+                return entry[0]
+            # rebuilt under the lock, so concurrent batches don't all rebuild it
+            index = self._build(tenant_id, entry[0] if entry else None)
+            self._tenants[tenant_id] = (index, now)
+            return index
+
+    def invalidate(self, tenant_id: str | None = None):
+        """Check the workflows of the tenant (or all tenants) on the next event,
+        should be called whenever a workflow is created, updated or deleted"""
+        with self._lock:
+            if tenant_id is None:
+                self._tenants.clear()
+            else:
+                self._tenants.pop(tenant_id, None)
+
+    def _build(
+        self, tenant_id: str, previous: TenantTriggerIndex | None
+    ) -> TenantTriggerIndex:
+        versions = get_workflows_versions(tenant_id)
+        previous_workflows = previous.workflows if previous else {}
+        workflows = {
+            workflow_id: workflow
+            for workflow_id, workflow in previous_workflows.items()
+            if versions.get(workflow_id) == workflow.version
+        }
+        if previous is not None and len(workflows) == len(versions) == len(
+            previous_workflows
+        ):
+            # nothing changed
+            return previous
+
+        changed = [
+            workflow_id for workflow_id in versions if workflow_id not in workflows
+        ]
+        for workflow_model in get_workflows_by_ids(tenant_id, changed):
+            indexed_workflow = self._index_workflow(
+                tenant_id,
+                workflow_model.id,
+                (workflow_model.revision, workflow_model.last_updated),
+                workflow_model.workflow_raw,
+            )
+            workflows[workflow_model.id] = indexed_workflow
+        # the workflows order, as the workflows were matched before the index
+        workflows = {
+            workflow_id: workflows[workflow_id]
+            for workflow_id in versions
+            if workflow_id in workflows
+        }
+        self.builds += 1
+        self.logger.info(
+            "Built workflows trigger index",
+            extra={
+                "tenant_id": tenant_id,
+                "workflows": len(workflows),
+                "parsed": len(changed),
+            },
+        )
+        return TenantTriggerIndex(workflows)
+
+    def _index_workflow(
+        self,
+        tenant_id: str,
+        workflow_id: str,
+        version: tuple[int, datetime],
+        workflow_raw: str,
+    ) -> IndexedWorkflow:
+        try:
+            workflow_yaml = yaml.safe_load(workflow_raw)
+        except Exception:
+            self.logger.exception(
+                "Failed to parse workflow",
+                extra={"tenant_id": tenant_id, "workflow_id": workflow_id},
+            )
+            return IndexedWorkflow(workflow_id, version, None, [])
+        if not isinstance(workflow_yaml, dict):
+            self.logger.warning(
+                "Workflow is not a valid workflow, skipping it",
+                extra={"tenant_id": tenant_id, "workflow_id": workflow_id},
+            )
+            return IndexedWorkflow(workflow_id, version, None, [])
+        # the same lookup as the parser (stored workflows don't have the "workflow" key)
+        workflow_definition = (
+            workflow_yaml.get("workflow") or workflow_yaml.get("alert") or workflow_yaml
+        )
+        triggers = []
+        for trigger in workflow_definition.get("triggers") or []:
+            if not isinstance(trigger, dict) or trigger.get("type") != "alert":
+                continue
+            filters = [
+                self._compile_filter(tenant_id, workflow_id, filt)
+                for filt in trigger.get("filters") or []
+            ]
+            triggers.append(IndexedTrigger(workflow_id, trigger, filters))
+        return IndexedWorkflow(workflow_id, version, workflow_yaml, triggers)
+
+    def _compile_filter(self, tenant_id: str, workflow_id: str, filt: dict):
+        key = filt.get("key")
+        value = filt.get("value")
+        if isinstance(value, str) and value.startswith('r"'):
+            try:
+                # remove the r" and the last "
+                return TriggerFilter(key, value, pattern=re.compile(value[2:-1]))
+            except Exception:
+                self.logger.error(
+                    f"Error compiling regex filter: {value}",
+                    extra={"tenant_id": tenant_id, "workflow_id": workflow_id},
+                )
+                return TriggerFilter(key, value, invalid=True)
+        return TriggerFilter(key, value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"tenants": len(self._tenants), "builds": self.builds}
+
+
+def _is_hashable(value) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
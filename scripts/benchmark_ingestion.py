@@ -0,0 +1,119 @@
+# A script that compares the per event and the batched alerts ingestion (handle_formatted_events)
+# Usage:
+#   DATABASE_CONNECTION_STRING=sqlite:///./benchmark.db python scripts/benchmark_ingestion.py --alerts 500
+import argparse
+import datetime
+import logging
+import os
+import time
+import uuid
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+from keep.api.core.db import engine, try_create_single_tenant
+from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.api.core.realtime_publisher import RealtimePublisher, RealtimeTransport
+from keep.api.models.alert import AlertDto, AlertSeverity, AlertStatus
+from keep.api.routes.alerts import handle_formatted_events
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+class CountingTransport(RealtimeTransport):
+    """A real-time transport that only counts the messages"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def send(self, channel: str, event_name: str, message: str):
+        self.calls += 1
+
+
+def generate_alerts(count: int, fingerprints: int) -> list[AlertDto]:
+    # a prometheus like batch, a few fingerprints that fire repeatedly
+    run_id = str(uuid.uuid4())
+    return [
+        AlertDto(
+            id=f"{run_id}-{i}",
+            name=f"HighCPUUsage-{i % fingerprints}",
+            status=AlertStatus.FIRING,
+            severity=AlertSeverity.CRITICAL,
+            lastReceived=datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
+            source=["prometheus"],
+            labels={
+                "instance": f"instance-{i % fingerprints}",
+                "run": run_id,
+                "pod": f"pod-{i}",
+            },
+            description="CPU usage is over 90%",
+        )
+        for i in range(count)
+    ]
+
+
+def run(batch_ingestion: bool, alerts: int, fingerprints: int, rounds: int) -> dict:
+    os.environ["KEEP_BATCH_INGESTION"] = "true" if batch_ingestion else "false"
+    statements = 0
+
+    def count_statement(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    # the ingestion publishes through the publisher singleton, flushed by hand
+    #   after every batch so the messages are counted per batch
+    transport = CountingTransport()
+    publisher = RealtimePublisher(transport, flush_interval=3600)
+    RealtimePublisher._instance = publisher
+    elapsed = 0.0
+    try:
+        for _ in range(rounds):
+            formatted_events = generate_alerts(alerts, fingerprints)
+            raw_events = [alert.dict() for alert in formatted_events]
+            with Session(engine) as session:
+                start = time.perf_counter()
+                handle_formatted_events(
+                    SINGLE_TENANT_UUID,
+                    "prometheus",
+                    session,
+                    raw_events,
+                    formatted_events,
+                    provider_id="benchmark",
+                )
+                elapsed += time.perf_counter() - start
+            publisher.flush(rate_limit=False)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+        publisher.stop()
+    return {
+        "mode": "batched" if batch_ingestion else "per event",
+        "alerts/s": round(alerts * rounds / elapsed, 1),
+        "statements/batch": statements // rounds,
+        "realtime messages/batch": transport.calls // rounds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the per event and the batched alerts ingestion"
+    )
+    parser.add_argument("--alerts", type=int, default=500, help="alerts per batch")
+    parser.add_argument(
+        "--fingerprints", type=int, default=50, help="distinct fingerprints per batch"
+    )
+    parser.add_argument("--rounds", type=int, default=3, help="batches per mode")
+    args = parser.parse_args()
+
+    try_create_single_tenant(SINGLE_TENANT_UUID)
+    results = [
+        run(batch_ingestion, args.alerts, args.fingerprints, args.rounds)
+        for batch_ingestion in [False, True]
+    ]
+    for result in results:
+        print(", ".join(f"{key}: {value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,12 @@ from sqlalchemy.pool import StaticPool
 from sqlmodel import SQLModel, create_engine
 from starlette_context import context, request_cycle_context
 
+from keep.api.alert_deduplicator.deduplication_index import DeduplicationIndex
+from keep.api.core.auth_cache import AuthCache
+
 # This import is required to create the tables
 from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.api.core.preset_counters import PresetCounters
 from keep.api.models.db.alert import *
 from keep.api.models.db.provider import *
 from keep.api.models.db.rule import *
@@ -20,6 +24,9 @@ from keep.api.models.db.tenant import *
 from keep.api.models.db.user import *
 from keep.api.models.db.workflow import *
 from keep.contextmanager.contextmanager import ContextManager
+from keep.secretmanager.secretmanagerfactory import SecretManagerFactory
+from keep.workflowmanager.workflowcache import WorkflowCache
+from keep.workflowmanager.workflowtriggerindex import WorkflowTriggerIndex
 
 load_dotenv(find_dotenv())
 
@@ -193,6 +200,13 @@ def db_session(request, mysql_container):
     session.add_all(workflow_data)
     session.commit()
 
+    # the deduplication, trigger, workflows, secrets, auth and preset counters caches are process wide, but every test has its own database
+    DeduplicationIndex.get_instance().clear()
+    WorkflowTriggerIndex.get_instance().invalidate()
+    WorkflowCache.get_instance().clear()
+    SecretManagerFactory.clear()
+    AuthCache.get_instance().clear()
+    PresetCounters.get_instance().clear()
     with patch("keep.api.core.db.engine", mock_engine):
         yield session
 
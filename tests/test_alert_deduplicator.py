@@ -140,3 +140,130 @@ def test_deduplication_with_unrelated_filter(db_session):
     # Shouldn't be deduplicated since some-non-relevant-field-1 changed
     #   and it is not the field we are removing in filter
     assert not deduplicated
+
+
+def test_deduplication_batch(db_session):
+    deduplicator = AlertDeduplicator(SINGLE_TENANT_UUID)
+    batch = [
+        AlertDto(
+            id=f"grafana-{i}",
+            source=["grafana"],
+            name=f"grafana-test-alert-{i}",
+            status=AlertStatus.FIRING,
+            severity=AlertSeverity.CRITICAL,
+            lastReceived="2021-08-01T00:00:00Z",
+        )
+        for i in range(3)
+    ]
+    # store the first alert
+    alert_hash, _ = deduplicator.is_deduplicated(batch[0])
+    db_session.add(
+        Alert(
+            tenant_id=SINGLE_TENANT_UUID,
+            provider_type="test",
+            provider_id="test",
+            event=batch[0].dict(),
+            fingerprint=batch[0].fingerprint,
+            alert_hash=alert_hash,
+        )
+    )
+    db_session.commit()
+
+    results = deduplicator.is_deduplicated_batch(batch)
+    assert [deduplicated for _, deduplicated in results] == [True, False, False]
+    # same results as checking the alerts one by one
+    assert results == [deduplicator.is_deduplicated(alert) for alert in batch]
+
+
+def test_deduplication_index(db_session, monkeypatch):
+    from keep.api.alert_deduplicator import deduplication_index
+
+    deduplicator = AlertDeduplicator(SINGLE_TENANT_UUID)
+    alert = AlertDto(
+        id="grafana-1",
+        source=["grafana"],
+        name="grafana-test-alert",
+        status=AlertStatus.FIRING,
+        severity=AlertSeverity.CRITICAL,
+        lastReceived="2021-08-01T00:00:00Z",
+        labels={"pod": "pod-1"},
+    )
+    alert_hash, deduplicated = deduplicator.is_deduplicated(alert)
+    assert not deduplicated
+    # the alert itself is never modified
+    assert alert.lastReceived and alert.labels == {"pod": "pod-1"}
+    # store it, as handle_formatted_events does
+    stored_alert = alert.copy()
+    stored_alert.alert_hash = alert_hash
+    deduplicator.update_index([stored_alert])
+
+    # indexed, so the database isn't read anymore
+    def fail(*args, **kwargs):
+        raise Exception("the database shouldn't be read")
+
+    monkeypatch.setattr(
+        deduplication_index, "get_last_alert_hashes_by_fingerprints", fail
+    )
+    monkeypatch.setattr(deduplication_index, "get_all_filters", fail)
+    # the duplicates aren't confirmed by default
+    assert not deduplicator.index.confirm_duplicates
+    deduplicator = AlertDeduplicator(SINGLE_TENANT_UUID)
+    assert deduplicator.is_deduplicated(alert)[1]
+    assert deduplicator.is_deduplicated_batch([alert]) == [(alert_hash, True)]
+
+
+def test_deduplication_index_confirms_duplicates(db_session):
+    from keep.api.alert_deduplicator.deduplication_index import DeduplicationIndex
+
+    index = DeduplicationIndex(confirm_duplicates=True)
+    index.set_last_hashes(SINGLE_TENANT_UUID, {"fp-1": "hash-1"})
+    # another replica stored a newer alert of the fingerprint
+    db_session.add(
+        Alert(
+            tenant_id=SINGLE_TENANT_UUID,
+            provider_type="test",
+            provider_id="test",
+            event={},
+            fingerprint="fp-1",
+            alert_hash="hash-2",
+        )
+    )
+    db_session.commit()
+    # a different hash is not a duplicate either way, the index is trusted
+    assert index.get_last_hashes(
+        SINGLE_TENANT_UUID, ["fp-1"], {("fp-1", "hash-3")}
+    ) == {"fp-1": "hash-1"}
+    # the alert would be dropped, the last hash is read from the database
+    assert index.get_last_hashes(
+        SINGLE_TENANT_UUID, ["fp-1"], {("fp-1", "hash-1")}
+    ) == {"fp-1": "hash-2"}
+    assert index.stats()["confirmations"] == 1
+
+
+def test_deduplication_index_lru_and_filters(db_session):
+    from keep.api.alert_deduplicator.deduplication_index import DeduplicationIndex
+
+    index = DeduplicationIndex(max_size=2)
+    index.set_last_hashes(SINGLE_TENANT_UUID, {"fp-1": "hash-1", "fp-2": "hash-2"})
+    index.get_last_hashes(SINGLE_TENANT_UUID, ["fp-1"])
+    index.set_last_hashes(SINGLE_TENANT_UUID, {"fp-3": "hash-3"})
+    # fp-2 is the least recently used, and it has no alerts in the database
+    assert index.get_last_hashes(SINGLE_TENANT_UUID, ["fp-1", "fp-2", "fp-3"]) == {
+        "fp-1": "hash-1",
+        "fp-3": "hash-3",
+    }
+    assert index.stats()["evictions"] == 1
+
+    assert index.get_filters(SINGLE_TENANT_UUID) == []
+    db_session.add(
+        AlertDeduplicationFilter(
+            tenant_id=SINGLE_TENANT_UUID,
+            matcher_cel='source[0] == "grafana"',
+            fields=["labels.pod"],
+        )
+    )
+    db_session.commit()
+    # cached until invalidated
+    assert index.get_filters(SINGLE_TENANT_UUID) == []
+    index.invalidate_filters(SINGLE_TENANT_UUID)
+    assert len(index.get_filters(SINGLE_TENANT_UUID)) == 1
@@ -0,0 +1,186 @@
+import datetime
+import importlib
+import json
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from keep.api.core.db import (
+    backfill_last_alerts,
+    get_alerts_by_fingerprint,
+    get_last_alerts,
+)
+from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.api.models.db.alert import Alert
+from keep.api.utils.pagination import (
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+    iterate_alert_pages,
+)
+
+
+@pytest.fixture
+def setup_alerts(db_session):
+    # 5 fingerprints x 3 occurrences, some of them with the same timestamp
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    alerts = []
+    for i in range(15):
+        fingerprint = f"fp-{i % 5}"
+        alerts.append(
+            Alert(
+                tenant_id=SINGLE_TENANT_UUID,
+                provider_type="test",
+                provider_id="test",
+                timestamp=now - datetime.timedelta(seconds=i // 2),
+                event={
+                    "id": f"alert-{i}",
+                    "name": fingerprint,
+                    "fingerprint": fingerprint,
+                    "source": ["sentry" if i % 2 else "grafana"],
+                    "severity": "critical",
+                    "status": "firing",
+                    "lastReceived": (
+                        now - datetime.timedelta(seconds=i // 2)
+                    ).isoformat(),
+                },
+                fingerprint=fingerprint,
+            )
+        )
+    db_session.add_all(alerts)
+    db_session.commit()
+    # inserted directly, not through the ingestion that maintains the last alerts
+    backfill_last_alerts(SINGLE_TENANT_UUID)
+    return alerts
+
+
+@pytest.fixture
+def client(db_session, monkeypatch):
+    monkeypatch.setenv("AUTH_TYPE", "NO_AUTH")
+    monkeypatch.setenv("PUSHER_DISABLED", "true")
+    # reload the routes so the AuthVerifier is instantiated with NO_AUTH (see test_auth.py)
+    for module in list(sys.modules):
+        if module.startswith("keep.api.routes"):
+            del sys.modules[module]
+    if "keep.api.api" in sys.modules:
+        importlib.reload(sys.modules["keep.api.api"])
+    from keep.api.api import get_app
+
+    # with NO_AUTH any api key is accepted
+    return TestClient(get_app(), headers={"x-api-key": "some-api-key"})
+
+
+def test_cursor_round_trip(setup_alerts):
+    alert = setup_alerts[0]
+    assert decode_cursor(encode_cursor(alert)) == (alert.timestamp, alert.id)
+    assert decode_cursor(None) is None
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_pagination_history(setup_alerts):
+    all_alerts = get_alerts_by_fingerprint(
+        SINGLE_TENANT_UUID, "fp-0", limit=None, keyset=True
+    )
+    assert len(all_alerts) == 3
+    pages = list(
+        iterate_alert_pages(
+            lambda cursor, page_size: get_alerts_by_fingerprint(
+                SINGLE_TENANT_UUID,
+                "fp-0",
+                limit=page_size,
+                cursor=cursor,
+                keyset=True,
+            ),
+            page_size=2,
+        )
+    )
+    assert [len(page) for page in pages] == [2, 1]
+    assert [alert.id for page in pages for alert in page] == [
+        alert.id for alert in all_alerts
+    ]
+
+
+def test_keyset_pagination_last_alerts(setup_alerts):
+    all_alerts = get_last_alerts(SINGLE_TENANT_UUID, keyset=True)
+    assert len(all_alerts) == 5
+    paged_ids = [
+        alert.id
+        for page in iterate_alert_pages(
+            lambda cursor, page_size: get_last_alerts(
+                SINGLE_TENANT_UUID, limit=page_size, cursor=cursor, keyset=True
+            ),
+            page_size=2,
+        )
+        for alert in page
+    ]
+    # no duplicates and nothing is skipped, newest first
+    assert paged_ids == [alert.id for alert in all_alerts]
+    timestamps = [alert.timestamp for alert in all_alerts]
+    assert timestamps == sorted(timestamps, reverse=True)
+
+
+def test_alerts_route_pagination(client, setup_alerts):
+    response = client.get("/alerts", params={"limit": 3})
+    assert response.status_code == 200
+    first_page = response.json()
+    assert len(first_page) == 3
+    cursor = response.headers[NEXT_CURSOR_HEADER]
+
+    response = client.get("/alerts", params={"limit": 3, "cursor": cursor})
+    assert response.status_code == 200
+    second_page = response.json()
+    assert len(second_page) == 2
+    assert NEXT_CURSOR_HEADER not in response.headers
+    assert {alert["fingerprint"] for alert in first_page + second_page} == {
+        f"fp-{i}" for i in range(5)
+    }
+
+    response = client.get("/alerts", params={"cursor": "invalid"})
+    assert response.status_code == 400
+    for limit in [0, -1, 10001]:
+        response = client.get("/alerts", params={"limit": limit})
+        assert response.status_code == 422
+        response = client.get("/alerts/fp-1/history", params={"limit": limit})
+        assert response.status_code == 422
+
+
+def test_alert_history_route_streaming(client, setup_alerts):
+    response = client.get("/alerts/fp-1/history", params={"stream": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    alerts = [json.loads(line) for line in response.text.splitlines()]
+    assert len(alerts) == 3
+    assert all(alert["fingerprint"] == "fp-1" for alert in alerts)
+
+
+def test_search_route_pagination_and_streaming(client, setup_alerts):
+    search_request = {"query": 'source == "sentry"', "timeframe": 3600}
+    alerts, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.post("/alerts/search", json=search_request, params=params)
+        assert response.status_code == 200
+        alerts.extend(response.json())
+        pages += 1
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+    assert pages == 3
+    assert len(alerts) == 7
+    assert len({alert["id"] for alert in alerts}) == 7
+    assert all(alert["source"] == ["sentry"] for alert in alerts)
+
+    response = client.post(
+        "/alerts/search", json=search_request, params={"stream": True}
+    )
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 7
+
+    response = client.post(
+        "/alerts/search", json=search_request, params={"limit": -1, "stream": True}
+    )
+    assert response.status_code == 422
@@ -7,6 +7,8 @@ from unittest.mock import patch
 import pytest
 from fastapi.testclient import TestClient
 
+from keep.api.core.auth_cache import AuthCache
+from keep.api.core.db import get_api_key
 from keep.api.core.dependencies import SINGLE_TENANT_UUID
 from keep.api.models.db.tenant import TenantApiKey
 
@@ -218,3 +220,32 @@ def test_webhook_api_key(client, db_session, test_app):
         headers={"Authorization": "digest invalid_api_key"},
     )
     assert response.status_code == 401 if auth_type != "NO_AUTH" else 200
+
+
+@pytest.mark.parametrize("test_app", ["SINGLE_TENANT", "MULTI_TENANT"], indirect=True)
+def test_api_key_cached(client, db_session, test_app):
+    """Tests the API keys are looked up once, and invalidated when deleted"""
+    valid_api_key = "valid_api_key"
+    setup_api_key(db_session, valid_api_key)
+    auth_cache = AuthCache.get_instance()
+
+    with patch("keep.api.core.auth_cache.get_api_key", wraps=get_api_key) as lookups:
+        for _ in range(3):
+            response = client.get("/providers", headers={"x-api-key": valid_api_key})
+            assert response.status_code == 200
+        assert lookups.call_count == 1
+
+        # the last used time is written once, in the background
+        assert auth_cache.stats()["pending_last_used"] == 1
+        auth_cache.flush()
+        tenant_api_key = db_session.query(TenantApiKey).one()
+        db_session.refresh(tenant_api_key)
+        assert tenant_api_key.last_used is not None
+
+        # a deleted key is invalidated
+        tenant_api_key.is_deleted = True
+        db_session.commit()
+        auth_cache.invalidate_api_key(SINGLE_TENANT_UUID, "test_api_key")
+        response = client.get("/providers", headers={"x-api-key": valid_api_key})
+        assert response.status_code == 401
+        assert lookups.call_count == 2
@@ -8,7 +8,7 @@ import pytest
 
 from keep.api.core.dependencies import SINGLE_TENANT_UUID
 from keep.api.models.db.workflow import WorkflowExecution
-from keep.contextmanager.contextmanager import ContextManager
+from keep.contextmanager.contextmanager import ContextManager, SpilledResults
 
 STATE_FILE_MOCK_DATA = {
     "new-github-stars": [
@@ -180,6 +180,60 @@ def test_context_manager_set_step_context(context_manager: ContextManager):
     assert context_manager.steps_context[step_id]["results"] == results
 
 
+def test_context_manager_steps_context_size(context_manager: ContextManager):
+    """
+    Test that only the new step results are measured
+    """
+    rows = [{"id": i, "name": f"row-{i}"} for i in range(100)]
+    context_manager.set_step_context("query", results=rows)
+    size = context_manager.steps_context_size
+    assert size > 0
+    # replacing the results of a step replaces its size
+    context_manager.set_step_context("query", results=rows)
+    assert context_manager.steps_context_size == size
+    # foreach results add up
+    for row in rows:
+        context_manager.set_step_context("notify", results=row, foreach=True)
+    assert context_manager.steps_context_size > size
+    context_manager.set_step_context("notify", results=[])
+    assert size <= context_manager.steps_context_size < size + 100
+
+
+def test_context_manager_spill_step_results(
+    context_manager: ContextManager, monkeypatch
+):
+    """
+    Test that big step results are moved out of the context, and loaded back when rendered
+    """
+    monkeypatch.setattr(
+        "keep.contextmanager.contextmanager.KEEP_STEP_RESULTS_SPILL_SIZE", 500
+    )
+    rows = [{"id": i, "name": f"row-{i}"} for i in range(100)]
+    context_manager.set_step_context("query", results=rows)
+    context_manager.set_step_context("small", results={"id": 1})
+    foreach_results = [rows[:50], rows[50:]]
+    for results in foreach_results:
+        context_manager.set_step_context("foreach", results=results, foreach=True)
+
+    spilled = context_manager.steps_context["query"]["results"]
+    assert isinstance(spilled, SpilledResults)
+    assert context_manager.steps_context["small"]["results"] == {"id": 1}
+    assert all(
+        isinstance(results, SpilledResults)
+        for results in context_manager.steps_context["foreach"]["results"]
+    )
+    # the spilled results are not part of the context size
+    assert context_manager.steps_context_size < 500
+
+    steps = context_manager.get_full_context()["steps"]
+    assert steps["query"]["results"] == rows
+    assert steps["small"]["results"] == {"id": 1}
+    assert steps["foreach"]["results"] == foreach_results
+    assert steps["this"]["results"] == steps["foreach"]["results"]
+    # the context itself keeps the reference
+    assert context_manager.steps_context["query"]["results"] is spilled
+
+
 def test_context_manager_get_last_alert_run(context_manager_with_state: ContextManager, db_session):
     alert_id = "mock_alert"
     alert_context = {"mock": "mock"}
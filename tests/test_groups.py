@@ -0,0 +1,177 @@
+import datetime
+import importlib
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from keep.api.core.db import (
+    assign_alert_to_group,
+    backfill_group_summaries,
+    create_rule,
+    get_group_summaries,
+    update_rule,
+)
+from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.api.models.db.alert import Alert, AlertToGroup, Group, GroupSummary
+from keep.api.utils.pagination import NEXT_CURSOR_HEADER
+
+TIMEFRAME = 600
+
+
+@pytest.fixture
+def rule(db_session):
+    rule = create_rule(
+        tenant_id=SINGLE_TENANT_UUID,
+        name="test-rule",
+        timeframe=TIMEFRAME,
+        definition={"sql": "N/A", "params": {}},
+        definition_cel='source == "grafana"',
+        created_by="test@keephq.dev",
+        grouping_criteria=["labels.cluster"],
+        group_description="{{ group.num_of_alerts }} alerts on {{ labels.cluster }}",
+    )
+    rule.item_description = "{{ name }}"
+    db_session.add(rule)
+    db_session.commit()
+    return rule
+
+
+def _add_alert(db_session, name, cluster, minutes_ago=0):
+    timestamp = datetime.datetime.utcnow() - datetime.timedelta(minutes=minutes_ago)
+    alert = Alert(
+        tenant_id=SINGLE_TENANT_UUID,
+        provider_type="grafana",
+        provider_id="test",
+        timestamp=timestamp,
+        event={
+            "name": name,
+            "labels": {"cluster": cluster},
+            "lastReceived": timestamp.isoformat(),
+        },
+        fingerprint=name,
+    )
+    db_session.add(alert)
+    db_session.commit()
+    return alert
+
+
+def _assign(rule, alert, cluster):
+    return assign_alert_to_group(
+        SINGLE_TENANT_UUID, alert.id, str(rule.id), rule.timeframe, cluster
+    )
+
+
+def test_summary_updated_on_assign(db_session, rule):
+    first = _add_alert(db_session, "cpu", "c1", minutes_ago=2)
+    second = _add_alert(db_session, "memory", "c1")
+    _assign(rule, first, "c1")
+    group = _assign(rule, second, "c1")
+    # the caller (the rules engine) gets the group with its alerts
+    assert len(group.alerts) == 2
+    # maintained on assign, not backfilled on read
+    assert db_session.get(GroupSummary, group.id).num_of_alerts == 2
+
+    [(summary, alert_summaries)] = get_group_summaries(SINGLE_TENANT_UUID)
+    assert summary.group_id == group.id
+    assert summary.num_of_alerts == 2
+    assert summary.description == "2 alerts on c1"
+    assert summary.start_time == first.timestamp
+    assert summary.last_alert_time == second.timestamp
+    assert summary.last_update_time == second.event["lastReceived"]
+    assert [alert_summary.alert_summary for alert_summary in alert_summaries] == [
+        "cpu",
+        "memory",
+    ]
+
+
+def test_active_only_window_and_pagination(db_session, rule):
+    for i, cluster in enumerate(["c1", "c2", "c3"]):
+        _assign(rule, _add_alert(db_session, f"alert-{i}", cluster, i), cluster)
+    # expired, no alert for more than the rule timeframe
+    _assign(rule, _add_alert(db_session, "old", "c4", minutes_ago=60), "c4")
+
+    groups = get_group_summaries(SINGLE_TENANT_UUID)
+    assert [alerts[0].alert_summary for _, alerts in groups] == [
+        "alert-0",
+        "alert-1",
+        "alert-2",
+    ]
+    assert len(get_group_summaries(SINGLE_TENANT_UUID, active_only=False)) == 4
+    since = datetime.datetime.utcnow() - datetime.timedelta(seconds=90)
+    assert len(get_group_summaries(SINGLE_TENANT_UUID, since=since)) == 2
+
+    first_page = get_group_summaries(SINGLE_TENANT_UUID, limit=2)
+    last_summary, _ = first_page[-1]
+    second_page = get_group_summaries(
+        SINGLE_TENANT_UUID,
+        limit=2,
+        cursor=(last_summary.last_alert_time, last_summary.group_id),
+    )
+    assert [summary.group_id for summary, _ in first_page + second_page] == [
+        summary.group_id for summary, _ in groups
+    ]
+
+
+def test_groups_without_summary_are_backfilled(db_session, rule):
+    alert = _add_alert(db_session, "cpu", "c1")
+    group = Group(tenant_id=SINGLE_TENANT_UUID, rule_id=rule.id, group_fingerprint="c1")
+    db_session.add(group)
+    db_session.commit()
+    db_session.add(
+        AlertToGroup(tenant_id=SINGLE_TENANT_UUID, alert_id=alert.id, group_id=group.id)
+    )
+    db_session.commit()
+    # not summarized on read, by the one-time backfill
+    assert get_group_summaries(SINGLE_TENANT_UUID) == []
+
+    assert backfill_group_summaries() == 1
+    assert backfill_group_summaries() == 0
+    [(summary, alert_summaries)] = get_group_summaries(SINGLE_TENANT_UUID)
+    assert summary.description == "1 alerts on c1"
+    assert [alert_summary.alert_summary for alert_summary in alert_summaries] == ["cpu"]
+    assert db_session.get(GroupSummary, group.id) is not None
+
+
+def test_update_rule_recalculates_expiry(db_session, rule):
+    _assign(rule, _add_alert(db_session, "cpu", "c1", minutes_ago=20), "c1")
+    assert get_group_summaries(SINGLE_TENANT_UUID) == []
+
+    update_rule(
+        SINGLE_TENANT_UUID,
+        rule.id,
+        rule.name,
+        3600,
+        rule.definition,
+        rule.definition_cel,
+        "test@keephq.dev",
+    )
+    assert len(get_group_summaries(SINGLE_TENANT_UUID)) == 1
+
+
+def test_groups_route(db_session, rule, monkeypatch):
+    monkeypatch.setenv("AUTH_TYPE", "NO_AUTH")
+    monkeypatch.setenv("PUSHER_DISABLED", "true")
+    # reload the routes so the AuthVerifier is instantiated with NO_AUTH
+    for module in list(sys.modules):
+        if module.startswith("keep.api.routes"):
+            del sys.modules[module]
+    if "keep.api.api" in sys.modules:
+        importlib.reload(sys.modules["keep.api.api"])
+    from keep.api.api import get_app
+
+    client = TestClient(get_app(), headers={"x-api-key": "some-api-key"})
+    for i, cluster in enumerate(["c1", "c2"]):
+        _assign(rule, _add_alert(db_session, f"alert-{i}", cluster, i), cluster)
+
+    response = client.get("/groups/", params={"limit": 1})
+    assert response.status_code == 200
+    assert [group["group_description"] for group in response.json()] == [
+        "1 alerts on c1"
+    ]
+    cursor = response.headers[NEXT_CURSOR_HEADER]
+    response = client.get("/groups/", params={"limit": 1, "cursor": cursor})
+    assert response.json()[0]["alerts"] == [
+        {"alert_summary": "alert-1", "alert_fingerprint": "alert-1"}
+    ]
+    assert client.get("/groups/", params={"cursor": "nope"}).status_code == 400
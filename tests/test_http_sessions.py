@@ -0,0 +1,122 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from keep.providers.http_sessions import HttpSessions
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.client_address[1]))
+        if self.path == "/slow":
+            time.sleep(0.5)
+        status = 200
+        if self.path in ("/flaky", "/busy") and server.failures > 0:
+            server.failures -= 1
+            status = 503
+        body = b"{}"
+        self.send_response(status)
+        if self.path == "/busy":
+            self.send_header("Retry-After", "3600")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "session=secret")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.requests = []
+    server.failures = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def http_sessions():
+    http_sessions = HttpSessions(
+        read_timeout=0.2, retries=2, backoff=0, max_retry_after=0.1
+    )
+    yield http_sessions
+    http_sessions.clear()
+
+
+def test_session_per_base_url_and_credentials(http_sessions):
+    session = http_sessions.get_session("https://grafana.example.com/api/health", "a")
+    assert session is http_sessions.get_session("https://GRAFANA.example.com/x", "a")
+    assert session is not http_sessions.get_session("https://grafana.example.com", "b")
+    assert session is not http_sessions.get_session("http://grafana.example.com", "a")
+    assert http_sessions.stats()["sessions"] == 3
+
+
+def test_connections_are_reused(http_sessions, server):
+    url, http_server = server
+    session = http_sessions.get_session(url)
+    for _ in range(5):
+        assert session.get(f"{url}/ok").ok
+    # a single connection (client port) for all the requests
+    assert len({port for _, port in http_server.requests}) == 1
+    stats = http_sessions.stats()
+    assert stats["connections"] == 1
+    assert stats["pooled_requests"] == 5
+    host_stats = stats["hosts"][url.split("//")[1]]
+    assert host_stats["requests"] == 5
+    # nothing is kept between the requests
+    assert not session.cookies
+
+
+def test_default_timeout(http_sessions, server):
+    url, _ = server
+    session = http_sessions.get_session(url)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        session.get(f"{url}/slow")
+    # an explicit timeout wins
+    assert session.get(f"{url}/slow", timeout=2).ok
+    assert http_sessions.stats()["hosts"][url.split("//")[1]]["errors"] == 1
+
+
+def test_retries_unavailable(http_sessions, server):
+    url, http_server = server
+    session = http_sessions.get_session(url)
+    http_server.failures = 2
+    assert session.get(f"{url}/flaky").ok
+    assert len(http_server.requests) == 3
+    # out of retries, the last response is returned
+    http_server.failures = 5
+    assert session.get(f"{url}/flaky").status_code == 503
+
+
+def test_retry_after_is_capped(http_sessions, server):
+    url, http_server = server
+    session = http_sessions.get_session(url)
+    http_server.failures = 1
+    start = time.monotonic()
+    # the server asks to wait an hour
+    assert session.get(f"{url}/busy").ok
+    assert time.monotonic() - start < 5
+    assert len(http_server.requests) == 2
+
+
+def test_evicted_sessions_are_closed(monkeypatch):
+    http_sessions = HttpSessions(max_sessions=1)
+    closed = []
+    first = http_sessions.get_session("https://a.example.com")
+    monkeypatch.setattr(first, "close", lambda: closed.append(first))
+    second = http_sessions.get_session("https://b.example.com")
+    assert closed == [first]
+    assert http_sessions.get_session("https://b.example.com") is second
+    http_sessions.clear()
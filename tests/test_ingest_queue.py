@@ -0,0 +1,191 @@
+import datetime
+import importlib
+import sys
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+
+from keep.api.core import db
+from keep.api.core.db import claim_ingest_queue_items
+from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.api.models.db.alert import Alert
+from keep.api.models.db.ingest import IngestQueueItem
+from keep.api.models.db.tenant import Tenant
+from keep.ingestqueue import ingest_queue as ingest_queue_module
+from keep.ingestqueue.ingest_queue import (
+    DbIngestQueue,
+    IngestTask,
+    InMemoryIngestQueue,
+    get_ingest_queue,
+)
+from keep.ingestqueue.ingest_worker import IngestWorkerPool
+
+
+def _task(i=0):
+    return IngestTask(
+        tenant_id=SINGLE_TENANT_UUID,
+        event={"id": f"event-{i}"},
+        provider_type="prometheus",
+    )
+
+
+@pytest.fixture
+def client(db_session, monkeypatch):
+    monkeypatch.setenv("AUTH_TYPE", "NO_AUTH")
+    monkeypatch.setenv("PUSHER_DISABLED", "true")
+    monkeypatch.setenv("KEEP_INGEST_QUEUE", "memory")
+    monkeypatch.setattr(ingest_queue_module, "_ingest_queues", {})
+    # reload the routes so the AuthVerifier is instantiated with NO_AUTH (see test_auth.py)
+    for module in list(sys.modules):
+        if module.startswith("keep.api.routes"):
+            del sys.modules[module]
+    if "keep.api.api" in sys.modules:
+        importlib.reload(sys.modules["keep.api.api"])
+    from keep.api.api import get_app
+
+    # with NO_AUTH any api key is accepted
+    return TestClient(get_app(), headers={"x-api-key": "some-api-key"})
+
+
+def test_in_memory_queue_at_least_once(monkeypatch):
+    monkeypatch.setattr(ingest_queue_module, "KEEP_INGEST_MAX_ATTEMPTS", 2)
+    ingest_queue = InMemoryIngestQueue()
+    assert ingest_queue.get("worker", timeout=0.01) is None
+    ingest_queue.put(_task(1))
+    ingest_queue.put(_task(2))
+    assert ingest_queue.depth() == 2
+    assert ingest_queue.lag() >= 0
+
+    first = ingest_queue.get("worker", timeout=0.01)
+    assert first.event == {"id": "event-1"}
+    assert ingest_queue.depth() == 1
+    # a failed task goes back to the queue until it reaches the max attempts
+    assert ingest_queue.nack(first, "error")
+    ingest_queue.ack(ingest_queue.get("worker", timeout=0.01))
+    retried = ingest_queue.get("worker", timeout=0.01)
+    assert retried.id == first.id and retried.attempts == 2
+    assert not ingest_queue.nack(retried, "error")
+    assert ingest_queue.depth() == 0
+    assert ingest_queue.lag() == 0
+
+
+def test_db_queue_claims_and_recovery(db_session, monkeypatch):
+    monkeypatch.setattr(ingest_queue_module, "KEEP_INGEST_MAX_ATTEMPTS", 2)
+    ingest_queue = DbIngestQueue(visibility_timeout=60, poll_interval=0.01)
+    ingest_queue.put(_task(1))
+    ingest_queue.put(_task(2))
+    assert ingest_queue.depth() == 2
+
+    first = ingest_queue.get("worker-1", timeout=0.01)
+    second = ingest_queue.get("worker-2", timeout=0.01)
+    assert {first.event["id"], second.event["id"]} == {"event-1", "event-2"}
+    # everything is claimed
+    assert ingest_queue.get("worker-3", timeout=0.01) is None
+    assert ingest_queue.depth() == 0
+
+    ingest_queue.ack(second)
+    # worker-1 crashed, its task is claimed again once the claim expired
+    claimed_at = datetime.datetime.utcnow() - datetime.timedelta(seconds=120)
+    db_session.query(IngestQueueItem).update({"claimed_at": claimed_at})
+    db_session.commit()
+    assert ingest_queue.recover() == 1
+    recovered = ingest_queue.get("worker-3", timeout=0.01)
+    assert recovered.id == first.id and recovered.attempts == 2
+
+    # it failed too many times
+    assert not ingest_queue.nack(recovered, "error")
+    assert ingest_queue.get("worker-3", timeout=0.01) is None
+    stats = ingest_queue.stats()
+    assert stats["depth"] == 0 and stats["failed"] == 1
+
+
+def test_db_queue_concurrent_claims(db_session, tmp_path, monkeypatch):
+    # the in-memory database shares a single connection between the threads,
+    #   so the workers use a database file with a connection each
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/keep.db", connect_args={"check_same_thread": False}
+    )
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(db, "engine", engine)
+    with Session(engine) as session:
+        session.add(
+            Tenant(id=SINGLE_TENANT_UUID, name="test-tenant", created_by="tests")
+        )
+        session.commit()
+    ingest_queue = DbIngestQueue()
+    for i in range(20):
+        ingest_queue.put(_task(i))
+    claimed = []
+    lock = threading.Lock()
+
+    def claim(worker_id):
+        items = claim_ingest_queue_items(worker_id, limit=20)
+        with lock:
+            claimed.extend(item.id for item in items)
+
+    threads = [threading.Thread(target=claim, args=(f"w-{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # every item is claimed exactly once
+    assert len(claimed) == 20
+    assert len(set(claimed)) == 20
+
+
+def test_worker_pool_retries_and_drains():
+    ingest_queue = InMemoryIngestQueue()
+    processed = []
+    failed_once = set()
+
+    def handler(task):
+        if task.event["id"] == "event-3" and task.id not in failed_once:
+            failed_once.add(task.id)
+            raise Exception("temporary failure")
+        time.sleep(0.01)
+        processed.append(task.event["id"])
+
+    pool = IngestWorkerPool(ingest_queue, handler, workers=2, poll_timeout=0.05)
+    for i in range(10):
+        ingest_queue.put(_task(i))
+    pool.start()
+    # stopping drains the in-process queue
+    pool.stop(drain_timeout=5)
+    assert sorted(processed) == sorted(f"event-{i}" for i in range(10))
+    assert pool.failed == 1
+    assert pool.processed == 10
+    assert ingest_queue.depth() == 0
+
+
+def test_receive_event_queued(client, db_session):
+    from keep.api.routes.alerts import process_ingest_task
+
+    response = client.post(
+        "/alerts/event",
+        json={
+            "id": "queued-alert",
+            "name": "queued-alert",
+            "status": "firing",
+            "severity": "critical",
+            "lastReceived": "2024-01-01T00:00:00Z",
+            "source": ["test"],
+        },
+    )
+    assert response.status_code == 202
+    ingest_queue = get_ingest_queue()
+    assert ingest_queue.depth() == 1
+    # nothing is stored until an ingest worker processes the event
+    assert db_session.query(Alert).count() == 0
+
+    task = ingest_queue.get("worker", timeout=0.01)
+    process_ingest_task(task)
+    ingest_queue.ack(task)
+    alerts = db_session.query(Alert).all()
+    assert len(alerts) == 1
+    assert alerts[0].event["name"] == "queued-alert"
+
+    response = client.get("/status")
+    assert response.json()["ingest"]["depth"] == 0
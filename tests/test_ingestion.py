@@ -0,0 +1,131 @@
+import datetime
+import json
+
+import pytest
+from sqlmodel import Session
+
+from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.api.core.realtime_publisher import RealtimePublisher, RealtimeTransport
+from keep.api.models.alert import AlertDto, AlertSeverity, AlertStatus
+from keep.api.models.db.alert import Alert, AlertEnrichment, LastAlert
+from keep.api.models.db.mapping import MappingRule
+from keep.api.routes import alerts as alerts_routes
+from keep.api.utils.pusher_utils import pack_pusher_messages
+
+
+def _alert_dtos(count, name_prefix="alert"):
+    return [
+        AlertDto(
+            id=f"{name_prefix}-{i}",
+            name=f"{name_prefix}-{i % 5}",
+            status=AlertStatus.FIRING,
+            severity=AlertSeverity.CRITICAL,
+            lastReceived=datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
+            source=["test"],
+            service="old-service",
+            labels={"run": str(i)},
+        )
+        for i in range(count)
+    ]
+
+
+class _RecordingTransport(RealtimeTransport):
+    def __init__(self):
+        self.sent = []
+
+    def send(self, channel, event_name, message):
+        self.sent.append((channel, event_name, message))
+
+
+def _ingest(db_session, alert_dtos):
+    # the ingestion runs with a sqlmodel session, like in the api
+    with Session(db_session.bind) as session:
+        alerts_routes.handle_formatted_events(
+            SINGLE_TENANT_UUID,
+            "test",
+            session,
+            [alert.dict() for alert in alert_dtos],
+            alert_dtos,
+        )
+
+
+def test_pack_pusher_messages():
+    items = [{"id": i, "payload": "x" * 100} for i in range(50)]
+    messages = list(pack_pusher_messages(items, max_size=1024))
+    assert len(messages) > 1
+    assert all(len(message.encode()) <= 1024 for message in messages)
+    # nothing is lost and the order is kept
+    assert [item for message in messages for item in json.loads(message)] == items
+
+    # an item that's too large is sent by itself
+    large_items = [{"id": 1}, {"id": 2, "payload": "x" * 2048}, {"id": 3}]
+    messages = list(pack_pusher_messages(large_items, max_size=1024))
+    assert [json.loads(message) for message in messages] == [
+        [large_items[0]],
+        [large_items[1]],
+        [large_items[2]],
+    ]
+    assert list(pack_pusher_messages([])) == []
+
+
+@pytest.mark.parametrize("batch_ingestion", ["true", "false"])
+def test_handle_formatted_events_ingestion_modes(
+    db_session, monkeypatch, batch_ingestion
+):
+    monkeypatch.setenv("KEEP_BATCH_INGESTION", batch_ingestion)
+    # get_enrichment opens its own session, which would roll back the shared
+    #   in-memory sqlite connection in the middle of the ingestion
+    monkeypatch.setattr(alerts_routes, "get_enrichment", lambda *args, **kwargs: None)
+    db_session.add(
+        MappingRule(
+            tenant_id=SINGLE_TENANT_UUID,
+            priority=1,
+            name="service mapping",
+            created_by="tests@keephq.dev",
+            matchers=["name"],
+            rows=[{"name": "alert-0", "service": "mapped-service"}],
+            disabled=False,
+        )
+    )
+    db_session.commit()
+
+    transport = _RecordingTransport()
+    realtime_publisher = RealtimePublisher(transport, flush_interval=60)
+    monkeypatch.setattr(
+        RealtimePublisher, "_instance", realtime_publisher, raising=False
+    )
+    alert_dtos = _alert_dtos(10)
+    _ingest(db_session, alert_dtos)
+    # nothing is sent on the ingest path
+    assert transport.sent == []
+    realtime_publisher.flush()
+    realtime_publisher.stop()
+
+    alerts = db_session.query(Alert).filter(Alert.tenant_id == SINGLE_TENANT_UUID)
+    assert alerts.count() == 10
+    assert db_session.query(LastAlert).count() == 5
+    alerts_messages = [
+        message
+        for _, event_name, message in transport.sent
+        if event_name == "async-alerts"
+    ]
+    # the alerts are coalesced per fingerprint and packed into a single message
+    assert len(alerts_messages) == 1
+    pushed = [alert for message in alerts_messages for alert in json.loads(message)]
+    assert len(pushed) == 5
+    last_alert_ids = {
+        str(last_alert.alert_id) for last_alert in db_session.query(LastAlert)
+    }
+    assert {alert["event_id"] for alert in pushed} == last_alert_ids
+    mapped = [alert for alert in pushed if alert["name"] == "alert-0"]
+    assert mapped and all(alert["service"] == "mapped-service" for alert in mapped)
+    enrichment = (
+        db_session.query(AlertEnrichment)
+        .filter(AlertEnrichment.alert_fingerprint == mapped[0]["fingerprint"])
+        .first()
+    )
+    assert enrichment.enrichments == {"service": "mapped-service"}
+
+    # the last alert of each fingerprint is deduplicated when it's sent again
+    _ingest(db_session, _alert_dtos(10)[5:])
+    assert alerts.count() == 10
@@ -4,10 +4,13 @@ Test the io handler
 
 import datetime
 
+import chevron
 import pytest
 
+import keep.iohandler.iohandler as iohandler_module
 from keep.api.models.alert import AlertDto
-from keep.iohandler.iohandler import IOHandler
+from keep.iohandler.iohandler import IOHandler, RenderException
+from keep.iohandler.template import compile_template
 
 
 def test_vanilla(context_manager):
@@ -732,3 +735,96 @@ def test_escaped_quotes_with_with_newlines(context_manager):
     assert (
         len(extracted_functions) == 1
     ), "Expected one function to be extracted with escaped quotes inside arguments."
+
+
+def test_render_missing_keys(mocked_context_manager, capsys):
+    mocked_context_manager.get_full_context.return_value = {"alert": {"name": "a"}}
+    iohandler = IOHandler(mocked_context_manager)
+    with pytest.raises(RenderException) as e:
+        iohandler.render("{{ alert.name }} {{ alert.missing }}", safe=True)
+    assert str(e.value) == "Could not find key 'alert.missing' in the context."
+    with pytest.raises(RenderException) as e:
+        iohandler.render(
+            "{{ alert.missing }} {{ alert.other }} {{ alert.missing }}", safe=True
+        )
+    assert str(e.value) == (
+        "Could not find keys: 'alert.missing', 'alert.other' in the context."
+    )
+    assert iohandler.render("{{ alert.missing }}", default="default") == "default"
+    # the missing keys are no longer written to stderr
+    assert capsys.readouterr().err == ""
+
+
+def test_render_compiled_template_cached(mocked_context_manager):
+    template = "{{#alerts}}{{ name }} & {{{ name }}},{{/alerts}} keep.len('{{ x }}')"
+    iohandler = IOHandler(mocked_context_manager)
+    for name in ["a", "<b>"]:
+        mocked_context_manager.get_full_context.return_value = {
+            "alerts": [{"name": name}, {"name": "c"}],
+            "x": "four",
+        }
+        assert iohandler.render(template) == chevron.render(
+            template.replace("keep.len('{{ x }}')", "4"),
+            mocked_context_manager.get_full_context.return_value,
+        )
+    assert compile_template.cache_info().hits >= 1
+
+
+def test_render_compiled_functions(mocked_context_manager, monkeypatch):
+    template = "keep.lowercase('{{ alert.name }}') keep.len({{ alert.tags }})"
+    compiled = compile_template(template)
+    assert [function.tree is not None for function in compiled.functions] == [
+        True,
+        True,
+    ]
+    iohandler = IOHandler(mocked_context_manager)
+    mocked_context_manager.get_full_context.return_value = {
+        "alert": {"name": "It's DOWN", "tags": ["a", "b"]}
+    }
+    assert iohandler.render(template) == "it's down 2"
+    # the calls were parsed with the template, only a rendered tag that isn't in
+    #   a string is parsed (as the arguments it renders to)
+    mocked_context_manager.get_full_context.return_value = {
+        "alert": {"name": "UP", "tags": ["c"]}
+    }
+    original_parse_keep_function = iohandler_module.parse_keep_function
+    parsed = []
+
+    def parse_keep_function(token):
+        parsed.append(token)
+        return original_parse_keep_function(token)
+
+    monkeypatch.setattr(iohandler_module, "parse_keep_function", parse_keep_function)
+    assert iohandler.render(template) == "up 1"
+    assert parsed == ["keep._(['c'])"]
+
+
+def test_render_context_builds_the_context_once(mocked_context_manager):
+    mocked_context_manager.get_full_context.return_value = {"alert": {"name": "a"}}
+    iohandler = IOHandler(mocked_context_manager)
+    rendered = iohandler.render_context(
+        {
+            "title": "{{ alert.name }}",
+            "body": {"text": "keep.uppercase('{{ alert.name }}')"},
+            "tags": ["{{ alert.name }}", "b"],
+        }
+    )
+    assert rendered == {"title": "a", "body": {"text": "A"}, "tags": ["a", "b"]}
+    assert mocked_context_manager.get_full_context.call_count == 1
+
+
+def test_keep_functions_from_the_context_are_not_evaluated(mocked_context_manager):
+    """Deliberate: only the keep.* calls written in the template are evaluated
+
+    They used to be found in the rendered text, so keep.* text in the context (e.g.
+    in an alert's description, sent by a monitoring tool) was evaluated too.
+    """
+    mocked_context_manager.get_full_context.return_value = {
+        "alert": {"description": "keep.len('ab')"}
+    }
+    iohandler = IOHandler(mocked_context_manager)
+    assert iohandler.render("{{{ alert.description }}}") == "keep.len('ab')"
+    assert (
+        iohandler.render("keep.uppercase('{{{ alert.description }}}')")
+        == "KEEP.LEN('AB')"
+    )
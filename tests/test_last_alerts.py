@@ -0,0 +1,140 @@
+import datetime
+
+from keep.api.core.db import (
+    backfill_last_alerts,
+    get_last_alerts,
+    run_pending_backfills,
+    set_last_alert,
+)
+from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.api.models.alert import AlertDto, AlertSeverity, AlertStatus
+from keep.api.models.db.alert import Alert, LastAlert
+from keep.api.routes import alerts as alerts_routes
+
+
+def _create_alert(db_session, fingerprint, timestamp, name=None):
+    alert = Alert(
+        tenant_id=SINGLE_TENANT_UUID,
+        provider_type="test",
+        provider_id="test",
+        timestamp=timestamp,
+        event={
+            "id": f"{fingerprint}-{timestamp.isoformat()}",
+            "name": name or fingerprint,
+            "fingerprint": fingerprint,
+            "source": ["test"],
+            "severity": "critical",
+            "status": "firing",
+            "lastReceived": timestamp.isoformat(),
+        },
+        fingerprint=fingerprint,
+    )
+    db_session.add(alert)
+    db_session.commit()
+    return alert
+
+
+def _last_alerts(db_session):
+    return {
+        last_alert.fingerprint: last_alert
+        for last_alert in db_session.query(LastAlert)
+        .filter(LastAlert.tenant_id == SINGLE_TENANT_UUID)
+        .all()
+    }
+
+
+def test_set_last_alert_out_of_order(db_session):
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    second = _create_alert(db_session, "fp-1", now)
+    first = _create_alert(db_session, "fp-1", now - datetime.timedelta(minutes=5))
+    third = _create_alert(db_session, "fp-1", now + datetime.timedelta(minutes=5))
+
+    set_last_alert(SINGLE_TENANT_UUID, second)
+    # an older alert arriving late only moves the first occurrence
+    set_last_alert(SINGLE_TENANT_UUID, first)
+    last_alert = _last_alerts(db_session)["fp-1"]
+    db_session.refresh(last_alert)
+    assert last_alert.alert_id == second.id
+    assert last_alert.first_timestamp == first.timestamp
+
+    set_last_alert(SINGLE_TENANT_UUID, third)
+    db_session.refresh(last_alert)
+    assert last_alert.alert_id == third.id
+    assert last_alert.timestamp == third.timestamp
+    assert last_alert.first_timestamp == first.timestamp
+
+    alerts = get_last_alerts(SINGLE_TENANT_UUID)
+    assert [alert.id for alert in alerts] == [third.id]
+    assert alerts[0].event["startedAt"] == str(first.timestamp)
+
+
+def test_backfill_last_alerts(db_session):
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    history = [
+        _create_alert(db_session, f"fp-{i % 3}", now - datetime.timedelta(minutes=i))
+        for i in range(6)
+    ]
+    assert not _last_alerts(db_session)
+
+    assert backfill_last_alerts(SINGLE_TENANT_UUID) == 3
+    last_alerts = _last_alerts(db_session)
+    assert set(last_alerts) == {"fp-0", "fp-1", "fp-2"}
+    for i in range(3):
+        assert last_alerts[f"fp-{i}"].timestamp == now - datetime.timedelta(minutes=i)
+        assert last_alerts[f"fp-{i}"].first_timestamp == now - datetime.timedelta(
+            minutes=i + 3
+        )
+
+    alerts = get_last_alerts(SINGLE_TENANT_UUID)
+    assert {alert.id for alert in alerts} == {alert.id for alert in history[:3]}
+
+
+def test_backfill_after_upgrade(db_session):
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    for i in range(6):
+        _create_alert(db_session, f"fp-{i % 3}", now - datetime.timedelta(minutes=i))
+    # an alert ingested after the upgrade, before the backfill ran
+    new_alert = _create_alert(db_session, "fp-0", now + datetime.timedelta(minutes=1))
+    set_last_alert(SINGLE_TENANT_UUID, new_alert)
+    assert [alert.id for alert in get_last_alerts(SINGLE_TENANT_UUID)] == [new_alert.id]
+
+    assert "last_alerts" in run_pending_backfills()
+    alerts = get_last_alerts(SINGLE_TENANT_UUID)
+    assert len(alerts) == 3
+    # the newer alert isn't overridden by the history
+    assert alerts[0].id == new_alert.id
+    assert alerts[0].event["startedAt"] == str(now - datetime.timedelta(minutes=3))
+    # once per database
+    assert run_pending_backfills() == []
+
+
+def test_handle_formatted_events_maintains_last_alerts(db_session, monkeypatch):
+    # get_enrichment opens its own session, which would roll back the shared
+    #   in-memory sqlite connection in the middle of the ingestion
+    monkeypatch.setattr(alerts_routes, "get_enrichment", lambda *args, **kwargs: None)
+    alert_dtos = [
+        AlertDto(
+            id=f"alert-{i}",
+            name=f"alert-{i % 2}",
+            status=AlertStatus.FIRING,
+            severity=AlertSeverity.CRITICAL,
+            lastReceived=datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
+            source=["test"],
+            labels={"run": str(i)},
+        )
+        for i in range(4)
+    ]
+    alerts_routes.handle_formatted_events(
+        SINGLE_TENANT_UUID,
+        "test",
+        db_session,
+        [alert.dict() for alert in alert_dtos],
+        alert_dtos,
+    )
+    last_alerts = _last_alerts(db_session)
+    assert len(last_alerts) == 2
+    alerts = get_last_alerts(SINGLE_TENANT_UUID)
+    assert len(alerts) == 2
+    assert {alert.id for alert in alerts} == {
+        last_alert.alert_id for last_alert in last_alerts.values()
+    }
@@ -0,0 +1,178 @@
+import datetime
+import time
+
+from sqlmodel import Session
+
+from keep.api.core.db import enrich_alert
+from keep.api.core.dependencies import SINGLE_TENANT_UUID, AuthenticatedEntity
+from keep.api.core.preset_counters import PresetCounters
+from keep.api.models.alert import AlertDto, AlertSeverity, AlertStatus
+from keep.api.models.db.preset import Preset
+from keep.api.routes import alerts as alerts_routes
+from keep.api.routes import preset as preset_routes
+
+
+def _alert_dtos(names, status=AlertStatus.FIRING, **kwargs):
+    return [
+        AlertDto(
+            id=name,
+            name=name,
+            status=status,
+            severity=AlertSeverity.CRITICAL,
+            lastReceived=datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
+            source=["test"],
+            fingerprint=name,
+            **kwargs,
+        )
+        for name in names
+    ]
+
+
+def _ingest(db_session, alert_dtos):
+    with Session(db_session.bind) as session:
+        alerts_routes.handle_formatted_events(
+            SINGLE_TENANT_UUID,
+            "test",
+            session,
+            [alert.dict() for alert in alert_dtos],
+            alert_dtos,
+        )
+
+
+def _preset(db_session, name, cel, is_noisy=False):
+    preset = Preset(
+        tenant_id=SINGLE_TENANT_UUID,
+        name=name,
+        created_by="tests@keephq.dev",
+        is_noisy=is_noisy,
+        options=[{"label": "CEL", "value": cel}],
+    )
+    db_session.add(preset)
+    db_session.commit()
+    return preset
+
+
+def _counts():
+    presets = preset_routes.get_presets(
+        authenticated_entity=AuthenticatedEntity(
+            tenant_id=SINGLE_TENANT_UUID, email="tests@keephq.dev"
+        )
+    )
+    return {
+        preset.name: (preset.alerts_count, preset.should_do_noise_now)
+        for preset in presets
+    }
+
+
+def test_preset_counters_incremental(db_session):
+    _preset(db_session, "db", 'name.startsWith("db")', is_noisy=True)
+    _preset(db_session, "resolved", 'status == "resolved"')
+    _ingest(db_session, _alert_dtos(["db-1", "web-1"]))
+
+    counters = PresetCounters.get_instance()
+    # the tenant is loaded from the database on the first request
+    assert _counts() == {
+        "db": (1, True),
+        "resolved": (0, False),
+        "feed": (2, False),
+        "dismissed": (0, False),
+        "groups": (0, False),
+    }
+    assert counters.stats()["reconciliations"] == 1
+
+    # a new fingerprint and a new state of an existing one
+    _ingest(db_session, _alert_dtos(["db-2"]))
+    _ingest(db_session, _alert_dtos(["db-1"], status=AlertStatus.RESOLVED))
+    # a noisy alert
+    _ingest(db_session, _alert_dtos(["web-2"], isNoisy=True))
+    incremental_counts = _counts()
+    assert incremental_counts == {
+        "db": (2, True),
+        "resolved": (1, False),
+        "feed": (4, True),
+        "dismissed": (0, False),
+        "groups": (0, False),
+    }
+    # served without going to the alerts
+    assert counters.stats()["reconciliations"] == 1
+
+    # a reconciliation from scratch agrees with the incremental counters
+    counters.reconcile(SINGLE_TENANT_UUID)
+    assert _counts() == incremental_counts
+    assert counters.stats()["reconciliations"] == 2
+
+
+def test_preset_counters_dismissed_and_presets_changes(db_session):
+    preset = _preset(db_session, "db", 'name.startsWith("db")', is_noisy=True)
+    _ingest(db_session, _alert_dtos(["db-1", "db-2"]))
+    assert _counts()["db"] == (2, True)
+
+    # dismissing an alert through /alerts/enrich
+    alerts_routes.enrich_alert(
+        alerts_routes.EnrichAlertRequestBody(
+            fingerprint="db-1", enrichments={"dismissed": "true"}
+        ),
+        background_tasks=None,
+        authenticated_entity=AuthenticatedEntity(
+            tenant_id=SINGLE_TENANT_UUID, email="tests@keephq.dev"
+        ),
+    )
+    counts = _counts()
+    assert counts["db"] == (2, True)
+    assert counts["feed"] == (1, False)
+    assert counts["dismissed"] == (1, False)
+
+    # a dismissal that expired is counted again
+    _ingest(
+        db_session,
+        _alert_dtos(
+            ["db-2"],
+            dismissed=True,
+            dismissUntil=(
+                datetime.datetime.utcnow() + datetime.timedelta(seconds=0.5)
+            ).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        ),
+    )
+    counts = _counts()
+    assert counts["db"] == (2, False)
+    assert counts["feed"] == (0, False)
+    assert counts["dismissed"] == (2, False)
+    time.sleep(0.5)
+    counts = _counts()
+    assert counts["feed"] == (1, False)
+    assert counts["dismissed"] == (1, False)
+
+    # a changed preset is counted again
+    preset.options = [{"label": "CEL", "value": 'name == "db-2"'}]
+    db_session.add(preset)
+    db_session.commit()
+    assert _counts()["db"] == (1, False)
+
+
+def test_preset_counters_catch_up_with_other_workers(db_session, monkeypatch):
+    _preset(db_session, "db", 'name.startsWith("db")', is_noisy=True)
+    _ingest(db_session, _alert_dtos(["db-1"]))
+    counters = PresetCounters.get_instance()
+    assert _counts()["db"] == (1, True)
+    reconciliations = counters.stats()["reconciliations"]
+    caught_up = counters.stats()["caught_up"]
+
+    # another worker receives an alert and dismisses one, this one doesn't see it
+    with monkeypatch.context() as m:
+        m.setattr(counters, "update", lambda *args, **kwargs: None)
+        _ingest(db_session, _alert_dtos(["db-2"]))
+    enrich_alert(SINGLE_TENANT_UUID, "db-1", {"dismissed": "true"})
+
+    counts = _counts()
+    assert counts["db"] == (2, True)
+    assert counts["feed"] == (1, False)
+    assert counts["dismissed"] == (1, False)
+    # caught up with the changes, not reconciled
+    stats = counters.stats()
+    assert stats["reconciliations"] == reconciliations
+    assert stats["caught_up"] == caught_up + 2
+
+    # the changes this worker counted itself aren't counted again
+    _ingest(db_session, _alert_dtos(["db-3"]))
+    assert _counts()["db"] == (3, True)
+    assert counters.stats()["caught_up"] == caught_up + 2
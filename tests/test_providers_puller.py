@@ -0,0 +1,103 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from keep.providers.providers_puller import ProvidersPuller
+
+
+def _provider(provider_id):
+    return SimpleNamespace(id=provider_id, type=provider_id.split("-")[0], details={})
+
+
+@pytest.fixture
+def puller(monkeypatch):
+    puller = ProvidersPuller(
+        max_workers=4, timeout=0.3, deadline=1, breaker_threshold=2
+    )
+    # how long every provider takes, or the exception it raises
+    behaviors = {}
+    release = threading.Event()
+
+    def pull_provider(tenant_id, provider, started, get_alerts):
+        started[provider.id] = time.monotonic()
+        behavior = behaviors[provider.id]
+        if isinstance(behavior, Exception):
+            raise behavior
+        if behavior == "hang":
+            release.wait(5)
+        else:
+            time.sleep(behavior)
+        return {f"{provider.id}-fingerprint": [provider.id]}
+
+    monkeypatch.setattr(puller, "_pull_provider", pull_provider)
+    puller.behaviors = behaviors
+    yield puller
+    release.set()
+    puller.stop()
+
+
+def test_providers_pulled_concurrently(puller):
+    puller.behaviors.update(
+        {"fast-1": 0, "slow-1": 0.2, "slow-2": 0.2, "broken-1": ValueError("boom")}
+    )
+    start = time.monotonic()
+    pulled = []
+    for provider, alerts_by_fingerprint in puller.pull(
+        "tenant", [_provider(provider_id) for provider_id in puller.behaviors]
+    ):
+        pulled.append((provider.id, time.monotonic() - start))
+    # the fast provider is returned first, without waiting for the slow ones
+    assert pulled[0][0] == "fast-1"
+    assert pulled[0][1] < 0.15
+    assert {provider_id for provider_id, _ in pulled} == {"fast-1", "slow-1", "slow-2"}
+    # the slow providers were pulled at the same time
+    assert time.monotonic() - start < 0.35
+    stats = puller.stats()["providers"]
+    assert stats["slow"]["pulls"] == 2
+    assert stats["broken"]["errors"] == 1
+
+
+def test_providers_timeout_and_breaker(puller):
+    puller.behaviors.update({"fast-1": 0, "hanging-1": "hang"})
+    providers = [_provider("fast-1"), _provider("hanging-1")]
+
+    for _ in range(2):
+        start = time.monotonic()
+        pulled = [provider.id for provider, _ in puller.pull("tenant", providers)]
+        # the partial results are returned once the hanging provider timed out
+        assert pulled == ["fast-1"]
+        assert time.monotonic() - start < 0.6
+    assert puller.stats()["providers"]["hanging"]["timeouts"] == 2
+    assert puller.stats()["open_breakers"] == 1
+
+    # the breaker is open, the hanging provider isn't pulled
+    start = time.monotonic()
+    pulled = [provider.id for provider, _ in puller.pull("tenant", providers)]
+    assert pulled == ["fast-1"]
+    assert time.monotonic() - start < 0.1
+    assert puller.stats()["providers"]["hanging"]["skipped"] == 1
+    # per tenant
+    pulled = [provider.id for provider, _ in puller.pull("other-tenant", providers)]
+    assert pulled == ["fast-1"]
+    assert puller.stats()["providers"]["hanging"]["timeouts"] == 3
+
+
+def test_providers_deadline(puller):
+    puller.timeout = 5
+    puller.deadline = 0.3
+    puller.behaviors.update({"fast-1": 0, "hanging-1": "hang"})
+    start = time.monotonic()
+    pulled = [
+        provider.id
+        for provider, _ in puller.pull(
+            "tenant", [_provider("fast-1"), _provider("hanging-1")]
+        )
+    ]
+    assert pulled == ["fast-1"]
+    assert time.monotonic() - start < 0.6
+    stats = puller.stats()
+    assert stats["providers"]["hanging"]["deadlines"] == 1
+    # only timeouts open the breaker
+    assert stats["open_breakers"] == 0
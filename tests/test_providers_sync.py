@@ -0,0 +1,145 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from keep.api.core.db import claim_provider_pulls
+from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.api.models.alert import AlertDto
+from keep.api.models.db.alert import Alert
+from keep.api.models.db.provider import Provider, ProviderPullState
+from keep.providers.providers_puller import ProvidersPuller
+from keep.providers.providers_sync import ProvidersSync
+
+
+def _alert(name, last_received):
+    return AlertDto(
+        id=name,
+        name=name,
+        status="firing",
+        severity="critical",
+        lastReceived=last_received,
+        source=["datadog"],
+    )
+
+
+@pytest.fixture
+def installed_provider(db_session):
+    db_session.add(
+        Provider(
+            id="datadog-1",
+            tenant_id=SINGLE_TENANT_UUID,
+            name="datadog",
+            type="datadog",
+            installed_by="tests@keephq.dev",
+            installation_time=datetime.datetime.utcnow(),
+            configuration_key="datadog-1",
+            validatedScopes={},
+        )
+    )
+    db_session.commit()
+    return SimpleNamespace(id="datadog-1", type="datadog", details={})
+
+
+@pytest.fixture
+def providers_sync(monkeypatch, installed_provider):
+    from keep.api.routes.alerts import process_ingest_task
+
+    monkeypatch.setenv("PUSHER_DISABLED", "true")
+    # what the provider returns on every pull, and the `since` of every pull
+    pulls = {"alerts": [], "since": []}
+
+    class FakeProvider:
+        def get_alerts(self, since=None):
+            pulls["since"].append(since)
+            return pulls["alerts"]
+
+    puller = ProvidersPuller(max_workers=2)
+    monkeypatch.setattr(
+        puller,
+        "_pull_provider",
+        lambda tenant_id, provider, started, get_alerts: get_alerts(
+            FakeProvider(), provider
+        ),
+    )
+    monkeypatch.setattr(ProvidersPuller, "_instance", puller, raising=False)
+    monkeypatch.setattr(
+        "keep.providers.providers_sync.ProvidersFactory.get_installed_providers",
+        lambda tenant_id: [installed_provider],
+    )
+    monkeypatch.setattr("keep.providers.providers_sync.get_ingest_queue", lambda: None)
+    providers_sync = ProvidersSync(process_ingest_task, interval=60, overlap=60)
+    providers_sync._pullable_types = ["datadog"]
+    providers_sync.pulls_made = pulls
+    yield providers_sync
+    puller.stop()
+
+
+def test_sync_ingests_pulled_alerts(db_session, providers_sync):
+    providers_sync.pulls_made["alerts"] = [
+        _alert("alert-1", "2024-01-01T00:00:00Z"),
+        _alert("alert-2", "2024-01-01T00:05:00.000Z"),
+    ]
+    assert providers_sync.sync() == 1
+    # the first pull asks for everything
+    assert providers_sync.pulls_made["since"] == [None]
+    alerts = db_session.query(Alert).all()
+    assert sorted(alert.event["name"] for alert in alerts) == ["alert-1", "alert-2"]
+    assert {alert.provider_id for alert in alerts} == {"datadog-1"}
+
+    db_session.expire_all()
+    state = db_session.get(ProviderPullState, (SINGLE_TENANT_UUID, "datadog-1"))
+    assert state.watermark == datetime.datetime(2024, 1, 1, 0, 5)
+    assert state.last_pull_alerts == 2
+    assert providers_sync.stats()["pulled_alerts"] == 2
+
+
+def test_sync_pulls_from_watermark(db_session, providers_sync):
+    providers_sync.pulls_made["alerts"] = [_alert("alert-1", "2024-01-01T00:05:00Z")]
+    providers_sync.sync()
+    # not due yet
+    assert providers_sync.sync() == 0
+
+    db_session.query(ProviderPullState).update(
+        {"next_pull_time": datetime.datetime.utcnow() - datetime.timedelta(seconds=1)}
+    )
+    db_session.commit()
+    # nothing new, the watermark stays
+    providers_sync.pulls_made["alerts"] = []
+    assert providers_sync.sync() == 1
+    # the watermark minus the overlap
+    assert providers_sync.pulls_made["since"][-1] == datetime.datetime(2024, 1, 1, 0, 4)
+    db_session.expire_all()
+    state = db_session.get(ProviderPullState, (SINGLE_TENANT_UUID, "datadog-1"))
+    assert state.watermark == datetime.datetime(2024, 1, 1, 0, 5)
+    assert state.last_pull_alerts == 0
+
+
+def test_sync_failed_ingest_keeps_watermark(db_session, providers_sync):
+    def handler(task):
+        raise ValueError("boom")
+
+    providers_sync.handler = handler
+    providers_sync.pulls_made["alerts"] = [_alert("alert-1", "2024-01-01T00:05:00Z")]
+    assert providers_sync.sync() == 0
+    db_session.expire_all()
+    state = db_session.get(ProviderPullState, (SINGLE_TENANT_UUID, "datadog-1"))
+    assert state.watermark is None
+    assert providers_sync.stats()["failed"] == 1
+
+
+def test_claim_provider_pulls(db_session, installed_provider):
+    # only the pullable provider types
+    assert claim_provider_pulls(["grafana"], interval=60) == []
+    claimed = claim_provider_pulls(["datadog"], interval=60)
+    assert [state.provider_id for state in claimed] == ["datadog-1"]
+    # claimed until it's due again
+    assert claim_provider_pulls(["datadog"], interval=60) == []
+
+    # uninstalled providers aren't pulled
+    db_session.query(ProviderPullState).update(
+        {"next_pull_time": datetime.datetime.utcnow() - datetime.timedelta(seconds=1)}
+    )
+    db_session.query(Provider).delete()
+    db_session.commit()
+    assert claim_provider_pulls(["datadog"], interval=60) == []
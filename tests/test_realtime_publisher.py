@@ -0,0 +1,155 @@
+import asyncio
+import json
+import types
+
+import pytest
+
+from keep.api.core.realtime_publisher import (
+    LocalBroadcaster,
+    RealtimePublisher,
+    RealtimeTransport,
+)
+
+CHANNEL = "private-tenant"
+
+
+class _RecordingTransport(RealtimeTransport):
+    def __init__(self):
+        self.sent = []
+
+    def send(self, channel, event_name, message):
+        self.sent.append((channel, event_name, json.loads(message)))
+
+
+def _publisher(**kwargs):
+    transport = _RecordingTransport()
+    # flushed by the tests
+    publisher = RealtimePublisher(transport, flush_interval=60, **kwargs)
+    return publisher, transport
+
+
+def _alert(fingerprint, status="firing", payload=""):
+    return {"fingerprint": fingerprint, "status": status, "payload": payload}
+
+
+def test_alerts_coalesced_per_fingerprint():
+    publisher, transport = _publisher()
+    publisher.publish_alerts("tenant", [_alert("a"), _alert("b")])
+    publisher.publish_alerts("tenant", [_alert("a", status="resolved")])
+    publisher.publish_alerts("other", [_alert("a")])
+    publisher.flush()
+    assert sorted(transport.sent) == sorted(
+        [
+            (CHANNEL, "async-alerts", [_alert("b"), _alert("a", status="resolved")]),
+            ("private-other", "async-alerts", [_alert("a")]),
+        ]
+    )
+    assert publisher.stats()["coalesced"] == 1
+    # nothing left
+    publisher.flush()
+    assert len(transport.sent) == 2
+    publisher.stop()
+
+
+def test_presets_merged_and_events_sent_last():
+    publisher, transport = _publisher()
+    publisher.publish_alerts("tenant", [_alert("a")])
+    publisher.publish_presets(
+        "tenant", [{"id": "p1", "alerts_count": 2, "should_do_noise_now": False}]
+    )
+    publisher.publish("tenant", "async-done", {})
+    publisher.publish_presets(
+        "tenant", [{"id": "p1", "alerts_count": 1, "should_do_noise_now": True}]
+    )
+    publisher.flush()
+    assert [event_name for _, event_name, _ in transport.sent] == [
+        "async-alerts",
+        "async-presets",
+        "async-done",
+    ]
+    assert transport.sent[1][2] == [
+        {"id": "p1", "alerts_count": 3, "should_do_noise_now": True}
+    ]
+    publisher.stop()
+
+
+def test_alerts_packed_into_size_bounded_messages():
+    publisher, transport = _publisher(max_message_size=1024)
+    alerts = [_alert(f"alert-{i}", payload="x" * 200) for i in range(20)]
+    publisher.publish_alerts("tenant", alerts)
+    publisher.flush()
+    assert len(transport.sent) > 1
+    assert all(len(json.dumps(message)) <= 1024 for _, _, message in transport.sent)
+    assert [alert for _, _, message in transport.sent for alert in message] == alerts
+    publisher.stop()
+
+
+def test_channel_rate_limit():
+    publisher, transport = _publisher(channel_rate=2, max_message_size=300)
+    alerts = [_alert(f"alert-{i}", payload="x" * 200) for i in range(4)]
+    publisher.publish_alerts("tenant", alerts)
+    publisher.publish("tenant", "async-done", {})
+    publisher.flush()
+    # a message per alert, only 2 messages per second
+    assert [message for _, _, message in transport.sent] == [[alerts[0]], [alerts[1]]]
+    assert publisher.stats()["rate_limited"] == 1
+
+    # an alert that's left behind is updated by a newer publish
+    newer = _alert("alert-2", status="resolved", payload="x" * 200)
+    publisher.publish_alerts("tenant", [newer])
+    publisher.flush(rate_limit=False)
+    assert [message for _, _, message in transport.sent[2:]] == [
+        [alerts[3]],
+        [newer],
+        {},
+    ]
+    publisher.stop()
+
+
+def test_max_buffered_alerts():
+    publisher, transport = _publisher(max_buffered_alerts=2)
+    publisher.publish_alerts("tenant", [_alert("a"), _alert("b"), _alert("c")])
+    publisher.flush()
+    assert transport.sent == [(CHANNEL, "async-alerts", [_alert("b"), _alert("c")])]
+    assert publisher.stats()["dropped"] == 1
+    publisher.stop()
+
+
+def test_disabled_publisher():
+    publisher = RealtimePublisher(None)
+    publisher.publish_alerts("tenant", [_alert("a")])
+    assert not publisher.enabled
+    assert publisher.stats()["buffered_alerts"] == 0
+
+
+def test_local_broadcaster():
+    async def _test():
+        broadcaster = LocalBroadcaster()
+        publisher = RealtimePublisher(broadcaster, flush_interval=60)
+        subscriber = broadcaster.subscribe(CHANNEL)
+        other = broadcaster.subscribe("private-other")
+        publisher.publish_alerts("tenant", [_alert("a")])
+        # flushed by the publisher thread, the queue is fed on the event loop
+        await asyncio.to_thread(publisher.flush)
+        event_name, message = await asyncio.wait_for(subscriber.get(), timeout=5)
+        assert event_name == "async-alerts"
+        assert json.loads(message) == [_alert("a")]
+        assert other.empty()
+
+        broadcaster.unsubscribe(CHANNEL, subscriber)
+        publisher.publish_alerts("tenant", [_alert("b")])
+        await asyncio.to_thread(publisher.flush)
+        await asyncio.sleep(0)
+        assert subscriber.empty()
+        publisher.stop()
+
+    asyncio.run(_test())
+
+
+def test_local_transport_refuses_multiple_workers(monkeypatch):
+    import keep.api.config
+
+    monkeypatch.setattr(keep.api.config, "KEEP_REALTIME_TRANSPORT", "local")
+    server = types.SimpleNamespace(cfg=types.SimpleNamespace(workers=4))
+    with pytest.raises(RuntimeError):
+        keep.api.config.on_starting(server)
@@ -11,6 +11,11 @@ from keep.api.core.db import get_rules as get_rules_db
 from keep.api.core.dependencies import SINGLE_TENANT_UUID
 from keep.api.models.alert import AlertDto, AlertSeverity, AlertStatus
 from keep.api.models.db.alert import Alert
+from keep.rulesengine.celactivation import (
+    alert_to_cel_payload,
+    build_filter_activations,
+)
+from keep.rulesengine.celcache import CelProgramCache
 from keep.rulesengine.rulesengine import RulesEngine
 
 
@@ -426,3 +431,90 @@ def test_expired_group(db_session):
 #   - test group attributes - labels
 #   - test that if more than one rule matches, the alert is being updated correctly
 #   - test that if more than one rule matches, the alert is being updated correctly - different group
+
+
+def test_cel_program_cache_hits_and_evictions():
+    cache = CelProgramCache(max_size=2)
+    first = cache.get_program('name == "a"')
+    # surrounding whitespace is normalized away
+    assert cache.get_program('  name == "a" ') is first
+    cache.get_program('name == "b"')
+    cache.get_program('name == "c"')
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["evictions"] == 1
+    # the least recently used program was evicted and has to be compiled again
+    assert cache.get_program('name == "a"') is not first
+
+
+def test_filter_alerts_reuses_compiled_program():
+    alerts = [
+        AlertDto(
+            id="grafana-1",
+            source=["grafana"],
+            name="grafana-test-alert",
+            status=AlertStatus.FIRING,
+            severity=AlertSeverity.CRITICAL,
+            lastReceived="2021-08-01T00:00:00Z",
+        ),
+        AlertDto(
+            id="grafana-2",
+            source=["grafana"],
+            name="grafana-test-alert-2",
+            status=AlertStatus.FIRING,
+            severity=AlertSeverity.LOW,
+            lastReceived="2021-08-01T00:00:00Z",
+        ),
+    ]
+    cache = CelProgramCache.get_instance()
+    cache.clear()
+    for _ in range(3):
+        filtered = RulesEngine.filter_alerts(alerts, 'severity > "warning"')
+        assert [alert.id for alert in filtered] == ["grafana-1"]
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+
+
+def test_alert_to_cel_payload_matches_json_round_trip():
+    alert = AlertDto(
+        id="grafana-1",
+        source=["grafana"],
+        name="grafana-test-alert",
+        status=AlertStatus.FIRING,
+        severity=AlertSeverity.CRITICAL,
+        lastReceived="2021-08-01T00:00:00Z",
+        url="https://keephq.dev/alerts/1",
+        labels={"queue": "queue1", "count": 3, "nested": {"values": (1, 2)}},
+        receivedAt=datetime.datetime(2021, 8, 1),
+    )
+    assert alert_to_cel_payload(alert) == json.loads(
+        json.dumps(alert.dict(), default=str)
+    )
+
+
+def test_filter_alerts_with_shared_activations():
+    alerts = [
+        AlertDto(
+            id=f"alert-{i}",
+            source=["grafana", "sentry"] if i % 2 else ["grafana"],
+            name=f"alert-{i}",
+            status=AlertStatus.FIRING,
+            severity=AlertSeverity.CRITICAL if i % 2 else AlertSeverity.INFO,
+            lastReceived="2021-08-01T00:00:00Z",
+            labels={"queue": f"queue{i % 3}"},
+        )
+        for i in range(6)
+    ]
+    activations = build_filter_activations(alerts)
+    for cel in [
+        'severity == "critical"',
+        'source.contains("sentry")',
+        'labels.queue == "queue1"',
+        'name.startsWith("alert")',
+    ]:
+        assert RulesEngine.filter_alerts(
+            alerts, cel, activations
+        ) == RulesEngine.filter_alerts(alerts, cel)
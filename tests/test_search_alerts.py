@@ -10,6 +10,7 @@ from keep.api.core.dependencies import SINGLE_TENANT_UUID
 from keep.api.models.alert import AlertStatus
 from keep.api.models.db.alert import Alert
 from keep.api.routes.alerts import convert_db_alerts_to_dto_alerts
+from keep.rulesengine.celsql import translate_cel_to_sql
 from keep.rulesengine.rulesengine import RulesEngine
 
 # Shahar: If you are struggling - you can play with https://playcel.undistro.io/ to see how the CEL expressions work
@@ -716,3 +717,97 @@ def test_severity_comparisons(
     assert len(alerts_dto) == 5
     filtered_alerts = RulesEngine.filter_alerts(alerts_dto, search_query)
     assert len(filtered_alerts) == expected_severity_counts
+
+
+pushdown_alert_details = {
+    "alert_details": [
+        {"source": ["sentry"], "severity": "critical", "service": "api"},
+        {
+            "source": ["grafana", "prometheus"],
+            "severity": "warning",
+            "labels": {"queue": "queue1", "a.b": "dotted"},
+        },
+        {"source": ["grafana"], "severity": "CRITICAL", "status": "resolved"},
+        {"source": ["datadog"], "service": "billing-api", "status": "weird"},
+        {"source": ["sentry"], "severity": "low", "labels": {"queue": "queue2"}},
+    ]
+}
+
+
+@pytest.mark.parametrize(
+    "setup_alerts, search_query",
+    [
+        (pushdown_alert_details, 'source == "sentry"'),
+        (pushdown_alert_details, 'source == "grafana"'),
+        (pushdown_alert_details, 'source.contains("graf")'),
+        (pushdown_alert_details, 'source.startsWith("prom")'),
+        (pushdown_alert_details, 'source in ["datadog", "sentry"]'),
+        (pushdown_alert_details, 'severity > "warning"'),
+        (pushdown_alert_details, 'severity == "info"'),
+        (pushdown_alert_details, 'severity <= "info" && source == "sentry"'),
+        (pushdown_alert_details, 'status == "firing"'),
+        (pushdown_alert_details, 'status != "resolved"'),
+        (pushdown_alert_details, 'service.startsWith("bill")'),
+        (pushdown_alert_details, 'service == "api" || labels.queue == "queue1"'),
+        (pushdown_alert_details, 'labels["a.b"] == "dotted"'),
+        (pushdown_alert_details, 'labels.queue in ["queue1", "queue2"]'),
+        (pushdown_alert_details, '"queue2" == labels.queue && !dismissed'),
+        (pushdown_alert_details, '!(source == "sentry") || service == "api"'),
+        (pushdown_alert_details, 'fingerprint == "test-1"'),
+    ],
+    indirect=["setup_alerts"],
+)
+def test_search_pushdown_matches_python_evaluation(
+    db_session, setup_alerts, search_query
+):
+    # mark one of the alerts as dismissed and override the service of another
+    enrich_alert(
+        SINGLE_TENANT_UUID, fingerprint="test-0", enrichments={"dismissed": True}
+    )
+    enrich_alert(
+        SINGLE_TENANT_UUID, fingerprint="test-4", enrichments={"service": "api"}
+    )
+    expected = RulesEngine.filter_alerts(
+        convert_db_alerts_to_dto_alerts(
+            get_alerts_with_filters(tenant_id=SINGLE_TENANT_UUID)
+        ),
+        search_query,
+    )
+    translation = translate_cel_to_sql(
+        RulesEngine.preprocess_cel_expression(search_query)
+    )
+    alerts = get_alerts_with_filters(
+        tenant_id=SINGLE_TENANT_UUID, cel_filter=translation.clause
+    )
+    filtered_alerts = RulesEngine.filter_alerts(
+        convert_db_alerts_to_dto_alerts(alerts), search_query
+    )
+    assert sorted(alert.fingerprint for alert in filtered_alerts) == sorted(
+        alert.fingerprint for alert in expected
+    )
+
+
+@pytest.mark.parametrize(
+    "search_query, pushed_down, fully_pushed_down",
+    [
+        ('source == "sentry"', ['source == "sentry"'], True),
+        (
+            'source == "sentry" && labels.queue != "q1"',
+            ['source == "sentry"'],
+            False,
+        ),
+        (
+            '(name == "a" || service in ["x", "y"]) && !dismissed',
+            ['name == "a" || service in ["x", "y"]'],
+            False,
+        ),
+        ('name == "a" || count > 3', [], False),
+        ('status == "suppressed"', [], False),
+        ("severity > 3 && severity < 5", ["severity > 3", "severity < 5"], True),
+    ],
+)
+def test_search_pushdown_report(search_query, pushed_down, fully_pushed_down):
+    translation = translate_cel_to_sql(search_query)
+    assert translation.pushed_down == pushed_down
+    assert translation.fully_pushed_down == fully_pushed_down
+    assert (translation.clause is None) == (not pushed_down)
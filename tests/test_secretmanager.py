@@ -1,5 +1,17 @@
-import pytest
+import base64
+import json
 
+import kubernetes.client
+import pytest
+from kubernetes.client.rest import ApiException
+
+from keep.secretmanager.cachedsecretmanager import (
+    CachedSecretManager,
+    SecretNotFoundException,
+)
+from keep.secretmanager.kubernetessecretmanager import KubernetesSecretManager
+from keep.secretmanager.secretmanager import BaseSecretManager
+from keep.secretmanager.secretmanagerfactory import SecretManagerFactory
 from keep.secretmanager.vaultsecretmanager import VaultSecretManager
 
 
@@ -57,3 +69,129 @@ def test_delete_secret(vault_secret_manager):
     secret_name = "test_secret"
     vault_secret_manager.delete_secret(secret_name)
     # You might want to assert logs or other side effects if necessary
+
+
+class CountingSecretManager(BaseSecretManager):
+    def __init__(self, context_manager, secrets):
+        super().__init__(context_manager)
+        self.secrets = secrets
+        self.reads = 0
+        self.bulk_reads = 0
+
+    def read_secret(self, secret_name, is_json=False):
+        self.reads += 1
+        if secret_name not in self.secrets:
+            raise KeyError(secret_name)
+        secret = self.secrets[secret_name]
+        return json.loads(secret) if is_json else secret
+
+    def read_secrets(self, secret_names, is_json=False):
+        self.bulk_reads += 1
+        return {
+            secret_name: (
+                json.loads(self.secrets[secret_name])
+                if is_json
+                else self.secrets[secret_name]
+            )
+            for secret_name in secret_names
+            if secret_name in self.secrets
+        }
+
+    def write_secret(self, secret_name, secret_value):
+        self.secrets[secret_name] = secret_value
+
+    def delete_secret(self, secret_name):
+        self.secrets.pop(secret_name)
+
+
+@pytest.fixture
+def cached_secret_manager(context_manager):
+    backend = CountingSecretManager(context_manager, {"a": '{"key": "a"}'})
+    return CachedSecretManager(context_manager, backend, ttl=60, negative_ttl=60)
+
+
+def test_cached_secret_manager_read(cached_secret_manager):
+    backend = cached_secret_manager.secret_manager
+    assert cached_secret_manager.read_secret("a", is_json=True) == {"key": "a"}
+    secret = cached_secret_manager.read_secret("a", is_json=True)
+    assert secret == {"key": "a"}
+    assert cached_secret_manager.read_secret("a") == '{"key": "a"}'
+    assert backend.reads == 2
+    # the cached secret can't be modified by the callers
+    secret["key"] = "modified"
+    assert cached_secret_manager.read_secret("a", is_json=True) == {"key": "a"}
+
+    # missing secrets are cached too
+    for _ in range(2):
+        with pytest.raises(KeyError):
+            cached_secret_manager.read_secret("b")
+    assert backend.reads == 3
+
+
+def test_cached_secret_manager_invalidation(cached_secret_manager):
+    backend = cached_secret_manager.secret_manager
+    with pytest.raises(KeyError):
+        cached_secret_manager.read_secret("b")
+    cached_secret_manager.write_secret("b", "b")
+    assert cached_secret_manager.read_secret("b") == "b"
+    cached_secret_manager.write_secret("b", "new b")
+    assert cached_secret_manager.read_secret("b") == "new b"
+    cached_secret_manager.delete_secret("b")
+    with pytest.raises(KeyError):
+        cached_secret_manager.read_secret("b")
+    assert backend.reads == 4
+
+
+def test_cached_secret_manager_read_secrets(cached_secret_manager):
+    backend = cached_secret_manager.secret_manager
+    cached_secret_manager.read_secret("a", is_json=True)
+    backend.secrets["c"] = '{"key": "c"}'
+    secrets = cached_secret_manager.read_secrets(["a", "b", "c"], is_json=True)
+    assert secrets == {"a": {"key": "a"}, "c": {"key": "c"}}
+    # only the misses are read, in one call
+    assert backend.bulk_reads == 1
+    assert cached_secret_manager.read_secrets(["a", "b", "c"], is_json=True) == secrets
+    assert backend.bulk_reads == 1
+    with pytest.raises(SecretNotFoundException):
+        cached_secret_manager.read_secret("b", is_json=True)
+
+
+def test_secret_manager_factory_is_cached(context_manager):
+    SecretManagerFactory.clear()
+    secret_manager = SecretManagerFactory.get_secret_manager(context_manager)
+    assert isinstance(secret_manager, CachedSecretManager)
+    assert SecretManagerFactory.get_secret_manager(context_manager) is secret_manager
+    SecretManagerFactory.clear()
+
+
+class ForbiddenListKubernetesApi:
+    """A service account that may get the secrets, but not list them"""
+
+    def __init__(self, secrets):
+        self.secrets = secrets
+        self.lists = 0
+
+    def list_namespaced_secret(self, *args, **kwargs):
+        self.lists += 1
+        raise ApiException(status=403, reason="Forbidden")
+
+    def read_namespaced_secret(self, name, namespace):
+        if name not in self.secrets:
+            raise ApiException(status=404, reason="Not Found")
+        return kubernetes.client.V1Secret(
+            data={"value": base64.b64encode(self.secrets[name].encode()).decode()}
+        )
+
+
+def test_kubernetes_read_secrets_without_list(monkeypatch, context_manager):
+    api = ForbiddenListKubernetesApi({"provider-a": '{"key": "a"}'})
+    monkeypatch.setattr("kubernetes.config.load_incluster_config", lambda: None)
+    monkeypatch.setattr("kubernetes.client.CoreV1Api", lambda: api)
+    secret_manager = KubernetesSecretManager(context_manager)
+    for _ in range(2):
+        secrets = secret_manager.read_secrets(
+            ["provider_a", "provider_b"], is_json=True
+        )
+        assert secrets == {"provider_a": {"key": "a"}}
+    # not listed again once it's forbidden
+    assert api.lists == 1
@@ -1,8 +1,10 @@
+import copy
 import time
 from unittest.mock import Mock
 
 import pytest
 
+from keep.contextmanager.contextmanager import ContextManager
 from keep.step.step import Step, StepError, StepType
 
 # constants for on-failure->retry mechanism
@@ -74,3 +76,59 @@ def test_run_single_exception(sample_step):
 
     # _run_single should take around RETRY_COUNT*RETRT_INTERVAL time due to retries
     assert execution_time >= RETRY_COUNT * RETRY_INTERVAL
+
+
+class SlowProvider:
+    """Notifies the value, the smaller values take longer"""
+
+    def __init__(self):
+        self.results = []
+
+    def clone(self, context_manager):
+        provider = copy.copy(self)
+        provider.results = []
+        return provider
+
+    def notify(self, value):
+        time.sleep((10 - int(value)) * 0.01)
+        if value == "3":
+            raise Exception("Failed to notify 3")
+        self.results.append(value)
+        return value
+
+    def expose(self):
+        return {}
+
+
+@pytest.mark.parametrize("concurrency", [1, 5])
+def test_run_foreach_concurrency(concurrency):
+    context_manager = ContextManager(tenant_id="keep")
+    context_manager.set_step_context("source", results=list(range(10)))
+    step = Step(
+        context_manager,
+        "notify",
+        {
+            "name": "notify",
+            "foreach": "{{ steps.source.results }}",
+            "foreach-concurrency": concurrency,
+        },
+        StepType.ACTION,
+        SlowProvider(),
+        {"value": "{{ foreach.value }}"},
+    )
+
+    assert step.run() is True
+
+    # the results are in the items order, without the failed item
+    expected = [str(i) for i in range(10) if i != 3]
+    assert context_manager.steps_context["notify"]["results"] == expected
+    assert step.provider.results == expected
+    assert context_manager.steps_context["this"]["results"] == expected
+    assert context_manager.foreach_context["value"] == 9
+    assert step.foreach_results["items"] == 10
+    assert step.foreach_results["failed"] == 1
+    assert step.foreach_results["concurrency"] == concurrency
+    assert len(step.foreach_results["latencies"]) == 10
+    if concurrency > 1:
+        # the items ran concurrently
+        assert step.foreach_results["duration"] < sum(step.foreach_results["latencies"])
@@ -0,0 +1,109 @@
+import datetime
+
+import pytest
+import yaml
+
+from keep.api.core.db import add_or_update_workflow
+from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.api.models.db.workflow import Workflow as WorkflowModel
+from keep.workflowmanager.workflowcache import WorkflowCache
+from keep.workflowmanager.workflowstore import WorkflowStore
+
+WORKFLOW_ID = "5f1c6a3e-2b8d-4c1e-9a7f-0d4b3e2c1a90"
+WORKFLOW = {
+    "id": "cached-workflow",
+    "name": "cached-workflow",
+    "triggers": [{"type": "manual"}],
+    "steps": [
+        {
+            "name": "step",
+            "provider": {"type": "console", "with": {"alert_message": "step"}},
+        }
+    ],
+    "actions": [
+        {
+            "name": "action",
+            "provider": {"type": "console", "with": {"alert_message": "action"}},
+        }
+    ],
+}
+
+
+@pytest.fixture
+def workflow_store(db_session, monkeypatch):
+    add_or_update_workflow(
+        id=WORKFLOW_ID,
+        name=WORKFLOW["name"],
+        tenant_id=SINGLE_TENANT_UUID,
+        description=None,
+        created_by="test@keephq.dev",
+        interval=0,
+        workflow_raw=yaml.dump(WORKFLOW),
+    )
+    workflow_store = WorkflowStore()
+    parsed = []
+    parse = workflow_store.parser.parse
+
+    def counting_parse(*args, **kwargs):
+        parsed.append(args)
+        return parse(*args, **kwargs)
+
+    monkeypatch.setattr(workflow_store.parser, "parse", counting_parse)
+    workflow_store.parsed = parsed
+    return workflow_store
+
+
+def test_workflow_cache_clones(workflow_store):
+    first = workflow_store.get_workflow(SINGLE_TENANT_UUID, WORKFLOW_ID)
+    second = workflow_store.get_workflow(SINGLE_TENANT_UUID, WORKFLOW_ID)
+    assert len(workflow_store.parsed) == 1
+    assert WorkflowCache.get_instance().stats()["hits"] == 1
+
+    # every run has its own context, steps and providers
+    assert first is not second
+    assert first.context_manager is not second.context_manager
+    assert first.context_manager.providers_context == (
+        second.context_manager.providers_context
+    )
+    first_step, second_step = first.workflow_steps[0], second.workflow_steps[0]
+    assert first_step is not second_step
+    assert first_step.provider is not second_step.provider
+    assert second_step.context_manager is second.context_manager
+    assert second_step.provider.context_manager is second.context_manager
+    assert second.workflow_actions[0].context_manager is second.context_manager
+
+    # the context of a run doesn't leak to the next runs
+    first.context_manager.steps_context["step"] = {"results": "first"}
+    third = workflow_store.get_workflow(SINGLE_TENANT_UUID, WORKFLOW_ID)
+    assert third.context_manager.steps_context == {}
+    assert third.run_actions() == ([], [])
+    assert "action" in third.context_manager.steps_context
+    assert len(workflow_store.parsed) == 1
+
+
+def test_workflow_cache_invalidation(db_session, workflow_store):
+    workflow_store.get_workflow(SINGLE_TENANT_UUID, WORKFLOW_ID)
+    assert len(workflow_store.parsed) == 1
+
+    # a new revision of the workflow is parsed again
+    workflow = db_session.get(WorkflowModel, WORKFLOW_ID)
+    workflow.revision += 1
+    workflow.last_updated = datetime.datetime.utcnow()
+    db_session.commit()
+    workflow_store.get_workflow(SINGLE_TENANT_UUID, WORKFLOW_ID)
+    assert len(workflow_store.parsed) == 2
+
+    # and so are the workflows of a tenant whose providers changed
+    WorkflowCache.get_instance().invalidate_providers(SINGLE_TENANT_UUID)
+    workflow_store.get_workflow(SINGLE_TENANT_UUID, WORKFLOW_ID)
+    workflow_store.get_workflow(SINGLE_TENANT_UUID, WORKFLOW_ID)
+    assert len(workflow_store.parsed) == 3
+
+    # the yamls of the trigger index are cached by their version
+    version = (workflow.revision, workflow.last_updated)
+    workflow_store.get_workflow_from_yaml(
+        SINGLE_TENANT_UUID, WORKFLOW_ID, WORKFLOW, version=version
+    )
+    assert len(workflow_store.parsed) == 3
+    workflow_store.get_workflow_from_yaml(SINGLE_TENANT_UUID, WORKFLOW_ID, WORKFLOW)
+    assert len(workflow_store.parsed) == 4
@@ -0,0 +1,137 @@
+import time
+
+import pytest
+
+from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.providers.mock_provider.mock_provider import MockProvider
+from keep.workflowmanager.workflowstore import WorkflowStore
+
+WORKFLOW_ID = "0b8e5a2c-6d1f-4f3e-8c7a-2e9d4b1a6f35"
+
+
+def _step(name, command_output, sleep=0, **kwargs):
+    return {
+        "name": name,
+        "provider": {
+            "type": "mock",
+            "with": {"command_output": command_output, "sleep": str(sleep)},
+        },
+        **kwargs,
+    }
+
+
+@pytest.fixture
+def slow_mock_provider(monkeypatch):
+    def _query(self, **kwargs):
+        time.sleep(float(kwargs.get("sleep", 0)))
+        return kwargs.get("command_output")
+
+    def _notify(self, **kwargs):
+        time.sleep(float(kwargs.get("sleep", 0)))
+        return kwargs
+
+    monkeypatch.setattr(MockProvider, "_query", _query)
+    monkeypatch.setattr(MockProvider, "_notify", _notify)
+
+
+def _get_workflow(steps, actions, **kwargs):
+    return WorkflowStore().get_workflow_from_yaml(
+        SINGLE_TENANT_UUID,
+        WORKFLOW_ID,
+        {
+            "id": "concurrent-workflow",
+            "triggers": [{"type": "manual"}],
+            "steps": steps,
+            "actions": actions,
+            **kwargs,
+        },
+    )
+
+
+def test_workflow_steps_run_by_dependencies(db_session, slow_mock_provider):
+    workflow = _get_workflow(
+        [
+            _step("query-a", "a", sleep=0.3),
+            _step("query-b", "b", sleep=0.3),
+            _step("merge", "{{ steps.query-a.results }}-{{ steps.query-b.results }}"),
+        ],
+        [
+            _step("notify", "{{ steps.merge.results }}"),
+            _step("notify-again", "again", depends_on="notify"),
+        ],
+    )
+    steps = {step.name: step for step in workflow.workflow_steps}
+    actions = {action.name: action for action in workflow.workflow_actions}
+    assert steps["query-a"].dependencies == []
+    assert steps["query-b"].dependencies == []
+    assert steps["merge"].dependencies == ["query-a", "query-b"]
+    assert actions["notify"].dependencies == []
+    assert actions["notify-again"].dependencies == ["notify"]
+
+    start = time.monotonic()
+    workflow.run_steps()
+    # query-a and query-b ran concurrently, merge after both of them
+    assert time.monotonic() - start < 0.55
+    assert workflow.context_manager.steps_context["merge"]["results"] == "a-b"
+    assert steps["merge"].timing["started_at"] > steps["query-a"].timing["started_at"]
+    assert steps["query-a"].timing["duration"] >= 0.3
+    assert workflow.run_actions() == ([], [])
+    notify_results = workflow.context_manager.steps_context["notify"]["results"]
+    assert notify_results["command_output"] == "a-b"
+
+
+def test_workflow_actions_run_in_order_unless_concurrent(
+    db_session, slow_mock_provider
+):
+    actions = [_step("notify", "a", sleep=0.2), _step("open-ticket", "b", sleep=0.2)]
+    workflow = _get_workflow([], actions)
+    start = time.monotonic()
+    assert workflow.run_actions() == ([], [])
+    # independent, but the actions may rely on their order
+    assert time.monotonic() - start >= 0.4
+    actions = {action.name: action for action in workflow.workflow_actions}
+    assert (
+        actions["open-ticket"].timing["started_at"]
+        >= actions["notify"].timing["started_at"]
+    )
+
+    workflow = _get_workflow(
+        [],
+        [_step("notify", "a", sleep=0.2), _step("open-ticket", "b", sleep=0.2)],
+        **{"actions-concurrency": 2},
+    )
+    assert workflow.clone().workflow_actions_concurrency == 2
+    start = time.monotonic()
+    assert workflow.run_actions() == ([], [])
+    assert time.monotonic() - start < 0.35
+
+
+def test_workflow_steps_this_runs_in_order(db_session, slow_mock_provider):
+    workflow = _get_workflow(
+        [
+            _step("query-a", "a", sleep=0.1),
+            _step("query-b", "b", sleep=0.1),
+        ],
+        [_step("notify", "{{ steps.this.results }}")],
+    )
+    assert workflow.workflow_actions[0].dependencies is None
+
+    start = time.monotonic()
+    workflow.run_steps()
+    assert time.monotonic() - start >= 0.2
+    workflow.run_actions()
+    notify_results = workflow.context_manager.steps_context["notify"]["results"]
+    assert notify_results["command_output"] == "b"
+
+
+def test_workflow_steps_bad_dependencies(db_session):
+    with pytest.raises(ValueError, match="unknown step"):
+        _get_workflow([_step("query-a", "a", depends_on=["query-c"])], [])
+    with pytest.raises(ValueError, match="Circular dependency"):
+        _get_workflow(
+            [
+                _step("query-a", "a", depends_on=["query-b"]),
+                _step("query-b", "{{ steps.query-a.results }}"),
+            ],
+            [],
+        )
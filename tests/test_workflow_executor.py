@@ -0,0 +1,54 @@
+import threading
+import time
+
+from keep.workflowmanager.workflowexecutor import WorkflowExecutor, WorkflowRunPriority
+
+
+def test_executor_priorities_and_bound():
+    executor = WorkflowExecutor(max_concurrency=1, queue_size=3)
+    executor.start()
+    started = threading.Event()
+    release = threading.Event()
+    ran = []
+
+    def blocking_run():
+        started.set()
+        release.wait(5)
+
+    # occupy the only worker, so the next runs are queued
+    assert executor.submit(blocking_run)
+    assert started.wait(5)
+    assert executor.submit(
+        ran.append, "interval", priority=WorkflowRunPriority.INTERVAL
+    )
+    assert executor.submit(ran.append, "event-1", priority=WorkflowRunPriority.EVENT)
+    assert executor.submit(ran.append, "manual", priority=WorkflowRunPriority.MANUAL)
+    # the queue is bounded
+    assert executor.is_full()
+    assert not executor.submit(ran.append, "event-2")
+    assert executor.status()["depth"] == 3
+    assert executor.status()["active"] == 1
+
+    release.set()
+    executor.stop(drain_timeout=5)
+    assert ran == ["manual", "event-1", "interval"]
+    status = executor.status()
+    assert status["completed"] == 4 and status["rejected"] == 1
+    assert status["depth"] == 0 and status["active"] == 0
+
+
+def test_executor_drains_on_stop():
+    executor = WorkflowExecutor(max_concurrency=4, queue_size=100)
+    executor.start()
+    finished = []
+
+    def run(i):
+        time.sleep(0.01)
+        finished.append(i)
+
+    for i in range(20):
+        assert executor.submit(run, i)
+    executor.stop(drain_timeout=5)
+    assert sorted(finished) == list(range(20))
+    # stopped, new runs are rejected
+    assert not executor.submit(run, 21)
@@ -0,0 +1,112 @@
+import datetime
+import logging
+
+import pytest
+
+from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.api.logging import WorkflowDBHandler, WorkflowLogShipper
+from keep.api.models.db.workflow import WorkflowExecutionLog
+from keep.contextmanager.contextmanager import ContextManager
+
+
+@pytest.fixture
+def shipper(monkeypatch):
+    shipper = WorkflowLogShipper(batch_size=3, flush_interval=60)
+    monkeypatch.setattr(WorkflowLogShipper, "_instance", shipper, raising=False)
+    yield shipper
+    shipper.stop()
+
+
+@pytest.fixture
+def workflow_logger():
+    logger = logging.getLogger("test_workflow_logs")
+    logger.setLevel(logging.INFO)
+    # the root logger may have a WorkflowDBHandler too (see keep.api.logging.CONFIG)
+    logger.propagate = False
+    handler = WorkflowDBHandler()
+    logger.addHandler(handler)
+    yield logger
+    logger.removeHandler(handler)
+
+
+def _logs(db_session, workflow_execution_id):
+    return (
+        db_session.query(WorkflowExecutionLog)
+        .filter(WorkflowExecutionLog.workflow_execution_id == workflow_execution_id)
+        .order_by(WorkflowExecutionLog.id)
+        .all()
+    )
+
+
+def test_workflow_logs_context_snapshots(db_session, shipper, workflow_logger):
+    context_manager = ContextManager(tenant_id=SINGLE_TENANT_UUID)
+    context_manager.set_execution_context("execution-1")
+    context_manager.logger_adapter.logger = workflow_logger
+    logger = context_manager.get_logger()
+
+    logger.info("before the steps")
+    context_manager.set_step_context("step-1", results={"value": 1})
+    logger.info("after step 1")
+    logger.info("still after step 1")
+    context_manager.set_step_context("step-2", results={"value": 2})
+    logger.info("after step 2")
+    # another execution is buffered separately
+    other_context_manager = ContextManager(tenant_id=SINGLE_TENANT_UUID)
+    other_context_manager.set_execution_context("execution-2")
+    other_context_manager.logger_adapter.logger = workflow_logger
+    other_context_manager.get_logger().info("other execution")
+    shipper.flush(wait=True)
+
+    logs = _logs(db_session, "execution-1")
+    assert [log.message for log in logs] == [
+        "before the steps",
+        "after step 1",
+        "still after step 1",
+        "after step 2",
+    ]
+    # the context is stored once per change, a snapshot of that time
+    assert logs[0].context == {}
+    assert logs[1].context["step-1"]["results"] == {"value": 1}
+    assert "step-2" not in logs[1].context
+    assert logs[2].context is None
+    assert logs[3].context["step-2"]["results"] == {"value": 2}
+    assert len(_logs(db_session, "execution-2")) == 1
+    assert shipper.stats()["shipped"] == 5
+
+
+def test_workflow_logs_batches_and_drops(db_session, shipper):
+    shipper.max_buffer_size = 100
+    for i in range(6):
+        shipper.enqueue(
+            {
+                "workflow_execution_id": "execution-1",
+                "timestamp": datetime.datetime.utcnow(),
+                "message": f"log {i}",
+                "context": None,
+            },
+            size=20,
+        )
+    assert shipper.stats()["buffered"] == 5
+    assert shipper.stats()["dropped"] == 1
+
+    shipper.flush(wait=True)
+    messages = [log.message for log in _logs(db_session, "execution-1")]
+    assert messages[0] == "1 log records were dropped (buffer full)"
+    assert messages[1:] == [f"log {i}" for i in range(5)]
+    assert shipper.stats()["buffered"] == 0
+
+
+def test_workflow_logs_shipped_in_background(db_session, shipper):
+    shipper.flush_interval = 0.05
+    shipper.enqueue(
+        {
+            "workflow_execution_id": "execution-1",
+            "timestamp": datetime.datetime.utcnow(),
+            "message": "shipped",
+            "context": None,
+        },
+        size=10,
+    )
+    # stopping waits for the writer thread and ships what's left
+    shipper.stop()
+    assert [log.message for log in _logs(db_session, "execution-1")] == ["shipped"]
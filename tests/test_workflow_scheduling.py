@@ -0,0 +1,177 @@
+import datetime
+import threading
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from keep.api.core import db
+from keep.api.core.db import (
+    add_or_update_workflow,
+    delete_workflow,
+    finish_workflow_execution,
+    get_next_workflow_run_at,
+    get_workflows_that_should_run,
+    sync_workflow_schedules,
+)
+from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.api.models.db.tenant import Tenant
+from keep.api.models.db.workflow import Workflow, WorkflowExecution, WorkflowSchedule
+
+
+def _add_interval_workflow(name, interval=60):
+    return add_or_update_workflow(
+        id=name,
+        name=name,
+        tenant_id=SINGLE_TENANT_UUID,
+        description=None,
+        created_by="test@keephq.dev",
+        interval=interval,
+        workflow_raw="{}",
+    )
+
+
+def _schedule(db_session, workflow_id) -> WorkflowSchedule:
+    db_session.expire_all()
+    return db_session.query(WorkflowSchedule).get(workflow_id)
+
+
+def test_interval_workflows_claims(db_session):
+    _add_interval_workflow("interval-wf")
+    # a new interval workflow is due right away
+    assert get_next_workflow_run_at() <= datetime.datetime.utcnow()
+
+    workflows_to_run = get_workflows_that_should_run()
+    assert [workflow["workflow_id"] for workflow in workflows_to_run] == ["interval-wf"]
+    execution_id = workflows_to_run[0]["workflow_execution_id"]
+    execution = db_session.query(WorkflowExecution).get(execution_id)
+    assert execution.status == "in_progress" and execution.execution_number == 1
+    # claimed, it isn't due until the interval passed
+    assert get_workflows_that_should_run() == []
+
+    # due again while the previous execution is still running, it isn't claimed
+    db_session.query(WorkflowSchedule).update(
+        {"next_run_at": datetime.datetime.utcnow() - datetime.timedelta(seconds=1)}
+    )
+    db_session.commit()
+    assert get_workflows_that_should_run() == []
+
+    finish_workflow_execution(
+        SINGLE_TENANT_UUID, "interval-wf", execution_id, "success", None
+    )
+    assert not _schedule(db_session, "interval-wf").is_running
+    workflows_to_run = get_workflows_that_should_run()
+    assert len(workflows_to_run) == 1
+    schedule = _schedule(db_session, "interval-wf")
+    assert schedule.execution_number == 2
+    assert schedule.next_run_at > datetime.datetime.utcnow()
+
+    # the running execution timed out
+    db_session.query(WorkflowSchedule).update(
+        {
+            "next_run_at": datetime.datetime.utcnow() - datetime.timedelta(seconds=1),
+            "last_started_at": datetime.datetime.utcnow()
+            - datetime.timedelta(minutes=61),
+        }
+    )
+    db_session.commit()
+    timed_out_execution_id = workflows_to_run[0]["workflow_execution_id"]
+    assert len(get_workflows_that_should_run()) == 1
+    db_session.expire_all()
+    assert (
+        db_session.query(WorkflowExecution).get(timed_out_execution_id).status
+        == "timeout"
+    )
+
+
+def test_interval_workflows_concurrent_claims(db_session, tmp_path, monkeypatch):
+    # the in-memory database shares a single connection between the threads,
+    #   so the schedulers use a database file with a connection each
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/keep.db", connect_args={"check_same_thread": False}
+    )
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(db, "engine", engine)
+    with Session(engine) as session:
+        session.add(
+            Tenant(id=SINGLE_TENANT_UUID, name="test-tenant", created_by="tests")
+        )
+        session.commit()
+    for i in range(10):
+        _add_interval_workflow(f"interval-wf-{i}")
+    claimed = []
+    lock = threading.Lock()
+
+    def claim():
+        workflows_to_run = get_workflows_that_should_run()
+        with lock:
+            claimed.extend(workflow["workflow_id"] for workflow in workflows_to_run)
+
+    threads = [threading.Thread(target=claim) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # every due workflow is claimed exactly once
+    assert sorted(claimed) == sorted(f"interval-wf-{i}" for i in range(10))
+
+
+def test_workflow_schedules_sync(db_session):
+    _add_interval_workflow("interval-wf", interval=60)
+    # changing the interval reschedules it
+    _add_interval_workflow("interval-wf", interval=0)
+    assert _schedule(db_session, "interval-wf") is None
+    _add_interval_workflow("interval-wf", interval=30)
+    assert _schedule(db_session, "interval-wf").interval == 30
+    delete_workflow(SINGLE_TENANT_UUID, "interval-wf")
+    assert _schedule(db_session, "interval-wf") is None
+
+    # a workflow that was created before the schedules existed
+    started = datetime.datetime.utcnow() - datetime.timedelta(seconds=10)
+    db_session.add(
+        Workflow(
+            id="old-interval-wf",
+            name="old-interval-wf",
+            tenant_id=SINGLE_TENANT_UUID,
+            created_by="test@keephq.dev",
+            interval=60,
+            workflow_raw="{}",
+        )
+    )
+    db_session.add(
+        WorkflowExecution(
+            id="old-execution",
+            workflow_id="old-interval-wf",
+            tenant_id=SINGLE_TENANT_UUID,
+            started=started,
+            triggered_by="scheduler",
+            status="success",
+            execution_number=7,
+        )
+    )
+    db_session.commit()
+    assert sync_workflow_schedules() == 1
+    schedule = _schedule(db_session, "old-interval-wf")
+    # continues from its last execution
+    assert schedule.execution_number == 7
+    assert schedule.next_run_at == started + datetime.timedelta(seconds=60)
+    assert sync_workflow_schedules() == 0
+
+
+def test_scheduler_sleep_time(db_session):
+    from keep.workflowmanager.workflowscheduler import (
+        KEEP_SCHEDULER_MAX_POLL_INTERVAL,
+        WorkflowScheduler,
+    )
+
+    scheduler = WorkflowScheduler(None)
+    # nothing to run
+    assert scheduler._get_sleep_time() == KEEP_SCHEDULER_MAX_POLL_INTERVAL
+    _add_interval_workflow("interval-wf")
+    db_session.query(WorkflowSchedule).update(
+        {"next_run_at": datetime.datetime.utcnow() + datetime.timedelta(seconds=3)}
+    )
+    db_session.commit()
+    # sleeps until the workflow is due
+    assert 2 < scheduler._get_sleep_time() <= 3
+    # event workflows are waiting
+    scheduler.workflows_to_run.append({"workflow_id": "event-wf"})
+    assert scheduler._get_sleep_time() == 1
@@ -0,0 +1,150 @@
+import pytest
+import yaml
+
+from keep.api.core.db import add_or_update_workflow
+from keep.api.core.dependencies import SINGLE_TENANT_UUID
+from keep.api.models.alert import AlertDto, AlertSeverity, AlertStatus
+from keep.workflowmanager.workflowmanager import WorkflowManager
+from keep.workflowmanager.workflowtriggerindex import WorkflowTriggerIndex
+
+
+def _workflow(name, filters):
+    return {
+        "id": name,
+        "name": name,
+        "triggers": [{"type": "alert", "filters": filters}],
+        "actions": [
+            {
+                "name": "print",
+                "provider": {"type": "console", "with": {"alert_message": "hi"}},
+            }
+        ],
+    }
+
+
+def _add_workflow(workflow_id, workflow):
+    return add_or_update_workflow(
+        id=workflow_id,
+        name=workflow["name"],
+        tenant_id=SINGLE_TENANT_UUID,
+        description=None,
+        created_by="test@keephq.dev",
+        interval=0,
+        workflow_raw=yaml.dump(workflow),
+    )
+
+
+def _alert(name, source="grafana"):
+    return AlertDto(
+        id=name,
+        name=name,
+        source=[source],
+        status=AlertStatus.FIRING,
+        severity=AlertSeverity.CRITICAL,
+        lastReceived="2024-01-01T00:00:00Z",
+    )
+
+
+@pytest.fixture
+def workflow_manager(db_session, monkeypatch):
+    workflow_manager = WorkflowManager()
+    workflow_manager.trigger_index = WorkflowTriggerIndex(refresh_interval=60)
+    materialized = []
+
+    def get_workflow_from_yaml(tenant_id, workflow_id, workflow_yaml, version=None):
+        materialized.append(workflow_id)
+        return workflow_yaml["name"]
+
+    monkeypatch.setattr(
+        workflow_manager.workflow_store,
+        "get_workflow_from_yaml",
+        get_workflow_from_yaml,
+    )
+    workflow_manager.materialized = materialized
+    return workflow_manager
+
+
+def _triggered(workflow_manager):
+    triggered = [
+        (workflow["workflow"], workflow["event"].id)
+        for workflow in workflow_manager.scheduler.workflows_to_run
+    ]
+    workflow_manager.scheduler.workflows_to_run.clear()
+    return triggered
+
+
+def test_trigger_index_matching(workflow_manager):
+    _add_workflow(
+        "wf-source",
+        _workflow("source", [{"key": "source", "value": "grafana"}]),
+    )
+    _add_workflow(
+        "wf-regex",
+        _workflow("regex", [{"key": "name", "value": 'r"^disk-.*"'}]),
+    )
+    _add_workflow(
+        "wf-both",
+        _workflow(
+            "both",
+            [
+                {"key": "source", "value": "datadog"},
+                {"key": "name", "value": 'r"^cpu-.*"'},
+            ],
+        ),
+    )
+    _add_workflow("wf-invalid", {"name": "invalid", "triggers": "not-a-list"})
+
+    workflow_manager.insert_events(
+        SINGLE_TENANT_UUID,
+        [
+            _alert("disk-full"),
+            _alert("cpu-high", source="datadog"),
+            _alert("memory-high", source="datadog"),
+        ],
+    )
+    assert _triggered(workflow_manager) == [
+        ("source", "disk-full"),
+        ("regex", "disk-full"),
+        ("both", "cpu-high"),
+    ]
+    # only the workflows that should run are materialized
+    assert sorted(workflow_manager.materialized) == [
+        "wf-both",
+        "wf-regex",
+        "wf-source",
+    ]
+
+    index = workflow_manager.trigger_index.get(SINGLE_TENANT_UUID)
+    # the regex is compiled once, and the triggers with an exact filter are bucketed
+    assert set(index.buckets["source"]) == {"grafana", "datadog"}
+    assert [trigger.workflow_id for trigger in index.unbucketed] == ["wf-regex"]
+    assert index.unbucketed[0].filters[0].pattern.pattern == "^disk-.*"
+
+
+def test_trigger_index_invalidation(workflow_manager):
+    _add_workflow(
+        "wf-source",
+        _workflow("source", [{"key": "source", "value": "grafana"}]),
+    )
+    workflow_manager.insert_events(SINGLE_TENANT_UUID, [_alert("a")])
+    assert _triggered(workflow_manager) == [("source", "a")]
+    assert workflow_manager.trigger_index.builds == 1
+
+    # cached, the workflows aren't read again
+    workflow_manager.insert_events(SINGLE_TENANT_UUID, [_alert("b")])
+    assert workflow_manager.trigger_index.builds == 1
+
+    _add_workflow(
+        "wf-source",
+        _workflow("source", [{"key": "source", "value": "datadog"}]),
+    )
+    # not invalidated yet
+    workflow_manager.insert_events(SINGLE_TENANT_UUID, [_alert("c")])
+    assert _triggered(workflow_manager) == [("source", "b"), ("source", "c")]
+
+    workflow_manager.trigger_index.invalidate(SINGLE_TENANT_UUID)
+    workflow_manager.insert_events(
+        SINGLE_TENANT_UUID, [_alert("d"), _alert("e", source="datadog")]
+    )
+    assert _triggered(workflow_manager) == [("source", "e")]
+    assert workflow_manager.trigger_index.builds == 2